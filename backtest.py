@@ -0,0 +1,514 @@
+#!/usr/bin/env python
+# Vectorized backtester for the CHAD strategies
+# Replays years of 5-minute bars through the ORB, BOSK, REV and EMA CHAD rules with NumPy operations over whole days at once.
+
+import argparse
+import inspect
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from bar_store import read_bars
+from spy_orb_strategy import SPYORBStrategy
+from spy_bosk_strategy import SPYBOSKStrategy
+from spy_rev_strategy import SPYREVStrategy
+from spy_ema_chad import SPYEMAChad
+
+
+# ---------------------------------------------------------------------------
+# Data layout
+# ---------------------------------------------------------------------------
+def _minutes(time_str: str) -> int:
+    hours, minutes, *_ = (int(part) for part in time_str.split(":"))
+    return hours * 60 + minutes
+
+
+def load_bars(path: str) -> pd.DataFrame:
+    """Read 5-minute OHLCV bars (``date, open, high, low, close, volume``) from CSV, Parquet or a bar store directory."""
+    if os.path.isdir(path):
+        return read_bars(path)
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    try:
+        df["date"] = pd.to_datetime(df["date"])
+    except ValueError:
+        # Offsets change across DST; DayMatrix converts back to the exchange timezone
+        df["date"] = pd.to_datetime(df["date"], utc=True)
+    return df
+
+
+class DayMatrix:
+    """Regular-session bars reshaped to ``(days, bars_per_day)`` arrays.
+
+    Row ``d`` holds session ``days[d]``; column ``j`` the bar starting
+    ``j * bar_minutes`` after the open.  Bars outside the session are dropped
+    and missing bars (half days, gaps) are NaN.  Timestamps are read in the
+    strategies' exchange timezone.
+    """
+
+    fields = ("open", "high", "low", "close", "volume")
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        market_open: str = "08:30:00",
+        market_close: str = "15:00:00",
+        bar_minutes: int = 5,
+        tz: str = "US/Central",
+    ):
+        dates = pd.to_datetime(df["date"])
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert(tz)
+        self.open_minute = _minutes(market_open)
+        self.bar_minutes = bar_minutes
+        self.bars_per_day = (_minutes(market_close) - self.open_minute) // bar_minutes
+
+        slot = ((dates.dt.hour * 60 + dates.dt.minute).to_numpy() - self.open_minute) // bar_minutes
+        keep = (slot >= 0) & (slot < self.bars_per_day)
+        days, row = np.unique(dates.dt.date.to_numpy()[keep], return_inverse=True)
+        self.days = days
+        shape = (len(days), self.bars_per_day)
+        for name in self.fields:
+            values = np.full(shape, np.nan)
+            values[row, slot[keep]] = df[name].to_numpy(dtype=float)[keep]
+            setattr(self, name, values)
+        self.valid = ~np.isnan(self.close)
+
+    @classmethod
+    def from_arrays(cls, days: np.ndarray, stacked: np.ndarray, open_minute: int, bar_minutes: int = 5) -> "DayMatrix":
+        """Wrap an existing ``(fields, days, bars)`` array (e.g. in shared memory) without copying."""
+        m = cls.__new__(cls)
+        m.days = days
+        m.open_minute = open_minute
+        m.bar_minutes = bar_minutes
+        m.bars_per_day = stacked.shape[2]
+        for i, name in enumerate(cls.fields):
+            setattr(m, name, stacked[i])
+        m.valid = ~np.isnan(m.close)
+        return m
+
+    def stacked(self) -> np.ndarray:
+        """The OHLCV arrays as one ``(fields, days, bars)`` block."""
+        return np.stack([getattr(self, name) for name in self.fields])
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.close.shape
+
+    def slot(self, time_str: str) -> int:
+        """Column of the bar that starts at *time_str*."""
+        return (_minutes(time_str) - self.open_minute) // self.bar_minutes
+
+
+# ---------------------------------------------------------------------------
+# Indicators — each row (session) is computed independently, like the live
+# strategies that only ever see today's bars.
+# ---------------------------------------------------------------------------
+def ema_rows(x: np.ndarray, period: int) -> np.ndarray:
+    """``ewm(span=period, adjust=False).mean()`` along each row."""
+    alpha = 2.0 / (period + 1.0)
+    out = np.empty_like(x)
+    out[:, 0] = x[:, 0]
+    for j in range(1, x.shape[1]):
+        prev, cur = out[:, j - 1], x[:, j]
+        step = prev + alpha * (cur - prev)
+        out[:, j] = np.where(np.isnan(prev), cur, np.where(np.isnan(cur), prev, step))
+    return out
+
+
+def rolling_mean_rows(x: np.ndarray, window: int) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    if x.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(x, window, axis=1).mean(axis=-1)
+    return out
+
+
+def rsi_rows(close: np.ndarray, period: int) -> np.ndarray:
+    """Simple-average RSI as computed by SPY REV."""
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = rolling_mean_rows(gain, period) / rolling_mean_rows(loss, period)
+        return 100 - (100 / (1 + rs))
+
+
+def atr_rows(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    prev_close = np.roll(close, 1, axis=1)
+    prev_close[:, 0] = np.nan
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return ema_rows(tr, period)
+
+
+def vwap_rows(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    typical = (high + low + close) / 3
+    vol = np.nan_to_num(volume)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.cumsum(np.nan_to_num(typical) * vol, axis=1) / np.cumsum(vol, axis=1)
+
+
+# ---------------------------------------------------------------------------
+# Trade simulation
+# ---------------------------------------------------------------------------
+NO_EVENT = np.iinfo(np.int64).max
+
+
+def _first(mask: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """Per row, first column >= *start* where *mask* is set (``mask.shape[1]`` if none)."""
+    cols = np.arange(mask.shape[1])
+    hits = mask & (cols >= start[:, None])
+    return np.where(hits.any(axis=1), hits.argmax(axis=1), mask.shape[1])
+
+
+def _at(values: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    """``values[d, idx[d]]`` with NaN where *idx* is out of range."""
+    inside = idx < values.shape[1]
+    picked = np.take_along_axis(values, np.minimum(idx, values.shape[1] - 1)[:, None], axis=1)[:, 0]
+    return np.where(inside, picked, np.nan)
+
+
+def _manage(
+    m: DayMatrix,
+    entry_bar: np.ndarray,
+    side: np.ndarray,
+    stop_mask: np.ndarray,
+    force_bar: int,
+    first_target: float | None,
+    second_target: np.ndarray,
+    entry_price: np.ndarray | None = None,
+    intrabar_from: np.ndarray | None = None,
+) -> dict[str, np.ndarray]:
+    """Resolve one position per row.
+
+    Events are ordered on a half-bar clock: ``2j`` is the open of bar ``j`` and
+    ``2j + 1`` anything touched inside it.  Exits, in the strategies' priority:
+
+    * stop: *stop_mask* true on the completed bar ``j`` -> out at the open of ``j + 1``;
+    * force close: out at the open of *force_bar*;
+    * second target: favourable move of *second_target* -> out at that level;
+    * breakeven: after the first target, price back at entry -> out at entry.
+
+    With *first_target* set, half the position is sold when the underlying
+    moves that far in favour.  P/L is in underlying points per share.
+    """
+    days, bars = m.shape
+    active = entry_bar < bars
+    e = np.where(active, entry_bar, bars)
+    price = _at(m.open, e) if entry_price is None else entry_price
+    start = e if intrabar_from is None else intrabar_from
+    s = side[:, None]
+
+    favourable = np.where(s > 0, m.high - price[:, None], price[:, None] - m.low)
+    back_at_entry = np.where(s > 0, m.low <= price[:, None], m.high >= price[:, None])
+
+    stop = _first(stop_mask & m.valid, e)
+    stop_t = np.where(stop + 1 < bars, 2 * (stop + 1), NO_EVENT)
+    force_t = np.where(force_bar >= e, 2 * force_bar, NO_EVENT)
+    t2 = _first(favourable >= second_target[:, None], start)
+    t2_t = np.where(t2 < bars, 2 * t2 + 1, NO_EVENT)
+    if first_target is not None:
+        t1 = _first(favourable >= first_target, start)
+        t1_t = np.where(t1 < bars, 2 * t1 + 1, NO_EVENT)
+        be = _first(back_at_entry, np.minimum(t1 + 1, bars))
+        be_t = np.where((t1 < bars) & (be < bars), 2 * be + 1, NO_EVENT)
+    else:
+        t1_t = np.full(days, NO_EVENT)
+        be_t = np.full(days, NO_EVENT)
+
+    events = np.stack([stop_t, force_t, t2_t, be_t])
+    kind = events.argmin(axis=0)
+    exit_t = events.min(axis=0)
+    last_bar = np.where(m.valid.any(axis=1), bars - 1 - m.valid[:, ::-1].argmax(axis=1), 0)
+    exit_bar = np.where(exit_t == NO_EVENT, last_bar, exit_t // 2)
+
+    exit_price = np.select(
+        [exit_t == NO_EVENT, kind == 0, kind == 1, kind == 2],
+        [_at(m.close, last_bar), _at(m.open, stop + 1), _at(m.open, np.full(days, force_bar)), price + side * second_target],
+        default=price,
+    )
+    half = t1_t <= exit_t
+    move = side * (exit_price - price)
+    pnl = np.where(half, 0.5 * (first_target or 0.0) + 0.5 * move, move)
+    return {
+        "active": active,
+        "entry_bar": e,
+        "exit_bar": exit_bar,
+        "side": side,
+        "entry_price": price,
+        "exit_price": exit_price,
+        "half_sold": half & active,
+        "pnl": np.where(active, pnl, 0.0),
+    }
+
+
+def _option_second_target(price: np.ndarray, side: np.ndarray, itm_offset: float) -> np.ndarray:
+    """Distance from entry to ``strike +/- itm_offset`` with the ATM strike ``round(price)``."""
+    strike = np.round(price)
+    return side * (strike - price) + itm_offset
+
+
+def _two_target_trades(m, entry_bar, side, stop_mask, p, force_bar):
+    """Manage ORB / BOSK / REV positions: half at the first target, rest at ITM or breakeven."""
+    price = _at(m.open, np.where(entry_bar < m.shape[1], entry_bar, m.shape[1]))
+    second = _option_second_target(np.nan_to_num(price), side, p["itm_offset"])
+    return _manage(m, entry_bar, side, stop_mask, force_bar, p["underlying_move_target"], second)
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+class BacktestResult:
+    """Trades of one backtest run plus summary statistics."""
+
+    def __init__(self, strategy: str, params: dict, m: DayMatrix, legs: list[dict]):
+        self.strategy = strategy
+        self.params = params
+        frames = []
+        for leg in legs:
+            rows = np.flatnonzero(leg["active"])
+            frames.append(pd.DataFrame({
+                "day": m.days[rows],
+                "side": np.where(leg["side"][rows] > 0, "LONG", "SHORT"),
+                "entry_bar": leg["entry_bar"][rows],
+                "exit_bar": leg["exit_bar"][rows],
+                "entry_price": leg["entry_price"][rows],
+                "exit_price": leg["exit_price"][rows],
+                "half_sold": leg["half_sold"][rows],
+                "pnl": leg["pnl"][rows],
+            }))
+        trades = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        self.trades = trades.sort_values(["day", "entry_bar"], ignore_index=True) if len(trades) else trades
+        self.days = len(m.days)
+
+    def summary(self) -> dict:
+        pnl = self.trades["pnl"].to_numpy() if len(self.trades) else np.zeros(0)
+        equity = np.cumsum(pnl)
+        drawdown = np.maximum.accumulate(np.r_[0.0, equity])[1:] - equity if len(pnl) else np.zeros(1)
+        wins, losses = pnl[pnl > 0].sum(), -pnl[pnl < 0].sum()
+        return {
+            "strategy": self.strategy,
+            "days": self.days,
+            "trades": len(pnl),
+            "win_rate": float((pnl > 0).mean()) if len(pnl) else 0.0,
+            "total_pnl": float(pnl.sum()),
+            "avg_pnl": float(pnl.mean()) if len(pnl) else 0.0,
+            "profit_factor": float(wins / losses) if losses else float("inf") if wins else 0.0,
+            "max_drawdown": float(drawdown.max()),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Strategy rules
+# ---------------------------------------------------------------------------
+def _defaults(cls) -> dict:
+    return {
+        name: param.default
+        for name, param in inspect.signature(cls.__init__).parameters.items()
+        if param.default is not inspect.Parameter.empty
+    }
+
+
+def backtest_orb(df: pd.DataFrame, m: DayMatrix | None = None, **params) -> BacktestResult:
+    """Opening range = first 15 minutes; one breakout trade per day, stopped by a close back through the range."""
+    p = {**_defaults(SPYORBStrategy), **params}
+    m = m or DayMatrix(df, p["market_open"], p["market_close"])
+    days, bars = m.shape
+    range_bars = 15 // m.bar_minutes
+    or_high = np.nanmax(m.high[:, :range_bars], axis=1)
+    or_low = np.nanmin(m.low[:, :range_bars], axis=1)
+    complete = m.valid[:, :range_bars].all(axis=1)
+
+    close = m.close
+    long_sig = (close > or_high[:, None]) & complete[:, None]
+    short_sig = (close < or_low[:, None]) & complete[:, None]
+    first = np.full(days, range_bars)
+    long_at, short_at = _first(long_sig, first), _first(short_sig, first)
+    signal = np.minimum(long_at, short_at)
+    side = np.where(long_at <= short_at, 1, -1)
+    force_bar = m.slot(p["force_close_time"])
+    entry_bar = np.where(signal + 1 < force_bar, signal + 1, bars)
+
+    stop_mask = np.where(side[:, None] > 0, close < or_low[:, None], close > or_high[:, None])
+    leg = _two_target_trades(m, entry_bar, side, stop_mask, p, force_bar)
+    return BacktestResult("orb", p, m, [leg])
+
+
+def _sequential(m, p, signals, stop_for, max_trades, force_bar, last_entry_bar, guard=None):
+    """Chain up to *max_trades* non-overlapping trades per day.
+
+    *signals(start)* returns ``(signal_bar, side, context)`` per row for the
+    first setup at or after *start*; *stop_for(side, context)* the stop mask.
+    *guard(leg)*, when given, returns the earliest bar new entries are allowed
+    after that trade (the BOSK re-entry rule).
+    """
+    days, bars = m.shape
+    start = np.zeros(days, dtype=int)
+    legs = []
+    for _ in range(max_trades):
+        signal, side, context = signals(start)
+        entry_bar = np.where((signal + 1 < bars) & (signal < last_entry_bar), signal + 1, bars)
+        if not (entry_bar < bars).any():
+            break
+        leg = _two_target_trades(m, entry_bar, side, stop_for(side, context), p, force_bar)
+        legs.append(leg)
+        resume = leg["exit_bar"] + 1
+        if guard is not None:
+            resume = np.maximum(resume, guard(leg))
+        start = np.where(leg["active"], resume, bars)
+    return legs
+
+
+def backtest_bosk(df: pd.DataFrame, m: DayMatrix | None = None, max_trades: int = 4, **params) -> BacktestResult:
+    """Break of structure plus Keltner cross on the same candle; close through EMA 9 stops out."""
+    p = {**_defaults(SPYBOSKStrategy), **params}
+    m = m or DayMatrix(df, p["market_open"], p["market_close"])
+    days, bars = m.shape
+    ema9 = ema_rows(m.close, p["ema9_period"])
+    ema20 = ema_rows(m.close, p["ema20_period"])
+    atr = atr_rows(m.high, m.low, m.close, p["atr_period"])
+    kc_upper, kc_lower = ema20 + p["kc_mult"] * atr, ema20 - p["kc_mult"] * atr
+
+    prior_high = np.full_like(m.high, np.nan)
+    prior_low = np.full_like(m.low, np.nan)
+    prior_high[:, 3:] = sliding_window_view(m.high, 3, axis=1)[:, :-1].max(axis=-1)
+    prior_low[:, 3:] = sliding_window_view(m.low, 3, axis=1)[:, :-1].min(axis=-1)
+    long_sig = (m.close > prior_high) & (m.open < kc_lower) & (m.close > kc_lower)
+    short_sig = (m.close < prior_low) & (m.open > kc_upper) & (m.close < kc_upper)
+    warmup = p["ema20_period"] + 3  # Live loop waits for ema20_period + 5 bars incl. the forming one
+    cols = np.arange(bars)
+
+    def signals(start):
+        start = np.maximum(start, warmup)
+        long_at, short_at = _first(long_sig, start), _first(short_sig, start)
+        return np.minimum(long_at, short_at), np.where(long_at <= short_at, 1, -1), None
+
+    def stop_for(side, _):
+        return np.where(side[:, None] > 0, m.close < ema9, m.close > ema9)
+
+    def guard(leg):
+        # After a winner, wait for a close back through EMA 20 before re-entering
+        crossed = np.where(leg["side"][:, None] > 0, m.close < ema20, m.close > ema20)
+        ready = _first(crossed & (cols > leg["exit_bar"][:, None]), leg["exit_bar"])
+        return np.where(leg["pnl"] > 0, ready + 1, 0)
+
+    legs = _sequential(
+        m, p, signals, stop_for, max_trades, m.slot(p["force_close_time"]), m.slot(p["no_new_trades_time"]), guard
+    )
+    return BacktestResult("bosk", p, m, legs)
+
+
+def backtest_rev(df: pd.DataFrame, m: DayMatrix | None = None, max_trades: int = 4, **params) -> BacktestResult:
+    """RSI extreme sets up a side; a close back across EMA 9 enters; the setup close is the stop."""
+    p = {**_defaults(SPYREVStrategy), **params}
+    m = m or DayMatrix(df, p["market_open"], p["market_close"])
+    days, bars = m.shape
+    rsi = rsi_rows(m.close, p["rsi_period"])
+    ema = ema_rows(m.close, p["ema_period"])
+    oversold, overbought = rsi < p["rsi_oversold"], rsi > p["rsi_overbought"]
+    confirm_long, confirm_short = m.close > ema, m.close < ema
+    warmup = p["rsi_period"] + 3
+
+    def signals(start):
+        start = np.maximum(start, warmup)
+        long_setup, short_setup = _first(oversold, start), _first(overbought, start)
+        setup = np.minimum(long_setup, short_setup)
+        side = np.where(long_setup <= short_setup, 1, -1)
+        confirm = np.where(side[:, None] > 0, confirm_long, confirm_short)
+        entry_signal = _first(confirm, np.minimum(setup + 1, bars))
+        return np.where(setup < bars, entry_signal, bars), side, _at(m.close, setup)
+
+    def stop_for(side, setup_close):
+        level = setup_close[:, None]
+        return np.where(side[:, None] > 0, m.close < level, m.close > level)
+
+    last_entry_bar = min(m.slot(p["no_new_trades_time"]), bars)
+    legs = _sequential(m, p, signals, stop_for, max_trades, m.slot(p["force_close_time"]), last_entry_bar)
+    return BacktestResult("rev", p, m, legs)
+
+
+def backtest_ema_chad(df: pd.DataFrame, m: DayMatrix | None = None, **params) -> BacktestResult:
+    """At the signal time price must sit above/below EMA short, EMA long and VWAP; enter on the 9 EMA touch."""
+    p = {**_defaults(SPYEMAChad), **params}
+    m = m or DayMatrix(df, p["market_open"], p["market_close"])
+    days, bars = m.shape
+    ema_s = ema_rows(m.close, p["ema_short"])
+    ema_l = ema_rows(m.close, p["ema_long"])
+    vwap = vwap_rows(m.high, m.low, m.close, m.volume)
+
+    check = m.slot(p["signal_time"]) - 1  # Bar completing at the signal time
+    price = m.close[:, check]
+    above = (price > ema_s[:, check]) & (price > ema_l[:, check]) & (price > vwap[:, check])
+    below = (price < ema_s[:, check]) & (price < ema_l[:, check]) & (price < vwap[:, check])
+    side = np.where(above, 1, -1)
+
+    # Touch of the prior bar's 9 EMA (within the entry threshold) inside a later bar
+    level = np.roll(ema_s, 1, axis=1)
+    band = level * p["threshold"]
+    touched = (m.low <= level + band) & (m.high >= level - band)
+    force_bar = m.slot(p["force_close_time"])
+    touch = _first(touched, np.full(days, check + 1))
+    entry_bar = np.where((above | below) & (touch < force_bar), touch, bars)
+    entry_price = np.clip(_at(level, entry_bar), _at(m.low, entry_bar), _at(m.high, entry_bar))
+
+    stop_mask = np.where(
+        side[:, None] > 0,
+        (m.close < ema_s) & (m.close < ema_l) & (m.close < vwap),
+        (m.close > ema_s) & (m.close > ema_l) & (m.close > vwap),
+    )
+    target = np.full(days, float(p["profit_target"]))
+    leg = _manage(
+        m, entry_bar, side, stop_mask, force_bar, None, target,
+        entry_price=entry_price, intrabar_from=np.minimum(entry_bar + 1, bars),
+    )
+    return BacktestResult("ema_chad", p, m, [leg])
+
+
+STRATEGIES = {
+    "orb": backtest_orb,
+    "bosk": backtest_bosk,
+    "rev": backtest_rev,
+    "ema_chad": backtest_ema_chad,
+}
+
+# config.yaml names strategies by script
+SCRIPTS = {
+    "spy_orb_strategy.py": "orb",
+    "spy_bosk_strategy.py": "bosk",
+    "spy_rev_strategy.py": "rev",
+    "spy_ema_chad.py": "ema_chad",
+}
+
+
+def run_backtest(strategy: str, df: pd.DataFrame, m: DayMatrix | None = None, **params) -> BacktestResult:
+    """Backtest *strategy* (``orb``/``bosk``/``rev``/``ema_chad`` or its script name) on *df*."""
+    return STRATEGIES[SCRIPTS.get(strategy, strategy)](df, m=m, **params)
+
+
+def _parse_value(text: str):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest a CHAD strategy on 5-minute bars")
+    parser.add_argument("data", type=str, help="CSV or Parquet file with date/open/high/low/close/volume")
+    parser.add_argument("--strategy", type=str, default="orb", choices=sorted(STRATEGIES), help="Strategy rules to replay")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="Override a strategy constructor parameter (repeatable)")
+    parser.add_argument("--trades", action="store_true", help="Print every trade")
+
+    args = parser.parse_args()
+    overrides = dict(item.split("=", 1) for item in args.set)
+    result = run_backtest(args.strategy, load_bars(args.data), **{k: _parse_value(v) for k, v in overrides.items()})
+    if args.trades:
+        print(result.trades.to_string())
+    for key, value in result.summary().items():
+        print(f"{key:>14}: {value}")
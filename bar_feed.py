@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+# Streaming bar feed for the CHAD strategies
+# Backfills the session once and then keeps the bars current through IB's keepUpToDate subscription.
+
+import datetime
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from ib_insync import *
+
+from bar_store import BarStore, bar_seconds
+from clock import WALL, Clock
+from indicators import IndicatorSet
+from quote_cache import QuoteCache
+
+
+class BarBuffer:
+    """Append-only columnar store of bars backed by growable NumPy arrays.
+
+    Columns are taken from the first frame loaded into the buffer (normally the
+    output of ``util.df`` on a ``BarDataList``).  Appending a bar is amortised
+    O(1); the arrays double in size when they run out of room.
+    """
+
+    def __init__(self, columns: dict[str, np.dtype], capacity: int = 256):
+        self.columns = list(columns)
+        self.bar_columns = list(columns)  # Columns filled from incoming bars
+        self._data = {name: np.empty(capacity, dtype=dtype) for name, dtype in columns.items()}
+        self._size = 0
+        self.version = 0  # Bumped on every append / update
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame, capacity: int = 256) -> "BarBuffer":
+        """Create a buffer holding a copy of every column of *df*."""
+        arrays = {name: df[name].to_numpy() for name in df.columns}
+        buffer = cls({name: arr.dtype for name, arr in arrays.items()}, max(capacity, 2 * len(df)))
+        for name, arr in arrays.items():
+            buffer._data[name][: len(df)] = arr
+        buffer._size = len(df)
+        return buffer
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self):
+        for name, arr in self._data.items():
+            bigger = np.empty(2 * len(arr), dtype=arr.dtype)
+            bigger[: self._size] = arr[: self._size]
+            self._data[name] = bigger
+
+    def _write(self, idx: int, bar):
+        for name in self.bar_columns:
+            self._data[name][idx] = getattr(bar, name)
+
+    def append(self, bar):
+        """Append *bar* (any object exposing the buffer's columns as attributes)."""
+        if self._size == len(self._data[self.columns[0]]):
+            self._grow()
+        self._write(self._size, bar)
+        self._size += 1
+        self.version += 1
+
+    def update_last(self, bar):
+        """Overwrite the most recent row with *bar* (used for the forming bar)."""
+        if self._size == 0:
+            self.append(bar)
+            return
+        self._write(self._size - 1, bar)
+        self.version += 1
+
+    def add_column(self, name: str, dtype=np.float64, fill=np.nan):
+        """Add an extra column (e.g. an indicator) that is not filled from bars."""
+        arr = np.full(len(self._data[self.columns[0]]), fill, dtype=dtype)
+        self._data[name] = arr
+        self.columns.append(name)
+
+    def set_value(self, name: str, idx: int, value):
+        self._data[name][idx] = value
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a read-only view of column *name* (no copy)."""
+        view = self._data[name][: self._size]
+        view.flags.writeable = False
+        return view
+
+    def to_df(self, columns: list[str] | None = None) -> pd.DataFrame:
+        """Materialise the buffer as a new DataFrame (columns are copied)."""
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({name: self._data[name][: self._size] for name in columns})
+
+
+class BarFeed:
+    """Historical backfill plus live bar updates for a single contract.
+
+    ``start()`` issues one ``reqHistoricalData(keepUpToDate=True)`` request.  From
+    then on IB pushes updates for the forming bar and every new bar into
+    ``buffer``, so strategies can read the current frame without another
+    round-trip.  As with a plain historical request, the last row is the bar
+    that is still forming and ``iloc[-2]`` is the last completed one.
+
+    Indicator sets registered with ``add_indicators`` are advanced one bar at a
+    time as updates arrive: completed bars are committed, the forming bar gets a
+    provisional value.  ``to_df`` returns the bar columns only; a strategy's
+    ``calculate_indicators`` pulls the matching indicator columns with
+    ``add_indicator_columns``.
+
+    With a ``BarStore`` the feed reads bars already on disk first: the last
+    *history_days* sessions before today are prepended (warming the
+    indicators before the open) and, after a restart, only the gap since
+    today's last stored bar is requested from IB.  Completed bars are appended
+    to the store as they close.  "Today" is *clock*'s: a replay passes its
+    ``SimClock``, so the history is the replayed day's, and the stored bars of
+    that day (ahead of the clock) are requested again rather than trusted.
+
+    Updates are delivered by the ib_insync event loop, so the owning loop must
+    keep it running (``ib.sleep`` instead of ``time.sleep``).
+    """
+
+    def __init__(
+        self,
+        ib: IB,
+        contract: Contract,
+        bar_size: str = "5 mins",
+        duration: str = "1 D",
+        what_to_show: str = "TRADES",
+        use_rth: bool = True,
+        store: BarStore | None = None,
+        history_days: int = 0,
+        clock: Clock = WALL,
+    ):
+        self.ib = ib
+        self.contract = contract
+        self.bar_size = bar_size
+        self.duration = duration
+        self.what_to_show = what_to_show
+        self.use_rth = use_rth
+        self.store = store
+        self.history_days = history_days
+        self.clock = clock
+
+        self.bars = None  # Live BarDataList owned by ib_insync
+        self.buffer: BarBuffer | None = None
+        self.indicator_sets: list[IndicatorSet] = []
+        self._offset = 0  # Rows in buffer loaded from the store ahead of ``bars``
+        self.updated_at: float | None = None  # time.monotonic() of the last update from IB
+        # Emitted with (feed) each time a bar completes
+        self.bar_close_event = Event("bar_close_event")
+        # Emitted with (feed) after the backfill and after every update from IB
+        self.update_event = Event("update_event")
+
+    @property
+    def is_active(self) -> bool:
+        return self.buffer is not None
+
+    def __len__(self) -> int:
+        return len(self.buffer) if self.buffer is not None else 0
+
+    def start(self) -> bool:
+        """Backfill and subscribe.  Returns False if IB sent no bars."""
+        if self.is_active:
+            return True
+        stored = self._load_stored()
+        bars = self.ib.reqHistoricalData(
+            self.contract,
+            endDateTime="",
+            durationStr=self._request_duration(),
+            barSizeSetting=self.bar_size,
+            whatToShow=self.what_to_show,
+            useRTH=self.use_rth,
+            formatDate=1,
+            keepUpToDate=True,
+        )
+        if not bars:
+            if bars is not None and hasattr(bars, "updateEvent"):
+                self.ib.cancelHistoricalData(bars)
+            return False
+        df = util.df(bars)
+        if stored is not None and not stored.empty:
+            tz = getattr(bars[0].date, "tzinfo", None)
+            stored["date"] = stored["date"].dt.tz_convert(tz) if tz else stored["date"].dt.tz_localize(None)
+            stored = stored[stored["date"] < pd.Timestamp(bars[0].date)].copy()
+            stored["date"] = pd.Series(stored["date"].dt.to_pydatetime(), index=stored.index, dtype=object)
+            df = pd.concat([stored[df.columns], df], ignore_index=True)
+            self._offset = len(stored)
+        self.buffer = BarBuffer.from_df(df)
+        self.bars = bars
+        self._persist(bars[:-1])
+        for indicators in self.indicator_sets:
+            self._backfill_indicators(indicators)
+        if hasattr(bars, "updateEvent"):
+            bars.updateEvent.connect(self._on_bar_update)
+        self.update_event.emit(self)
+        return True
+
+    def stop(self):
+        """Cancel the subscription and drop the buffered bars."""
+        if self.bars is not None and hasattr(self.bars, "updateEvent"):
+            self.bars.updateEvent.disconnect(self._on_bar_update)
+            if self.ib.isConnected():
+                self.ib.cancelHistoricalData(self.bars)
+        self.bars = None
+        self.buffer = None
+        self._offset = 0
+        for indicators in self.indicator_sets:
+            indicators.reset()
+
+    def to_df(self) -> pd.DataFrame | None:
+        if self.buffer is None:
+            return None
+        df = self.buffer.to_df(self.buffer.bar_columns)
+        # Remember which buffer state this frame was taken from
+        df.attrs["bar_feed"] = (id(self), self.buffer.version)
+        return df
+
+    # ------------------------------------------------------------------
+    # Bar store
+    # ------------------------------------------------------------------
+    def _load_stored(self) -> pd.DataFrame | None:
+        """Stored bars of the previous *history_days* sessions and of today."""
+        if self.store is None:
+            return None
+        today = self.clock.now(self.store.tz).date()
+        history = self.store.load(self.contract.symbol, today - datetime.timedelta(days=1), self.history_days)
+        return pd.concat([history, self.store.load_day(self.contract.symbol, today)], ignore_index=True)
+
+    def _request_duration(self) -> str:
+        """Only ask IB for the bars after today's last stored one."""
+        if self.store is None:
+            return self.duration
+        now = self.clock.now(self.store.tz)
+        last = self.store.last_bar(self.contract.symbol, now.date())
+        if last is None or last > now:
+            return self.duration
+        gap = (now - last).total_seconds() + bar_seconds(self.bar_size)
+        if gap >= 86400:
+            return self.duration
+        return f"{max(math.ceil(gap), 60)} S"
+
+    def _persist(self, bars):
+        if self.store is None:
+            return
+        try:
+            self.store.append(self.contract.symbol, bars)
+        except OSError as exc:
+            print(f"Could not store {self.contract.symbol} bars: {exc}")
+
+    # ------------------------------------------------------------------
+    # Indicators
+    # ------------------------------------------------------------------
+    def add_indicators(self, indicators: IndicatorSet) -> IndicatorSet:
+        """Keep *indicators* up to date with every bar from now on.
+
+        An identical set already registered (e.g. by another strategy sharing
+        the feed) is reused and returned instead.  Raises ValueError when a
+        different set would write the same columns.
+        """
+        for registered in self.indicator_sets:
+            if registered.key == indicators.key:
+                return registered
+        if not self.can_add(indicators):
+            raise ValueError(f"{type(indicators).__name__} columns clash with indicators already on this feed")
+        self.indicator_sets.append(indicators)
+        if self.buffer is not None:
+            self._backfill_indicators(indicators)
+        return indicators
+
+    def can_add(self, indicators: IndicatorSet) -> bool:
+        """True if *indicators* is registered already or its columns are free."""
+        for registered in self.indicator_sets:
+            if registered.key == indicators.key:
+                return True
+            if set(registered.columns) & set(indicators.columns):
+                return False
+        return True
+
+    def add_indicator_columns(self, df: pd.DataFrame) -> bool:
+        """Copy the streamed indicator columns into *df*.
+
+        Only frames produced by ``to_df`` for the current buffer state qualify;
+        returns False otherwise so the caller can fall back to a full recompute.
+        """
+        if self.buffer is None or df.attrs.get("bar_feed") != (id(self), self.buffer.version):
+            return False
+        for indicators in self.indicator_sets:
+            for name in indicators.columns:
+                df[name] = self.buffer.column(name).copy()
+        return True
+
+    def _backfill_indicators(self, indicators: IndicatorSet):
+        buffer = self.buffer
+        for name in indicators.columns:
+            buffer.add_column(name)
+        last = len(buffer) - 1
+        for idx, bar in enumerate(buffer.to_df(buffer.bar_columns).itertuples(index=False)):
+            self._write_indicators(indicators, idx, bar, provisional=idx == last)
+
+    def _write_indicators(self, indicators: IndicatorSet, idx: int, bar, provisional: bool):
+        for name, value in zip(indicators.columns, indicators.update(bar, provisional=provisional)):
+            self.buffer.set_value(name, idx, value)
+
+    def _update_indicators(self, idx: int, bar, provisional: bool):
+        for indicators in self.indicator_sets:
+            self._write_indicators(indicators, idx, bar, provisional)
+
+    # ------------------------------------------------------------------
+    # IB update handling
+    # ------------------------------------------------------------------
+    def _on_bar_update(self, bars, has_new_bar: bool):
+        buffer = self.buffer
+        if buffer is None:
+            return
+        self.updated_at = time.monotonic()
+        offset = self._offset
+        n = len(buffer) - offset  # Rows of ``bars`` already in the buffer
+        if not has_new_bar:
+            buffer.update_last(bars[-1])
+            self._update_indicators(len(buffer) - 1, bars[-1], provisional=True)
+            self.update_event.emit(self)
+            return
+        # The previously forming bar is now final; record its closing values first
+        if n:
+            buffer.update_last(bars[n - 1])
+            self._update_indicators(offset + n - 1, bars[n - 1], provisional=False)
+        for idx in range(n, len(bars)):
+            buffer.append(bars[idx])
+            self._update_indicators(offset + idx, bars[idx], provisional=idx == len(bars) - 1)
+        self._persist(bars[max(n - 1, 0):-1])
+        self.update_event.emit(self)
+        self.bar_close_event.emit(self)
+
+
+class BarFeedCache:
+    """Bar feeds shared by every strategy on one connection.
+
+    Strategies trading the same contract and bar size get the same ``BarFeed``
+    (one IB subscription, one buffer) and identical indicator sets are
+    computed once.  A strategy whose indicators would overwrite another's
+    columns with different parameters gets a feed of its own.
+
+    Every ``get`` takes a hold on the feed; a strategy done with it calls
+    ``release`` instead of ``stop``, and the subscription is cancelled when
+    the last holder releases it.  The feed stays in the cache, so a later
+    ``get`` starts it again with a fresh backfill.
+    """
+
+    def __init__(self, ib: IB, clock: Clock = WALL):
+        self.ib = ib
+        self.clock = clock  # Handed to the feeds for their bar store lookups
+        self._feeds: dict[tuple, list[BarFeed]] = {}
+        self._holders: dict[int, int] = {}  # Outstanding gets per feed (by id)
+
+    def __len__(self) -> int:
+        return sum(len(feeds) for feeds in self._feeds.values())
+
+    def get(
+        self,
+        contract: Contract,
+        bar_size: str = "5 mins",
+        duration: str = "1 D",
+        indicators: IndicatorSet | None = None,
+        store: BarStore | None = None,
+        history_days: int = 0,
+    ) -> BarFeed:
+        key = (QuoteCache.key(contract), bar_size, duration, history_days)
+        feeds = self._feeds.setdefault(key, [])
+        feed = next((f for f in feeds if indicators is None or f.can_add(indicators)), None)
+        if feed is None:
+            feed = BarFeed(self.ib, contract, bar_size=bar_size, duration=duration, store=store,
+                           history_days=history_days, clock=self.clock)
+            feeds.append(feed)
+        if indicators is not None:
+            feed.add_indicators(indicators)
+        self._holders[id(feed)] = self._holders.get(id(feed), 0) + 1
+        return feed
+
+    def release(self, feed: BarFeed):
+        """Drop one hold on *feed*; the last one stops it."""
+        held = self._holders.get(id(feed), 0)
+        if held > 1:
+            self._holders[id(feed)] = held - 1
+            return
+        self._holders.pop(id(feed), None)
+        feed.stop()
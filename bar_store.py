@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# On-disk bar store for the CHAD strategies
+# Keeps completed bars per ticker and per day in append-only record files so restarts and backtests skip the IB download.
+
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+import pytz
+
+# One fixed-width record per bar; columns match ib_insync's BarData
+BAR_DTYPE = np.dtype([
+    ("date", "<i8"),  # UTC epoch nanoseconds of the bar start
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+    ("average", "<f8"),
+    ("barCount", "<i8"),
+])
+
+_UNIT_SECONDS = {"sec": 1, "min": 60, "hour": 3600, "day": 86400}
+
+
+def bar_seconds(bar_size: str) -> int:
+    """Length of an IB bar size setting in seconds (``"5 mins"`` -> 300)."""
+    count, unit = bar_size.split()
+    return int(count) * _UNIT_SECONDS[unit.rstrip("s")]
+
+
+def read_records(path: str) -> np.ndarray:
+    """Records of one day file; a trailing partial record (interrupted write) is ignored."""
+    count = os.path.getsize(path) // BAR_DTYPE.itemsize
+    return np.fromfile(path, dtype=BAR_DTYPE, count=count)
+
+
+def records_to_df(records: np.ndarray, tz: str | datetime.tzinfo = "UTC") -> pd.DataFrame:
+    df = pd.DataFrame({name: records[name] for name in BAR_DTYPE.names if name != "date"})
+    df.insert(0, "date", pd.to_datetime(records["date"], utc=True).tz_convert(tz))
+    return df
+
+
+def read_bars(directory: str, tz: str | datetime.tzinfo = "UTC") -> pd.DataFrame:
+    """Every bar stored for one ticker (a ``<root>/<bar size>/<TICKER>`` directory), oldest first."""
+    files = sorted(name for name in os.listdir(directory) if name.endswith(".bars"))
+    records = [read_records(os.path.join(directory, name)) for name in files]
+    return records_to_df(np.concatenate(records) if records else np.empty(0, BAR_DTYPE), tz)
+
+
+class BarStore:
+    """Completed bars kept on disk, one file per ticker and session day.
+
+    Files live at ``<root>/<bar size>/<TICKER>/<YYYYMMDD>.bars`` and hold raw
+    ``BAR_DTYPE`` records in time order, so a day is read with a single
+    ``np.fromfile`` (or ``np.memmap``) and new bars are appended without
+    rewriting anything.  ``append`` only writes bars newer than the last one
+    on disk, which makes it safe to hand it overlapping backfills.
+
+    Naive timestamps are taken to be in *tz*, the exchange timezone that also
+    decides which day file a bar belongs to.  A *read_only* store (a replay's
+    view of the live one) loads bars but never appends.
+    """
+
+    def __init__(self, root: str = "bars", bar_size: str = "5 mins", tz: str = "US/Central", read_only: bool = False):
+        self.root = root
+        self.bar_size = bar_size
+        self.tz = pytz.timezone(tz)
+        self.read_only = read_only
+        self._last: dict[tuple[str, datetime.date], int] = {}  # Last stored bar per day file
+
+    def directory(self, symbol: str) -> str:
+        return os.path.join(self.root, self.bar_size.replace(" ", "").rstrip("s"), symbol)
+
+    def path(self, symbol: str, day: datetime.date) -> str:
+        return os.path.join(self.directory(symbol), day.strftime("%Y%m%d") + ".bars")
+
+    def days(self, symbol: str) -> list[datetime.date]:
+        """Session days with stored bars, oldest first."""
+        directory = self.directory(symbol)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            datetime.datetime.strptime(name[:-5], "%Y%m%d").date()
+            for name in os.listdir(directory)
+            if name.endswith(".bars")
+        )
+
+    def read_day(self, symbol: str, day: datetime.date) -> np.ndarray:
+        path = self.path(symbol, day)
+        return read_records(path) if os.path.exists(path) else np.empty(0, BAR_DTYPE)
+
+    def last_bar(self, symbol: str, day: datetime.date) -> datetime.datetime | None:
+        """Start time of the newest stored bar of *day*, or None."""
+        last = self._last_stamp(symbol, day)
+        return None if last is None else pd.Timestamp(last, tz="UTC").tz_convert(self.tz).to_pydatetime()
+
+    def load_day(self, symbol: str, day: datetime.date, tz: str | datetime.tzinfo | None = None) -> pd.DataFrame:
+        return records_to_df(self.read_day(symbol, day), tz or self.tz)
+
+    def load(self, symbol: str, end: datetime.date, days: int = 1, tz: str | datetime.tzinfo | None = None) -> pd.DataFrame:
+        """Bars of the last *days* stored sessions up to and including *end*."""
+        selected = [day for day in self.days(symbol) if day <= end][-days:] if days > 0 else []
+        records = [self.read_day(symbol, day) for day in selected]
+        return records_to_df(np.concatenate(records) if records else np.empty(0, BAR_DTYPE), tz or self.tz)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def append(self, symbol: str, bars) -> int:
+        """Append completed *bars* (``BarData`` or alike) not yet on disk; returns the number written."""
+        if self.read_only:
+            return 0
+        by_day: dict[datetime.date, list] = {}
+        for bar in bars:
+            stamp = self._stamp(bar.date)
+            day = pd.Timestamp(stamp, tz="UTC").tz_convert(self.tz).date()
+            by_day.setdefault(day, []).append((stamp, bar))
+
+        written = 0
+        for day, rows in by_day.items():
+            last = self._last_stamp(symbol, day)
+            rows = [(stamp, bar) for stamp, bar in rows if last is None or stamp > last]
+            if not rows:
+                continue
+            records = np.empty(len(rows), dtype=BAR_DTYPE)
+            records["date"] = [stamp for stamp, _ in rows]
+            for name in BAR_DTYPE.names[1:]:
+                records[name] = [getattr(bar, name) for _, bar in rows]
+            records.sort(order="date")
+            os.makedirs(self.directory(symbol), exist_ok=True)
+            path = self.path(symbol, day)
+            partial = os.path.getsize(path) % BAR_DTYPE.itemsize if os.path.exists(path) else 0
+            if partial:
+                os.truncate(path, os.path.getsize(path) - partial)  # Drop a half-written record
+            with open(path, "ab") as f:
+                records.tofile(f)
+            self._last[(symbol, day)] = int(records["date"][-1])
+            written += len(records)
+        return written
+
+    def _stamp(self, value) -> int:
+        ts = pd.Timestamp(value)
+        if ts.tzinfo is None:
+            ts = ts.tz_localize(self.tz)
+        return ts.value
+
+    def _last_stamp(self, symbol: str, day: datetime.date) -> int | None:
+        key = (symbol, day)
+        if key not in self._last:
+            path = self.path(symbol, day)
+            count = os.path.getsize(path) // BAR_DTYPE.itemsize if os.path.exists(path) else 0
+            if count == 0:
+                return None
+            last = np.fromfile(path, dtype=BAR_DTYPE, count=1, offset=(count - 1) * BAR_DTYPE.itemsize)
+            self._last[key] = int(last["date"][0])
+        return self._last[key]
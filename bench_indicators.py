@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# Benchmarks for the indicator calculations
+
+import unittest
+from unittest.mock import Mock
+
+from ib_insync import BarData, BarDataList, Stock
+
+from bar_feed import BarFeed
+from benchmark import SIZES, BenchmarkCase, make_bars
+from indicators import BOSKIndicators, EMAChadIndicators, REVIndicators
+from spy_bosk_strategy import SPYBOSKStrategy
+from spy_ema_chad import SPYEMAChad
+from spy_rev_strategy import SPYREVStrategy
+
+
+class BenchIndicators(BenchmarkCase):
+    def test_calculate_indicators(self):
+        """Full-frame recomputation, the path taken without a live bar feed."""
+        for cls in (SPYBOSKStrategy, SPYREVStrategy, SPYEMAChad):
+            strategy = cls()
+            for size, sessions in SIZES.items():
+                df = make_bars(sessions)
+                self.bench("calculate_indicators", lambda: strategy.calculate_indicators(df),
+                           strategy=cls.__name__, bars=size)
+
+    def test_bar_feed_update(self):
+        """One forming-bar update of a feed carrying the BOSK, REV and EMA CHAD indicator sets."""
+        for size, sessions in SIZES.items():
+            rows = make_bars(sessions).to_dict("records")
+            bars = BarDataList([BarData(**row) for row in rows])
+            ib = Mock()
+            ib.reqHistoricalData.return_value = bars
+            feed = BarFeed(ib, Stock("SPY", "SMART", "USD"))
+            for indicators in (BOSKIndicators(), REVIndicators(), EMAChadIndicators()):
+                feed.add_indicators(indicators)
+            feed.start()
+            self.bench("bar_feed_update", lambda: feed._on_bar_update(bars, False), bars=size)
+            self.bench("bar_feed_to_df", lambda: feed.add_indicator_columns(feed.to_df()), bars=size)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+# Benchmarks for one pass of the strategy loops against the simulated broker
+
+import unittest
+
+from benchmark import TICKERS, BenchmarkCase, sim_strategies
+from spy_bosk_strategy import SPYBOSKStrategy
+from spy_ema_chad import SPYEMAChad
+from spy_orb_strategy import SPYORBStrategy
+from spy_rev_strategy import SPYREVStrategy
+
+
+class BenchLoop(BenchmarkCase):
+    def test_step(self):
+        """``step()`` of every strategy instance once, with bar feeds, quotes and chains already warm."""
+        for cls in (SPYORBStrategy, SPYBOSKStrategy, SPYREVStrategy, SPYEMAChad):
+            for count in TICKERS:
+                _, strategies = sim_strategies(cls, count)
+                run_pass = lambda: [strategy.step() for strategy in strategies]
+                run_pass()  # Start the feeds and load the chains outside the timing
+                self.bench("step", run_pass, strategy=cls.__name__, tickers=count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# Benchmarks for the signal and contract selection helpers
+
+import datetime
+import tempfile
+import unittest
+
+import numpy as np
+from ib_insync import MarketOrder, Stock
+
+from benchmark import SIZES, TICKERS, TZ, BenchmarkCase, make_bars, sim_strategies, symbols
+from greeks import greeks, implied_vol, price
+from option_chain import OptionChainCache
+from risk_engine import RiskEngine
+from sim_broker import SimIB
+from scanner import FIELDS, BarScanner, BOSKScan, ChadScan
+from spy_bosk_strategy import SPYBOSKStrategy
+from spy_orb_strategy import SPYORBStrategy
+from tick_recorder import TickRecorder
+
+
+class BenchSignals(BenchmarkCase):
+    def test_break_of_structure(self):
+        strategy = SPYBOSKStrategy()
+        for size, sessions in SIZES.items():
+            df = make_bars(sessions)
+            self.bench("_break_of_structure", lambda: strategy._break_of_structure(df, len(df) - 2), bars=size)
+
+    def test_calculate_opening_range(self):
+        strategy = SPYORBStrategy()
+        for size, sessions in SIZES.items():
+            df = make_bars(sessions)
+            self.bench("calculate_opening_range", lambda: strategy.calculate_opening_range(df), bars=size)
+
+    def test_scanner_bar_close(self):
+        """One bar close scanned for EMA CHAD and BOSK signals across every ticker."""
+        for count in TICKERS:
+            names = symbols(count)
+            scanner = BarScanner(names, [ChadScan(), BOSKScan()], capacity=4096)
+            scanner.add_frames({name: make_bars(1, seed=i) for i, name in enumerate(names)})
+            last = scanner.dates[scanner.count - 1]
+            bar = [scanner.column(name)[:, -1].copy() for name in FIELDS]
+            self.bench("scanner_bar_close", lambda: scanner.add_bar(last, *bar), tickers=count)
+            self.assertEqual(scanner.signals["bosk"].shape, (count,))
+
+    def test_chain_greeks(self):
+        """Implied vols and greeks for a whole chain of calls and puts in one pass; a 2000-option chain solves in under a millisecond."""
+        for count in (200, 2000):
+            strikes = np.linspace(400.0, 600.0, count // 2).repeat(2)
+            is_call = np.tile([True, False], count // 2)
+            t = 2 / 365
+            premiums = price(500.0, strikes, t, 0.15 + 0.0005 * np.abs(strikes - 500.0), is_call)
+            best_us = self.bench("implied_vol", lambda: implied_vol(premiums, 500.0, strikes, t, is_call), options=count)
+            self.assertLess(best_us, 1000.0)
+            vols = implied_vol(premiums, 500.0, strikes, t, is_call)
+            self.bench("greeks", lambda: greeks(500.0, strikes, t, vols, is_call), options=count)
+
+    def test_risk_tick(self):
+        """Risk engine update on one option tick and one underlying tick, with that many positions held."""
+        today = datetime.datetime.now(TZ).date()
+        ib = SimIB({"SPY": make_bars(1)}, start=TZ.localize(datetime.datetime.combine(today, datetime.time(13, 0))), pacing=False)
+        ib.connect()
+        chain = OptionChainCache(ib).load(Stock("SPY", "SMART", "USD"), today, max_dte=0)
+        expiry = chain.expirations[0]
+        engine = RiskEngine(ib, clock=ib.now)
+        engine.start()
+        spot = ib.underlying_price("SPY")
+        held = 0
+        for count in TICKERS:
+            while held < count:
+                right, offset = "CP"[held % 2], held // 2
+                contract = chain.select(right, spot + (offset if right == "C" else -offset), expiry)
+                ib.placeOrder(contract, MarketOrder("BUY", 1))
+                ib.sleep(1)
+                held += 1
+            ticker = engine.quotes.subscribe(contract)
+            slot = engine._slots[contract.conId]
+            self.bench("risk_option_tick", lambda: engine._on_tick(slot, ticker), positions=count)
+            underlying = engine.quotes.subscribe(Stock("SPY", "SMART", "USD"))
+            self.bench("risk_underlying_tick", lambda: engine._on_underlying_tick(0, underlying), positions=count)
+            self.assertEqual(engine.snapshot()["positions"], count)
+
+    def test_record_tick(self):
+        """Tick recorder cost per quote tick and per bar update, file writes included."""
+        ib = SimIB({"SPY": make_bars(1)}, pacing=False)
+        ib.connect()
+        ib.sleep(3600)
+        ticker = ib.reqMktData(Stock("SPY", "SMART", "USD"))
+        bar = ib.reqHistoricalData(Stock("SPY", "SMART", "USD"), "", "1 D", "5 mins", "TRADES", True)[-1]
+        with tempfile.TemporaryDirectory() as root:
+            recorder = TickRecorder(root)
+            self.bench("record_quote", lambda: recorder.record_quote(ticker))
+            self.bench("record_bar", lambda: recorder.record_bar(ticker.contract, bar))
+            recorder.close()
+            self.assertEqual(len(recorder.load_day(recorder.days()[0])[0]), recorder.recorded)
+
+    def test_option_contract_selection(self):
+        for cls in (SPYORBStrategy, SPYBOSKStrategy):
+            _, (strategy,) = sim_strategies(cls, 1)
+            strategy.load_option_chain()
+            self.assertIsNotNone(strategy.get_option_chains().get(strategy.ticker))
+            self.bench("get_option_contract", lambda: strategy.get_option_contract("C"), strategy=cls.__name__)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# Benchmark helpers for the CHAD strategies
+# Timing base class, synthetic bar data and a simulated-IB strategy fixture shared by the bench_*.py suites.
+
+import contextlib
+import datetime
+import os
+import statistics
+import timeit
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytz
+
+TZ = pytz.timezone("US/Central")
+BARS_PER_SESSION = 78  # 08:30 - 14:55 in 5-minute bars
+
+# Data sizes in sessions and ticker counts; BENCH_QUICK=1 skips the largest ones
+QUICK = os.environ.get("BENCH_QUICK", "") not in ("", "0")
+SIZES = {"1 day": 1, "1 month": 21} if QUICK else {"1 day": 1, "1 month": 21, "1 year": 252}
+TICKERS = (1, 10) if QUICK else (1, 10, 100)
+
+# Results of the current run, collected by run_benchmarks.py
+RESULTS: list[dict] = []
+
+
+def session_days(sessions: int, end: datetime.date | None = None) -> list[datetime.date]:
+    """The last *sessions* weekdays up to *end* (today by default; today is always included)."""
+    end = end or datetime.datetime.now(TZ).date()
+    days, day = [end], end
+    while len(days) < sessions:
+        day -= datetime.timedelta(days=1)
+        if day.weekday() < 5:
+            days.append(day)
+    return days[::-1]
+
+
+def make_bars(sessions: int, price: float = 500.0, seed: int = 0, end: datetime.date | None = None) -> pd.DataFrame:
+    """Random-walk 5-minute RTH bars for *sessions* days ending today, oldest first."""
+    rng = np.random.default_rng(seed)
+    open_time = datetime.time(8, 30)
+    dates = [
+        TZ.localize(datetime.datetime.combine(day, open_time) + datetime.timedelta(minutes=5 * i))
+        for day in session_days(sessions, end) for i in range(BARS_PER_SESSION)
+    ]
+    n = len(dates)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.0008, n)))
+    open_ = np.concatenate([[price], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.0006, n)) * close
+    return pd.DataFrame({
+        "date": dates,
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.integers(1_000, 50_000, n).astype(float),
+        "average": close,
+        "barCount": 100,
+    })
+
+
+def symbols(count: int) -> list[str]:
+    return ["SPY"] if count == 1 else [f"T{i:03d}" for i in range(count)]
+
+
+def sim_strategies(cls, count: int, at: datetime.time = datetime.time(13, 0), **kwargs):
+    """*count* instances of strategy *cls* on distinct tickers, sharing one ``SimIB`` through a runtime.
+
+    The session is today's and the market-hour checks are pinned open, so
+    ``step()`` runs the full data, indicator and signal path whatever the
+    wall clock says.
+    """
+    from sim_broker import SimIB
+    from strategy_runtime import StrategyRuntime
+
+    names = symbols(count)
+    bars = {name: make_bars(1, price=100.0 + i, seed=i) for i, name in enumerate(names)}
+    start = TZ.localize(datetime.datetime.combine(datetime.datetime.now(TZ).date(), at))
+    ib = SimIB(bars, start=start, pacing=False)  # Setup requests would trip IB's pacing at 100 tickers
+    ib.connect()
+    runtime = StrategyRuntime(ib=ib)
+    strategies = []
+    for name in names:
+        strategy = runtime.add(cls(ticker=name, **kwargs))
+        for check, value in (("is_market_open", True), ("is_force_close_time", False),
+                             ("should_start_monitoring", True), ("can_open_new_trades", True)):
+            if hasattr(strategy, check):
+                setattr(strategy, check, lambda value=value: value)
+        if hasattr(strategy, "monitoring_started"):
+            strategy.monitoring_started = True
+        strategies.append(strategy)
+    return ib, strategies
+
+
+class BenchmarkCase(unittest.TestCase):
+    """``unittest`` case whose ``bench`` calls time a callable and record the result.
+
+    Each call runs *fn* in batches sized to take at least *min_time* seconds,
+    repeats the batch *repeat* times and keeps the best and median time per
+    call.  Output printed by *fn* is discarded unless ``quiet=False``.
+    """
+
+    min_time = 0.05
+    repeat = 5
+
+    def bench(self, name: str, fn, quiet: bool = True, **params) -> float:
+        timer = timeit.Timer(fn)
+        with open(os.devnull, "w") as devnull, (contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext()):
+            number, elapsed = 1, timer.timeit(1)
+            while elapsed * number < self.min_time and number < 1_000_000:
+                number *= 10 if elapsed * number * 10 < self.min_time else 2
+            times = [t / number for t in timer.repeat(self.repeat, number)]
+        result = {
+            "suite": type(self).__name__,
+            "name": name,
+            **params,
+            "best_us": min(times) * 1e6,
+            "median_us": statistics.median(times) * 1e6,
+            "number": number,
+        }
+        RESULTS.append(result)
+        return result["best_us"]
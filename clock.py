@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# Pluggable clock for the CHAD strategies
+# Wall time for live trading, or the simulated broker's virtual time so a recorded session replays through the real run() loops.
+
+import datetime
+import time
+
+
+class Clock:
+    """Wall time, the default ``clock`` of a strategy.
+
+    ``now`` and ``time`` are what the strategies read the session time from;
+    ``monotonic`` is for measuring ages (``QuoteCache``), ``sleep`` blocks.
+    """
+
+    def now(self, tz: datetime.tzinfo | None = None) -> datetime.datetime:
+        return datetime.datetime.now(tz)
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, secs: float):
+        time.sleep(secs)
+
+
+WALL = Clock()
+
+
+class SimClock(Clock):
+    """Virtual time of a ``SimIB``: ``sleep`` advances it instead of blocking.
+
+    All four readings are the broker's simulated clock, so a strategy given
+    this clock (and the broker as its ``ib``) sees the session of the recorded
+    bars instead of today, and waits cost no wall time.
+    """
+
+    def __init__(self, ib):
+        self.ib = ib
+
+    def now(self, tz: datetime.tzinfo | None = None) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.ib.time, tz or self.ib.tz)
+
+    def time(self) -> float:
+        return self.ib.time
+
+    def monotonic(self) -> float:
+        return self.ib.time
+
+    def sleep(self, secs: float):
+        self.ib.sleep(secs)
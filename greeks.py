@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# Option pricing for the CHAD strategies
+# Vectorised Black-Scholes prices, greeks and implied volatility for a whole option chain, priced from the streaming quotes already held in the QuoteCache.
+
+import datetime
+import math
+
+import numpy as np
+from ib_insync import *
+
+from option_chain import OptionChainIndex
+from quote_cache import QuoteCache
+from session_calendar import SessionCalendar
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+MIN_SECONDS = 60  # Floor on the time left, so expiring options keep finite greeks
+
+# Coefficients of Abramowitz & Stegun 26.2.17 (|error| < 7.5e-8)
+_P = 0.2316419
+_B = (0.319381530, -0.356563782, 1.781477937, -1.821255978, 1.330274429)
+_SQRT_2PI = math.sqrt(2 * math.pi)
+
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF without SciPy (in-place arithmetic: this is the hot path of the IV solver)."""
+    x = np.asarray(x, dtype=float)
+    shape = x.shape
+    x = x.reshape(-1)  # In-place ufuncs need arrays, not scalars
+    k = np.abs(x)
+    k *= _P
+    k += 1.0
+    np.reciprocal(k, out=k)
+    tail = k * _B[4]
+    for b in reversed(_B[:4]):
+        tail += b
+        tail *= k
+    pdf = x * x
+    pdf *= -0.5
+    np.exp(pdf, out=pdf)
+    pdf /= _SQRT_2PI
+    tail *= pdf  # P(X > |x|)
+    return np.where(x >= 0, 1.0 - tail, tail).reshape(shape)
+
+
+def years_to_expiry(now: datetime.datetime, expiry: str, calendar: SessionCalendar) -> float:
+    """Time from *now* to the close of the *expiry* session (``YYYYMMDD``), in years."""
+    day = datetime.datetime.strptime(expiry, "%Y%m%d").date()
+    session = calendar.session(now) if day == now.astimezone(calendar.tz).date() else calendar.build(day)
+    close = session.close if session.trading else session.end
+    return max(close - now.timestamp(), MIN_SECONDS) / SECONDS_PER_YEAR
+
+
+# ----------------------------------------------------------------------------
+# Black-Scholes
+# ----------------------------------------------------------------------------
+def _d1_d2(spot, strike, t, vol, rate):
+    sqrt_t = np.sqrt(t)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(spot / strike) + (rate + 0.5 * vol * vol) * t) / (vol * sqrt_t)
+    return d1, d1 - vol * sqrt_t, sqrt_t
+
+
+def price(spot, strike, t, vol, is_call, rate: float = 0.0) -> np.ndarray:
+    """Black-Scholes value; every argument may be an array (they broadcast)."""
+    d1, d2, _ = _d1_d2(spot, strike, t, vol, rate)
+    discounted = strike * np.exp(-rate * t)
+    call = spot * norm_cdf(d1) - discounted * norm_cdf(d2)
+    return np.where(is_call, call, call - spot + discounted)  # Put from put-call parity
+
+
+def greeks(spot, strike, t, vol, is_call, rate: float = 0.0) -> dict[str, np.ndarray]:
+    """Value, delta, gamma, theta (per calendar day) and vega (per vol point)."""
+    d1, d2, sqrt_t = _d1_d2(spot, strike, t, vol, rate)
+    discount = np.exp(-rate * t)
+    cdf_d1, cdf_d2, pdf_d1 = norm_cdf(d1), norm_cdf(d2), norm_pdf(d1)
+    call = spot * cdf_d1 - strike * discount * cdf_d2
+    decay = -spot * pdf_d1 * vol / (2 * sqrt_t)
+    call_theta = decay - rate * strike * discount * cdf_d2
+    put_theta = decay + rate * strike * discount * (1 - cdf_d2)
+    return {
+        "value": np.where(is_call, call, call - spot + strike * discount),
+        "delta": np.where(is_call, cdf_d1, cdf_d1 - 1),
+        "gamma": pdf_d1 / (spot * vol * sqrt_t),
+        "theta": np.where(is_call, call_theta, put_theta) / 365,
+        "vega": spot * pdf_d1 * sqrt_t / 100,
+    }
+
+
+def implied_vol(
+    premium, spot, strike, t, is_call, rate: float = 0.0,
+    low: float = 1e-4, high: float = 5.0, tol: float = 1e-6, max_iter: int = 50,
+) -> np.ndarray:
+    """Volatility that reprices *premium*; NaN where the premium is outside the no-arbitrage bounds or has no time value.
+
+    Puts are solved as calls through put-call parity.  Each option starts
+    from the Corrado-Miller guess, or in the wings (where that formula has no
+    real root and overshoots) from the asymptotic ``-d1**2 / 2`` decay of the
+    out-of-the-money price, so most converge in three or four Halley steps
+    inside a bisection bracket.  All options are stepped together; the ones
+    within *tol* of their premium are masked out and keep their vol.
+    """
+    premium, spot, strike, t, is_call = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (premium, spot, strike, t)), np.asarray(is_call, dtype=bool)
+    )
+    shape = premium.shape
+    premium, spot, strike, t, is_call = (np.ravel(a) for a in (premium, spot, strike, t, is_call))
+    discounted = strike * np.exp(-rate * t)
+    forward = spot - discounted
+    call = np.where(is_call, premium, premium + forward)
+    otm = call - np.maximum(forward, 0.0)  # Time value: the out-of-the-money option's price
+    valid = (otm > tol) & (call < spot)  # No time value: the vol is undetermined
+
+    result = np.full(premium.shape, np.nan)
+    active = np.flatnonzero(valid)
+    if not active.size:
+        return result.reshape(shape)
+    call, otm, spot, discounted, t, forward = (a[active] for a in (call, otm, spot, discounted, t, forward))
+    n = len(active)
+    sqrt_t = np.sqrt(t)
+    log_m = np.log(spot / discounted)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Total vol (vol * sqrt_t) from Corrado-Miller near the money ...
+        half = call - 0.5 * forward
+        root = half * half - forward * forward / np.pi
+        guess = _SQRT_2PI / (spot + discounted) * (half + np.sqrt(np.maximum(root, 0.0)))
+        # ... and from otm ~ spot * pdf(d1) * v / d1**2, d1 ~ |log_m| / v, in the wings
+        moneyness = np.abs(log_m)
+        level = np.log(np.sqrt(spot * discounted) / otm) - 0.5 * np.log(2 * np.pi)
+        wing = moneyness / np.sqrt(2 * np.maximum(level, 0.5))
+        for _ in range(2):
+            wing = moneyness / np.sqrt(2 * np.maximum(level + np.log(wing) - 2 * np.log(np.maximum(moneyness / wing, 1.0)), 0.5))
+        vol = np.clip(np.where(root > 0, guess, wing) / sqrt_t, low, high)
+    lo = np.full(n, low)
+    hi = np.full(n, high)
+    pending = np.ones(n, dtype=bool)
+    for _ in range(max_iter):
+        vs = vol * sqrt_t
+        d1 = log_m / vs
+        d1 += 0.5 * vs
+        d2 = d1 - vs
+        cdf = norm_cdf(np.concatenate((d1, d2)))  # One call: the CDF is most of an iteration's cost
+        diff = spot * cdf[:n] - discounted * cdf[n:] - call
+        pending &= np.abs(diff) > tol
+        pending &= hi - lo > tol * vol
+        if not pending.any():
+            break
+        above = diff > 0
+        hi = np.where(above, vol, hi)
+        lo = np.where(above, lo, vol)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Halley step: Newton corrected by the vomma (d vega / d vol = vega * d1 * d2 / vol)
+            step = diff / (spot * norm_pdf(d1) * sqrt_t)
+            step /= 1.0 - 0.5 * step * d1 * d2 / vol
+            step = vol - step
+        step = np.where((step > lo) & (step < hi), step, 0.5 * (lo + hi))
+        vol = np.where(pending, step, vol)
+    result[active] = vol
+    return result.reshape(shape)
+
+
+# ----------------------------------------------------------------------------
+# Chain pricing
+# ----------------------------------------------------------------------------
+class ChainPricer:
+    """Implied vols and greeks of an option chain from the quotes already streaming in *quotes*.
+
+    ``price_chain`` reads the latest price of every option the ``QuoteCache``
+    streams (no snapshot, no IB request), solves their implied vols in one
+    vectorised pass, fills the strikes without a quote by interpolating
+    across strikes (*default_vol* when nothing is quoted) and returns the
+    greeks of every listed strike.  The last implied vol of each contract is
+    kept, so ``option_price`` can fall back to a theoretical value while an
+    option's quote is stale.
+    """
+
+    def __init__(self, quotes: QuoteCache, rate: float = 0.0, default_vol: float = 0.2):
+        self.quotes = quotes
+        self.rate = rate
+        self.default_vol = default_vol
+        self.vols: dict[tuple, float] = {}  # Contract key -> last implied vol
+        self._layouts: dict[tuple, dict] = {}  # (chain, expiry) -> contracts and strike arrays
+        self._subscribed: set[tuple] = set()
+
+    def layout(self, chain: OptionChainIndex, expiry: str) -> dict:
+        """Contracts of *expiry* in strike order (calls then puts), as arrays built once per chain."""
+        key = (id(chain), expiry)
+        layout = self._layouts.get(key)
+        if layout is None:
+            strikes = chain.strikes.get(expiry, [])
+            contracts, strike, is_call = [], [], []
+            for right in ("C", "P"):
+                for k in strikes:
+                    contract = chain.contract(expiry, k, right)
+                    if contract is not None:
+                        contracts.append(contract)
+                        strike.append(k)
+                        is_call.append(right == "C")
+            layout = self._layouts[key] = {
+                "contracts": contracts,
+                "strike": np.array(strike, dtype=float),
+                "is_call": np.array(is_call, dtype=bool),
+                "index": {QuoteCache.key(contract): j for j, contract in enumerate(contracts)},
+            }
+        return layout
+
+    def subscribe(self, chain: OptionChainIndex, expiry: str, spot: float, width: int = 5) -> int:
+        """Stream quotes for the *width* strikes either side of *spot* (once per expiry); returns the count."""
+        if (id(chain), expiry) in self._subscribed or spot != spot:
+            return 0
+        self._subscribed.add((id(chain), expiry))
+        count = 0
+        for offset in range(-width, width + 1):
+            strike = chain.nearest_strike(expiry, spot, offset)
+            for right in ("C", "P"):
+                contract = None if strike is None else chain.contract(expiry, strike, right)
+                if contract is not None and contract not in self.quotes:
+                    self.quotes.subscribe(contract)
+                    count += 1
+        return count
+
+    def price_chain(self, chain: OptionChainIndex, expiry: str, spot: float, t: float) -> dict:
+        """Quotes, implied vols and greeks of every contract of *expiry* (arrays in ``layout`` order)."""
+        layout = self.layout(chain, expiry)
+        strike, is_call, index = layout["strike"], layout["is_call"], layout["index"]
+        quote = np.full(len(strike), np.nan)
+        for key, value in self.quotes.cached_prices():
+            j = index.get(key)
+            if j is not None:
+                quote[j] = value
+        iv = implied_vol(quote, spot, strike, t, is_call, self.rate)
+        quoted = ~np.isnan(iv)
+        for j in np.flatnonzero(quoted):
+            self.vols[QuoteCache.key(layout["contracts"][j])] = float(iv[j])
+        vol = iv.copy()
+        for side in (is_call, ~is_call):
+            known = side & quoted
+            fill = side & ~quoted
+            if known.any():
+                vol[fill] = np.interp(strike[fill], strike[known], iv[known])
+            elif self.vols:
+                vol[fill] = np.median(list(self.vols.values()))
+            else:
+                vol[fill] = self.default_vol
+        result = greeks(spot, strike, t, vol, is_call, self.rate)
+        result.update(strike=strike, is_call=is_call, quote=quote, iv=vol, contracts=layout["contracts"])
+        return result
+
+    def select_delta(self, chain: OptionChainIndex, right: str, expiry: str, spot: float, t: float, target: float) -> Contract | None:
+        """Contract of *right* whose absolute delta is closest to *target* (0.5 is at the money)."""
+        if spot != spot:
+            return None
+        priced = self.price_chain(chain, expiry, spot, t)
+        side = priced["is_call"] == (right == "C")
+        if not side.any():
+            return None
+        distance = np.where(side, np.abs(np.abs(priced["delta"]) - target), np.inf)
+        return priced["contracts"][int(np.argmin(distance))]
+
+    def value(self, contract: Contract, spot: float, t: float) -> float:
+        """Theoretical price of *contract* at its last implied vol (NaN if it never had a quote)."""
+        vol = self.vols.get(QuoteCache.key(contract))
+        if vol is None or spot != spot:
+            return math.nan
+        return float(price(spot, float(contract.strike), t, vol, contract.right == "C", self.rate))
+
+    def option_price(self, contract: Contract, spot: float, t: float) -> float:
+        """Streaming price of *contract*, or its theoretical value while the quote is stale.
+
+        Falls back to the quote cache (and its snapshot) when no implied vol
+        is known yet.
+        """
+        if self.quotes.is_fresh(contract):
+            premium = self.quotes.cached_price(contract)
+            if premium == premium:
+                vol = implied_vol(premium, spot, float(contract.strike), t, contract.right == "C", self.rate)
+                if vol == vol:
+                    self.vols[QuoteCache.key(contract)] = float(vol)
+                return premium
+        theoretical = self.value(contract, spot, t)
+        return theoretical if theoretical == theoretical else self.quotes.price(contract)
@@ -0,0 +1,593 @@
+#!/usr/bin/env python
+# IB connection gateway for the CHAD strategies
+# Owns the IB connection and fans bars, quotes and order updates out to strategy processes over a local socket / pipe.
+
+import asyncio
+import dataclasses
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import AuthenticationError, Client as IPCClient, Listener
+from ib_insync import *
+
+from quote_cache import QuoteCache
+
+# Environment variable holding the shared secret clients authenticate with
+AUTHKEY_ENV = "SPY_GATEWAY_KEY"
+
+# Ticker attributes forwarded to clients (tick / depth history stays in the gateway)
+_TICKER_SKIP = {"contract", "ticks", "tickByTicks", "domBids", "domAsks", "domTicks"}
+TICKER_FIELDS = [f.name for f in dataclasses.fields(Ticker) if f.name not in _TICKER_SKIP]
+
+# Request / response calls clients may make, mapped to the IB coroutine serving them
+CALLS = {
+    "qualifyContracts": "qualifyContractsAsync",
+    "reqContractDetails": "reqContractDetailsAsync",
+    "reqSecDefOptParams": "reqSecDefOptParamsAsync",
+    "reqTickers": "reqTickersAsync",
+    "reqHistoricalData": "reqHistoricalDataAsync",
+    "reqPositions": "reqPositionsAsync",
+    "reqExecutions": "reqExecutionsAsync",
+}
+# Contract definitions do not change intraday; answer repeats from memory
+CACHED_CALLS = {"qualifyContracts", "reqContractDetails", "reqSecDefOptParams"}
+
+
+def default_address(port: int) -> str:
+    """IPC address of the gateway serving TWS / IB Gateway *port*."""
+    if sys.platform == "win32":
+        return rf"\\.\pipe\spy_ib_gateway_{port}"
+    return os.path.join(tempfile.gettempdir(), f"spy_ib_gateway_{port}.sock")
+
+
+def default_authkey() -> bytes:
+    key = os.environ.get(AUTHKEY_ENV)
+    if not key:
+        raise RuntimeError(f"Set {AUTHKEY_ENV} to the gateway's shared secret")
+    return key.encode()
+
+
+def ticker_state(ticker: Ticker) -> dict:
+    return {name: getattr(ticker, name) for name in TICKER_FIELDS}
+
+
+class _Stream:
+    """One upstream subscription (a Ticker or a keepUpToDate BarDataList) and its clients."""
+
+    def __init__(self, source):
+        self.source = source
+        self.clients: set["_Session"] = set()
+
+
+class _Session:
+    """A connected strategy process.
+
+    Messages are queued and written by a dedicated thread so a slow reader
+    never stalls the gateway's event loop.
+    """
+
+    def __init__(self, session_id: int, conn):
+        self.id = session_id
+        self.conn = conn
+        self.subscriptions: set[tuple] = set()
+        self._outbox: queue.Queue = queue.Queue()
+        threading.Thread(target=self._write_loop, name=f"gateway-writer-{session_id}", daemon=True).start()
+
+    def send(self, message: tuple):
+        self._outbox.put(message)
+
+    def close(self):
+        self._outbox.put(None)
+
+    def _write_loop(self):
+        while (message := self._outbox.get()) is not None:
+            try:
+                self.conn.send(message)
+            except (OSError, EOFError, ValueError):
+                break
+        self.conn.close()
+
+
+class IBGateway:
+    """Single IB connection shared by every strategy process on the machine.
+
+    Strategy processes connect with ``GatewayIB`` over a
+    ``multiprocessing.connection`` channel (a Unix socket, or a named pipe on
+    Windows) authenticated with a shared key.  Identical market data and
+    keepUpToDate bar requests are opened upstream once and fanned out to every
+    subscriber; the upstream stream is cancelled when its last subscriber
+    leaves.  Concurrent identical requests share one IB round-trip and
+    contract-definition answers are cached, which keeps the strategies under
+    IB's market data line limit and request pacing.
+
+    Order status and fills are routed back to the process that placed the
+    order.
+    """
+
+    def __init__(self, ib: IB, address: str, authkey: bytes):
+        self.ib = ib
+        self.address = address
+        self.authkey = authkey
+        self.sessions: dict[int, _Session] = {}
+        self.streams: dict[tuple, _Stream] = {}
+        self._orders: dict[int, _Session] = {}  # orderId -> owner
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self._cache: dict[tuple, object] = {}
+        self._listener: Listener | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stopped: asyncio.Event | None = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def run(self, host: str, port: int, client_id: int):
+        await self.ib.connectAsync(host, port, clientId=client_id)
+        print(f"Gateway connected to IB on port {port} (client {client_id})")
+        await self.serve()
+
+    async def serve(self):
+        """Accept strategy processes until ``stop`` is called."""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        if not self.address.startswith("\\\\") and os.path.exists(self.address):
+            os.unlink(self.address)  # Stale socket from a previous run
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self.ib.orderStatusEvent += self._on_order_status
+        self.ib.execDetailsEvent += self._on_fill
+        threading.Thread(target=self._accept_loop, name="gateway-accept", daemon=True).start()
+        print(f"Gateway listening on {self.address}")
+        try:
+            await self._stopped.wait()
+        finally:
+            self.ib.orderStatusEvent -= self._on_order_status
+            self.ib.execDetailsEvent -= self._on_fill
+            self._listener.close()
+            for session in list(self.sessions.values()):
+                self._drop(session)
+
+    def stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+
+    def _accept_loop(self):
+        session_id = 0
+        while True:
+            try:
+                conn = self._listener.accept()
+            except AuthenticationError:
+                print("Gateway rejected a client with the wrong key")
+                continue
+            except OSError:
+                return  # Listener closed
+            session_id += 1
+            session = _Session(session_id, conn)
+            self._loop.call_soon_threadsafe(self.sessions.__setitem__, session.id, session)
+            threading.Thread(target=self._read_loop, args=(session,), daemon=True).start()
+
+    def _read_loop(self, session: _Session):
+        while True:
+            try:
+                message = session.conn.recv()
+            except (EOFError, OSError):
+                break
+            self._loop.call_soon_threadsafe(self._dispatch, session, message)
+        try:
+            self._loop.call_soon_threadsafe(self._drop, session)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    def _drop(self, session: _Session):
+        if self.sessions.pop(session.id, None) is None:
+            return
+        for key in list(session.subscriptions):
+            self._release(session, key)
+        for order_id in [oid for oid, owner in self._orders.items() if owner is session]:
+            del self._orders[order_id]
+        session.close()
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+    def _dispatch(self, session: _Session, message: tuple):
+        kind, req_id, *payload = message
+        handler = {
+            "call": self._call,
+            "mktdata": self._subscribe_mktdata,
+            "bars": self._subscribe_bars,
+            "release": self._release_async,
+            "order": self._place_order,
+            "cancel_order": self._cancel_order,
+        }.get(kind)
+        asyncio.ensure_future(self._reply(session, req_id, kind, handler, payload))
+
+    async def _reply(self, session: _Session, req_id: int | None, kind: str, handler, payload: list):
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown gateway request {kind!r}")
+            result, ok = await handler(session, *payload), True
+        except Exception as exc:
+            result, ok = f"{type(exc).__name__}: {exc}", False
+        if req_id is not None:
+            session.send(("reply", req_id, ok, result))
+
+    async def _shared(self, key: tuple, factory):
+        """Run ``factory()`` once for concurrent identical requests."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _task: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _call(self, session: _Session, method: str, args: tuple, kwargs: dict):
+        if method not in CALLS:
+            raise ValueError(f"{method} is not served by the gateway")
+        key = ("call", method, repr(args), repr(sorted(kwargs.items())))
+        if key in self._cache:
+            return self._cache[key]
+        result = await self._shared(key, lambda: self._invoke(method, args, kwargs))
+        if method in CACHED_CALLS and result:
+            self._cache[key] = result
+        return result
+
+    async def _invoke(self, method: str, args: tuple, kwargs: dict):
+        result = await getattr(self.ib, CALLS[method])(*args, **kwargs)
+        if method == "qualifyContracts":
+            return list(args)  # Qualified in place; the client copies them back positionally
+        if method == "reqTickers":
+            return [(ticker.contract, ticker_state(ticker)) for ticker in result]
+        if method == "reqHistoricalData":
+            return list(result or [])
+        return result
+
+    async def _subscribe_mktdata(self, session: _Session, contract: Contract, generic_ticks: str = ""):
+        key = ("mktdata", QuoteCache.key(contract), generic_ticks)
+        stream = self.streams.get(key)
+        if stream is None:
+            ticker = self.ib.reqMktData(contract, generic_ticks)
+            stream = self.streams[key] = _Stream(ticker)
+            ticker.updateEvent += lambda ticker, key=key: self._on_tick(key, ticker)
+        stream.clients.add(session)
+        session.subscriptions.add(key)
+        return key, ticker_state(stream.source)
+
+    async def _subscribe_bars(
+        self,
+        session: _Session,
+        contract: Contract,
+        duration: str,
+        bar_size: str,
+        what_to_show: str,
+        use_rth: bool,
+        format_date: int = 1,
+    ):
+        key = ("bars", QuoteCache.key(contract), duration, bar_size, what_to_show, use_rth, format_date)
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = await self._shared(
+                key, lambda: self._open_bars(key, contract, duration, bar_size, what_to_show, use_rth, format_date)
+            )
+        if stream is None:
+            return key, []
+        stream.clients.add(session)
+        session.subscriptions.add(key)
+        return key, list(stream.source)
+
+    async def _open_bars(self, key, contract, duration, bar_size, what_to_show, use_rth, format_date) -> _Stream | None:
+        bars = await self.ib.reqHistoricalDataAsync(
+            contract, "", duration, bar_size, what_to_show, use_rth, format_date, keepUpToDate=True
+        )
+        if not bars:
+            if bars is not None and hasattr(bars, "updateEvent"):
+                self.ib.cancelHistoricalData(bars)
+            return None
+        stream = self.streams[key] = _Stream(bars)
+        bars.updateEvent += lambda bars, has_new_bar, key=key: self._on_bars(key, bars, has_new_bar)
+        return stream
+
+    async def _release_async(self, session: _Session, key: tuple):
+        self._release(session, key)
+
+    def _release(self, session: _Session, key: tuple):
+        """Drop *session* from a stream; the last one out cancels it upstream."""
+        session.subscriptions.discard(key)
+        stream = self.streams.get(key)
+        if stream is None:
+            return
+        stream.clients.discard(session)
+        if stream.clients:
+            return
+        del self.streams[key]
+        if not self.ib.isConnected():
+            return
+        if key[0] == "mktdata":
+            self.ib.cancelMktData(stream.source.contract)
+        else:
+            self.ib.cancelHistoricalData(stream.source)
+
+    async def _place_order(self, session: _Session, contract: Contract, order: Order):
+        trade = self.ib.placeOrder(contract, order)
+        self._orders[trade.order.orderId] = session
+        return trade.order, trade.orderStatus
+
+    async def _cancel_order(self, session: _Session, order: Order):
+        self.ib.cancelOrder(order)
+
+    # ------------------------------------------------------------------
+    # Fan-out
+    # ------------------------------------------------------------------
+    def _on_tick(self, key: tuple, ticker: Ticker):
+        stream = self.streams.get(key)
+        if stream is None:
+            return
+        message = ("tick", key, ticker_state(ticker))
+        for session in stream.clients:
+            session.send(message)
+
+    def _on_bars(self, key: tuple, bars: BarDataList, has_new_bar: bool):
+        stream = self.streams.get(key)
+        if stream is None:
+            return
+        # The completed bar (when a new one opened) and the forming bar
+        start = max(len(bars) - (2 if has_new_bar else 1), 0)
+        message = ("bars", key, start, list(bars[start:]), has_new_bar)
+        for session in stream.clients:
+            session.send(message)
+
+    def _on_order_status(self, trade: Trade):
+        owner = self._orders.get(trade.order.orderId)
+        if owner is not None:
+            owner.send(("order_status", trade.order.orderId, trade.orderStatus))
+
+    def _on_fill(self, trade: Trade, fill: Fill):
+        owner = self._orders.get(trade.order.orderId)
+        if owner is not None:
+            owner.send(("fill", trade.order.orderId, fill))
+
+
+class GatewayIB:
+    """Stand-in for ``IB`` inside a strategy process, backed by an ``IBGateway``.
+
+    It implements the part of the ``IB`` API the strategies use, so a
+    strategy switches over by replacing ``self.ib``.  Messages from the
+    gateway (ticks, bar updates, order status) are processed while the
+    strategy waits in ``sleep`` or on a request, and fire the same events as
+    ``IB`` does.
+    """
+
+    def __init__(self, address: str | None = None, port: int = 7497, authkey: bytes | None = None):
+        self.address = address or default_address(port)
+        self.authkey = authkey
+        self._conn = None
+        self._req_id = 0
+        self._replies: dict[int, tuple[bool, object]] = {}
+        self._tickers: dict[tuple, Ticker] = {}
+        self._bars: dict[tuple, BarDataList] = {}
+        self._trades: dict[int, Trade] = {}
+        self.orderStatusEvent = Event("orderStatusEvent")
+        self.execDetailsEvent = Event("execDetailsEvent")
+
+    # ------------------------------------------------------------------
+    # Connection
+    # ------------------------------------------------------------------
+    def connect(self, host: str = "127.0.0.1", port: int = 7497, clientId: int = 1, timeout: float = 10.0):
+        """Attach to the gateway (*host*, *port* and *clientId* belong to the gateway and are ignored)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self._conn = IPCClient(self.address, authkey=self.authkey or default_authkey())
+                return self
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(f"No IB gateway listening on {self.address}")
+                time.sleep(0.2)
+
+    def isConnected(self) -> bool:
+        return self._conn is not None
+
+    def disconnect(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._tickers.clear()
+        self._bars.clear()
+        self._replies.clear()
+
+    def sleep(self, *args) -> bool:
+        """Wait, handling gateway messages meanwhile."""
+        secs = args[0] if args else 0.02
+        deadline = time.monotonic() + secs
+        if self._conn is None:
+            time.sleep(secs)
+            return True
+        while self._poll(max(deadline - time.monotonic(), 0)):
+            self._handle(self._recv())
+            if time.monotonic() >= deadline:
+                break
+        return True
+
+    # ------------------------------------------------------------------
+    # Market data
+    # ------------------------------------------------------------------
+    def reqMktData(self, contract: Contract, genericTickList: str = "", *args, **kwargs) -> Ticker:
+        key, state = self._request("mktdata", contract, genericTickList)
+        ticker = self._tickers.get(key)
+        if ticker is None:
+            ticker = self._tickers[key] = Ticker(contract=contract)
+        ticker.__dict__.update(state)
+        return ticker
+
+    def cancelMktData(self, contract: Contract):
+        contract_key = QuoteCache.key(contract)
+        for key in [key for key in self._tickers if key[1] == contract_key]:
+            del self._tickers[key]
+            self._send(("release", None, key))
+
+    def reqTickers(self, *contracts: Contract, **kwargs) -> list[Ticker]:
+        tickers = []
+        for contract, state in self._call("reqTickers", *contracts, **kwargs):
+            ticker = Ticker(contract=contract)
+            ticker.__dict__.update(state)
+            tickers.append(ticker)
+        return tickers
+
+    def reqHistoricalData(
+        self,
+        contract: Contract,
+        endDateTime,
+        durationStr: str,
+        barSizeSetting: str,
+        whatToShow: str,
+        useRTH: bool,
+        formatDate: int = 1,
+        keepUpToDate: bool = False,
+        **kwargs,
+    ) -> BarDataList:
+        if not keepUpToDate:
+            return BarDataList(self._call(
+                "reqHistoricalData", contract, endDateTime, durationStr, barSizeSetting, whatToShow, useRTH, formatDate
+            ))
+        key, bars = self._request("bars", contract, durationStr, barSizeSetting, whatToShow, useRTH, formatDate)
+        bars = BarDataList(bars)
+        bars.contract = contract
+        bars.keepUpToDate = True
+        bars.gatewayKey = key
+        if bars:
+            self._bars[key] = bars
+        return bars
+
+    def cancelHistoricalData(self, bars: BarDataList):
+        key = getattr(bars, "gatewayKey", None)
+        if key is not None and self._bars.pop(key, None) is not None:
+            self._send(("release", None, key))
+
+    # ------------------------------------------------------------------
+    # Contracts
+    # ------------------------------------------------------------------
+    def qualifyContracts(self, *contracts: Contract) -> list[Contract]:
+        for contract, qualified in zip(contracts, self._call("qualifyContracts", *contracts)):
+            contract.__dict__.update(qualified.__dict__)
+        return [contract for contract in contracts if contract.conId]
+
+    def reqContractDetails(self, contract: Contract) -> list[ContractDetails]:
+        return self._call("reqContractDetails", contract)
+
+    def reqSecDefOptParams(self, *args) -> list[OptionChain]:
+        return self._call("reqSecDefOptParams", *args)
+
+    # ------------------------------------------------------------------
+    # Orders
+    # ------------------------------------------------------------------
+    def placeOrder(self, contract: Contract, order: Order) -> Trade:
+        placed, status = self._request("order", contract, order)
+        order.__dict__.update(placed.__dict__)
+        trade = self._trades.get(order.orderId)
+        if trade is None:
+            trade = self._trades[order.orderId] = Trade(contract, order, status)
+        return trade
+
+    def cancelOrder(self, order: Order) -> Trade | None:
+        self._request("cancel_order", order)
+        return self._trades.get(order.orderId)
+
+    def openTrades(self) -> list[Trade]:
+        """Working orders placed through this session."""
+        return [trade for trade in self._trades.values() if not trade.isDone()]
+
+    def positions(self, account: str = "") -> list[Position]:
+        return [position for position in self._call("reqPositions") if not account or position.account == account]
+
+    def fills(self) -> list[Fill]:
+        """Today's executions on the gateway's connection, every client's."""
+        return self._call("reqExecutions")
+
+    # ------------------------------------------------------------------
+    # Wire protocol
+    # ------------------------------------------------------------------
+    def _call(self, method: str, *args, **kwargs):
+        return self._request("call", method, args, kwargs)
+
+    def _send(self, message: tuple):
+        if self._conn is None:
+            raise ConnectionError("Not connected to the IB gateway")
+        self._conn.send(message)
+
+    def _recv(self) -> tuple:
+        try:
+            return self._conn.recv()
+        except (EOFError, OSError):
+            self._conn = None
+            raise ConnectionError("IB gateway closed the connection")
+
+    def _poll(self, timeout: float) -> bool:
+        return self._conn is not None and self._conn.poll(timeout)
+
+    def _request(self, kind: str, *payload, timeout: float = 60.0):
+        self._req_id += 1
+        req_id = self._req_id
+        self._send((kind, req_id, *payload))
+        deadline = time.monotonic() + timeout
+        while req_id not in self._replies:
+            if not self._poll(max(deadline - time.monotonic(), 0)):
+                if self._conn is None:
+                    raise ConnectionError("IB gateway closed the connection")
+                raise TimeoutError(f"IB gateway did not answer {kind}")
+            self._handle(self._recv())
+        ok, result = self._replies.pop(req_id)
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def _handle(self, message: tuple):
+        kind = message[0]
+        if kind == "reply":
+            _, req_id, ok, result = message
+            self._replies[req_id] = (ok, result)
+        elif kind == "tick":
+            _, key, state = message
+            ticker = self._tickers.get(key)
+            if ticker is not None:
+                ticker.__dict__.update(state)
+                ticker.updateEvent.emit(ticker)
+        elif kind == "bars":
+            _, key, start, tail, has_new_bar = message
+            bars = self._bars.get(key)
+            if bars is not None:
+                bars[start:] = tail
+                bars.updateEvent.emit(bars, has_new_bar)
+        elif kind == "order_status":
+            _, order_id, status = message
+            trade = self._trades.get(order_id)
+            if trade is not None:
+                trade.orderStatus = status
+                trade.statusEvent.emit(trade)
+                self.orderStatusEvent.emit(trade)
+        elif kind == "fill":
+            _, order_id, fill = message
+            trade = self._trades.get(order_id)
+            if trade is not None:
+                trade.fills.append(fill)
+                trade.fillEvent.emit(trade, fill)
+                self.execDetailsEvent.emit(trade, fill)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shared IB connection for the strategy processes")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="TWS / IB Gateway host")
+    parser.add_argument("--port", type=int, default=7497, help="TWS / IB Gateway port")
+    parser.add_argument("--client_id", type=int, default=50, help="Client ID of the shared connection")
+    parser.add_argument("--address", type=str, default=None, help="IPC address (default: per-port socket / pipe)")
+
+    args = parser.parse_args()
+    gateway = IBGateway(IB(), args.address or default_address(args.port), default_authkey())
+    try:
+        util.run(gateway.run(args.host, args.port, args.client_id))
+    except KeyboardInterrupt:
+        print("Gateway interrupted — shutting down.")
+    finally:
+        gateway.ib.disconnect()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# Incremental indicator engine for the CHAD strategies
+# Stateful EMA / RSI / ATR / VWAP / Keltner updates that reproduce the pandas formulas bar by bar.
+
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+class EMA:
+    """Exponential moving average matching ``Series.ewm(span=period, adjust=False).mean()``.
+
+    The arithmetic mirrors pandas' ``ewm`` kernel step for step (including the
+    normalisation by ``old_wt + new_wt``) so that the streamed values are
+    bit-identical to the vectorised column.
+    """
+
+    def __init__(self, period: int):
+        com = (period - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - self.alpha
+        self.value = math.nan  # Last committed value
+
+    def _step(self, weighted: float, x: float) -> float:
+        if weighted != weighted:  # NaN: first observation seeds the average
+            return x
+        if x != x:
+            return weighted
+        if weighted != x:  # pandas skips the update on constant series
+            weighted = self.old_wt_factor * weighted + self.alpha * x
+            weighted /= self.old_wt_factor + self.alpha
+        return weighted
+
+    def update(self, x: float) -> float:
+        self.value = self._step(self.value, x)
+        return self.value
+
+    def peek(self, x: float) -> float:
+        """Value the EMA would have if *x* closed the next bar (state untouched)."""
+        return self._step(self.value, x)
+
+
+class RollingMean:
+    """Fixed-window mean matching ``Series.rolling(window).mean()``.
+
+    Uses the same Kahan-compensated add/remove sums as pandas' ``roll_mean`` so
+    results agree to the last bit.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values: deque = deque()
+        self._nobs = 0
+        self._sum = 0.0
+        self._neg_ct = 0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._same_ct = 0
+        self._prev = math.nan
+        self.value = math.nan
+
+    def _state(self):
+        return (self._nobs, self._sum, self._neg_ct, self._comp_add, self._comp_remove, self._same_ct, self._prev)
+
+    def _apply(self, x: float, state, removed):
+        nobs, total, neg_ct, comp_add, comp_remove, same_ct, prev = state
+        if removed is not None and removed == removed:
+            nobs -= 1
+            y = -removed - comp_remove
+            t = total + y
+            comp_remove = t - total - y
+            total = t
+            if math.copysign(1.0, removed) < 0:
+                neg_ct -= 1
+        if x == x:
+            nobs += 1
+            y = x - comp_add
+            t = total + y
+            comp_add = t - total - y
+            total = t
+            if math.copysign(1.0, x) < 0:
+                neg_ct += 1
+            same_ct = same_ct + 1 if x == prev else 1
+            prev = x
+        return nobs, total, neg_ct, comp_add, comp_remove, same_ct, prev
+
+    @staticmethod
+    def _mean(window, state) -> float:
+        nobs, total, neg_ct, _, _, same_ct, prev = state
+        if nobs < window or nobs == 0:
+            return math.nan
+        result = total / nobs
+        if same_ct >= nobs:
+            result = prev
+        elif neg_ct == 0 and result < 0:
+            result = 0.0
+        elif neg_ct == nobs and result > 0:
+            result = 0.0
+        return result
+
+    def _removed(self):
+        return self._values[0] if len(self._values) == self.window else None
+
+    def update(self, x: float) -> float:
+        removed = self._removed()
+        if removed is not None:
+            self._values.popleft()
+        if not self._values and removed is None:
+            self._prev = x  # pandas seeds prev_value with the first window value
+        self._values.append(x)
+        state = self._apply(x, self._state(), removed)
+        (self._nobs, self._sum, self._neg_ct, self._comp_add,
+         self._comp_remove, self._same_ct, self._prev) = state
+        self.value = self._mean(self.window, state)
+        return self.value
+
+    def peek(self, x: float) -> float:
+        state = self._state()
+        if not self._values:
+            state = state[:-1] + (x,)
+        return self._mean(self.window, self._apply(x, state, self._removed()))
+
+
+class RSI:
+    """Simple-average RSI matching the ``rolling(window).mean()`` formula used by SPY REV."""
+
+    def __init__(self, period: int):
+        self.gain = RollingMean(period)
+        self.loss = RollingMean(period)
+        self.prev_close = math.nan
+        self.value = math.nan
+
+    def _moves(self, close: float):
+        delta = close - self.prev_close
+        gain = delta if delta > 0 else 0.0
+        # -delta.where(delta < 0, 0) yields -0.0 for flat / up moves; keep the sign for parity
+        loss = -(delta if delta < 0 else 0.0)
+        return gain, loss
+
+    @staticmethod
+    def _rsi(avg_gain: float, avg_loss: float) -> float:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = np.float64(avg_gain) / np.float64(avg_loss)
+            return float(100 - (100 / (1 + rs)))
+
+    def update(self, close: float) -> float:
+        gain, loss = self._moves(close)
+        self.prev_close = close
+        self.value = self._rsi(self.gain.update(gain), self.loss.update(loss))
+        return self.value
+
+    def peek(self, close: float) -> float:
+        gain, loss = self._moves(close)
+        return self._rsi(self.gain.peek(gain), self.loss.peek(loss))
+
+
+class ATR:
+    """Average true range: EMA of the true range, as computed by SPY BOSK."""
+
+    def __init__(self, period: int):
+        self.ema = EMA(period)
+        self.prev_close = math.nan
+        self.value = math.nan
+
+    def _true_range(self, high: float, low: float) -> float:
+        if self.prev_close != self.prev_close:
+            return high - low
+        return max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.value = self.ema.update(self._true_range(high, low))
+        self.prev_close = close
+        return self.value
+
+    def peek(self, high: float, low: float, close: float) -> float:
+        return self.ema.peek(self._true_range(high, low))
+
+
+class SessionVWAP:
+    """Volume-weighted average price that restarts every trading day.
+
+    The running sums use the same Kahan compensation as pandas'
+    ``groupby().cumsum()`` so values match the vectorised VWAP exactly.
+    """
+
+    def __init__(self):
+        self.day = None
+        self._sums = (0.0, 0.0, 0.0, 0.0)  # cum_vol, comp_vol, cum_vol_price, comp_vol_price
+        self.value = math.nan
+
+    @staticmethod
+    def _kahan(total: float, comp: float, x: float) -> tuple[float, float]:
+        y = x - comp
+        t = total + y
+        return t, t - total - y
+
+    def _next(self, day, high, low, close, volume):
+        typical_price = (high + low + close) / 3
+        cum_vol, comp_vol, cum_vp, comp_vp = self._sums if day == self.day else (0.0, 0.0, 0.0, 0.0)
+        cum_vol, comp_vol = self._kahan(cum_vol, comp_vol, volume)
+        cum_vp, comp_vp = self._kahan(cum_vp, comp_vp, typical_price * volume)
+        return cum_vol, comp_vol, cum_vp, comp_vp
+
+    @staticmethod
+    def _vwap(sums) -> float:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return float(np.float64(sums[2]) / np.float64(sums[0]))
+
+    def update(self, day, high: float, low: float, close: float, volume: float) -> float:
+        self._sums = self._next(day, high, low, close, volume)
+        self.day = day
+        self.value = self._vwap(self._sums)
+        return self.value
+
+    def peek(self, day, high: float, low: float, close: float, volume: float) -> float:
+        return self._vwap(self._next(day, high, low, close, volume))
+
+
+# ---------------------------------------------------------------------------
+# Indicator sets — one per strategy, producing the same columns as calculate_indicators
+# ---------------------------------------------------------------------------
+class IndicatorSet:
+    """Group of indicators updated together from one bar.
+
+    Subclasses list their output ``columns`` and implement ``_compute``.  A bar
+    is any object with ``date``/``open``/``high``/``low``/``close``/``volume``
+    attributes (``BarData`` or a DataFrame row via ``itertuples``).
+    """
+
+    columns: tuple[str, ...] = ()
+
+    @property
+    def key(self) -> tuple:
+        """Identity of the set: two sets with the same key produce identical columns."""
+        return (type(self).__name__, tuple(sorted(self.params.items())))
+
+    def update(self, bar, provisional: bool = False) -> tuple[float, ...]:
+        """Feed one bar.  Provisional updates (forming bar) do not advance state."""
+        return self._compute(bar, provisional)
+
+    def _compute(self, bar, provisional: bool) -> tuple[float, ...]:
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget all state (e.g. before backfilling a new session)."""
+        self.__init__(**self.params)
+
+    def frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Replay *df* through a fresh copy of this set and return the indicator columns."""
+        fresh = self.__class__(**self.params)
+        rows = [fresh.update(bar) for bar in df.itertuples(index=False)]
+        return pd.DataFrame(rows, columns=list(self.columns), index=df.index)
+
+
+class BOSKIndicators(IndicatorSet):
+    """EMA(9), EMA(20), ATR and Keltner bands for SPY BOSK."""
+
+    columns = ("ema9", "ema20", "atr", "kc_upper", "kc_lower")
+
+    def __init__(self, ema9_period: int = 9, ema20_period: int = 20, atr_period: int = 20, kc_mult: float = 1.5):
+        self.params = dict(ema9_period=ema9_period, ema20_period=ema20_period, atr_period=atr_period, kc_mult=kc_mult)
+        self.ema9 = EMA(ema9_period)
+        self.ema20 = EMA(ema20_period)
+        self.atr = ATR(atr_period)
+        self.kc_mult = kc_mult
+
+    def _compute(self, bar, provisional):
+        method = "peek" if provisional else "update"
+        ema9 = getattr(self.ema9, method)(bar.close)
+        ema20 = getattr(self.ema20, method)(bar.close)
+        atr = getattr(self.atr, method)(bar.high, bar.low, bar.close)
+        return ema9, ema20, atr, ema20 + self.kc_mult * atr, ema20 - self.kc_mult * atr
+
+
+class REVIndicators(IndicatorSet):
+    """RSI and 9 EMA for SPY REV."""
+
+    columns = ("rsi", "ema_9")
+
+    def __init__(self, rsi_period: int = 14, ema_period: int = 9):
+        self.params = dict(rsi_period=rsi_period, ema_period=ema_period)
+        self.rsi = RSI(rsi_period)
+        self.ema = EMA(ema_period)
+
+    def _compute(self, bar, provisional):
+        method = "peek" if provisional else "update"
+        return getattr(self.rsi, method)(bar.close), getattr(self.ema, method)(bar.close)
+
+
+class EMAChadIndicators(IndicatorSet):
+    """Short / long EMA and session VWAP for SPY EMA CHAD."""
+
+    columns = ("ema_short", "ema_long", "vwap")
+
+    def __init__(self, ema_short: int = 9, ema_long: int = 20):
+        self.params = dict(ema_short=ema_short, ema_long=ema_long)
+        self.ema_short = EMA(ema_short)
+        self.ema_long = EMA(ema_long)
+        self.vwap = SessionVWAP()
+
+    def _compute(self, bar, provisional):
+        method = "peek" if provisional else "update"
+        day = pd.Timestamp(bar.date).date()
+        return (
+            getattr(self.ema_short, method)(bar.close),
+            getattr(self.ema_long, method)(bar.close),
+            getattr(self.vwap, method)(day, bar.high, bar.low, bar.close, bar.volume),
+        )
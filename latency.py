@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# Tick-to-trade latency instrumentation for the CHAD strategies
+# Times each stage from data arrival to fill per strategy and exports p50/p99 histograms to a JSON file.
+
+import atexit
+import datetime
+import json
+import math
+import os
+import threading
+import time
+
+# Stages measured from the arrival of the data a pass acts on
+STAGES = ("data", "indicators", "signal", "submit", "ack", "fill")
+ACK_STATES = {"PreSubmitted", "Submitted", "Filled"}
+
+
+class LatencyHistogram:
+    """Latency counts in logarithmic buckets (4% wide) from 1 µs to about 100 s.
+
+    Recording is one ``log`` and a list increment, so it can sit on the hot
+    path; percentiles are read back with bucket resolution.
+    """
+
+    MIN = 1e-6
+    GROWTH = 1.04
+    BUCKETS = math.ceil(math.log(1e8) / math.log(GROWTH)) + 1
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        if seconds > self.MIN:
+            idx = min(int(math.log(seconds / self.MIN) / math.log(self.GROWTH)) + 1, self.BUCKETS - 1)
+        else:
+            idx = 0
+        self.counts[idx] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bucket holding the *q*-th percentile (seconds)."""
+        if not self.count:
+            return math.nan
+        target = q / 100 * self.count
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return min(self.MIN * self.GROWTH ** idx, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1e3 if self.count else math.nan,
+            "p50_ms": self.percentile(50) * 1e3,
+            "p90_ms": self.percentile(90) * 1e3,
+            "p99_ms": self.percentile(99) * 1e3,
+            "max_ms": self.max * 1e3,
+        }
+
+
+class LatencyRecorder:
+    """Per-strategy stage timings, all measured from the same origin.
+
+    ``begin`` opens a pass at the arrival time of the newest data it acts on
+    (a bar update or quote tick) and records the ``data`` stage: how long that
+    data waited for the loop.  ``mark`` records later stages of the pass
+    (``indicators``, ``signal``) and ``track`` follows an order from submit to
+    its acknowledgement and first fill, so every histogram reads "time since
+    the market moved".  ``submit_to_ack`` and ``submit_to_fill`` isolate the
+    broker round-trip.
+    """
+
+    def __init__(self, name: str, clock=time.monotonic):
+        self.name = name
+        self.clock = clock
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self.origin: float | None = None
+
+    def record(self, stage: str, seconds: float):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def begin(self, arrived: float | None = None):
+        """Start a pass acting on data that arrived at *arrived* (``clock`` time; now if unknown)."""
+        now = self.clock()
+        self.origin = arrived if arrived is not None and arrived <= now else now
+        self.record("data", now - self.origin)
+
+    def mark(self, stage: str):
+        if self.origin is not None:
+            self.record(stage, self.clock() - self.origin)
+
+    def track(self, trade):
+        """Record the submit of *trade* and hook its acknowledgement and first fill."""
+        self.mark("submit")
+        origin, submitted = self.origin, self.clock()
+        pending = {"ack", "fill"}
+
+        def stage(name: str):
+            if name not in pending:
+                return
+            pending.discard(name)
+            now = self.clock()
+            if origin is not None:
+                self.record(name, now - origin)
+            self.record(f"submit_to_{name}", now - submitted)
+
+        def on_status(trade):
+            if trade.orderStatus.status in ACK_STATES:
+                stage("ack")
+
+        def on_fill(trade, fill):
+            stage("ack")  # A fill implies the order was accepted
+            stage("fill")
+            trade.statusEvent.disconnect(on_status)
+            trade.fillEvent.disconnect(on_fill)
+
+        trade.statusEvent.connect(on_status)
+        trade.fillEvent.connect(on_fill)
+        on_status(trade)  # Brokers that acknowledge synchronously
+        return trade
+
+    def summary(self) -> dict:
+        """Histogram summaries by stage; safe to call from the export thread while the loop records."""
+        order = {name: i for i, name in enumerate(STAGES)}
+        histograms = list(self.histograms.items())  # Snapshot: the loop thread may add a stage meanwhile
+        return {
+            stage: histogram.summary()
+            for stage, histogram in sorted(histograms, key=lambda item: (order.get(item[0], len(order)), item[0]))
+        }
+
+
+# ----------------------------------------------------------------------
+# Process-wide registry and export
+# ----------------------------------------------------------------------
+_recorders: dict[str, LatencyRecorder] = {}
+_exports: dict[str, threading.Event] = {}
+
+
+def recorder(name: str) -> LatencyRecorder:
+    """The recorder for *name*, created on first use."""
+    rec = _recorders.get(name)
+    if rec is None:
+        rec = _recorders[name] = LatencyRecorder(name)
+    return rec
+
+
+def last_arrival(bar_feed=None, quotes=None, contract=None) -> float | None:
+    """Newest ``time.monotonic`` arrival among *bar_feed*'s updates and *contract*'s ticks in *quotes*."""
+    arrivals = []
+    if bar_feed is not None and getattr(bar_feed, "updated_at", None) is not None:
+        arrivals.append(bar_feed.updated_at)
+    if quotes is not None and contract is not None:
+        age = quotes.age(contract)
+        if age != math.inf:
+            arrivals.append(quotes.clock() - age)
+    return max(arrivals) if arrivals else None
+
+
+def summary() -> dict:
+    return {name: rec.summary() for name, rec in sorted(list(_recorders.items()))}
+
+
+def write(path: str):
+    """Write every recorder's histograms to *path* as JSON (atomically)."""
+    data = {"time": datetime.datetime.now().isoformat(timespec="seconds"), "strategies": summary()}
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+def start_export(path: str, interval: float = 60.0):
+    """Rewrite *path* every *interval* seconds from a background thread, and once more at exit."""
+    if path in _exports:
+        return
+    stop = _exports[path] = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                write(path)
+            except Exception as exc:  # Keep exporting: one bad pass must not end the thread
+                print(f"Latency export to {path} failed: {type(exc).__name__}: {exc}")
+
+    threading.Thread(target=loop, name=f"latency-export-{path}", daemon=True).start()
+    atexit.register(write, path)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show the latency histograms exported by the strategies")
+    parser.add_argument("file", help="JSON file written with --latency_file")
+    args = parser.parse_args()
+
+    with open(args.file) as f:
+        data = json.load(f)
+    print(f"Exported {data['time']}")
+    for name, stages in data["strategies"].items():
+        print(f"\n{name}")
+        print(f"  {'stage':<16}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for stage, s in stages.items():
+            print(f"  {stage:<16}{s['count']:>8}{s['p50_ms']:>10.2f}{s['p90_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
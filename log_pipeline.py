@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# Logging pipeline for the strategy launcher
+# Records are queued by the thread that produces them and written by one background thread: JSON lines in one file per strategy, plus readable text on the console.
+
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+from pathlib import Path
+
+# Environment variable carrying global.log_level to strategy processes
+LEVEL_ENV = "CHAD_LOG_LEVEL"
+
+# File name of records that do not come from a strategy
+MANAGER_LOG = "strategy_manager"
+
+# Level of a strategy output line, from how the strategies phrase their messages
+LINE_LEVELS = [
+    (re.compile(r"^DEBUG:"), logging.DEBUG),
+    (re.compile(r"^KILL SWITCH:"), logging.CRITICAL),
+    (re.compile(r"^Traceback|\b(ERROR|Error|Unhandled error|Failed|Unable)\b"), logging.ERROR),
+    (re.compile(r"\b(WARNING|Warning)\b| rejected: |Server-side exits failed"), logging.WARNING),
+]
+
+
+def debug_enabled() -> bool:
+    """True when the launcher runs with ``log_level: DEBUG``."""
+    return os.environ.get(LEVEL_ENV, "INFO").upper() == "DEBUG"
+
+
+def debug(*args):
+    """Print *args* only at debug level.
+
+    Arguments are converted to text only when printed, so pass DataFrames as
+    separate arguments (``debug("Indicators:", df)``) rather than in an f-string.
+    """
+    if debug_enabled():
+        print("DEBUG:", *args)
+
+
+def line_level(line: str) -> int:
+    """Log level of one line of strategy output."""
+    for pattern, level in LINE_LEVELS:
+        if pattern.search(line):
+            return level
+    return logging.INFO
+
+
+# ----------------------------------------------------------------------------
+# Formatting and routing
+# ----------------------------------------------------------------------------
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, strategy and message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "time": datetime.datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "strategy": getattr(record, "strategy", None),
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            event["exc"] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False)
+
+
+class StrategyFileHandler(logging.Handler):
+    """Write each record to ``<log_dir>/<strategy>.jsonl``; records without a strategy go to the manager's file."""
+
+    def __init__(self, log_dir: str, level: int = logging.NOTSET):
+        super().__init__(level)
+        self.log_dir = Path(log_dir)
+        self.files: dict[str, object] = {}
+        self.setFormatter(JsonFormatter())
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            name = getattr(record, "strategy", None) or MANAGER_LOG
+            stream = self.files.get(name)
+            if stream is None:
+                self.log_dir.mkdir(parents=True, exist_ok=True)
+                stream = self.files[name] = open(self.log_dir / f"{name}.jsonl", "a", encoding="utf-8")
+            stream.write(self.format(record) + "\n")
+            stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        for stream in self.files.values():
+            stream.close()
+        self.files.clear()
+        super().close()
+
+
+# ----------------------------------------------------------------------------
+# Setup
+# ----------------------------------------------------------------------------
+def start_logging(level: str = "INFO", log_dir: str = "logs", console: bool = True) -> logging.handlers.QueueListener:
+    """Route the root logger through a queue to a background writer; returns the started listener.
+
+    Logging calls only put the record on the queue, so the thread reading a
+    strategy's output never waits on a file or the console.  Stop the listener
+    on shutdown to flush what is still queued.
+    """
+    level = level.upper()
+    os.environ[LEVEL_ENV] = level  # Inherited by strategy processes, read in-process by debug()
+    records = queue.SimpleQueue()
+    handlers = [StrategyFileHandler(log_dir)]
+    if console:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        handlers.append(stream_handler)
+    listener = logging.handlers.QueueListener(records, *handlers)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(getattr(logging, level))
+    listener.start()
+    return listener
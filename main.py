@@ -11,10 +11,25 @@ import time
 import signal
 import sys
 import os
+import secrets
+import inspect
+import importlib
+import json
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from log_pipeline import line_level, start_logging
+
+# Strategy class per script, for running strategies in-process (global.in_process)
+STRATEGY_CLASSES = {
+    'spy_orb_strategy.py': ('spy_orb_strategy', 'SPYORBStrategy'),
+    'spy_bosk_strategy.py': ('spy_bosk_strategy', 'SPYBOSKStrategy'),
+    'spy_rev_strategy.py': ('spy_rev_strategy', 'SPYREVStrategy'),
+    'spy_ema_chad.py': ('spy_ema_chad', 'SPYEMAChad'),
+    'options_trading.py': ('options_trading', 'OptionsTrader'),
+}
+
 
 class StrategyManager:
     """Manages multiple trading strategy processes."""
@@ -24,6 +39,11 @@ class StrategyManager:
         self.config = self._load_config()
         self.processes: Dict[str, subprocess.Popen] = {}
         self.threads: Dict[str, threading.Thread] = {}
+        self.gateways: Dict[int, str] = {}  # IB port -> gateway IPC address
+        self.bar_buses: Dict[int, str] = {}  # IB port -> shared-memory bar bus name prefix
+        self.risk_engines: List[str] = []  # Names of the risk engine processes
+        self.halted: set = set()  # Strategies stopped by a kill switch, never restarted
+        self.runtimes: list = []  # One StrategyRuntime per IB port in in-process mode
         self.running = True
         
         # Setup logging
@@ -47,23 +67,13 @@ class StrategyManager:
             sys.exit(1)
     
     def _setup_logging(self):
-        """Setup logging configuration."""
-        log_level = self.config.get('global', {}).get('log_level', 'INFO')
-        
-        # Create handlers with explicit UTF-8 encoding
-        file_handler = logging.FileHandler('strategy_manager.log', encoding='utf-8')
-        stream_handler = logging.StreamHandler(sys.stdout)
-        
-        # Set the same formatter for both handlers
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        stream_handler.setFormatter(formatter)
-        
-        # Configure logging with explicit handlers
-        logging.basicConfig(
-            level=getattr(logging, log_level),
-            handlers=[file_handler, stream_handler]
-        )
+        """Setup logging configuration.
+
+        Records go through a queue to a background writer (log_pipeline), which
+        keeps one JSON-lines file per strategy in ``global.log_dir``.
+        """
+        global_config = self.config.get('global', {})
+        self.log_listener = start_logging(global_config.get('log_level', 'INFO'), global_config.get('log_dir', 'logs'))
         self.logger = logging.getLogger('StrategyManager')
     
     def _signal_handler(self, signum, frame):
@@ -92,8 +102,196 @@ class StrategyManager:
             else:
                 cmd.extend([f"--{key}", str(value)])
         
+        # Route the strategy through the shared IB gateway for its port (risk engines keep their own connection)
+        gateway = self.gateways.get(args.get('port', 7497))
+        if gateway and strategy_name not in self._gateway_names() + self.risk_engines:
+            cmd.extend(["--gateway", gateway])
+        
+        # Read bars from the shared-memory bus for its port
+        from shm_bus import BAR_BUS_SCRIPTS
+        bar_bus = self.bar_buses.get(args.get('port', 7497))
+        if bar_bus and script in BAR_BUS_SCRIPTS:
+            cmd.extend(["--bar_bus", bar_bus])
+        
         return cmd
     
+    def _gateway_names(self) -> List[str]:
+        return [f"gateway_{port}" for port in self.gateways]
+    
+    def _start_gateways(self, enabled_strategies: dict):
+        """Start one shared IB connection per port used by the enabled strategies."""
+        from ib_gateway import AUTHKEY_ENV, default_address
+        
+        global_config = self.config.get('global', {})
+        client_id = global_config.get('gateway_client_id', 50)
+        # Shared secret inherited by the gateway and strategy subprocesses
+        os.environ.setdefault(AUTHKEY_ENV, secrets.token_hex(16))
+        
+        ports = sorted({config.get('args', {}).get('port', 7497) for config in enabled_strategies.values()})
+        for port in ports:
+            self.gateways[port] = default_address(port)
+        for port in ports:
+            name = f"gateway_{port}"
+            gateway_config = {
+                'script': 'ib_gateway.py',
+                'args': {'port': port, 'client_id': client_id, 'address': self.gateways[port]},
+            }
+            thread = threading.Thread(
+                target=self._run_strategy,
+                args=(name, gateway_config),
+                name=f"Gateway-{port}",
+                daemon=False
+            )
+            self.threads[name] = thread
+            thread.start()
+        self.logger.info(f"Started IB gateways for ports: {', '.join(map(str, ports))}")
+    
+    def _start_bar_buses(self, enabled_strategies: dict):
+        """Start one bar publisher per port, covering the tickers and indicators of the strategies on it."""
+        from shm_bus import BAR_BUS_SCRIPTS, indicator_spec
+        
+        global_config = self.config.get('global', {})
+        client_id = global_config.get('bar_bus_client_id', 70)
+        buses = {}
+        for strategy_config in enabled_strategies.values():
+            script = strategy_config['script']
+            if script not in BAR_BUS_SCRIPTS:
+                continue
+            args = strategy_config.get('args', {})
+            bus = buses.setdefault(args.get('port', 7497), {'feeds': {}, 'bar_store': None, 'warm_days': 0})
+            # One feed per ticker and bar size: strategies on different bar sizes each get theirs
+            ticker, bar_size = args.get('ticker', 'SPY'), args.get('bar_size') or args.get('timeframe') or '5 mins'
+            feed = bus['feeds'].setdefault((ticker, bar_size), {'ticker': ticker, 'bar_size': bar_size, 'indicators': []})
+            indicator_class = BAR_BUS_SCRIPTS[script]
+            if indicator_class is not None:
+                accepted = inspect.signature(indicator_class.__init__).parameters
+                spec = indicator_spec(indicator_class(**{key: value for key, value in args.items() if key in accepted}))
+                if spec not in feed['indicators']:
+                    feed['indicators'].append(spec)
+            bus['bar_store'] = bus['bar_store'] or args.get('bar_store')
+            bus['warm_days'] = max(bus['warm_days'], args.get('warm_days', 0))
+        for port, bus in sorted(buses.items()):
+            name = f"bar_bus_{port}"
+            self.bar_buses[port] = f"chad{port}"
+            bus_args = {'port': port, 'client_id': client_id, 'prefix': self.bar_buses[port],
+                        'feeds': json.dumps(list(bus['feeds'].values())), 'warm_days': bus['warm_days']}
+            if bus['bar_store']:
+                bus_args['bar_store'] = bus['bar_store']
+            thread = threading.Thread(
+                target=self._run_strategy,
+                args=(name, {'script': 'shm_bus.py', 'args': bus_args}),
+                name=f"BarBus-{port}",
+                daemon=False
+            )
+            self.threads[name] = thread
+            thread.start()
+        self.logger.info(f"Started bar buses for ports: {', '.join(map(str, sorted(buses)))}")
+    
+    def _risk_limits(self) -> dict:
+        limits = self.config.get('global', {}).get('risk_limits') or {}
+        return {key: limits[key] for key in ('max_delta', 'max_premium', 'max_loss') if limits.get(key) is not None}
+    
+    def _start_risk_engines(self, enabled_strategies: dict):
+        """Start one risk engine per port; a kill switch on a port halts the strategies trading on it."""
+        client_id = self.config.get('global', {}).get('risk_client_id', 80)
+        ports = sorted({config.get('args', {}).get('port', 7497) for config in enabled_strategies.values()})
+        for port in ports:
+            name = f"risk_{port}"
+            self.risk_engines.append(name)
+            risk_config = {
+                'script': 'risk_engine.py',
+                'args': {'port': port, 'client_id': client_id, **self._risk_limits()},
+            }
+            thread = threading.Thread(
+                target=self._run_strategy,
+                args=(name, risk_config),
+                name=f"Risk-{port}",
+                daemon=False
+            )
+            self.threads[name] = thread
+            thread.start()
+        self.logger.info(f"Started risk engines for ports: {', '.join(map(str, ports))}")
+    
+    def _halt_strategies(self, port: int, reason: str):
+        """Kill the strategy processes on *port* outright: the risk engine flattens their positions."""
+        self.logger.critical(f"Kill switch on port {port} ({reason}) — halting its strategies")
+        for strategy_name, strategy_config in self.config.get('strategies', {}).items():
+            if strategy_config.get('args', {}).get('port', 7497) != port:
+                continue
+            self.halted.add(strategy_name)  # Before the kill, so the process is not restarted
+            process = self.processes.get(strategy_name)
+            if process is not None:
+                process.kill()
+    
+    def _create_strategy(self, strategy_name: str, strategy_config: dict):
+        """Instantiate a strategy from its config entry; returns (strategy, IB port)."""
+        from bar_store import BarStore
+        from latency import recorder, start_export
+        from position_journal import PositionJournal
+        from tick_recorder import TickRecorder
+        
+        script = strategy_config['script']
+        if script not in STRATEGY_CLASSES:
+            raise ValueError(f"Strategy script '{script}' cannot be run in-process.")
+        module_name, class_name = STRATEGY_CLASSES[script]
+        cls = getattr(importlib.import_module(module_name), class_name)
+        
+        args = dict(strategy_config.get('args', {}))
+        port = args.pop('port', 7497)
+        bar_store = args.pop('bar_store', None)
+        warm_days = args.pop('warm_days', 0)
+        latency_file = args.pop('latency_file', None)
+        journal = args.pop('journal', None)
+        record = args.pop('record', None)
+        accepted = inspect.signature(cls.__init__).parameters
+        ignored = [key for key in args if key not in accepted]
+        if ignored:
+            self.logger.warning(f"{strategy_name}: ignoring unsupported args in-process: {', '.join(ignored)}")
+        strategy = cls(**{key: value for key, value in args.items() if key in accepted})
+        if 'port' in accepted:
+            strategy.port = port
+        if bar_store:
+            strategy.bar_store = BarStore(bar_store, getattr(strategy, 'bar_size', None) or strategy.timeframe)
+            strategy.warm_days = warm_days
+        if hasattr(strategy, 'latency'):
+            strategy.latency = recorder(strategy_name)
+        if latency_file:
+            start_export(latency_file)
+        if journal:
+            # Named as in a strategy process, so switching modes keeps the journal
+            strategy.journal = PositionJournal(journal, f"{cls.__name__} {strategy.ticker}")
+        if record:
+            strategy.recorder = TickRecorder(record, f"{cls.__name__}_{strategy.ticker}")
+        return strategy, port
+    
+    def _build_runtimes(self, enabled_strategies: dict) -> list:
+        """Load the strategies into one runtime (IB connection) per port."""
+        from strategy_runtime import StrategyRuntime
+        
+        client_id = self.config.get('global', {}).get('host_client_id', 60)
+        risk = self.config.get('global', {}).get('risk', False)
+        runtimes = {}
+        for strategy_name, strategy_config in enabled_strategies.items():
+            strategy, port = self._create_strategy(strategy_name, strategy_config)
+            if port not in runtimes:
+                runtimes[port] = StrategyRuntime(port=port, client_id=client_id)
+                if risk:
+                    from risk_engine import RiskEngine, RiskLimits
+                    runtime = runtimes[port]
+                    runtime.risk = RiskEngine(runtime.ib, runtime.quotes.share(), RiskLimits(**self._risk_limits()))
+            runtimes[port].add(strategy)
+            self.logger.info(f"Loaded {strategy_name} ({type(strategy).__name__}) on port {port}")
+        return list(runtimes.values())
+    
+    def _run_in_process(self, enabled_strategies: dict):
+        """Run every strategy as an object on this process's event loop (blocks until they stop)."""
+        from strategy_runtime import run_runtimes
+        
+        self.runtimes = self._build_runtimes(enabled_strategies)
+        self.logger.info(f"Running {len(enabled_strategies)} strategies in-process on "
+                         f"{len(self.runtimes)} IB connection(s)...")
+        run_runtimes(self.runtimes)
+    
     def _run_strategy(self, strategy_name: str, strategy_config: dict):
         """Run a single strategy in a subprocess with monitoring."""
         max_retries = self.config.get('global', {}).get('max_retries', 3)
@@ -101,7 +299,7 @@ class StrategyManager:
         
         retry_count = 0
         
-        while self.running and retry_count <= max_retries:
+        while self.running and strategy_name not in self.halted and retry_count <= max_retries:
             try:
                 cmd = self._build_command(strategy_name, strategy_config)
                 self.logger.info(f"Starting {strategy_name} strategy: {' '.join(cmd)}")
@@ -147,17 +345,27 @@ class StrategyManager:
                 
                 self.processes[strategy_name] = process
                 
-                # Monitor process output
+                # Monitor process output; logging only queues the line
+                strategy_logger = self.logger.getChild(strategy_name)
+                extra = {'strategy': strategy_name}
                 for line in iter(process.stdout.readline, ''):
                     if not self.running:
                         break
-                    if line.strip():
-                        self.logger.info(f"[{strategy_name}] {line.strip()}")
+                    line = line.strip()
+                    if line:
+                        level = line_level(line)
+                        if strategy_logger.isEnabledFor(level):
+                            strategy_logger.log(level, line, extra=extra)
+                        if strategy_name in self.risk_engines and line.startswith("KILL SWITCH:"):
+                            self._halt_strategies(strategy_config['args']['port'], line[len("KILL SWITCH:"):].strip())
                 
                 # Wait for process to complete
                 return_code = process.wait()
                 
-                if return_code == 0:
+                if strategy_name in self.halted:
+                    self.logger.critical(f"{strategy_name} halted by the kill switch.")
+                    break
+                elif return_code == 0:
                     self.logger.info(f"{strategy_name} strategy completed successfully.")
                     break
                 else:
@@ -202,6 +410,26 @@ class StrategyManager:
             self.logger.error("No strategies enabled.")
             return
         
+        calendar_file = self.config.get('global', {}).get('market_calendar')
+        if calendar_file:
+            from session_calendar import CALENDAR_ENV, load_calendar
+            load_calendar(calendar_file)  # A bad file fails here rather than in every strategy
+            # Inherited by the strategy processes, read in-process by SessionCalendar
+            os.environ[CALENDAR_ENV] = os.path.abspath(calendar_file)
+        
+        if self.config.get('global', {}).get('in_process', False):
+            self._run_in_process(enabled_strategies)
+            return
+        
+        if self.config.get('global', {}).get('gateway', False):
+            self._start_gateways(enabled_strategies)
+        
+        if self.config.get('global', {}).get('bar_bus', False):
+            self._start_bar_buses(enabled_strategies)
+        
+        if self.config.get('global', {}).get('risk', False):
+            self._start_risk_engines(enabled_strategies)
+        
         self.logger.info(f"Starting {len(enabled_strategies)} strategies...")
         
         # Start each strategy in its own thread
@@ -221,8 +449,13 @@ class StrategyManager:
         """Stop all running strategies."""
         self.logger.info("Stopping all strategies...")
         
-        # Terminate processes
-        for strategy_name, process in self.processes.items():
+        # In-process strategies finish their current pass, then flatten
+        for runtime in self.runtimes:
+            runtime.stop()
+        
+        # Terminate processes (gateways and risk engines last so strategies can still flatten through them)
+        last = self._gateway_names() + self.risk_engines
+        for strategy_name, process in sorted(self.processes.items(), key=lambda item: item[0] in last):
             try:
                 self.logger.info(f"Terminating {strategy_name}...")
                 process.terminate()
@@ -285,6 +518,7 @@ class StrategyManager:
             if self.running:
                 self.stop_all_strategies()
             self.logger.info("SPY Trading Strategies Manager shutdown complete.")
+            self.log_listener.stop()  # Write out what is still queued
 
 
 def main():
@@ -3,11 +3,12 @@
 # Runs the strategy on multiple tickers simultaneously
 
 import sys
-import threading
-import time
 from ib_insync import *
 from spy_ema_chad import SPYEMAChad
 from options_trading import OptionsTrader
+from strategy_runtime import StrategyRuntime
+from bar_feed import BarFeedCache
+from scanner import BarScanner, BOSKScan, ChadScan
 
 class MultiTickerTrader:
     def __init__(self, tickers=None, use_options=False, paper_trading=True):
@@ -26,7 +27,7 @@ class MultiTickerTrader:
         self.use_options = use_options
         self.paper_trading = paper_trading
         self.strategies = {}
-        self.threads = {}
+        self.runtime = None
         self.ib = IB()
     
     def connect_to_ib(self, host='127.0.0.1', port=None, client_id=1):
@@ -44,10 +45,7 @@ class MultiTickerTrader:
     
     def create_strategies(self):
         """Create strategy instances for each ticker"""
-        for idx, ticker in enumerate(self.tickers):
-            # Use different client IDs for each strategy
-            client_id = 1 + idx
-            
+        for ticker in self.tickers:
             # Create the appropriate strategy object
             if self.use_options:
                 strategy = OptionsTrader(
@@ -68,20 +66,8 @@ class MultiTickerTrader:
             
             self.strategies[ticker] = strategy
     
-    def run_strategy(self, ticker):
-        """Run a single strategy in its own thread"""
-        strategy = self.strategies[ticker]
-        
-        try:
-            print(f"Starting strategy for {ticker}")
-            strategy.run()
-        except Exception as e:
-            print(f"Error in {ticker} strategy: {e}")
-        finally:
-            print(f"Strategy for {ticker} has stopped")
-    
     def start_all(self):
-        """Start all strategies in separate threads"""
+        """Run all strategies on one event loop sharing this trader's IB connection"""
         if not self.connect_to_ib():
             print("Failed to connect to IB. Exiting.")
             return
@@ -90,37 +76,57 @@ class MultiTickerTrader:
         if not self.strategies:
             self.create_strategies()
         
-        # Start a thread for each strategy
+        # One task per ticker; strategies wake on bar closes, ticks and order updates
+        self.runtime = StrategyRuntime(ib=self.ib)
         for ticker in self.tickers:
-            thread = threading.Thread(target=self.run_strategy, args=(ticker,))
-            thread.daemon = True
-            thread.start()
-            self.threads[ticker] = thread
-            
-            # Small delay to avoid overwhelming IB connection
-            time.sleep(1)
+            print(f"Starting strategy for {ticker}")
+            self.runtime.add(self.strategies[ticker])
         
         print(f"Started trading for {len(self.tickers)} tickers: {', '.join(self.tickers)}")
+        self.runtime.run()
+    
+    def start_scanner(self):
+        """Scan every ticker for EMA CHAD and BOSK signals at each bar close, in one vectorised pass"""
+        if not self.connect_to_ib():
+            print("Failed to connect to IB. Exiting.")
+            return
         
-        # Wait for all threads to complete (which they won't unless there's an error)
+        # One bar subscription per ticker feeding a single scanner
+        cache = BarFeedCache(self.ib)
+        feeds = {ticker: cache.get(Stock(ticker, 'SMART', 'USD')) for ticker in self.tickers}
+        for ticker, feed in feeds.items():
+            if not feed.start():
+                print(f"No bars for {ticker}")
+        scanner = BarScanner(self.tickers, [ChadScan(), BOSKScan()])
+        scanner.watch(feeds)
+        scanner.scan_event.connect(self.on_scan)
+        
+        print(f"Scanning {len(self.tickers)} tickers: {', '.join(self.tickers)}")
         try:
-            while True:
-                active_threads = [ticker for ticker, thread in self.threads.items() if thread.is_alive()]
-                if not active_threads:
-                    break
-                print(f"Active strategies: {', '.join(active_threads)}")
-                time.sleep(60)
+            self.ib.run()
         except KeyboardInterrupt:
-            print("Stopping all strategies...")
+            print("User interrupted — shutting down.")
         finally:
+            scanner.unwatch(feeds)
+            for feed in feeds.values():
+                feed.stop()
             self.ib.disconnect()
-            print("Disconnected from Interactive Brokers")
+    
+    def on_scan(self, scanner, signals):
+        """Print the tickers with a signal on the bar that just closed"""
+        date = scanner.dates[scanner.count - 1]
+        touching = scanner.hits("chad_touch")
+        for ticker, side in scanner.hits("chad_side").items():
+            condition = "ABOVE" if side > 0 else "BELOW"
+            print(f"{date}: {ticker} {condition} all indicators{', touching 9 EMA' if ticker in touching else ''}")
+        for ticker, side in scanner.hits("bosk").items():
+            print(f"{date}: {ticker} BOSK {'ENTER_LONG' if side > 0 else 'ENTER_SHORT'}")
     
     def stop_all(self):
         """Stop all running strategies"""
-        # There's no clean way to stop the threads, but we can disconnect IB
-        # which will cause the strategies to exit
-        if self.ib.isConnected():
+        if self.runtime is not None:
+            self.runtime.stop()
+        elif self.ib.isConnected():
             self.ib.disconnect()
             print("Disconnected from Interactive Brokers")
 
@@ -130,6 +136,7 @@ def main():
     
     # Parse command line arguments
     use_options = "--options" in sys.argv
+    scan_only = "--scan" in sys.argv
     paper_trading = not ("--live" in sys.argv)
     
     if "--tickers" in sys.argv:
@@ -137,6 +144,10 @@ def main():
         if idx + 1 < len(sys.argv):
             tickers = sys.argv[idx + 1].split(",")
     
+    if scan_only:
+        MultiTickerTrader(tickers=tickers, paper_trading=paper_trading).start_scanner()
+        return
+    
     print(f"Trading {'options' if use_options else 'stocks'} for: {', '.join(tickers)}")
     print(f"Mode: {'Paper Trading' if paper_trading else 'LIVE TRADING'}")
     
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# Option chain cache for the CHAD strategies
+# Loads each underlying's expirations, strikes and qualified contracts once per session for instant strike selection.
+
+import bisect
+import datetime
+from ib_insync import *
+
+
+class OptionChainIndex:
+    """Listed options of one underlying, indexed for nearest-strike / nearest-expiry lookups.
+
+    ``expirations`` is sorted (``YYYYMMDD`` strings sort chronologically) and
+    every expiry keeps its own sorted strike list, so lookups are a bisect plus
+    a dict hit on pre-qualified contracts.
+    """
+
+    def __init__(self, symbol: str, contracts: list[Contract]):
+        self.symbol = symbol
+        self._contracts: dict[tuple[str, float, str], Contract] = {}
+        strikes: dict[str, set[float]] = {}
+        for contract in contracts:
+            expiry = contract.lastTradeDateOrContractMonth
+            self._contracts[(expiry, float(contract.strike), contract.right)] = contract
+            strikes.setdefault(expiry, set()).add(float(contract.strike))
+        self.expirations: list[str] = sorted(strikes)
+        self.strikes: dict[str, list[float]] = {expiry: sorted(values) for expiry, values in strikes.items()}
+
+    def __len__(self) -> int:
+        return len(self._contracts)
+
+    def nearest_expiry(self, target: datetime.date, on_or_after: bool = False) -> str | None:
+        """Expiry closest to *target* (or the first one not before it when *on_or_after*)."""
+        if not self.expirations:
+            return None
+        key = target.strftime("%Y%m%d")
+        idx = bisect.bisect_left(self.expirations, key)
+        if on_or_after:
+            return self.expirations[idx] if idx < len(self.expirations) else None
+        candidates = self.expirations[max(idx - 1, 0):idx + 1]
+        return min(candidates, key=lambda e: abs((datetime.datetime.strptime(e, "%Y%m%d").date() - target).days))
+
+    def nearest_strike(self, expiry: str, price: float, offset: int = 0) -> float | None:
+        """Listed strike closest to *price*, shifted *offset* strikes up (+) or down (-)."""
+        strikes = self.strikes.get(expiry)
+        if not strikes:
+            return None
+        idx = bisect.bisect_left(strikes, price)
+        if idx == len(strikes) or (idx > 0 and price - strikes[idx - 1] <= strikes[idx] - price):
+            idx -= 1
+        idx = min(max(idx + offset, 0), len(strikes) - 1)
+        return strikes[idx]
+
+    def contract(self, expiry: str, strike: float, right: str) -> Contract | None:
+        return self._contracts.get((expiry, float(strike), right))
+
+    def select(self, right: str, price: float, expiry: str | None, offset: int = 0) -> Contract | None:
+        """Qualified contract for *right* nearest to *price* on *expiry*, or None if not listed."""
+        if expiry is None:
+            return None
+        strike = self.nearest_strike(expiry, price, offset)
+        return None if strike is None else self.contract(expiry, strike, right)
+
+
+class OptionChainCache:
+    """One ``OptionChainIndex`` per underlying, loaded once per trading day.
+
+    ``load`` asks IB for the chain definition (``reqSecDefOptParams``) and then
+    qualifies every contract of the nearby expirations with one
+    ``reqContractDetails`` per expiry, so nothing is requested on the entry
+    path.  Of the trading classes IB lists (SPX and SPXW), the one with the
+    nearest expiry is loaded.  A failed load is not retried the same day; callers fall back to
+    resolving contracts on demand.
+    """
+
+    def __init__(self, ib: IB, exchange: str = "SMART"):
+        self.ib = ib
+        self.exchange = exchange
+        self._chains: dict[str, OptionChainIndex | None] = {}
+        self._loaded: dict[str, tuple[datetime.date, int]] = {}  # symbol -> (day, max_dte)
+
+    def get(self, symbol: str) -> OptionChainIndex | None:
+        return self._chains.get(symbol)
+
+    def clear(self):
+        self._chains.clear()
+        self._loaded.clear()
+
+    def load(self, underlying: Contract, day: datetime.date | None = None, max_dte: int = 7) -> OptionChainIndex | None:
+        """Chain of *underlying* with expirations up to *max_dte* days after *day*."""
+        day = day or datetime.date.today()
+        loaded = self._loaded.get(underlying.symbol)
+        if loaded is not None and loaded[0] == day and loaded[1] >= max_dte:
+            return self._chains.get(underlying.symbol)
+
+        self._loaded[underlying.symbol] = (day, max_dte)
+        self._chains[underlying.symbol] = None
+        try:
+            chain = self._request_chain(underlying, day, max_dte)
+        except Exception as exc:
+            print(f"Option chain for {underlying.symbol} unavailable: {exc}")
+            return None
+        if chain is None or not len(chain):
+            print(f"No option chain found for {underlying.symbol}")
+            return None
+        self._chains[underlying.symbol] = chain
+        print(f"Loaded {underlying.symbol} option chain: {len(chain.expirations)} expiries, {len(chain)} contracts")
+        return chain
+
+    def _request_chain(self, underlying: Contract, day: datetime.date, max_dte: int) -> OptionChainIndex | None:
+        if not underlying.conId:
+            self.ib.qualifyContracts(underlying)
+        params = self.ib.reqSecDefOptParams(underlying.symbol, "", underlying.secType, underlying.conId)
+        chains = [p for p in params if p.exchange == self.exchange]
+        if not chains:
+            return None
+        first = day.strftime("%Y%m%d")
+        last = (day + datetime.timedelta(days=max_dte)).strftime("%Y%m%d")
+
+        def rank(definition: OptionChain) -> tuple:
+            # The class listing the nearest expiry (SPX's dailies are SPXW, not SPX), then the one listing
+            # the most expiries in the window, then the one named after the underlying
+            upcoming = [e for e in definition.expirations if e >= first]
+            return (min(upcoming, default="99999999"), -sum(e <= last for e in upcoming),
+                    definition.tradingClass != underlying.symbol)
+
+        definition = min(chains, key=rank)
+        contracts = []
+        for expiry in sorted(e for e in definition.expirations if first <= e <= last):
+            template = Option(
+                underlying.symbol,
+                expiry,
+                exchange=self.exchange,
+                currency=underlying.currency or "USD",
+                tradingClass=definition.tradingClass,
+            )
+            contracts.extend(details.contract for details in self.ib.reqContractDetails(template))
+        return OptionChainIndex(underlying.symbol, contracts)
@@ -10,7 +10,7 @@ class OptionsTrader(SPYEMAChad):
     def __init__(self, ticker="SPY", profit_target=1.0, market_open="08:30:00",
                  market_close="15:00:00", signal_time="09:00:00", force_close_time="14:55:00",
                  timeframe="5 mins", ema_short=9, ema_long=20, paper_trading=True,
-                 option_type="call", dte_target=14, strike_offset=0, contracts=1):
+                 option_type="call", dte_target=14, strike_offset=0, contracts=1, target_delta=None):
         """
         Initialize the options trading strategy
         
@@ -29,6 +29,8 @@ class OptionsTrader(SPYEMAChad):
             dte_target (int): Target days to expiration
             strike_offset (int): Offset from ATM in strike prices
             contracts (int): Number of contracts to trade
+            target_delta (float): Pick the option with the delta closest to this
+                (0.5 = ATM) instead of applying strike_offset
         """
         # Initialize parent class
         super().__init__(ticker, profit_target, market_open, market_close, signal_time,
@@ -39,13 +41,13 @@ class OptionsTrader(SPYEMAChad):
         self.dte_target = dte_target
         self.strike_offset = strike_offset
         self.contracts = contracts
+        self.target_delta = target_delta
         self.current_option_contract = None
     
     def get_stock_price(self):
         """Get current price of underlying stock"""
         contract = Stock(self.ticker, 'SMART', 'USD')
-        ticker = self.ib.reqTickers(contract)[0]
-        return ticker.marketPrice()
+        return self.get_quote_cache().price(contract)
     
     def find_option_contract(self, direction):
         """
@@ -81,6 +83,21 @@ class OptionsTrader(SPYEMAChad):
         today = datetime.date.today()
         target_date = today + datetime.timedelta(days=self.dte_target)
         
+        # Use the chain loaded at session start when available
+        chain = self.get_option_chains().get(self.ticker)
+        if chain is not None:
+            expiration = chain.nearest_expiry(target_date)
+            otm_side = (direction == "LONG" and option_right == "C") or (direction == "SHORT" and option_right == "P")
+            offset = self.strike_offset if otm_side else -self.strike_offset
+            if self.target_delta is not None and expiration is not None:
+                contract = self.get_pricer().select_delta(chain, option_right, expiration, stock_price,
+                                                          self.years_to_expiry(expiration), self.target_delta)
+            else:
+                contract = chain.select(option_right, stock_price, expiration, offset)
+            if contract is not None:
+                print(f"Selected option: {self.ticker} {expiration} {contract.strike} {option_right}")
+                return contract
+        
         # Get list of available option chains
         chains = self.ib.reqSecDefOptParams(self.ticker, '', "STK", 8314)  # 8314 is the exchange code for SMART
         
@@ -106,6 +123,11 @@ class OptionsTrader(SPYEMAChad):
         print(f"Selected option: {self.ticker} {best_expiration} {target_strike} {option_right}")
         return contract
     
+    def load_option_chain(self):
+        """Pre-qualify expirations up to a week past the target DTE"""
+        self.get_option_chains().load(Stock(self.ticker, 'SMART', 'USD'), datetime.date.today(),
+                                      max_dte=self.dte_target + 7)
+    
     def get_contract(self):
         """Override get_contract to return the current option contract"""
         if self.current_option_contract:
@@ -127,12 +149,13 @@ class OptionsTrader(SPYEMAChad):
         # Place order
         action = "BUY"  # We're always buying options (calls for LONG, puts for SHORT)
         order = MarketOrder(action, self.contracts)
-        trade = self.ib.placeOrder(self.current_option_contract, order)
-        self.ib.sleep(1)  # Give IB time to process the order
+        trade = self.get_order_manager().submit(
+            self.current_option_contract, order,
+            on_fill=self.on_order_filled, on_partial=self.on_partial_fill, on_reject=self.on_order_rejected,
+        )
         
-        # Get current option price for tracking profit/loss
-        ticker = self.ib.reqTickers(self.current_option_contract)[0]
-        self.entry_price = ticker.marketPrice()
+        # Track profit/loss from the current option price until the fill arrives
+        self.entry_price = self.get_quote_cache().price(self.current_option_contract)
         
         self.position = direction
         self.today_trade_taken = True
@@ -149,28 +172,34 @@ class OptionsTrader(SPYEMAChad):
         # Place order to sell the option
         action = "SELL"  # We're always selling our options to exit
         order = MarketOrder(action, self.contracts)
-        trade = self.ib.placeOrder(self.current_option_contract, order)
-        self.ib.sleep(1)
+        trade = self.get_order_manager().submit(
+            self.current_option_contract, order,
+            on_fill=self.on_order_filled, on_partial=self.on_partial_fill, on_reject=self.on_order_rejected,
+        )
+        self.get_quote_cache().unsubscribe(self.current_option_contract)
         
-        # Get exit price
-        ticker = self.ib.reqTickers(self.current_option_contract)[0]
-        exit_price = ticker.marketPrice()
-        profit = (exit_price - self.entry_price) * 100 * self.contracts  # Each option is for 100 shares
-        
-        print(f"{datetime.datetime.now(self.tz)}: Exited {self.position} position at ${exit_price:.2f}, "
-              f"P/L: ${profit:.2f} ({reason})")
+        # The exit price and P/L are reported from the fill
+        print(f"{datetime.datetime.now(self.tz)}: Exiting {self.position} position ({reason})")
         
         self.position = None
         self.entry_price = 0
         self.current_option_contract = None
     
+    def on_order_filled(self, trade, price, pnl):
+        """Track profit/loss from the real entry fill"""
+        if trade.order.action == "BUY" and trade.contract is self.current_option_contract:
+            self.entry_price = price
+        super().on_order_filled(trade, price, pnl)
+    
     def check_profit_target(self):
         """Check if profit target has been reached for options"""
         if self.position is None or self.current_option_contract is None:
             return False
         
-        ticker = self.ib.reqTickers(self.current_option_contract)[0]
-        current_price = ticker.marketPrice()
+        # Theoretical value while the option's quote is stale
+        expiry = self.current_option_contract.lastTradeDateOrContractMonth
+        current_price = self.get_pricer().option_price(self.current_option_contract, self.get_stock_price(),
+                                                       self.years_to_expiry(expiry))
         
         # Calculate the dollar profit per contract (not per share)
         profit_per_contract = (current_price - self.entry_price) * 100
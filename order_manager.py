@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# Order manager for the CHAD strategies
+# Submits orders without blocking the loop, follows each trade's status and executions, and reports fills, partial fills and rejects at the real fill prices.
+
+from ib_insync import *
+
+from quote_cache import QuoteCache
+
+# Order states after which IB will not fill any more of the order
+REJECT_STATES = {"Cancelled", "ApiCancelled", "Inactive"}
+
+
+class OrderManager:
+    """Non-blocking order submission with fill tracking.
+
+    ``submit`` hands the order to IB and returns its ``Trade`` at once; the
+    caller's loop keeps running while IB works the order.  The manager hooks
+    the trade's status and fill events and calls back:
+
+    * ``on_fill(trade, price, pnl)`` once the whole quantity has executed, with
+      the share-weighted average execution price and the P/L the order
+      realized against earlier fills of the same contract (0 for an opening
+      order),
+    * ``on_partial(trade, fill)`` for each execution that leaves a remainder,
+    * ``on_reject(trade, reason)`` when IB cancels or rejects the order before
+      it is complete.
+
+    Callbacks run on the event loop (inside ``ib.sleep`` or the runtime's
+    loop), never inside ``submit``.  Net quantity and average price are kept
+    per contract from the executions, so P/L is based on fills, not on the
+    quote seen when the order was sent.  P/L is gross of commissions.
+    """
+
+    def __init__(self, ib: IB, journal=None):
+        self.ib = ib
+        self.journal = journal  # PositionJournal told each order id, so a restart knows which orders are its own
+        self.open_trades: dict[int, Trade] = {}  # Submitted and not yet done, by orderId
+        self.holdings: dict[tuple, list[float]] = {}  # Contract key -> [net quantity, average price]
+        self.realized = 0.0
+        self._handlers: dict[int, tuple] = {}
+        self._order_pnl: dict[int, float] = {}
+        self._exec_ids: set[str] = set()
+
+    def submit(self, contract: Contract, order: Order, on_fill=None, on_partial=None, on_reject=None) -> Trade:
+        """Place *order* and return its trade without waiting for IB to work it.
+
+        With a journal the order id is journaled before the order is sent, so
+        a crash in between still leaves it known to the restart.  That needs
+        the id up front from the connection (``ib.client.getReqId``); through
+        the gateway, which numbers the orders of all its clients itself, the
+        id is journaled right after, and an entry is found by its ``orderRef``.
+        """
+        journaled = False
+        if self.journal is not None:
+            client = getattr(self.ib, "client", None)
+            if not order.orderId and client is not None:
+                order.orderId = client.getReqId()
+            if order.orderId:
+                self.journal.order(contract, order.orderId)
+                journaled = True
+        trade = self.ib.placeOrder(contract, order)
+        order_id = trade.order.orderId
+        self.open_trades[order_id] = trade
+        self._handlers[order_id] = (on_fill, on_partial, on_reject)
+        self._order_pnl[order_id] = 0.0
+        trade.fillEvent.connect(self._on_fill)
+        trade.statusEvent.connect(self._on_status)
+        if self.journal is not None and not journaled:
+            self.journal.order(contract, order_id)
+        return trade
+
+    def restore(self, contract: Contract, quantity: float, price: float):
+        """Book a position opened by an earlier run (recovered from the position journal)."""
+        self.holdings[QuoteCache.key(contract)] = [quantity, price]
+
+    def cancel_orders(self, contract: Contract, order_ids, order_ref: str | None = None) -> int:
+        """Cancel the working orders on *contract* among *order_ids* (the ones an earlier run placed); returns the count.
+
+        An order tagged *order_ref* (a journaled entry whose id never made it
+        to the journal) is cancelled too.  Other working orders on the contract belong to another strategy on the
+        connection or to the trader and are left alone.
+        """
+        owned = set(order_ids)
+        count = others = 0
+        for trade in self.ib.openTrades():
+            if QuoteCache.key(trade.contract) != QuoteCache.key(contract) or trade.isDone():
+                continue
+            if trade.order.orderId in owned or (order_ref and trade.order.orderRef == order_ref):
+                self.ib.cancelOrder(trade.order)
+                count += 1
+            else:
+                others += 1
+        if others:
+            print(f"{others} other working order(s) on {contract.localSymbol} left alone.")
+        return count
+
+    # ------------------------------------------------------------------
+    # Trade events
+    # ------------------------------------------------------------------
+    def _on_fill(self, trade: Trade, fill: Fill):
+        order_id = trade.order.orderId
+        execution = fill.execution
+        if order_id not in self.open_trades or execution.execId in self._exec_ids:
+            return  # IB repeats executions after a reconnect
+        self._exec_ids.add(execution.execId)
+        shares = execution.shares if trade.order.action == "BUY" else -execution.shares
+        self._order_pnl[order_id] += self._book(trade.contract, shares, execution.price)
+        if self.filled(trade) < trade.order.totalQuantity:
+            on_partial = self._handlers[order_id][1]
+            if on_partial is not None:
+                on_partial(trade, fill)
+        elif trade.orderStatus.status == "Filled":
+            self._finish(trade)
+
+    def _on_status(self, trade: Trade):
+        status = trade.orderStatus.status
+        if trade.order.orderId not in self.open_trades:
+            return
+        if status == "Filled":
+            # The status can arrive before the executions; finish on the last one
+            if self.filled(trade) >= trade.order.totalQuantity:
+                self._finish(trade)
+        elif status in REJECT_STATES:
+            self._finish(trade, rejected=True)
+
+    def _finish(self, trade: Trade, rejected: bool = False):
+        order_id = trade.order.orderId
+        del self.open_trades[order_id]
+        on_fill, _, on_reject = self._handlers.pop(order_id)
+        pnl = self._order_pnl.pop(order_id)
+        trade.fillEvent.disconnect(self._on_fill)
+        trade.statusEvent.disconnect(self._on_status)
+        if rejected:
+            if on_reject is not None:
+                on_reject(trade, self.reason(trade))
+        elif on_fill is not None:
+            on_fill(trade, self.fill_price(trade), pnl)
+
+    def _book(self, contract: Contract, shares: float, price: float) -> float:
+        """Apply an execution of signed *shares* at *price* and return the P/L it realizes."""
+        key = QuoteCache.key(contract)
+        held, average = self.holdings.get(key, (0.0, 0.0))
+        pnl = 0.0
+        if held * shares < 0:
+            # Reducing (or flipping) the position
+            closed = min(abs(shares), abs(held))
+            pnl = (price - average) * closed * (1 if held > 0 else -1) * self.multiplier(contract)
+            if abs(shares) > abs(held):
+                average = price
+        else:
+            average = (average * held + price * shares) / (held + shares)
+        held += shares
+        if held:
+            self.holdings[key] = [held, average]
+        else:
+            self.holdings.pop(key, None)
+        self.realized += pnl
+        return pnl
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    @staticmethod
+    def multiplier(contract: Contract) -> float:
+        return float(contract.multiplier or 1)
+
+    @staticmethod
+    def filled(trade: Trade) -> float:
+        """Executed quantity, counted from the fills."""
+        return sum(fill.execution.shares for fill in trade.fills)
+
+    @staticmethod
+    def fill_price(trade: Trade) -> float | None:
+        """Share-weighted average execution price of *trade*, or ``None`` before its first fill."""
+        shares = sum(fill.execution.shares for fill in trade.fills)
+        if shares:
+            return sum(fill.execution.price * fill.execution.shares for fill in trade.fills) / shares
+        return trade.orderStatus.avgFillPrice or None
+
+    @staticmethod
+    def reason(trade: Trade) -> str:
+        """IB's last message on *trade* (the reject reason), or its status."""
+        for entry in reversed(trade.log):
+            if entry.message:
+                return entry.message
+        return trade.orderStatus.status
+
+    def position(self, contract: Contract) -> float:
+        """Net quantity of *contract* filled through this manager."""
+        return self.holdings.get(QuoteCache.key(contract), (0.0, 0.0))[0]
+
+    def average_price(self, contract: Contract) -> float | None:
+        held = self.holdings.get(QuoteCache.key(contract))
+        return held[1] if held else None
+
+    def wait(self, timeout: float = 5.0, step: float = 0.1) -> bool:
+        """Service the event loop until every submitted order is done, or *timeout* seconds pass.
+
+        Only for shutdown, when the connection is about to close; the trading
+        loop never waits on an order.
+        """
+        waited = 0.0
+        while self.open_trades and waited < timeout:
+            self.ib.sleep(step)
+            waited += step
+        return not self.open_trades
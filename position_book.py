@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# Position book for the CHAD strategies
+# Compact open-position records with constant-time lookup by contract and side, and one-pass mark-to-market from the quote cache.
+
+import datetime
+import math
+
+import numpy as np
+from ib_insync import *
+
+from quote_cache import QuoteCache
+
+
+class Position:
+    """One open option position.
+
+    A ``__slots__`` record instead of a dict: the fields are fixed, take no
+    per-instance dict and are read as attributes (``position.half_sold``).
+    ``key`` is the contract's ``QuoteCache.key``, which the book indexes by.
+    """
+
+    __slots__ = (
+        "type", "contract", "key", "entry_underlying_price", "entry_option_price", "entry_strike",
+        "stop_loss_price", "contracts_remaining", "half_sold", "entry_time", "exits",
+    )
+    # Fields recorded in the position journal (the contract is journaled by itself, exits are live orders)
+    STATE = (
+        "type", "entry_underlying_price", "entry_option_price", "entry_strike",
+        "stop_loss_price", "contracts_remaining", "half_sold", "entry_time",
+    )
+
+    def __init__(
+        self,
+        type: str | None,
+        contract: Contract | None,
+        entry_underlying_price: float = math.nan,
+        entry_option_price: float = math.nan,
+        entry_strike: float | None = None,
+        contracts_remaining: int = 0,
+        half_sold: bool = False,
+        entry_time: datetime.datetime | None = None,
+        stop_loss_price: float | None = None,
+        exits=None,
+    ):
+        self.type = type  # CALL / PUT (LONG / SHORT for EMA CHAD)
+        self.contract = contract
+        self.key = QuoteCache.key(contract) if contract is not None else None
+        self.entry_underlying_price = entry_underlying_price
+        self.entry_option_price = entry_option_price
+        self.entry_strike = contract.strike if entry_strike is None and contract is not None else entry_strike
+        self.stop_loss_price = stop_loss_price
+        self.contracts_remaining = contracts_remaining
+        self.half_sold = half_sold
+        self.entry_time = entry_time
+        self.exits = exits  # ServerExits working the targets, if any
+
+    @classmethod
+    def from_state(cls, contract: Contract, state: dict, **overrides) -> "Position":
+        """Rebuild a position from its journaled ``state`` (see ``state()``)."""
+        fields = {name: state[name] for name in cls.STATE if name in state}
+        if isinstance(fields.get("entry_time"), str):
+            fields["entry_time"] = datetime.datetime.fromisoformat(fields["entry_time"])
+        fields.update(overrides)
+        return cls(contract=contract, **fields)
+
+    @property
+    def side(self) -> int:
+        """+1 for a CALL or LONG (long the underlying), -1 for a PUT or SHORT."""
+        return 1 if self.type in ("CALL", "LONG") else -1
+
+    def state(self) -> dict:
+        """The journaled fields of the position."""
+        return {name: getattr(self, name) for name in self.STATE}
+
+    def __repr__(self) -> str:
+        contract = self.contract.localSymbol or self.contract.strike if self.contract is not None else None
+        return f"Position({self.type} {self.contracts_remaining} {contract} @ {self.entry_option_price:.2f})"
+
+
+class PositionBook:
+    """Open positions indexed by contract and by side.
+
+    ``get(contract)``, ``has_type`` and ``remove`` are dict operations instead
+    of scans over a list.  Iterating yields a snapshot, so positions can be
+    removed while the caller walks the book.
+
+    Books nest: a strategy's book created with ``parent=`` adds and removes
+    each of its positions in the parent as well, so ``StrategyRuntime`` holds
+    one book of every position in the process (``mark`` it for the combined
+    P/L) while each strategy only sees and closes its own.
+    """
+
+    def __init__(self, parent: "PositionBook | None" = None):
+        self.parent = parent
+        self._positions: dict[int, Position] = {}  # By id(): two strategies may hold the same option
+        self._by_key: dict[tuple, Position] = {}
+        self._by_type: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __bool__(self) -> bool:
+        return bool(self._positions)
+
+    def __iter__(self):
+        return iter(list(self._positions.values()))
+
+    def __contains__(self, contract: Contract) -> bool:
+        return QuoteCache.key(contract) in self._by_key
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+    def add(self, position: Position) -> Position:
+        self._positions[id(position)] = position
+        self._by_key[position.key] = position
+        self._by_type[position.type] = self._by_type.get(position.type, 0) + 1
+        if self.parent is not None:
+            self.parent.add(position)
+        return position
+
+    def remove(self, position: Position):
+        if self._positions.pop(id(position), None) is None:
+            return
+        if self._by_key.get(position.key) is position:
+            del self._by_key[position.key]
+            # Another strategy's position on the same option takes its place
+            other = next((p for p in self._positions.values() if p.key == position.key), None)
+            if other is not None:
+                self._by_key[position.key] = other
+        self._by_type[position.type] -= 1
+        if self.parent is not None:
+            self.parent.remove(position)
+
+    def clear(self):
+        for position in self:
+            self.remove(position)
+
+    def get(self, contract: Contract) -> Position | None:
+        return self._by_key.get(QuoteCache.key(contract))
+
+    def has_type(self, position_type: str) -> bool:
+        return self._by_type.get(position_type, 0) > 0
+
+    # ------------------------------------------------------------------
+    # Mark-to-market
+    # ------------------------------------------------------------------
+    def mark(self, quotes: QuoteCache) -> tuple[list[Position], np.ndarray, np.ndarray]:
+        """Positions, their last streamed option prices and unrealized P/L in dollars.
+
+        Prices come from ``QuoteCache.cached_prices`` in one pass, without
+        asking IB; a position whose option has no streamed price gets NaN.
+        The P/L is ``(price - entry) * contracts * 100`` over arrays.
+        """
+        positions = list(self._positions.values())
+        prices = dict(quotes.cached_prices())
+        count = len(positions)
+        price = np.fromiter((prices.get(p.key, math.nan) for p in positions), dtype=float, count=count)
+        entry = np.fromiter((p.entry_option_price for p in positions), dtype=float, count=count)
+        quantity = np.fromiter((p.contracts_remaining for p in positions), dtype=float, count=count)
+        return positions, price, (price - entry) * quantity * 100.0
+
+    def unrealized(self, quotes: QuoteCache) -> float:
+        """Unrealized P/L in dollars of every marked position."""
+        return float(np.nansum(self.mark(quotes)[2]))
+
+
+# ----------------------------------------------------------------------
+# Strategies holding one position at a time
+# ----------------------------------------------------------------------
+class CurrentField:
+    """Strategy attribute kept in a field of the strategy's open position (``strategy.current``).
+
+    Reads give *default* while the strategy is flat.  Writes go through
+    ``SinglePositionMixin.update_current``; writing the default while flat
+    is a no-op, so the resets after an exit do not open a new position.
+    """
+
+    def __init__(self, field: str, default=None):
+        self.field = field
+        self.default = default
+
+    def __get__(self, strategy, owner=None):
+        if strategy is None:
+            return self
+        current = strategy.current
+        return self.default if current is None else getattr(current, self.field)
+
+    def __set__(self, strategy, value):
+        if strategy.current is None and (value is self.default or value == self.default):
+            return
+        strategy.update_current(**{self.field: value})
+
+
+class SinglePositionMixin:
+    """Keeps the one open position of the ORB and EMA CHAD strategies in ``self.positions``.
+
+    ``current`` is that position, None while flat; ``CurrentField`` class
+    attributes keep the strategies' scalar names (``position``,
+    ``entry_option_price``, ...) as views on it.  Setting a field while flat
+    opens the position and setting its type to None closes it.  The position
+    is in the book (and so in the runtime's book and its mark) once it has
+    both a type and a contract.
+    """
+
+    current: Position | None = None
+
+    def update_current(self, **fields) -> Position | None:
+        current = self.current
+        if "type" in fields and fields["type"] is None:
+            if current is not None:
+                self.positions.remove(current)
+                self.current = None
+            return None
+        if current is None:
+            current = self.current = Position(fields.pop("type", None), fields.pop("contract", None))
+        self.positions.remove(current)  # Re-indexed below: the type or contract may change
+        for name, value in fields.items():
+            setattr(current, name, value)
+        current.key = QuoteCache.key(current.contract) if current.contract is not None else None
+        if current.type is not None and current.contract is not None:
+            self.positions.add(current)
+        return current
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# Position journal for the CHAD strategies
+# Records entries, partial exits, fills and exits in an fsync'd SQLite log so a restarted strategy picks its open positions back up.
+
+import datetime
+import json
+import os
+import sqlite3
+import time
+from ib_insync import *
+
+# Event kinds
+ENTRY = "entry"
+PARTIAL = "partial"
+FILL = "fill"
+ORDER = "order"
+EXIT = "exit"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    strategy TEXT NOT NULL,
+    conid INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_strategy ON events (strategy, seq);
+"""
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not journaled")
+
+
+class PositionJournal:
+    """Append-only log of one strategy's option positions.
+
+    Each event is one row in a SQLite database in WAL mode with
+    ``synchronous=FULL``, so it is on disk (the WAL fsync'd) before the call
+    returns; a crash loses at most the event being written.  Several
+    strategies can share a file: rows are tagged with the strategy's name.
+
+    Positions are keyed by the option's ``conId``:
+
+    * ``open(contract, quantity, **state)`` before the entry is sent, with the
+      strategy's own bookkeeping (entry prices, side, ...) as *state*; it
+      returns the ``orderRef`` to tag the entry order with, so a restart can
+      find the order and its fills even if the process died before either
+      was journaled,
+    * ``update(contract, **state)`` on a partial exit,
+    * ``fill(contract, action, quantity, price)`` for each fill,
+    * ``order(contract, order_id)`` for each order the strategy places on it,
+      so a restart only cancels its own working orders,
+    * ``close(contract)`` once the strategy stops managing the position.
+
+    ``recover`` replays the log, reconciles it against IB's positions and
+    executions and compacts it to one row per surviving position, so the next
+    restart only reads a handful of rows.
+    """
+
+    def __init__(self, path: str, strategy: str):
+        self.path = path
+        self.strategy = strategy
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=10.0, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.executescript(_SCHEMA)
+        self.dropped: list[dict] = []  # Records the last ``recover`` gave up, for cancelling their working orders
+
+    def close_db(self):
+        self.db.close()
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+    def _write(self, kind: str, con_id: int, payload: dict):
+        self.db.execute(
+            "INSERT INTO events (time, strategy, conid, kind, payload) VALUES (?, ?, ?, ?, ?)",
+            (time.time(), self.strategy, con_id, kind, json.dumps(payload, default=_encode)),
+        )
+
+    def open(self, contract: Contract, quantity: float, **state) -> str:
+        """A new position of signed *quantity* (negative when sold to open); returns the entry's ``orderRef``."""
+        ref = f"entry-{contract.conId}-{time.time_ns()}"
+        self._write(ENTRY, contract.conId, {
+            "contract": util.dataclassNonDefaults(contract),
+            "quantity": quantity,
+            "filled": 0.0,
+            "fill_price": None,
+            "ref": ref,
+            "state": state,
+        })
+        return ref
+
+    def update(self, contract: Contract, **state):
+        self._write(PARTIAL, contract.conId, state)
+
+    def fill(self, contract: Contract, action: str, quantity: float, price: float):
+        self._write(FILL, contract.conId, {"action": action, "quantity": quantity, "price": price})
+
+    def order(self, contract: Contract, order_id: int):
+        self._write(ORDER, contract.conId, {"order_id": order_id})
+
+    def close(self, contract: Contract):
+        self._write(EXIT, contract.conId, {})
+
+    # ------------------------------------------------------------------
+    # Recovery
+    # ------------------------------------------------------------------
+    def replay(self) -> dict[int, dict]:
+        """Open positions by conId, folded from the log.
+
+        Each record has ``contract``, ``quantity`` (as ordered), ``filled``
+        (net filled quantity), ``fill_price`` (average price of the opening
+        fills, ``None`` before the first), ``ref`` (the entry's ``orderRef``),
+        ``orders`` (ids of the orders placed on it, the entry included) and
+        the strategy's ``state``.
+        """
+        records: dict[int, dict] = {}
+        placed: dict[int, list[int]] = {}  # Orders journaled ahead of their entry
+        rows = self.db.execute(
+            "SELECT conid, kind, payload FROM events WHERE strategy = ? ORDER BY seq", (self.strategy,)
+        )
+        for con_id, kind, payload in rows:
+            data = json.loads(payload)
+            if kind == ENTRY:
+                data.setdefault("orders", []).extend(placed.pop(con_id, []))
+                records[con_id] = data
+                continue
+            record = records.get(con_id)
+            if kind == ORDER:
+                (record["orders"] if record is not None else placed.setdefault(con_id, [])).append(data["order_id"])
+                continue
+            if record is None:
+                continue  # Fill of a position already given up
+            if kind == EXIT:
+                del records[con_id]
+            elif kind == PARTIAL:
+                record["state"].update(data)
+            elif kind == FILL:
+                shares = data["quantity"] if data["action"] == "BUY" else -data["quantity"]
+                if shares * record["quantity"] > 0:
+                    # Opening fill: average it into the entry price
+                    opened = abs(record["filled"])
+                    price = record["fill_price"] or 0.0
+                    record["fill_price"] = (price * opened + data["price"] * abs(shares)) / (opened + abs(shares))
+                record["filled"] += shares
+        for record in records.values():
+            record["contract"] = Contract.create(**record["contract"])
+        return records
+
+    def recover(self, positions: list[Position], symbol: str | None = None, fills: list[Fill] = ()) -> list[dict]:
+        """Replay the log and keep the positions IB still holds.
+
+        *positions* is ``ib.positions()`` and *fills* ``ib.fills()``.  An entry
+        whose fills were not journaled (the process died while the order
+        worked) takes its fill price from the executions tagged with its
+        ``orderRef``; one that never filled is dropped.  A journaled position IB no longer
+        holds (sold by a server-side exit or by hand while the strategy was
+        down, or expired) is closed in the log.  One IB still holds keeps the
+        smaller of the journaled and the held quantity: IB's position is
+        account-wide, so a surplus may be another strategy's (or the
+        trader's) and is reported, not taken on.  Option positions on
+        *symbol* that IB holds but no record covers are reported, not
+        adopted, for the same reason.  Returns the surviving records; the
+        dropped ones are left in ``dropped``, so the caller can cancel the
+        orders still working on them (an unfilled entry, a stop).
+        """
+        held = {position.contract.conId: position.position for position in positions}
+        records = self.replay()
+        survivors = []
+        self.dropped = []
+        for con_id, record in records.items():
+            quantity = held.get(con_id, 0.0)
+            local_symbol = record["contract"].localSymbol or con_id
+            if record["fill_price"] is None and record.get("ref"):
+                executions = [fill.execution for fill in fills if fill.execution.orderRef == record["ref"]]
+                shares = sum(execution.shares for execution in executions)
+                if shares:
+                    record["fill_price"] = sum(execution.price * execution.shares for execution in executions) / shares
+                    record["filled"] = shares if record["quantity"] > 0 else -shares
+                    print(f"Journal: {local_symbol} entry filled while down — {shares:g} @ {record['fill_price']:.2f}.")
+            # Net filled once the entry filled, the ordered quantity before
+            journaled = record["quantity"] if record["fill_price"] is None else record["filled"]
+            if quantity * journaled <= 0:
+                if record["fill_price"] is None:
+                    print(f"Journal: {local_symbol} entry never filled — dropped.")
+                else:
+                    print(f"Journal: {local_symbol} no longer held — dropped.")
+                self.dropped.append(record)
+                continue
+            if abs(quantity) > abs(journaled):
+                print(f"Journal: WARNING: {local_symbol} held {quantity:g}, journaled {journaled:g} by {self.strategy}"
+                      f" — the surplus is left alone.")
+                quantity = journaled
+            elif quantity != journaled:
+                print(f"Journal: {local_symbol} held {quantity:g} (journaled {journaled:g}) — using IB's quantity.")
+            record["quantity"] = quantity
+            survivors.append(record)
+        for position in positions:
+            contract = position.contract
+            if (position.position and contract.secType == "OPT" and contract.conId not in records
+                    and (symbol is None or contract.symbol == symbol)):
+                print(f"Journal: WARNING: {position.position:g} {contract.localSymbol} held but not journaled by {self.strategy}.")
+        self._compact(survivors)
+        return survivors
+
+    def _compact(self, records: list[dict]):
+        """Replace this strategy's log with one entry per record, in one transaction."""
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.execute("DELETE FROM events WHERE strategy = ?", (self.strategy,))
+            self.db.executemany(
+                "INSERT INTO events (time, strategy, conid, kind, payload) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (now, self.strategy, record["contract"].conId, ENTRY, json.dumps(
+                        dict(record, contract=util.dataclassNonDefaults(record["contract"])), default=_encode,
+                    ))
+                    for record in records
+                ],
+            )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# Shared quote cache for the CHAD strategies
+# Keeps one streaming reqMktData subscription per contract and serves the latest quote from memory.
+
+import copy
+import math
+import time
+from ib_insync import *
+
+
+class QuoteCache:
+    """Latest bid / ask / last per contract from long-lived market data streams.
+
+    ``subscribe`` opens a ``reqMktData`` stream the first time a contract is
+    seen and reuses it afterwards; every tick stamps the contract with
+    ``clock()`` so callers can tell how old a quote is.  While a stream is stale
+    (no tick within ``max_age`` seconds, or no usable price yet) ``ticker`` falls
+    back to a one-off ``reqTickers`` snapshot, so prices are never older than
+    the old snapshot-per-call behaviour.
+
+    The cache can be shared by several strategies on one connection; identical
+    contracts then cost a single market data line.  Each user takes its own
+    handle from ``share()``: streams are counted per handle and cancelled once
+    the last handle holding them unsubscribes, so one strategy closing an
+    option does not cut the stream of another (or of the risk engine).
+    ``tick_event`` re-emits the ticker of every streamed update (a
+    ``TickRecorder`` listens to it).
+    """
+
+    def __init__(self, ib: IB, max_age: float = 5.0, clock=time.monotonic):
+        self.ib = ib
+        self.max_age = max_age
+        self.clock = clock
+        self._tickers: dict[tuple, Ticker] = {}
+        self._updated: dict[tuple, float] = {}
+        self._holders: dict[tuple, int] = {}  # Handles subscribed to each stream
+        self._held: set[tuple] = set()  # Streams this handle subscribed to
+        self.tick_event = Event("tick_event")
+
+    def share(self) -> "QuoteCache":
+        """Handle on the same streams whose subscriptions are counted apart from this one's."""
+        handle = copy.copy(self)
+        handle._held = set()
+        return handle
+
+    @staticmethod
+    def key(contract: Contract) -> tuple:
+        """Identity of a contract: its conId once qualified, its defining fields otherwise."""
+        if contract.conId:
+            return ("conId", contract.conId)
+        return (
+            contract.secType,
+            contract.symbol,
+            contract.lastTradeDateOrContractMonth,
+            contract.strike,
+            contract.right,
+            contract.exchange,
+            contract.currency,
+        )
+
+    def __len__(self) -> int:
+        return len(self._tickers)
+
+    def __contains__(self, contract: Contract) -> bool:
+        return self.key(contract) in self._tickers
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+    def subscribe(self, contract: Contract) -> Ticker:
+        """Streaming ticker for *contract*, requested only once per contract."""
+        key = self.key(contract)
+        ticker = self._tickers.get(key)
+        if ticker is None:
+            ticker = self.ib.reqMktData(contract)
+            ticker.updateEvent.connect(lambda ticker, key=key: self._touch(key, ticker))
+            self._tickers[key] = ticker
+        if key not in self._held:
+            self._held.add(key)
+            self._holders[key] = self._holders.get(key, 0) + 1
+        return ticker
+
+    def unsubscribe(self, contract: Contract):
+        """Release this handle's stream for *contract* (e.g. an option that has been closed).
+
+        The stream is cancelled when no other handle holds it.
+        """
+        key = self.key(contract)
+        if key not in self._held:
+            return
+        self._held.discard(key)
+        self._holders[key] -= 1
+        if self._holders[key] > 0:
+            return
+        del self._holders[key]
+        ticker = self._tickers.pop(key, None)
+        self._updated.pop(key, None)
+        if ticker is not None and self.ib.isConnected():
+            self.ib.cancelMktData(ticker.contract)
+
+    def clear(self):
+        """Release every stream this handle subscribed to."""
+        for key in list(self._held):
+            self.unsubscribe(self._tickers[key].contract)
+
+    def _touch(self, key: tuple, ticker: Ticker):
+        self._updated[key] = self.clock()
+        self.tick_event.emit(ticker)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def age(self, contract: Contract) -> float:
+        """Seconds since the last tick for *contract* (``inf`` if none yet)."""
+        updated = self._updated.get(self.key(contract))
+        return math.inf if updated is None else self.clock() - updated
+
+    def is_fresh(self, contract: Contract, max_age: float | None = None) -> bool:
+        return self.age(contract) <= (self.max_age if max_age is None else max_age)
+
+    def ticker(self, contract: Contract, max_age: float | None = None) -> Ticker | None:
+        """Latest ticker for *contract*, or a snapshot while the stream is stale.
+
+        Returns None when no market data is available at all.
+        """
+        ticker = self.subscribe(contract)
+        if self.is_fresh(contract, max_age):
+            price = ticker.marketPrice()
+            if price == price:  # Stream is ticking but may not have a price yet
+                return ticker
+        snapshot = self.ib.reqTickers(contract)
+        return snapshot[0] if snapshot else None
+
+    def cached_price(self, contract: Contract) -> float:
+        """Last streamed price of *contract* whatever its age; NaN when not streaming (never asks IB)."""
+        ticker = self._tickers.get(self.key(contract))
+        return ticker.marketPrice() if ticker is not None else math.nan
+
+    def cached_prices(self):
+        """``(key, price)`` of every stream that has a price (never asks IB)."""
+        for key, ticker in self._tickers.items():
+            price = ticker.marketPrice()
+            if price == price:
+                yield key, price
+
+    def price(self, contract: Contract, max_age: float | None = None) -> float:
+        """Market price of *contract* (last inside the spread, else midpoint)."""
+        ticker = self.ticker(contract, max_age)
+        return ticker.marketPrice() if ticker is not None else math.nan
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# Replay runner for the CHAD strategies
+# Runs a strategy's own run() loop over recorded bars on the simulated broker, with a virtual clock that jumps ahead on every sleep so a trading day takes seconds.
+
+import argparse
+import datetime
+import time
+
+import pandas as pd
+
+from backtest import _parse_value, load_bars
+from bar_store import BarStore
+from clock import SimClock
+from sim_broker import SimIB
+from spy_bosk_strategy import SPYBOSKStrategy
+from spy_rev_strategy import SPYREVStrategy
+
+STRATEGIES = {"bosk": SPYBOSKStrategy, "rev": SPYREVStrategy}
+
+LEAD_SECONDS = 300  # The replay starts this long before the first open and stops this long after the last close
+
+
+def sessions(bars: pd.DataFrame, tz) -> list[datetime.date]:
+    """Days that have bars, in the strategies' timezone."""
+    dates = pd.to_datetime(bars["date"])
+    dates = dates.dt.tz_localize(tz) if dates.dt.tz is None else dates.dt.tz_convert(tz)
+    return sorted(set(dates.dt.date))
+
+
+def replay(strategy, bars: pd.DataFrame, day: datetime.date | None = None, days: int = 1, **sim) -> SimIB:
+    """Run ``strategy.run()`` over *days* sessions of *bars* from *day* (default: the last *days* sessions).
+
+    The strategy gets a ``SimIB`` replaying *bars* as its ``ib`` and the
+    broker's ``SimClock`` as its ``clock``, so every session check, quote age
+    and sleep (the loop's own, the order manager's, the connection retries')
+    runs on virtual time.  The broker stops the clock after the last close
+    with ``ReplayFinished``; the loop then shuts down as on Ctrl-C, flattening
+    and waiting for its fills.  A ``bar_store`` the strategy has is swapped
+    for a read-only view of it: the stored sessions before the replayed day
+    still warm the indicators, but the replayed bars are not written into
+    the live store.  Extra keyword arguments go to ``SimIB``
+    (``slippage``, ``fill_latency``, ...).  Returns the broker, whose
+    ``fills()`` hold the day's executions.
+    """
+    calendar = strategy.get_calendar()
+    available = sessions(bars, strategy.tz)
+    if day is None:
+        day = available[max(len(available) - days, 0)]
+    picked = [d for d in available if d >= day and calendar.is_trading_day(d)][:days]
+    if not picked:
+        raise ValueError(f"No trading session in the bars from {day}")
+    first, last = calendar.build(picked[0]), calendar.build(picked[-1])
+    sim.setdefault("pacing", False)  # Pacing is measured on the wall clock, which a replay compresses
+    ib = SimIB(
+        {strategy.ticker: bars},
+        start=datetime.datetime.fromtimestamp(first.open - LEAD_SECONDS, strategy.tz),
+        end=datetime.datetime.fromtimestamp(last.close + LEAD_SECONDS, strategy.tz),
+        tz=str(strategy.tz),
+        **sim,
+    )
+    strategy.ib = ib
+    strategy.clock = SimClock(ib)
+    store = getattr(strategy, "bar_store", None)
+    if store is not None:
+        strategy.bar_store = BarStore(store.root, store.bar_size, store.tz.zone, read_only=True)
+    if getattr(strategy, "recorder", None) is not None:
+        strategy.recorder.clock = strategy.clock.time  # Records stamped and filed by the replayed day
+    strategy.run()
+    return ib
+
+
+def summary(ib: SimIB) -> dict:
+    """Executions and P/L in dollars from the broker's fills (options at a multiplier of 100)."""
+    pnl = commissions = 0.0
+    bought = sold = 0
+    for fill in ib.fills():
+        shares = fill.execution.shares
+        multiplier = float(fill.contract.multiplier or 1)
+        if fill.execution.side == "BOT":
+            bought += shares
+            pnl -= fill.execution.price * shares * multiplier
+        else:
+            sold += shares
+            pnl += fill.execution.price * shares * multiplier
+        commissions += fill.commissionReport.commission
+    return {
+        "fills": len(ib.fills()),
+        "bought": bought,
+        "sold": sold,
+        "open": sum(p.position for p in ib.positions()),
+        "gross_pnl": round(pnl, 2),
+        "commissions": round(commissions, 2),
+        "net_pnl": round(pnl - commissions, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded bars through a CHAD strategy's run() loop")
+    parser.add_argument("data", type=str, help="CSV or Parquet file, or bar store directory, with date/open/high/low/close/volume")
+    parser.add_argument("--strategy", type=str, default="bosk", choices=sorted(STRATEGIES), help="Strategy to run")
+    parser.add_argument("--ticker", type=str, default="SPY", help="Ticker the bars belong to")
+    parser.add_argument("--day", type=datetime.date.fromisoformat, default=None, help="First session to replay (YYYY-MM-DD, default: the last)")
+    parser.add_argument("--days", type=int, default=1, help="Number of sessions to replay")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="Override a strategy constructor parameter (repeatable)")
+    parser.add_argument("--slippage", type=float, default=0.01, help="Simulated slippage per fill")
+    parser.add_argument("--fills", action="store_true", help="Print every fill")
+
+    args = parser.parse_args()
+    overrides = dict(item.split("=", 1) for item in args.set)
+    strategy = STRATEGIES[args.strategy](ticker=args.ticker, **{k: _parse_value(v) for k, v in overrides.items()})
+    started = time.perf_counter()
+    ib = replay(strategy, load_bars(args.data), day=args.day, days=args.days, slippage=args.slippage)
+    elapsed = time.perf_counter() - started
+    if args.fills:
+        for fill in ib.fills():
+            e = fill.execution
+            print(f"{e.time} {e.side} {e.shares:g} {fill.contract.localSymbol} @ {e.price:.2f}")
+    for key, value in {**summary(ib), "wall_seconds": round(elapsed, 2)}.items():
+        print(f"{key:>14}: {value}")
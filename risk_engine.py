@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+# Portfolio risk engine for the CHAD strategies
+# Aggregates delta, premium and P/L of every position on the account on each quote tick, and flattens everything when a kill-switch limit is crossed.
+
+import datetime
+import math
+
+import numpy as np
+import pytz
+from ib_insync import *
+
+from greeks import greeks, implied_vol, years_to_expiry
+from quote_cache import QuoteCache
+from session_calendar import SessionCalendar
+
+
+class RiskLimits:
+    """Kill-switch thresholds; a limit left at None is not checked.
+
+    * ``max_delta``: share-equivalent delta of the whole book, either side,
+    * ``max_premium``: market value of the options held (the premium at risk),
+    * ``max_loss``: realized plus unrealized loss since the engine started.
+    """
+
+    def __init__(self, max_delta: float | None = None, max_premium: float | None = None, max_loss: float | None = None):
+        self.max_delta = max_delta
+        self.max_premium = max_premium
+        self.max_loss = max_loss
+
+    def breach(self, delta: float, premium: float, pnl: float) -> str | None:
+        """Description of the first limit crossed, None while all hold."""
+        if self.max_delta is not None and abs(delta) > self.max_delta:
+            return f"delta {delta:+.0f} beyond ±{self.max_delta:g}"
+        if self.max_premium is not None and premium > self.max_premium:
+            return f"premium at risk ${premium:,.0f} above ${self.max_premium:,.0f}"
+        if self.max_loss is not None and pnl < -self.max_loss:
+            return f"P/L ${pnl:,.0f} below -${self.max_loss:,.0f}"
+        return None
+
+
+class RiskEngine:
+    """Account-wide exposure, updated incrementally from the quote streams.
+
+    Positions come from IB's position updates, which cover the whole account
+    whatever client placed the orders, so one engine per IB connection sees
+    the ORB, BOSK and REV processes together.  Each position is a slot in a
+    set of arrays (quantity, multiplier, average cost, last price, delta,
+    gamma, implied vol).
+
+    * An option tick moves ``premium`` and ``unrealized`` by the change of
+      that one slot: a handful of float operations.
+    * An underlying tick moves ``delta`` by the book's gamma on that
+      underlying times the price change, so the delta stays current without
+      repricing anything.
+    * ``reprice`` solves implied vols and greeks for every option in one
+      vectorized pass and recomputes the totals exactly.  It runs on every
+      position change and every *refresh* seconds of underlying ticks.
+
+    Realized P/L is booked when a position shrinks, at the fill price when
+    this connection sees the execution, at the last quote otherwise.  After
+    each update the totals are checked against *limits*; the first breach
+    fires ``kill_event(reason)`` and ``kill`` cancels every working order on
+    the account and closes every position at market.  Positions that show up
+    after the kill are closed as well.
+    """
+
+    def __init__(
+        self,
+        ib: IB,
+        quotes: QuoteCache | None = None,
+        limits: RiskLimits | None = None,
+        rate: float = 0.0,
+        refresh: float = 60.0,
+        calendar: SessionCalendar | None = None,
+        clock=None,
+        capacity: int = 64,
+    ):
+        self.ib = ib
+        self.quotes = quotes if quotes is not None else QuoteCache(ib)
+        self.limits = limits if limits is not None else RiskLimits()
+        self.rate = rate
+        self.refresh = refresh  # Seconds between full repricings while only the underlying moves
+        self.calendar = calendar if calendar is not None else SessionCalendar(pytz.timezone("US/Central"), "08:30:00", "15:00:00")
+        self.clock = clock if clock is not None else (lambda: datetime.datetime.now(self.calendar.tz))
+
+        # One slot per contract held today
+        self.contracts: list[Contract] = []
+        self._slots: dict[int, int] = {}  # conId -> slot
+        self._qty = np.zeros(capacity)
+        self._mult = np.zeros(capacity)
+        self._avg = np.zeros(capacity)  # Average cost per unit (IB's avgCost / multiplier)
+        self._price = np.full(capacity, np.nan)
+        self._delta = np.zeros(capacity)  # Per unit
+        self._gamma = np.zeros(capacity)
+        self._iv = np.full(capacity, np.nan)
+        self._strike = np.zeros(capacity)
+        self._call = np.zeros(capacity, dtype=bool)
+        self._option = np.zeros(capacity, dtype=bool)
+        self._underlying = np.zeros(capacity, dtype=np.int64)
+
+        # One entry per underlying symbol
+        self.symbols: list[str] = []
+        self._symbol_index: dict[str, int] = {}
+        self._spot: list[float] = []
+        self._gamma_by_symbol: list[float] = []  # Share-equivalent gamma of the options on each underlying
+
+        self.delta = 0.0
+        self.premium = 0.0
+        self.unrealized = 0.0
+        self.realized = 0.0
+        self.killed = False
+        self.kill_event = Event("kill_event")
+        self._last_fill: dict[int, float] = {}  # conId -> price of the last execution seen
+        self._flattening: dict[int, Trade] = {}
+        self._repriced: datetime.datetime | None = None
+        self._started = False
+
+    @property
+    def pnl(self) -> float:
+        return self.realized + self.unrealized
+
+    def snapshot(self) -> dict:
+        return {
+            "delta": self.delta, "premium": self.premium, "unrealized": self.unrealized,
+            "realized": self.realized, "pnl": self.pnl, "positions": int(np.count_nonzero(self._qty[:len(self.contracts)])),
+            "killed": self.killed,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        """Load the account's positions and follow position updates, executions and quotes."""
+        if self._started:
+            return
+        self._started = True
+        self.ib.execDetailsEvent.connect(self._on_exec)
+        self.ib.positionEvent.connect(self._on_position)
+        for position in self.ib.positions():
+            self._on_position(position, opening=True)
+        print(f"Risk engine watching {len(self.ib.positions())} positions")
+
+    def stop(self):
+        if not self._started:
+            return
+        self._started = False
+        self.ib.execDetailsEvent.disconnect(self._on_exec)
+        self.ib.positionEvent.disconnect(self._on_position)
+
+    # ------------------------------------------------------------------
+    # Slots
+    # ------------------------------------------------------------------
+    def _grow(self):
+        capacity = 2 * len(self._qty)
+        for name in ("_qty", "_mult", "_avg", "_price", "_delta", "_gamma", "_iv", "_strike", "_call", "_option", "_underlying"):
+            old = getattr(self, name)
+            new = np.full(capacity, np.nan) if name in ("_price", "_iv") else np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _symbol(self, symbol: str) -> int:
+        index = self._symbol_index.get(symbol)
+        if index is None:
+            index = self._symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self._spot.append(math.nan)
+            self._gamma_by_symbol.append(0.0)
+            ticker = self.quotes.subscribe(Stock(symbol, "SMART", "USD"))
+            ticker.updateEvent.connect(lambda ticker, index=index: self._on_underlying_tick(index, ticker))
+            self._spot[index] = ticker.marketPrice()  # Already streaming for a strategy
+        return index
+
+    def _slot(self, contract: Contract) -> int:
+        slot = self._slots.get(contract.conId)
+        if slot is not None:
+            return slot
+        slot = len(self.contracts)
+        if slot == len(self._qty):
+            self._grow()
+        # Positions report the contract without an exchange
+        contract = Contract.create(**{**util.dataclassNonDefaults(contract), "exchange": contract.exchange or "SMART"})
+        self._slots[contract.conId] = slot
+        self.contracts.append(contract)
+        option = contract.secType in ("OPT", "FOP")
+        self._option[slot] = option
+        self._mult[slot] = float(contract.multiplier or (100 if option else 1))
+        if option:
+            self._strike[slot] = contract.strike
+            self._call[slot] = contract.right.startswith("C")
+            self._underlying[slot] = self._symbol(contract.symbol)
+        else:
+            self._delta[slot] = 1.0
+        ticker = self.quotes.subscribe(contract)
+        ticker.updateEvent.connect(lambda ticker, slot=slot: self._on_tick(slot, ticker))
+        self._on_tick(slot, ticker)  # Nothing held yet: only records a price already streamed
+        return slot
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+    def _on_exec(self, trade: Trade, fill: Fill):
+        self._last_fill[fill.contract.conId] = fill.execution.price
+
+    def _on_position(self, position: Position, opening: bool = False):
+        slot = self._slot(position.contract)
+        old, new = self._qty[slot], float(position.position)
+        mult = self._mult[slot]
+        if not opening and old and (old * new <= 0 or abs(new) < abs(old)):
+            # Some or all of the position was closed: book it at the fill (or the quote)
+            closed = old if old * new <= 0 else old - new
+            price = self._last_fill.get(position.contract.conId, self._price[slot])
+            if price == price:
+                self.realized += closed * mult * (price - self._avg[slot])
+        self._qty[slot] = new
+        if new:
+            self._avg[slot] = position.avgCost / mult
+        self.reprice()
+        if self.killed and new:
+            self._close(slot)
+        self.check()
+
+    def _on_tick(self, slot: int, ticker: Ticker):
+        price = ticker.marketPrice()
+        if price != price:
+            return
+        old = self._price[slot]
+        self._price[slot] = price
+        held = self._qty[slot] * self._mult[slot]
+        if held:
+            if old == old:
+                change = price - old
+                self.unrealized += held * change
+            else:
+                change = price
+                self.unrealized += held * (price - self._avg[slot])
+            if self._option[slot]:
+                self.premium += abs(held) * change
+            self.check()
+
+    def _on_underlying_tick(self, index: int, ticker: Ticker):
+        spot = ticker.marketPrice()
+        if spot != spot:
+            return
+        old = self._spot[index]
+        self._spot[index] = spot
+        if old == old:
+            self.delta += self._gamma_by_symbol[index] * (spot - old)
+        if old != old or (self.refresh is not None and (self.clock() - self._repriced).total_seconds() >= self.refresh):
+            self.reprice()
+        self.check()
+
+    # ------------------------------------------------------------------
+    # Full repricing
+    # ------------------------------------------------------------------
+    def reprice(self):
+        """Solve implied vols and greeks for every option held and recompute the totals."""
+        now = self.clock()
+        self._repriced = now
+        count = len(self.contracts)
+        qty, mult, price = self._qty[:count], self._mult[:count], self._price[:count]
+        option = self._option[:count]
+        underlying = self._underlying[:count]
+        spot = np.asarray(self._spot)[underlying] if self.symbols else np.full(count, np.nan)
+        live = option & (qty != 0) & ~np.isnan(price) & ~np.isnan(spot)
+        if live.any():
+            expiries = {}
+            t = np.array([
+                expiries.setdefault(c.lastTradeDateOrContractMonth, years_to_expiry(now, c.lastTradeDateOrContractMonth, self.calendar))
+                if live[i] else 1.0
+                for i, c in enumerate(self.contracts)
+            ])[live]
+            strike, call = self._strike[:count][live], self._call[:count][live]
+            iv = implied_vol(price[live], spot[live], strike, t, call, rate=self.rate)
+            # No time value left: the previous vol, else a near-zero one (delta 0 or 1)
+            previous = self._iv[:count][live]
+            iv = np.where(np.isnan(iv), np.where(np.isnan(previous), 1e-4, previous), iv)
+            g = greeks(spot[live], strike, t, iv, call, rate=self.rate)
+            self._iv[:count][live] = iv
+            self._delta[:count][live] = g["delta"]
+            self._gamma[:count][live] = g["gamma"]
+        held = qty * mult
+        priced = ~np.isnan(price)
+        self.delta = float(np.dot(held, self._delta[:count]))
+        self.premium = float(np.abs(held[option & priced]) @ price[option & priced])
+        self.unrealized = float(held[priced] @ (price[priced] - self._avg[:count][priced]))
+        gamma = np.bincount(underlying[option], weights=(held * self._gamma[:count])[option], minlength=len(self.symbols))
+        self._gamma_by_symbol = gamma.tolist()
+
+    # ------------------------------------------------------------------
+    # Kill switch
+    # ------------------------------------------------------------------
+    def check(self):
+        if self.killed:
+            return
+        reason = self.limits.breach(self.delta, self.premium, self.pnl)
+        if reason is not None:
+            self.kill(reason)
+
+    def kill(self, reason: str):
+        """Cancel every working order on the account and close every position at market."""
+        if self.killed:
+            return
+        self.killed = True
+        print(f"KILL SWITCH: {reason} — cancelling all orders and flattening")
+        self.kill_event.emit(reason)
+        self.ib.reqGlobalCancel()
+        for slot in range(len(self.contracts)):
+            if self._qty[slot]:
+                self._close(slot)
+
+    def _close(self, slot: int):
+        contract = self.contracts[slot]
+        working = self._flattening.get(contract.conId)
+        if working is not None and not working.isDone():
+            return
+        quantity = self._qty[slot]
+        order = MarketOrder("SELL" if quantity > 0 else "BUY", abs(quantity))
+        self._flattening[contract.conId] = self.ib.placeOrder(contract, order)
+        print(f"Flattening {order.action} {abs(quantity):g} {contract.localSymbol or contract.symbol}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Watch the account's aggregate risk and flatten everything when a limit is crossed")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="TWS / IB Gateway host")
+    parser.add_argument("--port", type=int, default=7497, help="TWS / IB Gateway port")
+    parser.add_argument("--client_id", type=int, default=80, help="Client ID of the engine's connection (make it TWS's Master API client ID to see every fill)")
+    parser.add_argument("--max_delta", type=float, default=None, help="Kill switch: share-equivalent delta, either side")
+    parser.add_argument("--max_premium", type=float, default=None, help="Kill switch: market value of the options held")
+    parser.add_argument("--max_loss", type=float, default=None, help="Kill switch: realized plus unrealized loss")
+    parser.add_argument("--report", type=float, default=60.0, help="Seconds between exposure reports")
+    args = parser.parse_args()
+
+    ib = IB()
+    ib.connect(args.host, args.port, clientId=args.client_id)
+    engine = RiskEngine(ib, limits=RiskLimits(args.max_delta, args.max_premium, args.max_loss))
+    engine.start()
+    try:
+        while True:
+            ib.sleep(args.report)
+            s = engine.snapshot()
+            print(f"Risk — delta {s['delta']:+.0f}, premium ${s['premium']:,.0f}, "
+                  f"P/L ${s['pnl']:,.2f} (realized ${s['realized']:,.2f}), {s['positions']} positions")
+    except KeyboardInterrupt:
+        print("Risk engine interrupted — shutting down.")
+    finally:
+        engine.stop()
+        ib.disconnect()
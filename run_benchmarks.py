@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# Run all benchmarks for SPY EMA CHAD
+# Discovers bench_*.py the way run_tests.py discovers tests, stores the timings and compares them with a baseline.
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import unittest
+
+TIMINGS = ("best_us", "median_us", "number")
+
+
+def result_key(result: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in result.items() if k not in TIMINGS))
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> list[dict]:
+    """Results slower than their baseline entry by more than *threshold* (a fraction)."""
+    base = {result_key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = base.get(result_key(result))
+        result["baseline_us"] = before["best_us"] if before else None
+        if before and result["best_us"] > before["best_us"] * (1 + threshold):
+            regressions.append(result)
+    return regressions
+
+
+def describe(result: dict) -> str:
+    params = ", ".join(f"{k}={v}" for k, v in result.items() if k not in TIMINGS + ("suite", "name", "baseline_us"))
+    return f"{result['name']}({params})"
+
+
+def print_table(results: list[dict]):
+    print(f"\n{'benchmark':<58}{'best µs':>12}{'median µs':>12}{'baseline':>12}{'change':>9}")
+    for r in results:
+        base = r.get("baseline_us")
+        change = f"{(r['best_us'] / base - 1) * 100:+.0f}%" if base else ""
+        base_text = f"{base:.1f}" if base else "-"
+        print(f"{describe(r):<58}{r['best_us']:>12.1f}{r['median_us']:>12.1f}{base_text:>12}{change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bench_*.py suites and compare with a baseline")
+    parser.add_argument("--pattern", default="bench_*.py", help="Benchmark file pattern (default: bench_*.py)")
+    parser.add_argument("--quick", action="store_true", help="Skip the 1 year and 100 ticker sizes")
+    parser.add_argument("--out-dir", default="bench_results", help="Directory the run's timings are written to")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="Timings to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Slowdown reported as a regression (default: 0.25)")
+    args = parser.parse_args()
+
+    if args.quick:
+        os.environ["BENCH_QUICK"] = "1"
+    import benchmark  # Reads BENCH_QUICK on import
+
+    suite = unittest.defaultTestLoader.discover(".", pattern=args.pattern)
+    outcome = unittest.TextTestRunner(verbosity=2).run(suite)
+    results = benchmark.RESULTS
+
+    baseline = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    print_table(results)
+
+    run = {"time": datetime.datetime.now().isoformat(timespec="seconds"), "quick": benchmark.QUICK, "results": results}
+    os.makedirs(args.out_dir, exist_ok=True)
+    path = os.path.join(args.out_dir, datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(path, "w") as f:
+        json.dump(run, f, indent=1)
+    print(f"\nTimings written to {path}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for r in regressions:
+            print(f"  {describe(r)}: {r['baseline_us']:.1f} -> {r['best_us']:.1f} µs")
+    sys.exit(not outcome.wasSuccessful() or bool(regressions))
+
+
+if __name__ == "__main__":
+    main()
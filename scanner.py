@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# Multi-ticker bar scanner for the CHAD strategies
+# Holds the bars of every ticker in ticker × bar arrays and advances indicators and entry signals for all tickers with one NumPy operation per bar close.
+
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from ib_insync import *
+
+from bar_feed import BarFeed
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+# ---------------------------------------------------------------------------
+# Vectorised indicators — one value per ticker, same arithmetic as indicators.py
+# ---------------------------------------------------------------------------
+class VectorEMA:
+    """``indicators.EMA`` for a vector of tickers; results are bit-identical to the scalar version.
+
+    A NaN input (no bar for that ticker) leaves the ticker's average unchanged.
+    """
+
+    def __init__(self, period: int, n: int):
+        com = (period - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - self.alpha
+        self.value = np.full(n, np.nan)
+
+    def update(self, x: np.ndarray) -> np.ndarray:
+        weighted = self.value
+        with np.errstate(invalid="ignore"):
+            stepped = (self.old_wt_factor * weighted + self.alpha * x) / (self.old_wt_factor + self.alpha)
+        # pandas skips the update on constant series; the first observation seeds the average
+        value = np.where(np.isnan(x) | (weighted == x), weighted, stepped)
+        self.value = np.where(np.isnan(weighted), x, value)
+        return self.value
+
+
+class VectorATR:
+    """``indicators.ATR`` for a vector of tickers."""
+
+    def __init__(self, period: int, n: int):
+        self.ema = VectorEMA(period, n)
+        self.prev_close = np.full(n, np.nan)
+
+    def update(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        high_low = high - low
+        true_range = np.maximum(high_low, np.maximum(np.abs(high - self.prev_close), np.abs(low - self.prev_close)))
+        true_range = np.where(np.isnan(self.prev_close), high_low, true_range)
+        value = self.ema.update(true_range)
+        self.prev_close = np.where(np.isnan(close), self.prev_close, close)
+        return value
+
+
+class VectorVWAP:
+    """``indicators.SessionVWAP`` for a vector of tickers trading the same session."""
+
+    def __init__(self, n: int):
+        self.n = n
+        self._sums = np.zeros((4, n))  # cum_vol, comp_vol, cum_vol_price, comp_vol_price
+        self.value = np.full(n, np.nan)
+
+    @staticmethod
+    def _kahan(total: np.ndarray, comp: np.ndarray, x: np.ndarray):
+        y = x - comp
+        t = total + y
+        return t, t - total - y
+
+    def update(self, new_day: bool, high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        if new_day:
+            self._sums = np.zeros((4, self.n))
+        cum_vol, comp_vol, cum_vp, comp_vp = self._sums
+        typical_price = (high + low + close) / 3
+        cum_vol, comp_vol = self._kahan(cum_vol, comp_vol, volume)
+        cum_vp, comp_vp = self._kahan(cum_vp, comp_vp, typical_price * volume)
+        self._sums = np.where(np.isnan(volume), self._sums, np.array([cum_vol, comp_vol, cum_vp, comp_vp]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.value = self._sums[2] / self._sums[0]
+        return self.value
+
+
+# ---------------------------------------------------------------------------
+# Scans — one per strategy, producing the strategy's indicator columns and entry signals
+# ---------------------------------------------------------------------------
+class Scan:
+    """Indicators and signals computed for every ticker at each bar close.
+
+    Subclasses list the indicator ``columns`` and ``signals`` they produce,
+    allocate their state in ``bind`` and implement ``update``, which writes the
+    indicator values of bar *i* into the scanner and returns the signal
+    arrays (one value per ticker; 0 / False where there is no signal).
+    """
+
+    columns: tuple[str, ...] = ()
+    signals: tuple[str, ...] = ()
+
+    def bind(self, n: int):
+        raise NotImplementedError
+
+    def update(self, scanner: "BarScanner", i: int, new_day: bool) -> dict[str, np.ndarray]:
+        raise NotImplementedError
+
+
+class ChadScan(Scan):
+    """SPY EMA CHAD: position of the close against the EMAs and VWAP, and 9 EMA touches.
+
+    ``chad_side`` is 1 when the close is above all three indicators, -1 when
+    it is below all three and 0 otherwise (the 9:00 initial condition).
+    ``chad_touch`` is True when the close is within *threshold* of the short
+    EMA (the entry trigger once a side is set).
+    """
+
+    columns = ("ema_short", "ema_long", "vwap")
+    signals = ("chad_side", "chad_touch")
+
+    def __init__(self, ema_short: int = 9, ema_long: int = 20, threshold: float = 0.0003):
+        self.params = dict(ema_short=ema_short, ema_long=ema_long, threshold=threshold)
+        self.threshold = threshold
+
+    def bind(self, n: int):
+        self.ema_short = VectorEMA(self.params["ema_short"], n)
+        self.ema_long = VectorEMA(self.params["ema_long"], n)
+        self.vwap = VectorVWAP(n)
+
+    def update(self, scanner, i, new_day):
+        high, low, close, volume = (scanner.data[name][:, i] for name in ("high", "low", "close", "volume"))
+        ema_short = scanner.data["ema_short"][:, i] = self.ema_short.update(close)
+        ema_long = scanner.data["ema_long"][:, i] = self.ema_long.update(close)
+        vwap = scanner.data["vwap"][:, i] = self.vwap.update(new_day, high, low, close, volume)
+        above = (close > ema_short) & (close > ema_long) & (close > vwap)
+        below = (close < ema_short) & (close < ema_long) & (close < vwap)
+        return {
+            "chad_side": above.astype(np.int8) - below.astype(np.int8),
+            "chad_touch": np.abs(close - ema_short) < close * self.threshold,
+        }
+
+
+class BOSKScan(Scan):
+    """SPY BOSK: Keltner channel and the break-of-structure entry on the bar that just closed.
+
+    ``bosk`` is 1 for ``ENTER_LONG`` and -1 for ``ENTER_SHORT``, with the rules
+    of ``SPYBOSKStrategy.check_entry_signal``.
+    """
+
+    columns = ("ema9", "ema20", "atr", "kc_upper", "kc_lower")
+    signals = ("bosk",)
+
+    def __init__(self, ema9_period: int = 9, ema20_period: int = 20, atr_period: int = 20, kc_mult: float = 1.5):
+        self.params = dict(ema9_period=ema9_period, ema20_period=ema20_period, atr_period=atr_period, kc_mult=kc_mult)
+        self.kc_mult = kc_mult
+
+    def bind(self, n: int):
+        self.ema9 = VectorEMA(self.params["ema9_period"], n)
+        self.ema20 = VectorEMA(self.params["ema20_period"], n)
+        self.atr = VectorATR(self.params["atr_period"], n)
+
+    def update(self, scanner, i, new_day):
+        data = scanner.data
+        open_, high, low, close = (data[name][:, i] for name in ("open", "high", "low", "close"))
+        data["ema9"][:, i] = self.ema9.update(close)
+        ema20 = data["ema20"][:, i] = self.ema20.update(close)
+        atr = data["atr"][:, i] = self.atr.update(high, low, close)
+        kc_upper = data["kc_upper"][:, i] = ema20 + self.kc_mult * atr
+        kc_lower = data["kc_lower"][:, i] = ema20 - self.kc_mult * atr
+        signal = np.zeros(len(close), dtype=np.int8)
+        if i >= 3:
+            prev_high = data["high"][:, i - 3:i].max(axis=1)
+            prev_low = data["low"][:, i - 3:i].min(axis=1)
+            signal[(close > prev_high) & (open_ < kc_lower) & (close > kc_lower)] = 1
+            signal[(close < prev_low) & (open_ > kc_upper) & (close < kc_upper)] = -1
+        return {"bosk": signal}
+
+
+# ---------------------------------------------------------------------------
+# Scanner
+# ---------------------------------------------------------------------------
+class BarScanner:
+    """Completed bars of many tickers in ``(ticker, bar)`` arrays, scanned at every bar close.
+
+    ``add_bar`` takes one bar per ticker (NaN where a ticker has none), so the
+    work per bar close is a fixed number of NumPy operations whatever the
+    number of tickers.  ``data[name]`` holds the bar fields and every scan's
+    indicator columns; ``signals`` holds the last bar's signal arrays.  When
+    the arrays are full, the older half is dropped.
+
+    ``watch`` keeps the scanner up to date from live ``BarFeed``s and emits
+    ``scan_event(scanner, signals)`` once every ticker has closed the bar.
+    """
+
+    def __init__(
+        self,
+        tickers: list[str],
+        scans: list[Scan] | None = None,
+        capacity: int = 1024,
+        max_wait: float = 30.0,
+        clock=time.monotonic,
+    ):
+        self.tickers = list(tickers)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.scans = list(scans) if scans is not None else [ChadScan()]
+        columns = [name for scan in self.scans for name in scan.columns]
+        if len(set(columns)) != len(columns):
+            raise ValueError(f"Scans share indicator columns: {columns}")
+        n = len(self.tickers)
+        for scan in self.scans:
+            scan.bind(n)
+        self.capacity = capacity
+        self.data = {name: np.full((n, capacity), np.nan) for name in (*FIELDS, *columns)}
+        self.dates = np.empty(capacity, dtype=object)
+        self.count = 0
+        self.day = None
+        self.signals: dict[str, np.ndarray] = {}
+        self.scan_event = Event("scan_event")
+        self.max_wait = max_wait  # Seconds a watched bar waits for slow tickers
+        self.clock = clock
+        self._feeds: dict[int, int] = {}
+        self._pending: dict = {}  # Bar date -> (fields, seen, first report) of bars not scanned yet
+        self._latest = np.full(n, -math.inf)  # Newest bar each watched ticker closed (epoch seconds)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _compact(self):
+        keep = self.capacity // 2
+        for arr in self.data.values():
+            arr[:, :keep] = arr[:, self.count - keep:self.count]
+            arr[:, keep:] = np.nan
+        self.dates[:keep] = self.dates[self.count - keep:self.count]
+        self.count = keep
+
+    def add_bar(self, date, open_, high, low, close, volume) -> dict[str, np.ndarray]:
+        """Append one completed bar for every ticker (arrays in ticker order) and return the signals."""
+        if self.count == self.capacity:
+            self._compact()
+        i = self.count
+        for name, values in zip(FIELDS, (open_, high, low, close, volume)):
+            self.data[name][:, i] = values
+        self.dates[i] = date
+        self.count += 1
+        day = pd.Timestamp(date).date()
+        new_day = day != self.day
+        self.day = day
+        signals = {}
+        for scan in self.scans:
+            signals.update(scan.update(self, i, new_day))
+        self.signals = signals
+        return signals
+
+    def add_frames(self, frames: dict[str, pd.DataFrame]):
+        """Replay the completed bars in *frames* (ticker -> bars), aligned on their dates."""
+        dates = pd.Index(sorted(set().union(*(frame["date"] for frame in frames.values())))[-self.capacity:])
+        rows = {name: np.full((len(self.tickers), len(dates)), np.nan) for name in FIELDS}
+        for ticker, frame in frames.items():
+            aligned = frame.drop_duplicates("date", keep="last").set_index("date").reindex(dates)
+            for name in FIELDS:
+                rows[name][self.index[ticker]] = aligned[name].to_numpy(dtype=float)
+        for j, date in enumerate(dates):
+            self.add_bar(date, *(rows[name][:, j] for name in FIELDS))
+
+    def column(self, name: str) -> np.ndarray:
+        """``(ticker, bar)`` view of *name* over the bars held."""
+        return self.data[name][:, :self.count]
+
+    def hits(self, signal: str) -> dict[str, object]:
+        """Tickers with a non-zero value of *signal* on the last bar."""
+        values = self.signals.get(signal)
+        if values is None:
+            return {}
+        return {self.tickers[i]: values[i].item() for i in np.flatnonzero(values)}
+
+    def to_df(self, ticker: str) -> pd.DataFrame:
+        """Bars and indicator columns of one ticker."""
+        i = self.index[ticker]
+        frame = pd.DataFrame({name: arr[i, :self.count] for name, arr in self.data.items()})
+        frame.insert(0, "date", self.dates[:self.count])
+        return frame
+
+    # ------------------------------------------------------------------
+    # Live feeds
+    # ------------------------------------------------------------------
+    def watch(self, feeds: dict[str, BarFeed]):
+        """Load the completed bars of started *feeds* (ticker -> feed) and follow their bar closes.
+
+        Bars are scanned in date order, each once every ticker has closed it
+        or a newer bar.  A ticker that has not reported ``max_wait`` seconds
+        after the first one did is scanned as missing (NaN) at the next bar
+        close; its bar arriving after that is dropped, as is any bar older
+        than the last one scanned.
+        """
+        frames = {}
+        for ticker, feed in feeds.items():
+            df = feed.to_df()
+            if df is not None and len(df) > 1:
+                frames[ticker] = df.iloc[:-1]  # The last row is still forming
+        if frames:
+            self.add_frames(frames)
+        for ticker, feed in feeds.items():
+            self._feeds[id(feed)] = self.index[ticker]
+            feed.bar_close_event.connect(self._on_bar_close)
+
+    def unwatch(self, feeds: dict[str, BarFeed]):
+        for feed in feeds.values():
+            feed.bar_close_event.disconnect(self._on_bar_close)
+            self._feeds.pop(id(feed), None)
+
+    def _on_bar_close(self, feed: BarFeed):
+        buffer = feed.buffer
+        if buffer is None or len(buffer) < 2:
+            return
+        row = len(buffer) - 2  # Last completed bar
+        date = buffer.column("date")[row]
+        i = self._feeds[id(feed)]
+        if self.count and date <= self.dates[self.count - 1]:
+            if date < self.dates[self.count - 1] or math.isnan(self.data["close"][i, self.count - 1]):
+                print(f"Scanner: {self.tickers[i]} bar {date} arrived after {self.dates[self.count - 1]} was scanned — dropped.")
+            return  # Already scanned
+        pending = self._pending.get(date)
+        if pending is None:
+            n = len(self.tickers)
+            pending = self._pending[date] = ({name: np.full(n, np.nan) for name in FIELDS}, np.zeros(n, dtype=bool), self.clock())
+        fields, seen, _ = pending
+        for name in FIELDS:
+            fields[name][i] = buffer.column(name)[row]
+        seen[i] = True
+        self._latest[i] = max(self._latest[i], pd.Timestamp(date).timestamp())
+        self._flush()
+
+    def _flush(self):
+        """Scan the pending bars, oldest first, while the oldest is complete or timed out."""
+        while self._pending:
+            date = min(self._pending)
+            fields, seen, reported = self._pending[date]
+            complete = (seen | (self._latest > pd.Timestamp(date).timestamp())).all()
+            if not complete and self.clock() - reported < self.max_wait:
+                return
+            del self._pending[date]
+            signals = self.add_bar(date, *(fields[name] for name in FIELDS))
+            self.scan_event.emit(self, signals)
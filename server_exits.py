@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# Server-side exit orders for the CHAD option strategies
+# Turns the first target, breakeven stop and second target into IB conditional orders in OCA groups, placed when the entry fills.
+
+import itertools
+import os
+import time
+from ib_insync import *
+
+from order_manager import OrderManager
+
+# orderRef of each exit, so fills and rejects can be told apart in TWS and in the callbacks
+FIRST_TARGET = "first_target"
+SECOND_TARGET = "second_target"
+BREAKEVEN = "breakeven"
+
+_groups = itertools.count(1)
+
+
+class ServerExits:
+    """The managed exits of one long option position, worked by IB instead of the strategy loop.
+
+    The position is split into the first half (``quantity // 2``) and the
+    rest, each with its own OCA group so one fill cancels the alternatives:
+
+    * first half: a market sell when the underlying crosses *first_target*,
+      or one when it crosses *second_target* if it gets there first;
+    * the rest: a market sell when the underlying crosses *second_target*,
+      or a stop at the entry fill price (breakeven) that only activates once
+      the underlying has crossed *first_target*.
+
+    "Crosses" means at or above the target for calls, at or below for puts.
+    The orders are placed by ``submit`` once the entry price is known and
+    their fills are reported through the *on_fill* callback, so the loop only
+    reconciles its state.  Cancels caused by the OCA groups or by ``cancel``
+    are expected and not reported; any other reject is passed to *on_reject*
+    and sets ``failed`` so the strategy can fall back to client-side exits.
+    """
+
+    def __init__(
+        self,
+        manager: OrderManager,
+        underlying: Contract,
+        option: Contract,
+        quantity: int,
+        first_target: float,
+        second_target: float,
+        on_fill=None,
+        on_reject=None,
+    ):
+        self.manager = manager
+        self.underlying = underlying
+        self.option = option
+        self.quantity = quantity
+        self.first_target = first_target
+        self.second_target = second_target
+        self.on_fill = on_fill
+        self.on_reject = on_reject
+        self.trades: list[Trade] = []
+        self.cancelled = False
+        self.failed = False
+
+    @property
+    def is_more(self) -> bool:
+        """Targets are above the underlying for calls and below it for puts."""
+        return self.option.right.startswith("C")
+
+    def condition(self, price: float) -> PriceCondition:
+        return PriceCondition(
+            price=round(price, 2), conId=self.underlying.conId, exch=self.underlying.exchange or "SMART",
+            isMore=self.is_more, conjunction="a",
+        )
+
+    def orders(self, breakeven: float) -> list[Order]:
+        """The exit orders for an entry filled at *breakeven*."""
+        group = f"{self.option.localSymbol.replace(' ', '')}-{os.getpid()}-{int(time.time())}-{next(_groups)}"
+        first_half = self.quantity // 2
+        rest = self.quantity - first_half
+        orders = []
+        if first_half:
+            orders += [
+                MarketOrder("SELL", first_half, conditions=[self.condition(self.first_target)],
+                            ocaGroup=f"{group}-A", ocaType=1, orderRef=FIRST_TARGET),
+                MarketOrder("SELL", first_half, conditions=[self.condition(self.second_target)],
+                            ocaGroup=f"{group}-A", ocaType=1, orderRef=SECOND_TARGET),
+            ]
+        orders += [
+            MarketOrder("SELL", rest, conditions=[self.condition(self.second_target)],
+                        ocaGroup=f"{group}-B", ocaType=1, orderRef=SECOND_TARGET),
+            StopOrder("SELL", rest, round(breakeven, 2), conditions=[self.condition(self.first_target)],
+                      ocaGroup=f"{group}-B", ocaType=1, orderRef=BREAKEVEN),
+        ]
+        for order in orders:
+            order.tif = "DAY"  # 0-DTE: nothing to work after the close
+        return orders
+
+    def submit(self, breakeven: float) -> list[Trade]:
+        """Place the exits for an entry filled at *breakeven* (nothing if already cancelled)."""
+        if self.cancelled or self.trades:
+            return self.trades
+        for order in self.orders(breakeven):
+            self.trades.append(self.manager.submit(
+                self.option, order, on_fill=self.on_fill, on_reject=self._on_reject,
+            ))
+        return self.trades
+
+    def cancel(self):
+        """Cancel every exit still working (before the strategy exits the position itself)."""
+        self.cancelled = True
+        self._cancel_working()
+
+    @property
+    def active(self) -> bool:
+        """True while IB is (or is about to be) working the exits."""
+        return not (self.cancelled or self.failed)
+
+    def _cancel_working(self):
+        for trade in self.trades:
+            if trade.order.orderId in self.manager.open_trades:
+                self.manager.ib.cancelOrder(trade.order)
+
+    def _sibling_filled(self, trade: Trade) -> bool:
+        group = trade.order.ocaGroup
+        return any(
+            other is not trade and other.order.ocaGroup == group and (other.fills or other.orderStatus.status == "Filled")
+            for other in self.trades
+        )
+
+    def _on_reject(self, trade: Trade, reason: str):
+        if not self.active or self._sibling_filled(trade):
+            return  # Cancelled by us or by its OCA group
+        self.failed = True
+        self._cancel_working()
+        if self.on_reject is not None:
+            self.on_reject(trade, reason)
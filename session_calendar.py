@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# Trading session calendar for the CHAD strategies
+# Builds each day's open / close / force-close / no-new-trades times once, as epoch seconds, with the exchange holidays and early closes.
+
+import datetime
+import os
+
+import pytz
+
+EXCHANGE_TZ = pytz.timezone("US/Eastern")
+EARLY_CLOSE = datetime.time(13, 0)  # Exchange time
+CALENDAR_ENV = "CHAD_MARKET_CALENDAR"  # YAML file of holidays and early closes added to the tables below
+
+# NYSE full-day closures
+HOLIDAYS = {
+    datetime.date(2023, 1, 2), datetime.date(2023, 1, 16), datetime.date(2023, 2, 20), datetime.date(2023, 4, 7),
+    datetime.date(2023, 5, 29), datetime.date(2023, 6, 19), datetime.date(2023, 7, 4), datetime.date(2023, 9, 4),
+    datetime.date(2023, 11, 23), datetime.date(2023, 12, 25),
+    datetime.date(2024, 1, 1), datetime.date(2024, 1, 15), datetime.date(2024, 2, 19), datetime.date(2024, 3, 29),
+    datetime.date(2024, 5, 27), datetime.date(2024, 6, 19), datetime.date(2024, 7, 4), datetime.date(2024, 9, 2),
+    datetime.date(2024, 11, 28), datetime.date(2024, 12, 25),
+    datetime.date(2025, 1, 1), datetime.date(2025, 1, 9), datetime.date(2025, 1, 20), datetime.date(2025, 2, 17),
+    datetime.date(2025, 4, 18), datetime.date(2025, 5, 26), datetime.date(2025, 6, 19), datetime.date(2025, 7, 4),
+    datetime.date(2025, 9, 1), datetime.date(2025, 11, 27), datetime.date(2025, 12, 25),
+    datetime.date(2026, 1, 1), datetime.date(2026, 1, 19), datetime.date(2026, 2, 16), datetime.date(2026, 4, 3),
+    datetime.date(2026, 5, 25), datetime.date(2026, 6, 19), datetime.date(2026, 7, 3), datetime.date(2026, 9, 7),
+    datetime.date(2026, 11, 26), datetime.date(2026, 12, 25),
+    datetime.date(2027, 1, 1), datetime.date(2027, 1, 18), datetime.date(2027, 2, 15), datetime.date(2027, 3, 26),
+    datetime.date(2027, 5, 31), datetime.date(2027, 6, 18), datetime.date(2027, 7, 5), datetime.date(2027, 9, 6),
+    datetime.date(2027, 11, 25), datetime.date(2027, 12, 24),
+}
+
+# NYSE early closes (13:00 Eastern)
+EARLY_CLOSES = {
+    datetime.date(2023, 7, 3), datetime.date(2023, 11, 24),
+    datetime.date(2024, 7, 3), datetime.date(2024, 11, 29), datetime.date(2024, 12, 24),
+    datetime.date(2025, 7, 3), datetime.date(2025, 11, 28), datetime.date(2025, 12, 24),
+    datetime.date(2026, 11, 27), datetime.date(2026, 12, 24),
+    datetime.date(2027, 11, 26),
+}
+
+
+def load_calendar(path: str) -> tuple[set[datetime.date], set[datetime.date]]:
+    """Holidays and early closes from a YAML file with ``holidays`` and ``early_closes`` lists of dates."""
+    import yaml
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    days = [
+        {day if isinstance(day, datetime.date) else datetime.date.fromisoformat(str(day)) for day in data.get(key) or []}
+        for key in ("holidays", "early_closes")
+    ]
+    return days[0], days[1]
+
+
+def default_tables() -> tuple[set[datetime.date], set[datetime.date]]:
+    """The built-in tables, plus the file named by ``CHAD_MARKET_CALENDAR`` when it is set."""
+    path = os.environ.get(CALENDAR_ENV)
+    if not path:
+        return HOLIDAYS, EARLY_CLOSES
+    holidays, early_closes = load_calendar(path)
+    return HOLIDAYS | holidays, EARLY_CLOSES | early_closes
+
+
+def _parse(value: str | None) -> datetime.time | None:
+    return None if value is None else datetime.datetime.strptime(value, "%H:%M:%S").time()
+
+
+class Session:
+    """One calendar day's transitions as epoch seconds.
+
+    ``start``/``end`` bound the day itself (local midnight to midnight), so a
+    cached session is checked against the current time with two integer
+    comparisons.  On a weekend or holiday ``trading`` is False, the other
+    times are ``end`` and the no-new-trades cut-off is ``start``, so the
+    market never opens and no check lets a trade through.
+    """
+
+    __slots__ = ("day", "start", "end", "trading", "early_close", "open", "close", "force_close", "no_new_trades", "monitor_start")
+
+    def __init__(self, day: datetime.date, start: int, end: int, trading: bool, early_close: bool, **times: int):
+        self.day = day
+        self.start = start
+        self.end = end
+        self.trading = trading
+        self.early_close = early_close
+        for name in ("open", "close", "force_close", "no_new_trades", "monitor_start"):
+            setattr(self, name, times.get(name, end))
+
+    def transitions(self) -> list[int]:
+        return sorted({self.monitor_start, self.open, self.no_new_trades, self.force_close, self.close} - {self.start, self.end})
+
+
+class SessionCalendar:
+    """Session times of a strategy, built once per day.
+
+    The times are the strategy's own settings (``"HH:MM:SS"`` in *tz*).  On an
+    early-close day every setting later than the exchange's early close moves
+    earlier by the time the session is cut short, so the force close and the
+    no-new-trades cut-off keep their distance to the close.  The checks take
+    an aware ``now`` and compare its timestamp with the cached session's
+    epoch seconds; the session is rebuilt only when ``now`` leaves its day.
+
+    A year without a holiday in the tables has no exchange calendar: its days
+    are built as full trading days, with a warning the first time.  Add the
+    year to ``HOLIDAYS`` and ``EARLY_CLOSES``, or to the YAML file named by
+    ``CHAD_MARKET_CALENDAR`` (``global.market_calendar`` in main.py's config).
+    """
+
+    def __init__(
+        self,
+        tz: datetime.tzinfo,
+        market_open: str,
+        market_close: str,
+        force_close: str | None = None,
+        no_new_trades: str | None = None,
+        monitor_start: str | None = None,
+        holidays: set[datetime.date] | None = None,
+        early_closes: set[datetime.date] | None = None,
+    ):
+        self.tz = tz
+        self.times = {
+            name: value for name, value in (
+                ("open", _parse(market_open)),
+                ("close", _parse(market_close)),
+                ("force_close", _parse(force_close)),
+                ("no_new_trades", _parse(no_new_trades)),
+                ("monitor_start", _parse(monitor_start)),
+            ) if value is not None
+        }
+        if holidays is None or early_closes is None:
+            default_holidays, default_early_closes = default_tables()
+            holidays = default_holidays if holidays is None else holidays
+            early_closes = default_early_closes if early_closes is None else early_closes
+        self.holidays = holidays
+        self.early_closes = early_closes
+        self.years = {day.year for day in holidays}
+        self._warned: set[int] = set()
+        self._session: Session | None = None
+
+    # ------------------------------------------------------------------
+    # Sessions
+    # ------------------------------------------------------------------
+    def _epoch(self, day: datetime.date, at: datetime.time) -> int:
+        moment = datetime.datetime.combine(day, at)
+        if moment.tzinfo is None:  # Only localize if not already localized
+            moment = self.tz.localize(moment)
+        return int(moment.timestamp())
+
+    def covers(self, day: datetime.date) -> bool:
+        """Whether the holiday tables include *day*'s year."""
+        return day.year in self.years
+
+    def is_trading_day(self, day: datetime.date) -> bool:
+        if day.year not in self.years and day.year not in self._warned:
+            self._warned.add(day.year)
+            print(f"WARNING: No exchange holidays or early closes for {day.year} — its weekdays count as full "
+                  f"trading days. Add them to session_calendar.py or the {CALENDAR_ENV} file.")
+        return day.weekday() < 5 and day not in self.holidays
+
+    def build(self, day: datetime.date) -> Session:
+        start = self._epoch(day, datetime.time(0, 0))
+        end = self._epoch(day + datetime.timedelta(days=1), datetime.time(0, 0))
+        if not self.is_trading_day(day):
+            return Session(day, start, end, trading=False, early_close=False, no_new_trades=start)
+        times = {name: self._epoch(day, at) for name, at in self.times.items()}
+        early = day in self.early_closes
+        if early:
+            cut = int(EXCHANGE_TZ.localize(datetime.datetime.combine(day, EARLY_CLOSE)).timestamp())
+            shortened = max(times["close"] - cut, 0)
+            times = {name: t - shortened if t > cut else t for name, t in times.items()}
+        return Session(day, start, end, trading=True, early_close=early, **times)
+
+    def session(self, now: datetime.datetime) -> Session:
+        """The session of *now*'s day (cached until the day changes)."""
+        t = now.timestamp()
+        session = self._session
+        if session is None or not session.start <= t < session.end:
+            session = self._session = self.build(now.astimezone(self.tz).date())
+        return session
+
+    def next_trading_session(self, after: datetime.date) -> Session:
+        day = after + datetime.timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += datetime.timedelta(days=1)
+        return self.build(day)
+
+    # ------------------------------------------------------------------
+    # Checks
+    # ------------------------------------------------------------------
+    def is_open(self, now: datetime.datetime) -> bool:
+        session = self.session(now)
+        return session.open <= now.timestamp() <= session.close
+
+    def is_after_close(self, now: datetime.datetime) -> bool:
+        return now.timestamp() > self.session(now).close
+
+    def is_force_close_time(self, now: datetime.datetime) -> bool:
+        return now.timestamp() >= self.session(now).force_close
+
+    def can_open_new_trades(self, now: datetime.datetime) -> bool:
+        return now.timestamp() < self.session(now).no_new_trades
+
+    def should_start_monitoring(self, now: datetime.datetime) -> bool:
+        return now.timestamp() >= self.session(now).monitor_start
+
+    def seconds_until_next(self, now: datetime.datetime) -> float:
+        """Seconds from *now* to the next session transition (the next trading day's first after today's last)."""
+        session = self.session(now)
+        t = now.timestamp()
+        upcoming = [at for at in session.transitions() if at > t]
+        if not upcoming:
+            upcoming = self.next_trading_session(session.day).transitions()
+        return max(upcoming[0] - t, 0.0)
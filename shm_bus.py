@@ -0,0 +1,443 @@
+#!/usr/bin/env python
+# Shared-memory bar bus for the CHAD strategy processes
+# One publisher process keeps each ticker's bars and indicator columns in a shared-memory ring; the strategy processes read them instead of subscribing and computing their own.
+
+import datetime
+import json
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+import pytz
+from ib_insync import *
+
+from bar_feed import BarFeed, BarFeedCache
+from bar_store import BarStore, bar_seconds
+from ib_gateway import GatewayIB
+from indicators import BOSKIndicators, EMAChadIndicators, IndicatorSet, REVIndicators
+
+# Indicator set each strategy script computes on its bars (None: bars only)
+BAR_BUS_SCRIPTS = {
+    "spy_orb_strategy.py": None,
+    "spy_bosk_strategy.py": BOSKIndicators,
+    "spy_rev_strategy.py": REVIndicators,
+    "spy_ema_chad.py": EMAChadIndicators,
+}
+INDICATOR_CLASSES = {cls.__name__: cls for cls in BAR_BUS_SCRIPTS.values() if cls is not None}
+
+# Header slots (int64) at the start of every block
+SEQ, COUNT, GENERATION, CAPACITY, NCOLS, PUBLISHED, META_LEN = range(7)
+HEADER_SLOTS = 8
+META_SIZE = 4096  # Bytes reserved for the JSON description of the columns
+DATA_OFFSET = HEADER_SLOTS * 8 + META_SIZE
+
+_created: set[str] = set()  # Blocks this process publishes
+
+
+def block_name(prefix: str, symbol: str, bar_size: str) -> str:
+    """Shared-memory name of *symbol*'s *bar_size* bars (``chad7497_SPY_300``)."""
+    return f"{prefix}_{symbol}_{bar_seconds(bar_size)}"
+
+
+def indicator_spec(indicators: IndicatorSet) -> list:
+    return [type(indicators).__name__, indicators.params]
+
+
+def spec_key(spec: list) -> tuple:
+    """The ``IndicatorSet.key`` of a JSON *spec*."""
+    name, params = spec
+    return (name, tuple(sorted(params.items())))
+
+
+def _tz_name(tz) -> str | None:
+    if tz is None:
+        return None
+    return getattr(tz, "zone", None) or getattr(tz, "key", None) or str(tz)
+
+
+def _epoch(value) -> float:
+    """Bar time as epoch seconds; naive times are stored as if they were UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+class BarRing:
+    """One shared-memory block: a header, the column description and a float64 ring.
+
+    The ring is laid out column by column (``ncols x capacity``) so each column
+    is contiguous; bar *i* of the session lives in slot ``i % capacity``.  The
+    writer brackets every update with two increments of ``SEQ`` (a seqlock):
+    a reader that sees an odd or changed ``SEQ`` around its copy retries.
+    """
+
+    def __init__(self, block: shared_memory.SharedMemory, owner: bool):
+        self.block = block
+        self.owner = owner
+        self.header = np.ndarray(HEADER_SLOTS, dtype=np.int64, buffer=block.buf)
+        meta = json.loads(bytes(block.buf[HEADER_SLOTS * 8:HEADER_SLOTS * 8 + int(self.header[META_LEN])]))
+        self.columns: list[str] = meta["columns"]
+        self.bar_columns: list[str] = meta["bar_columns"]
+        self.dtypes: list[str] = meta["dtypes"]
+        self.tz: str | None = meta["tz"]
+        self.indicators = {spec_key(spec): spec for spec in meta["indicators"]}
+        self.capacity = int(self.header[CAPACITY])
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.data = np.ndarray((len(self.columns), self.capacity), dtype=np.float64, buffer=block.buf, offset=DATA_OFFSET)
+
+    @classmethod
+    def create(cls, name: str, columns: list[str], bar_columns: list[str], dtypes: list[str],
+               tz: str | None, indicators: list[list], capacity: int = 4096) -> "BarRing":
+        meta = json.dumps({
+            "columns": columns, "bar_columns": bar_columns, "dtypes": dtypes, "tz": tz, "indicators": indicators,
+        }).encode()
+        if len(meta) > META_SIZE:
+            raise ValueError(f"Column description of {name} exceeds {META_SIZE} bytes")
+        try:
+            stale = shared_memory.SharedMemory(name=name)  # Left behind by a publisher that crashed
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        block = shared_memory.SharedMemory(name=name, create=True, size=DATA_OFFSET + len(columns) * capacity * 8)
+        _created.add(name)
+        header = np.ndarray(HEADER_SLOTS, dtype=np.int64, buffer=block.buf)
+        header[:] = 0
+        header[CAPACITY] = capacity
+        header[NCOLS] = len(columns)
+        header[META_LEN] = len(meta)
+        block.buf[HEADER_SLOTS * 8:HEADER_SLOTS * 8 + len(meta)] = meta
+        del header
+        return cls(block, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "BarRing":
+        """Map an existing ring (raises FileNotFoundError while nobody publishes it)."""
+        block = shared_memory.SharedMemory(name=name)
+        if name not in _created:
+            # Readers must not unlink the publisher's block when they exit
+            resource_tracker.unregister(block._name, "shared_memory")
+        return cls(block, owner=False)
+
+    def close(self):
+        self.header = self.data = None  # Views must go before the mapping
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+            _created.discard(self.block.name)
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+    def write(self, first: int, rows: np.ndarray, count: int):
+        """Store *rows* (``ncols x n``) as bars ``first ..`` and publish *count* bars."""
+        header = self.header
+        header[SEQ] += 1
+        slots = np.arange(first, first + rows.shape[1]) % self.capacity
+        self.data[:, slots] = rows
+        header[COUNT] = count
+        header[PUBLISHED] = time.time_ns()
+        header[SEQ] += 1
+
+    def reset(self):
+        """Start a new session (the publisher's feed was restarted)."""
+        header = self.header
+        header[SEQ] += 1
+        header[COUNT] = 0
+        header[GENERATION] += 1
+        header[SEQ] += 1
+
+    # ------------------------------------------------------------------
+    # Readers
+    # ------------------------------------------------------------------
+    @property
+    def version(self) -> tuple[int, int, int]:
+        header = self.header
+        return int(header[GENERATION]), int(header[COUNT]), int(header[SEQ])
+
+    @property
+    def published_at(self) -> float:
+        return self.header[PUBLISHED] / 1e9
+
+    def _span(self, count: int) -> tuple[int, int]:
+        n = min(count, self.capacity)
+        return count - n, n
+
+    def column(self, name: str) -> np.ndarray:
+        """The stored bars of column *name*, oldest first.
+
+        A zero-copy view while the ring has not wrapped (a copy after that);
+        the view shows later writes, so compare ``version`` before and after
+        reading it, or use ``snapshot`` for a consistent copy.
+        """
+        first, n = self._span(int(self.header[COUNT]))
+        row = self.data[self.index[name]]
+        start = first % self.capacity
+        if start + n <= self.capacity:
+            view = row[start:start + n]
+            view.flags.writeable = False
+            return view
+        return np.concatenate([row[start:], row[:start + n - self.capacity]])
+
+    def snapshot(self, retries: int = 1000) -> tuple[tuple[int, int, int], np.ndarray]:
+        """A consistent copy of the stored bars (``ncols x n``) and the version it was taken at."""
+        header = self.header
+        for _ in range(retries):
+            seq = int(header[SEQ])
+            if seq % 2:
+                continue  # Writer in the middle of an update
+            generation, count = int(header[GENERATION]), int(header[COUNT])
+            first, n = self._span(count)
+            slots = np.arange(first, first + n) % self.capacity
+            rows = self.data[:, slots]  # Fancy indexing copies
+            if int(header[SEQ]) == seq:
+                return (generation, count, seq), rows
+        raise RuntimeError("Bar bus writer did not finish an update")
+
+
+# ---------------------------------------------------------------------------
+# Publisher
+# ---------------------------------------------------------------------------
+class BarBusPublisher:
+    """Mirrors one ``BarFeed`` (bars and indicator columns) into a ``BarRing``.
+
+    The ring is created on the feed's first backfill, with the feed's columns
+    at that time, so register every indicator set before starting the feed.
+    Each update rewrites the previously forming bar and appends the new ones.
+    """
+
+    def __init__(self, feed: BarFeed, name: str, capacity: int = 4096):
+        self.feed = feed
+        self.name = name
+        self.capacity = capacity
+        self.ring: BarRing | None = None
+        self.published = 0  # Bars of the feed's buffer already in the ring
+        feed.update_event.connect(self.publish)
+
+    def _create(self, buffer):
+        dates = buffer.column("date")
+        tz = _tz_name(getattr(dates[0], "tzinfo", None)) if len(dates) else None
+        self.ring = BarRing.create(
+            self.name, buffer.columns, buffer.bar_columns,
+            ["datetime" if name == "date" else buffer.column(name).dtype.str for name in buffer.columns],
+            tz, [indicator_spec(indicators) for indicators in self.feed.indicator_sets], self.capacity,
+        )
+
+    def publish(self, feed: BarFeed | None = None):
+        buffer = self.feed.buffer
+        if buffer is None or not len(buffer):
+            return
+        if self.ring is None:
+            self._create(buffer)
+        n = len(buffer)
+        if n < self.published:
+            self.ring.reset()
+            self.published = 0
+        first = max(self.published - 1, 0)  # The previously forming bar has changed too
+        rows = np.empty((len(self.ring.columns), n - first))
+        for i, name in enumerate(self.ring.columns):
+            values = buffer.column(name)[first:n]
+            rows[i] = [_epoch(value) for value in values] if name == "date" else values
+        self.ring.write(first, rows, n)
+        self.published = n
+
+    def close(self):
+        self.feed.update_event.disconnect(self.publish)
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+class BarBus:
+    """The publisher process: one bar feed per ticker and bar size, published under *prefix*.
+
+    *feeds* lists a ``{ticker, bar_size, indicators}`` entry per feed, with
+    the indicator specs (``[class name, params]``) of the strategies that
+    trade it.  A ticker may appear once per bar size.  Stored history comes
+    from the bar store at *store_root*, in the directory of each bar size.
+    """
+
+    def __init__(self, ib: IB, prefix: str, feeds: list[dict], store_root: str | None = None,
+                 history_days: int = 0, tz: str = "US/Central"):
+        self.ib = ib
+        self.prefix = prefix
+        self.tz = pytz.timezone(tz)
+        self.cache = BarFeedCache(ib)
+        self.publishers: list[BarBusPublisher] = []
+        for spec in feeds:
+            ticker, bar_size = spec["ticker"], spec.get("bar_size", "5 mins")
+            indicators = [INDICATOR_CLASSES[name](**params) for name, params in spec.get("indicators", [])]
+            store = BarStore(store_root, bar_size, tz) if store_root else None
+            feed = self.cache.get(Stock(ticker, "SMART", "USD"), bar_size, store=store, history_days=history_days)
+            for indicator_set in indicators:
+                feed.add_indicators(indicator_set)
+            self.publishers.append(BarBusPublisher(feed, block_name(prefix, ticker, bar_size)))
+        self.day = datetime.datetime.now(self.tz).date()
+
+    def poll(self):
+        """Start feeds that have no data yet; restart every feed when the day changes."""
+        today = datetime.datetime.now(self.tz).date()
+        for publisher in self.publishers:
+            if today != self.day:
+                publisher.feed.stop()
+            if not publisher.feed.is_active and not publisher.feed.start():
+                print(f"No bars for {publisher.feed.contract.symbol} yet — retrying.")
+        self.day = today
+
+    def close(self):
+        for publisher in self.publishers:
+            publisher.feed.stop()
+            publisher.close()
+
+
+# ---------------------------------------------------------------------------
+# Subscribers
+# ---------------------------------------------------------------------------
+class SharedBarFeed:
+    """A ``BarFeed`` stand-in that reads the bars a ``BarBusPublisher`` publishes.
+
+    ``to_df`` copies the ring into the same frame a ``BarFeed`` returns, and
+    ``add_indicator_columns`` fills the indicator columns from the ring when
+    the publisher computes every registered set; otherwise it returns False
+    and the strategy computes its indicators itself, as it does for a frame
+    that did not come from a feed.  Nothing here talks to IB.
+    """
+
+    def __init__(self, name: str, contract: Contract, bar_size: str = "5 mins"):
+        self.name = name
+        self.contract = contract
+        self.bar_size = bar_size
+        self.ring: BarRing | None = None
+        self.indicator_sets: list[IndicatorSet] = []
+        self.updated_at: float | None = None  # time.monotonic() of the last publish seen
+        self.bar_close_event = Event("bar_close_event")
+        self._rows: np.ndarray | None = None
+        self._version = None
+        self._bars = 0
+
+    @property
+    def is_active(self) -> bool:
+        return self.ring is not None
+
+    def __len__(self) -> int:
+        return self._bars
+
+    def start(self) -> bool:
+        """Attach to the ring.  Returns False until the publisher has bars."""
+        if self.ring is not None and time.time() - self.ring.published_at > 2 * bar_seconds(self.bar_size):
+            self.stop()  # Publisher restarted or gone quiet: map the current block again
+        if self.ring is None:
+            try:
+                self.ring = BarRing.attach(self.name)
+            except FileNotFoundError:
+                return False
+        return self.ring.version[1] > 0
+
+    def stop(self):
+        if self.ring is not None:
+            self._rows = None
+            self.ring.close()
+            self.ring = None
+
+    def to_df(self) -> pd.DataFrame | None:
+        if self.ring is None:
+            return None
+        ring = self.ring
+        version, rows = ring.snapshot()
+        self.updated_at = time.monotonic() - max(time.time() - ring.published_at, 0.0)
+        self._rows, self._version = rows, version
+        df = pd.DataFrame({
+            name: rows[ring.index[name]].astype(ring.dtypes[ring.index[name]]) if name != "date" else self._dates(rows[0])
+            for name in ring.bar_columns
+        })
+        df.attrs["bar_feed"] = (id(self), version)
+        if version[1] > self._bars:
+            completed = version[1] > self._bars > 0
+            self._bars = version[1]
+            if completed:
+                self.bar_close_event.emit(self)
+        return df
+
+    def _dates(self, seconds: np.ndarray) -> pd.Series:
+        dates = pd.to_datetime(seconds, unit="s", utc=True)
+        return pd.Series(dates.tz_convert(self.ring.tz) if self.ring.tz else dates.tz_localize(None))
+
+    def add_indicators(self, indicators: IndicatorSet) -> IndicatorSet:
+        for registered in self.indicator_sets:
+            if registered.key == indicators.key:
+                return registered
+        self.indicator_sets.append(indicators)
+        return indicators
+
+    def can_add(self, indicators: IndicatorSet) -> bool:
+        return True
+
+    def add_indicator_columns(self, df: pd.DataFrame) -> bool:
+        """Copy the published indicator columns into *df* (a frame from ``to_df``)."""
+        if self.ring is None or self._rows is None or df.attrs.get("bar_feed") != (id(self), self._version):
+            return False
+        if not all(indicators.key in self.ring.indicators for indicators in self.indicator_sets):
+            return False
+        for indicators in self.indicator_sets:
+            for name in indicators.columns:
+                df[name] = self._rows[self.ring.index[name]]
+        return True
+
+
+class SharedBarFeedCache:
+    """``BarFeedCache`` stand-in handing out ``SharedBarFeed``s of the bus published under *prefix*."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._feeds: dict[tuple, SharedBarFeed] = {}
+
+    def __len__(self) -> int:
+        return len(self._feeds)
+
+    def get(
+        self,
+        contract: Contract,
+        bar_size: str = "5 mins",
+        duration: str = "1 D",
+        indicators: IndicatorSet | None = None,
+        store: BarStore | None = None,
+        history_days: int = 0,
+    ) -> SharedBarFeed:
+        key = (contract.symbol, bar_size)
+        feed = self._feeds.get(key)
+        if feed is None:
+            feed = self._feeds[key] = SharedBarFeed(block_name(self.prefix, contract.symbol, bar_size), contract, bar_size)
+        if indicators is not None:
+            feed.add_indicators(indicators)
+        return feed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish bars and indicators to the strategy processes through shared memory")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="TWS / IB Gateway host")
+    parser.add_argument("--port", type=int, default=7497, help="TWS / IB Gateway port")
+    parser.add_argument("--client_id", type=int, default=70, help="Client ID of the publisher's connection")
+    parser.add_argument("--prefix", type=str, required=True, help="Name prefix of the shared-memory blocks")
+    parser.add_argument("--feeds", type=str, required=True, help="JSON: list of {ticker, bar_size, indicators}")
+    parser.add_argument("--bar_store", type=str, default=None, help="Directory of the on-disk bar store")
+    parser.add_argument("--warm_days", type=int, default=0, help="Stored sessions loaded to warm up indicators")
+    parser.add_argument("--gateway", type=str, default=None, help="Address of a shared IB gateway to use instead of a direct connection")
+    args = parser.parse_args()
+
+    feeds = json.loads(args.feeds)
+    ib = GatewayIB(args.gateway) if args.gateway else IB()
+    ib.connect(args.host, args.port, clientId=args.client_id)
+    bus = BarBus(ib, args.prefix, feeds, args.bar_store, args.warm_days)
+    print(f"Publishing {', '.join(spec['ticker'] + ' ' + spec.get('bar_size', '5 mins') for spec in feeds)} bars as {args.prefix}_*")
+    try:
+        while True:
+            bus.poll()
+            ib.sleep(1)
+    except KeyboardInterrupt:
+        print("Bar bus interrupted — shutting down.")
+    finally:
+        bus.close()
+        ib.disconnect()
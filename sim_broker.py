@@ -0,0 +1,667 @@
+#!/usr/bin/env python
+# Simulated broker for the CHAD strategies
+# Stands in for IB at the ``IB`` object boundary: replays recorded bars as bars and quotes on a simulated clock, fills orders with latency and slippage and enforces IB's pacing limits.
+
+import asyncio
+import bisect
+import copy
+import datetime
+import itertools
+import math
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import pytz
+from ib_insync import *
+
+from bar_store import bar_seconds
+from quote_cache import QuoteCache
+
+# IB pacing limits (TWS API "Historical Data Limitations" and message rate)
+MAX_MESSAGES_PER_SECOND = 50
+HISTORICAL_REQUESTS = 60  # ... per HISTORICAL_WINDOW seconds
+HISTORICAL_WINDOW = 600.0
+IDENTICAL_REQUEST_GAP = 15.0  # Identical historical requests closer than this are rejected
+
+_DURATION_SECONDS = {"S": 1, "D": 86400, "W": 7 * 86400}
+
+
+class ReplayFinished(KeyboardInterrupt):
+    """Raised by ``SimIB.sleep`` when the simulated clock reaches ``end``.
+
+    A ``KeyboardInterrupt`` so a strategy's ``run()`` loop takes its Ctrl-C
+    path: flatten, wait for the exit fills, disconnect.
+    """
+
+
+class SimIB:
+    """Replay broker exposing the slice of ``IB`` the strategies and their helpers use.
+
+    *bars* maps a symbol to its recorded bars (``date, open, high, low, close,
+    volume`` as returned by ``backtest.load_bars`` or ``bar_store.read_bars``).
+    The simulated clock starts at *start* (default: the first bar) and only
+    moves when the caller sleeps.  With ``speed=None`` ``sleep(s)`` jumps *s*
+    seconds ahead at once, so a session replays as fast as the strategy loop
+    runs; with a speed factor the clock follows the wall clock (``speed=60``
+    plays one minute per second) and ``run_clock`` keeps it moving for
+    asyncio hosts such as ``StrategyRuntime``.
+
+    Inside a bar the price walks open -> low -> high -> close (open -> high
+    -> low -> close on down bars) and subscribed tickers get a quote every
+    *tick_seconds*.  Options are synthesised around the underlying: daily
+    expiries, strikes every *strike_step*, priced at intrinsic value plus a
+    rough Black-Scholes time value.  Orders fill *fill_latency* simulated
+    seconds after submission at the touch plus *slippage*; orders with price
+    conditions on an underlying wait until they trigger, and a fill cancels
+    the rest of its OCA group.  Requests that
+    would break IB's pacing rules are answered the way TWS answers them
+    (error 162 and no bars, error 100) and recorded in ``violations``.
+
+    With an *end*, the ``sleep()`` that reaches it stops the clock there and
+    raises ``ReplayFinished`` once; later sleeps (the shutdown waiting for its
+    fills) run on normally.
+    """
+
+    def __init__(
+        self,
+        bars: dict[str, pd.DataFrame],
+        start: datetime.datetime | None = None,
+        end: datetime.datetime | None = None,
+        speed: float | None = None,
+        tick_seconds: float = 5.0,
+        fill_latency: float = 0.25,
+        slippage: float = 0.01,
+        commission: float = 0.65,
+        spread: float = 0.01,
+        option_spread: float = 0.05,
+        strike_step: float = 1.0,
+        expiry_days: int = 10,
+        volatility: float = 0.15,
+        tz: str = "US/Central",
+        close_time: datetime.time = datetime.time(15, 0),
+        pacing: bool = True,
+        clock=time.monotonic,
+    ):
+        self.tz = pytz.timezone(tz)
+        self.speed = speed
+        self.tick_seconds = tick_seconds
+        self.fill_latency = fill_latency
+        self.slippage = slippage
+        self.commission = commission  # Per contract / share
+        self.spread = spread
+        self.option_spread = option_spread
+        self.strike_step = strike_step
+        self.expiry_days = expiry_days
+        self.volatility = volatility
+        self.close_time = close_time
+        self.pacing = pacing  # Enforce IB's pacing limits (off for benchmarks)
+        self._clock = clock  # Wall clock for pacing and speed, injectable for tests
+
+        self._series: dict[str, dict[str, np.ndarray]] = {}
+        for symbol, df in bars.items():
+            dates = pd.to_datetime(df["date"])
+            dates = dates.dt.tz_localize(self.tz) if dates.dt.tz is None else dates.dt.tz_convert("UTC")
+            self._series[symbol] = {
+                "start": dates.dt.as_unit("s").astype("int64").to_numpy(),
+                **{name: df[name].to_numpy(dtype=float) for name in ("open", "high", "low", "close", "volume")},
+            }
+        first = min((s["start"][0] for s in self._series.values() if len(s["start"])), default=0)
+        steps = [np.median(np.diff(s["start"])) for s in self._series.values() if len(s["start"]) > 1]
+        self.bar_seconds = int(min(steps)) if steps else 300
+        self.time = float(first) if start is None else start.timestamp()
+        self._wall_start = self._clock()
+        self._sim_start = self.time
+        self.end = None if end is None else end.timestamp()
+        self._next_tick = self.time
+
+        self.connected = False
+        self.account = "SIM"
+        self._con_ids: dict[tuple, int] = {}
+        self._tickers: dict[tuple, Ticker] = {}
+        self._bar_subs: list[tuple[BarDataList, str, int]] = []
+        self._trades: list[Trade] = []
+        self._pending: list[Trade] = []  # Working orders in submission order
+        self._due: dict[int, float] = {}  # orderId -> simulated time the order reaches the market
+        self._positions: dict[int, Position] = {}
+        self._order_ids = itertools.count(1)
+        self.client = self  # ``ib.client.getReqId()`` hands out order ids, as ib_insync's ``Client`` does
+        self._req_ids = itertools.count(1)
+        self._exec_ids = itertools.count(1)
+        self._messages: deque[float] = deque()
+        self._historical: deque[float] = deque()
+        self._last_request: dict[tuple, float] = {}
+        self.violations: list[tuple[int, str]] = []  # (IB error code, message)
+
+        self.connectedEvent = Event("connectedEvent")
+        self.disconnectedEvent = Event("disconnectedEvent")
+        self.errorEvent = Event("errorEvent")
+        self.orderStatusEvent = Event("orderStatusEvent")
+        self.execDetailsEvent = Event("execDetailsEvent")
+        self.commissionReportEvent = Event("commissionReportEvent")
+        self.newOrderEvent = Event("newOrderEvent")
+        self.positionEvent = Event("positionEvent")
+
+    # ------------------------------------------------------------------
+    # Connection and clock
+    # ------------------------------------------------------------------
+    def connect(self, host: str = "127.0.0.1", port: int = 7497, clientId: int = 1, *args, **kwargs):
+        self.connected = True
+        self.connectedEvent.emit()
+        return self
+
+    async def connectAsync(self, host: str = "127.0.0.1", port: int = 7497, clientId: int = 1, *args, **kwargs):
+        if self.speed:
+            asyncio.ensure_future(self.run_clock())
+        return self.connect(host, port, clientId)
+
+    def isConnected(self) -> bool:
+        return self.connected
+
+    def disconnect(self):
+        if self.connected:
+            self.connected = False
+            self.disconnectedEvent.emit()
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.time, self.tz)
+
+    def sleep(self, secs: float = 0.02) -> bool:
+        """Let *secs* of simulated time pass (instantly unless a speed is set)."""
+        if self.end is not None and self.time + secs >= self.end:
+            self.advance_to(self.end)
+            self.end = None
+            raise ReplayFinished(f"Replay reached {self.now()}")
+        if self.speed:
+            util.sleep(secs / self.speed)
+            self.advance_to(self._sim_start + (self._clock() - self._wall_start) * self.speed)
+        else:
+            self.advance(secs)
+        return True
+
+    async def run_clock(self, interval: float = 0.05):
+        """Follow the wall clock at ``speed`` while connected (for asyncio hosts)."""
+        while self.connected:
+            await asyncio.sleep(interval)
+            self.advance_to(self._sim_start + (self._clock() - self._wall_start) * self.speed)
+
+    def advance(self, seconds: float):
+        self.advance_to(self.time + seconds)
+
+    def advance_to(self, target: float):
+        """Move the clock to *target* (epoch seconds), emitting ticks, bar updates and fills on the way."""
+        while self.time < target:
+            due = min((when for when in self._due.values() if when > self.time), default=math.inf)
+            self.time = min(target, self._next_tick, due)
+            if self.time >= self._next_tick:
+                self._next_tick = self.time + self.tick_seconds
+                self._update_tickers()
+                self._update_bars()
+            self._work_orders()
+
+    # ------------------------------------------------------------------
+    # Prices
+    # ------------------------------------------------------------------
+    def _bar_index(self, series: dict, t: float) -> int:
+        return bisect.bisect_right(series["start"], t) - 1
+
+    def _path(self, series: dict, i: int) -> tuple[float, float, float, float]:
+        o, h, l, c = (series[name][i] for name in ("open", "high", "low", "close"))
+        return (o, l, h, c) if c >= o else (o, h, l, c)
+
+    def _partial(self, series: dict, i: int, t: float) -> tuple[float, float, float, float]:
+        """(open, high, low, close) of bar *i* as seen at time *t*."""
+        frac = min(max((t - series["start"][i]) / self.bar_seconds, 0.0), 1.0)
+        path = self._path(series, i)
+        pos = frac * 3
+        k = min(int(pos), 2)
+        price = path[k] + (path[k + 1] - path[k]) * (pos - k)
+        seen = path[:k + 1] + (price,)
+        return path[0], max(seen), min(seen), price
+
+    def underlying_price(self, symbol: str, t: float | None = None) -> float:
+        series = self._series.get(symbol)
+        if series is None or not len(series["start"]):
+            return math.nan
+        t = self.time if t is None else t
+        i = self._bar_index(series, t)
+        if i < 0:
+            return float(series["open"][0])
+        if t >= series["start"][i] + self.bar_seconds:
+            return float(series["close"][i])
+        return float(self._partial(series, i, t)[3])
+
+    def option_price(self, contract: Contract) -> float:
+        """Intrinsic value plus a Black-Scholes-like time value decaying to the expiry close."""
+        spot = self.underlying_price(contract.symbol)
+        if math.isnan(spot):
+            return math.nan
+        strike = contract.strike
+        intrinsic = max(spot - strike, 0.0) if contract.right.startswith("C") else max(strike - spot, 0.0)
+        expiry = self.tz.localize(datetime.datetime.combine(
+            datetime.datetime.strptime(contract.lastTradeDateOrContractMonth, "%Y%m%d").date(), self.close_time))
+        years = max(expiry.timestamp() - self.time, 60.0) / (365 * 86400)
+        sd = self.volatility * math.sqrt(years)
+        d = math.log(spot / strike) / sd
+        return round(max(intrinsic + 0.4 * spot * sd * math.exp(-d * d / 2), 0.01), 2)
+
+    def _quote(self, contract: Contract) -> tuple[float, float, float]:
+        """(bid, ask, last) for *contract* right now."""
+        if contract.secType in ("OPT", "FOP"):
+            last = self.option_price(contract)
+            half = self.option_spread / 2
+        else:
+            last = self.underlying_price(contract.symbol)
+            half = self.spread / 2
+        return round(last - half, 2), round(last + half, 2), last
+
+    def _fill_ticker(self, ticker: Ticker):
+        bid, ask, last = self._quote(ticker.contract)
+        ticker.time = self.now()
+        ticker.bid, ticker.ask, ticker.last = bid, ask, last
+        ticker.bidSize = ticker.askSize = 100.0
+        ticker.lastSize = 1.0
+
+    def _update_tickers(self):
+        for ticker in self._tickers.values():
+            before = (ticker.bid, ticker.ask, ticker.last)
+            self._fill_ticker(ticker)
+            if (ticker.bid, ticker.ask, ticker.last) != before:
+                ticker.updateEvent.emit(ticker)
+
+    # ------------------------------------------------------------------
+    # Pacing
+    # ------------------------------------------------------------------
+    def _violation(self, req_id: int, code: int, message: str, contract: Contract | None = None):
+        self.violations.append((code, message))
+        self.errorEvent.emit(req_id, code, message, contract)
+
+    def _message(self):
+        """Count one API message against the 50 messages/second limit."""
+        if not self.pacing:
+            return
+        now = self._clock()
+        self._messages.append(now)
+        while self._messages and self._messages[0] <= now - 1.0:
+            self._messages.popleft()
+        if len(self._messages) > MAX_MESSAGES_PER_SECOND:
+            self._violation(-1, 100, "Max rate of messages per second has been exceeded")
+
+    def _historical_allowed(self, req_id: int, contract: Contract, request: tuple) -> bool:
+        if not self.pacing:
+            return True
+        now = self._clock()
+        while self._historical and self._historical[0] <= now - HISTORICAL_WINDOW:
+            self._historical.popleft()
+        last = self._last_request.get(request)
+        if len(self._historical) >= HISTORICAL_REQUESTS or (last is not None and now - last < IDENTICAL_REQUEST_GAP):
+            self._violation(req_id, 162, "Historical Market Data Service error message:API historical data query cancelled", contract)
+            return False
+        self._historical.append(now)
+        self._last_request[request] = now
+        return True
+
+    # ------------------------------------------------------------------
+    # Contracts
+    # ------------------------------------------------------------------
+    def _qualify(self, contract: Contract) -> Contract | None:
+        if contract.symbol not in self._series:
+            return None
+        key = (contract.symbol, contract.secType, contract.lastTradeDateOrContractMonth, float(contract.strike), contract.right[:1])
+        if contract.secType in ("OPT", "FOP"):
+            if not (contract.lastTradeDateOrContractMonth and contract.strike and contract.right):
+                return None
+            contract.right = contract.right[:1]
+            contract.multiplier = "100"
+            contract.tradingClass = contract.tradingClass or contract.symbol
+            contract.localSymbol = (
+                f"{contract.symbol:<6}{contract.lastTradeDateOrContractMonth[2:]}{contract.right}{int(round(contract.strike * 1000)):08d}"
+            )
+        else:
+            contract.localSymbol = contract.symbol
+        contract.exchange = contract.exchange or "SMART"
+        contract.currency = contract.currency or "USD"
+        contract.conId = self._con_ids.setdefault(key, len(self._con_ids) + 1000)
+        return contract
+
+    def qualifyContracts(self, *contracts: Contract) -> list[Contract]:
+        self._message()
+        return [c for c in (self._qualify(contract) for contract in contracts) if c is not None]
+
+    def _expirations(self) -> list[str]:
+        days, day = [], self.now().date()
+        while len(days) < self.expiry_days:
+            if day.weekday() < 5:
+                days.append(day.strftime("%Y%m%d"))
+            day += datetime.timedelta(days=1)
+        return days
+
+    def _strikes(self, symbol: str) -> list[float]:
+        series = self._series[symbol]
+        low = math.floor(series["low"].min() * 0.9 / self.strike_step) * self.strike_step
+        high = math.ceil(series["high"].max() * 1.1 / self.strike_step) * self.strike_step
+        return [round(float(k), 2) for k in np.arange(low, high + self.strike_step / 2, self.strike_step)]
+
+    def reqSecDefOptParams(self, underlyingSymbol: str, futFopExchange: str, underlyingSecType: str, underlyingConId: int):
+        self._message()
+        if underlyingSymbol not in self._series:
+            return []
+        return [OptionChain("SMART", underlyingConId, underlyingSymbol, "100", self._expirations(), self._strikes(underlyingSymbol))]
+
+    def reqContractDetails(self, contract: Contract) -> list[ContractDetails]:
+        """Details of *contract*; an option template without strike or right expands to the listed chain."""
+        self._message()
+        if contract.symbol not in self._series:
+            return []
+        if contract.secType not in ("OPT", "FOP"):
+            return [ContractDetails(contract=self._qualify(copy.copy(contract)))]
+        expiries = [contract.lastTradeDateOrContractMonth] if contract.lastTradeDateOrContractMonth else self._expirations()
+        strikes = [float(contract.strike)] if contract.strike else self._strikes(contract.symbol)
+        rights = [contract.right[:1]] if contract.right else ["C", "P"]
+        return [
+            ContractDetails(contract=self._qualify(Option(contract.symbol, expiry, strike, right, "SMART", currency="USD")))
+            for expiry in expiries for strike in strikes for right in rights
+        ]
+
+    # ------------------------------------------------------------------
+    # Market data
+    # ------------------------------------------------------------------
+    def reqMktData(self, contract: Contract, genericTickList: str = "", snapshot: bool = False,
+                   regulatorySnapshot: bool = False, mktDataOptions=None) -> Ticker:
+        self._message()
+        key = QuoteCache.key(contract)
+        ticker = self._tickers.get(key)
+        if ticker is None:
+            ticker = self._tickers[key] = Ticker(contract=contract)
+            self._fill_ticker(ticker)
+        return ticker
+
+    def cancelMktData(self, contract: Contract):
+        self._message()
+        self._tickers.pop(QuoteCache.key(contract), None)
+
+    def reqTickers(self, *contracts: Contract, regulatorySnapshot: bool = False) -> list[Ticker]:
+        self._message()
+        tickers = []
+        for contract in contracts:
+            ticker = Ticker(contract=contract)
+            self._fill_ticker(ticker)
+            tickers.append(ticker)
+        return tickers
+
+    def _bar(self, series: dict, i: int, size: int, t: float) -> BarData | None:
+        """Bar of *size* seconds made of the recorded bars from index *i*, as seen at time *t*."""
+        start = series["start"][i]
+        o, h, l, c, v = series["open"][i], -math.inf, math.inf, 0.0, 0.0
+        j = i
+        while j < len(series["start"]) and series["start"][j] < start + size and series["start"][j] <= t:
+            done = t >= series["start"][j] + self.bar_seconds
+            bar = (series["open"][j], series["high"][j], series["low"][j], series["close"][j]) if done else self._partial(series, j, t)
+            frac = 1.0 if done else (t - series["start"][j]) / self.bar_seconds
+            h, l, c = max(h, bar[1]), min(l, bar[2]), bar[3]
+            v += series["volume"][j] * frac
+            j += 1
+        return BarData(date=datetime.datetime.fromtimestamp(start, self.tz), open=o, high=h, low=l, close=c,
+                       volume=round(v), average=(h + l + c) / 3, barCount=j - i)
+
+    def _bars_since(self, symbol: str, since: float, size: int) -> list[BarData]:
+        """Bars of *size* seconds starting at or after *since* up to now, the last one possibly still forming."""
+        series = self._series[symbol]
+        starts = series["start"]
+        i = bisect.bisect_left(starts, since)
+        bars = []
+        while i < len(starts) and starts[i] <= self.time:
+            bucket = starts[i] - starts[i] % size
+            first = bisect.bisect_left(starts, bucket, lo=i)
+            bars.append(self._bar(series, first, size, self.time))
+            i = bisect.bisect_left(starts, bucket + size, lo=i)
+        return bars
+
+    def _duration_start(self, durationStr: str, end: float) -> float:
+        count, unit = durationStr.split()
+        if unit == "D":
+            # N sessions back, starting at midnight of the first one
+            day = datetime.datetime.fromtimestamp(end, self.tz).date() - datetime.timedelta(days=int(count) - 1)
+            return self.tz.localize(datetime.datetime.combine(day, datetime.time())).timestamp()
+        return end - int(count) * _DURATION_SECONDS[unit]
+
+    def reqHistoricalData(self, contract: Contract, endDateTime, durationStr: str, barSizeSetting: str,
+                          whatToShow: str, useRTH: bool, formatDate: int = 1, keepUpToDate: bool = False,
+                          chartOptions=None, timeout: float = 60) -> BarDataList:
+        self._message()
+        req_id = next(self._req_ids)
+        bars = BarDataList()
+        bars.reqId = req_id
+        bars.contract = contract
+        bars.endDateTime = endDateTime
+        bars.durationStr = durationStr
+        bars.barSizeSetting = barSizeSetting
+        bars.whatToShow = whatToShow
+        bars.useRTH = useRTH
+        bars.formatDate = formatDate
+        bars.keepUpToDate = keepUpToDate
+        bars.chartOptions = chartOptions or []
+        request = (QuoteCache.key(contract), str(endDateTime), durationStr, barSizeSetting, whatToShow, useRTH)
+        if contract.symbol not in self._series or not self._historical_allowed(req_id, contract, request):
+            return bars
+
+        end = self.time if not endDateTime else pd.Timestamp(endDateTime).timestamp()
+        size = bar_seconds(barSizeSetting)
+        history = self._bars_since(contract.symbol, self._duration_start(durationStr, end), size)
+        if not keepUpToDate and history and history[-1].date.timestamp() + size > self.time:
+            history = history[:-1]  # Only completed bars without a subscription
+        bars.extend(history)
+        if keepUpToDate:
+            self._bar_subs.append((bars, contract.symbol, size))
+        return bars
+
+    def cancelHistoricalData(self, bars: BarDataList):
+        self._message()
+        self._bar_subs = [sub for sub in self._bar_subs if sub[0] is not bars]
+
+    def _update_bars(self):
+        for bars, symbol, size in self._bar_subs:
+            since = bars[-1].date.timestamp() if bars else self._duration_start(bars.durationStr, self.time)
+            fresh = self._bars_since(symbol, since, size)
+            if not fresh or (len(fresh) == 1 and bars and fresh[0] == bars[-1]):
+                continue
+            has_new_bar = bool(bars) and len(fresh) > 1
+            if bars:
+                bars[-1] = fresh[0]
+                bars.extend(fresh[1:])
+            else:
+                bars.extend(fresh)
+                has_new_bar = True
+            bars.updateEvent.emit(bars, has_new_bar)
+
+    # ------------------------------------------------------------------
+    # Orders
+    # ------------------------------------------------------------------
+    def _set_status(self, trade: Trade, status: str, message: str = ""):
+        trade.orderStatus.status = status
+        trade.log.append(TradeLogEntry(self.now(), status, message))
+        trade.statusEvent.emit(trade)
+        self.orderStatusEvent.emit(trade)
+
+    def getReqId(self) -> int:
+        return next(self._order_ids)
+
+    def placeOrder(self, contract: Contract, order: Order) -> Trade:
+        self._message()
+        if not order.orderId:
+            order.orderId = self.getReqId()
+        order.permId = order.permId or order.orderId
+        if not contract.conId:
+            self._qualify(contract)
+        trade = Trade(contract, order, OrderStatus(orderId=order.orderId, status="PendingSubmit", remaining=order.totalQuantity))
+        self._trades.append(trade)
+        self.newOrderEvent.emit(trade)
+        self._pending.append(trade)
+        if order.orderType not in ("MKT", "LMT", "STP") or contract.symbol not in self._series:
+            # Rejected after the round-trip, like TWS's asynchronous order errors
+            self._due[order.orderId] = self.time + self.fill_latency
+            return trade
+        # Conditional orders wait at IB as PreSubmitted until their conditions are met
+        self._set_status(trade, "PreSubmitted" if order.conditions else "Submitted")
+        self._due[order.orderId] = self.time + self.fill_latency
+        return trade
+
+    def cancelOrder(self, order: Order) -> Trade | None:
+        self._message()
+        trade = next((t for t in self._pending if t.order.orderId == order.orderId), None)
+        if trade is not None:
+            self._pending.remove(trade)
+            self._due.pop(order.orderId, None)
+            self._set_status(trade, "Cancelled")
+            trade.cancelledEvent.emit(trade)
+        return trade
+
+    def reqGlobalCancel(self):
+        """Cancel every working order, whatever client placed it."""
+        for trade in list(self._pending):
+            self.cancelOrder(trade.order)
+
+    def _work_orders(self):
+        for trade in list(self._pending):
+            order = trade.order
+            if self._due.get(order.orderId, math.inf) > self.time:
+                continue
+            if trade.orderStatus.status == "PendingSubmit":
+                self._reject(trade)
+                continue
+            if order.conditions:
+                if not self._conditions_met(order.conditions):
+                    continue
+                order.conditions = []  # Triggered: IB transmits the order as is from here on
+                self._set_status(trade, "Submitted")
+            bid, ask, last = self._quote(trade.contract)
+            buy = order.action == "BUY"
+            if order.orderType == "STP":
+                if not (last >= order.auxPrice if buy else last <= order.auxPrice):
+                    continue
+                price = ask + self.slippage if buy else bid - self.slippage
+            elif order.orderType == "LMT":
+                if not (ask <= order.lmtPrice if buy else bid >= order.lmtPrice):
+                    continue
+                price = min(ask, order.lmtPrice) if buy else max(bid, order.lmtPrice)
+            else:
+                price = ask + self.slippage if buy else bid - self.slippage
+            self._fill(trade, round(max(price, 0.01), 2))
+
+    def _conditions_met(self, conditions: list) -> bool:
+        """Evaluate price conditions on simulated contracts (``and``/``or`` read left to right)."""
+        symbols = {con_id: key[0] for key, con_id in self._con_ids.items() if key[1] not in ("OPT", "FOP")}
+        met, previous = None, "a"
+        for condition in conditions:
+            symbol = symbols.get(getattr(condition, "conId", None))
+            if not isinstance(condition, PriceCondition) or symbol is None:
+                value = False  # Only price conditions on known contracts can trigger
+            else:
+                price = self.underlying_price(symbol)
+                value = price >= condition.price if condition.isMore else price <= condition.price
+            if met is None:
+                met = value
+            else:
+                met = (met or value) if previous == "o" else (met and value)
+            previous = condition.conjunction
+        return bool(met)
+
+    def _cancel_oca(self, trade: Trade):
+        """Cancel the other working orders of *trade*'s OCA group (``ocaType`` 1, cancel with block)."""
+        group = trade.order.ocaGroup
+        if not group:
+            return
+        for other in list(self._pending):
+            if other is not trade and other.order.ocaGroup == group:
+                self._pending.remove(other)
+                self._due.pop(other.order.orderId, None)
+                self._set_status(other, "Cancelled", "OCA group cancel")
+                other.cancelledEvent.emit(other)
+
+    def _reject(self, trade: Trade):
+        order, contract = trade.order, trade.contract
+        self._pending.remove(trade)
+        self._due.pop(order.orderId, None)
+        message = f"Order type {order.orderType} on {contract.symbol} is not simulated"
+        self._violation(order.orderId, 321, message, contract)
+        self._set_status(trade, "Inactive", f"Error 321, reqId {order.orderId}: {message}")
+
+    def _fill(self, trade: Trade, price: float):
+        order, contract = trade.order, trade.contract
+        self._pending.remove(trade)
+        self._due.pop(order.orderId, None)
+        quantity = order.totalQuantity
+        when = self.now()
+        execution = Execution(
+            execId=f"sim.{next(self._exec_ids)}", time=when, acctNumber=self.account, exchange="SIM",
+            side="BOT" if order.action == "BUY" else "SLD", shares=quantity, price=price, permId=order.permId,
+            orderId=order.orderId, cumQty=quantity, avgPrice=price, orderRef=order.orderRef,
+        )
+        report = CommissionReport(execId=execution.execId, commission=self.commission * quantity, currency="USD")
+        fill = Fill(contract, execution, report, when)
+        trade.fills.append(fill)
+        trade.orderStatus.filled = quantity
+        trade.orderStatus.remaining = 0.0
+        trade.orderStatus.avgFillPrice = trade.orderStatus.lastFillPrice = price
+        trade.fillEvent.emit(trade, fill)
+        self.execDetailsEvent.emit(trade, fill)
+        trade.commissionReportEvent.emit(trade, fill, report)
+        self.commissionReportEvent.emit(trade, fill, report)
+        self._set_status(trade, "Filled")
+        trade.filledEvent.emit(trade)
+        self._cancel_oca(trade)
+        self._book(contract, quantity if order.action == "BUY" else -quantity, price)
+
+    def _book(self, contract: Contract, quantity: float, price: float):
+        multiplier = float(contract.multiplier or 1)
+        held = self._positions.get(contract.conId)
+        size = (held.position if held else 0.0) + quantity
+        if held is None or held.position * quantity > 0:
+            # Opening or adding: average the cost
+            cost = ((held.avgCost * held.position) if held else 0.0) + price * multiplier * quantity
+            avg = cost / size
+        else:
+            avg = held.avgCost if size * held.position > 0 else price * multiplier
+        position = Position(self.account, contract, size, avg if size else 0.0)
+        if size:
+            self._positions[contract.conId] = position
+        else:
+            self._positions.pop(contract.conId, None)
+        self.positionEvent.emit(position)
+
+    def positions(self, account: str = "") -> list[Position]:
+        return list(self._positions.values())
+
+    def trades(self) -> list[Trade]:
+        return list(self._trades)
+
+    def openTrades(self) -> list[Trade]:
+        return list(self._pending)
+
+    def fills(self) -> list[Fill]:
+        return [fill for trade in self._trades for fill in trade.fills]
+
+    # ------------------------------------------------------------------
+    # Async variants (used by the gateway)
+    # ------------------------------------------------------------------
+    async def qualifyContractsAsync(self, *contracts: Contract) -> list[Contract]:
+        return self.qualifyContracts(*contracts)
+
+    async def reqContractDetailsAsync(self, contract: Contract) -> list[ContractDetails]:
+        return self.reqContractDetails(contract)
+
+    async def reqPositionsAsync(self) -> list[Position]:
+        return self.positions()
+
+    async def reqExecutionsAsync(self, execFilter=None) -> list[Fill]:
+        return self.fills()
+
+    async def reqSecDefOptParamsAsync(self, *args):
+        return self.reqSecDefOptParams(*args)
+
+    async def reqTickersAsync(self, *contracts: Contract, regulatorySnapshot: bool = False) -> list[Ticker]:
+        return self.reqTickers(*contracts)
+
+    async def reqHistoricalDataAsync(self, *args, **kwargs) -> BarDataList:
+        return self.reqHistoricalData(*args, **kwargs)
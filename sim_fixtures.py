@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# Shared test fixtures for the simulated broker
+# One session of 5-minute SPY bars on 2024-03-04 and a TestCase connected to a SimIB replaying it.
+
+import datetime
+import unittest
+
+import pandas as pd
+from ib_insync import Stock
+
+from option_chain import OptionChainCache
+from sim_broker import SimIB
+
+DAY = datetime.date(2024, 3, 4)
+EXPIRY = DAY.strftime("%Y%m%d")
+
+
+def make_session(closes: list[float], spread: float = 0.5, gap: float = 0.0, gapless: bool = False) -> pd.DataFrame:
+    """5-minute bars from the 08:30 Central open of ``DAY``, one per close.
+
+    Bars open *gap* above their close, or at the previous close when
+    *gapless*, and reach *spread* either side of the close (and the open).
+    """
+    opens = [closes[0]] + list(closes[:-1]) if gapless else [c + gap for c in closes]
+    return pd.DataFrame({
+        "date": pd.date_range(f"{DAY} 08:30", periods=len(closes), freq="5min", tz="US/Central"),
+        "open": opens,
+        "high": [max(o, c + spread) for o, c in zip(opens, closes)],
+        "low": [min(o, c - spread) for o, c in zip(opens, closes)],
+        "close": closes,
+        "volume": 1000.0,
+    })
+
+
+class SimTestCase(unittest.TestCase):
+    """Test case connected to a ``SimIB`` replaying ``make_session`` for SPY.
+
+    Subclasses set the session's ``closes`` (and ``spread``, ``gap``, ``gapless``) and
+    how far into it the test starts (``warmup`` seconds).  ``open_session``
+    takes extra ``SimIB`` arguments for a test that needs its own broker.
+    """
+
+    closes = [500.0 + 0.1 * i for i in range(24)]
+    spread = 0.5
+    gap = 0.0
+    gapless = False
+    warmup = 0
+
+    def setUp(self):
+        self.open_session()
+
+    def open_session(self, closes: list[float] | None = None, **sim) -> SimIB:
+        self.spy = Stock("SPY", "SMART", "USD")
+        self.bars = make_session(self.closes if closes is None else closes, self.spread, self.gap, self.gapless)
+        self.ib = SimIB({"SPY": self.bars}, **sim)
+        self.ib.connect()
+        if self.warmup:
+            self.ib.sleep(self.warmup)
+        return self.ib
+
+    def load_chain(self):
+        """The session's 0-DTE SPY option chain."""
+        return OptionChainCache(self.ib).load(Stock("SPY", "SMART", "USD"), DAY, max_dte=0)
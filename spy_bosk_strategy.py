@@ -5,12 +5,24 @@
 import pandas as pd
 import numpy as np
 import datetime
-import time
 import pytz
 from ib_insync import *
 
-
-class SPYBOSKStrategy:
+from bar_store import BarStore
+from clock import WALL
+from ib_gateway import GatewayIB
+from latency import last_arrival, recorder, start_export
+from position_book import Position, PositionBook
+from position_journal import PositionJournal
+from server_exits import ServerExits
+from session_calendar import SessionCalendar
+from shm_bus import SharedBarFeedCache
+from strategy_services import StrategyServices
+from tick_recorder import TickRecorder
+from indicators import BOSKIndicators
+
+
+class SPYBOSKStrategy(StrategyServices):
     """Break-of-Structure + Keltner Channel exit strategy for SPY 0-DTE options.
 
     The strategy looks for a simultaneous bullish / bearish break of structure on the
@@ -37,6 +49,8 @@ class SPYBOSKStrategy:
         kc_mult: float = 1.5,
         paper_trading: bool = True,
         port: int = 7497,
+        server_side_exits: bool = False,
+        target_delta: float | None = None,
     ):
         # Core parameters
         self.ticker = ticker
@@ -55,14 +69,30 @@ class SPYBOSKStrategy:
         self.kc_mult = kc_mult
         self.paper_trading = paper_trading
         self.port = port
+        self.server_side_exits = server_side_exits  # Targets and breakeven stop worked by IB as conditional orders
+        self.target_delta = target_delta  # Strike picked by delta (0.5 = at the money) instead of the nearest strike
         # Trading state
-        self.positions: list[dict] = []  # Active positions
+        self.positions = PositionBook()  # Active positions (the runtime may nest it in its process-wide book)
         self.wait_for_ema20_cross = False  # Prevent re-entry after profitable trade
         self.last_profit_side: str | None = None  # "LONG" or "SHORT"
+        self.monitoring_started = False
+
+        # On-disk bar history shared across restarts (optional, set by the launcher)
+        self.bar_store: BarStore | None = None
+        self.warm_days = 0  # Stored sessions prepended to warm the indicators
+        # Stage timings from data arrival to fill (the launcher may rename it)
+        self.latency = recorder(f"{type(self).__name__} {self.ticker}")
+        # Crash-safe record of the open positions (optional, set by the launcher)
+        self.journal: PositionJournal | None = None
+        self.journal_recovered = False
+        # Every quote, bar and order event seen, on disk for replay (optional, set by the launcher)
+        self.recorder: TickRecorder | None = None
+
 
         # IB / timezone helpers
         self.tz = pytz.timezone("US/Central")
         self.ib = IB()
+        self.clock = WALL  # Session time and sleeps (replay.py sets the simulated broker's clock)
 
     # ------------------------------------------------------------------
     # Interactive Brokers helpers
@@ -74,7 +104,7 @@ class SPYBOSKStrategy:
             try:
                 if self.ib.isConnected():
                     self.ib.disconnect()
-                    time.sleep(1)
+                    self.clock.sleep(1)
                 self.ib.connect(host, port, clientId=client_id)
                 print(
                     f"Connected to Interactive Brokers {'Paper' if self.paper_trading else 'Live'} trading"
@@ -82,28 +112,40 @@ class SPYBOSKStrategy:
                 return True
             except Exception as exc:
                 print(f"Connection attempt {attempt}/{max_retries} failed: {exc}")
-                time.sleep(2)
+                self.clock.sleep(2)
         print("Unable to connect after maximum retries – exiting.")
         return False
 
 
     def has_position_type(self, position_type: str) -> bool:
         """Check if there's already a position of the specified type (CALL or PUT)."""
-        return any(pos['type'] == position_type for pos in self.positions)
-
+        return self.positions.has_type(position_type)
 
-    def get_stock_contract(self):
-        return Stock(self.ticker, "SMART", "USD")
 
-    def get_underlying_price(self) -> float:
-        ticker = self.ib.reqTickers(self.get_stock_contract())[0]
-        return ticker.marketPrice()
+    def load_option_chain(self):
+        """Pre-qualify today's 0-DTE contracts so entries skip the contract lookups."""
+        today = self.clock.now(self.tz).date()
+        chain = self.get_option_chains().load(self.get_stock_contract(), today, max_dte=0)
+        if chain is not None and self.target_delta is not None:
+            # Stream the strikes around the money so their implied vols are known at entry
+            self.get_pricer().subscribe(chain, today.strftime("%Y%m%d"), self.get_underlying_price())
 
     def get_option_contract(self, right: str) -> Option:
         """Return the ATM 0-DTE option contract (right="C" or "P")."""
-        today = datetime.datetime.now(self.tz).date()
+        today = self.clock.now(self.tz).date()
         expiry_str = today.strftime("%Y%m%d")
-        strike = round(self.get_underlying_price())
+        spot = self.get_underlying_price()
+        chain = self.get_option_chains().get(self.ticker)
+        if chain is not None:
+            if self.target_delta is not None:
+                contract = self.get_pricer().select_delta(
+                    chain, right, expiry_str, spot, self.years_to_expiry(expiry_str), self.target_delta
+                )
+            else:
+                contract = chain.select(right, spot, expiry_str)
+            if contract is not None:
+                return contract
+        strike = round(spot)
         contract = Option(
             symbol=self.ticker,
             lastTradeDateOrContractMonth=expiry_str,
@@ -122,55 +164,68 @@ class SPYBOSKStrategy:
     # ------------------------------------------------------------------
     # Time helpers
     # ------------------------------------------------------------------
-    def _today_dt(self, time_str: str) -> datetime.datetime:
-        today = datetime.datetime.now(self.tz).date()
-        return self.tz.localize(
-            datetime.datetime.combine(today, datetime.datetime.strptime(time_str, "%H:%M:%S").time())
-        )
+    def get_calendar(self) -> SessionCalendar:
+        """Session times, holidays and early closes."""
+        return self.lazy("calendar", lambda: SessionCalendar(
+            self.tz, self.market_open, self.market_close, force_close=self.force_close_time,
+            no_new_trades=self.no_new_trades_time, monitor_start=self.monitor_start,
+        ))
 
     def is_market_open(self) -> bool:
-        now = datetime.datetime.now(self.tz)
-        return self._today_dt(self.market_open) <= now <= self._today_dt(self.market_close)
+        return self.get_calendar().is_open(self.clock.now(self.tz))
 
     def should_start_monitoring(self) -> bool:
-        now = datetime.datetime.now(self.tz)
-        return now >= self._today_dt(self.monitor_start)
+        return self.get_calendar().should_start_monitoring(self.clock.now(self.tz))
 
     def can_open_new_trades(self) -> bool:
         """Return True if we are allowed to open *new* positions right now."""
-        now = datetime.datetime.now(self.tz)
-        if now >= self._today_dt(self.no_new_trades_time):
+        if not self.get_calendar().can_open_new_trades(self.clock.now(self.tz)):
             return False
         if self.wait_for_ema20_cross:
             return False
         return True
 
     def is_force_close_time(self) -> bool:
-        now = datetime.datetime.now(self.tz)
-        return now >= self._today_dt(self.force_close_time)
+        return self.get_calendar().is_force_close_time(self.clock.now(self.tz))
 
     # ------------------------------------------------------------------
     # Data helpers
     # ------------------------------------------------------------------
     def get_intraday_5min(self, duration: str = "1 D") -> pd.DataFrame | None:
-        contract = self.get_stock_contract()
-        bars = self.ib.reqHistoricalData(
-            contract,
-            endDateTime="",
-            durationStr=duration,
-            barSizeSetting=self.bar_size,
-            whatToShow="TRADES",
-            useRTH=True,
-            formatDate=1,
-        )
-        if not bars:
+        """Return 5-minute bars for the underlying.
+
+        The first call backfills *duration* and subscribes to live updates; later
+        calls are served from the bar feed without another IB request.
+        """
+        if self.bar_feed is None:
+            self.bar_feed = self.get_bar_feeds().get(
+                self.get_stock_contract(),
+                self.bar_size,
+                duration,
+                BOSKIndicators(self.ema9_period, self.ema20_period, self.atr_period, self.kc_mult),
+                store=self.bar_store,
+                history_days=self.warm_days,
+            )
+            if self.recorder is not None:
+                self.recorder.watch_bars(self.bar_feed)
+        if not self.bar_feed.start():
             return None
-        df = util.df(bars)
+        df = self.bar_feed.to_df()
         df["date"] = pd.to_datetime(df["date"])
         return df
 
+    def stop_bar_feed(self):
+        """Release the bar feed (cancelled once no other strategy holds it) so the next session starts with a fresh backfill."""
+        if self.bar_feed is not None:
+            self.get_bar_feeds().release(self.bar_feed)
+            self.bar_feed = None
+
     def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """Add EMA(9), EMA(20), ATR and Keltner Channel bands to *df*."""
+        # Bars from the live feed already carry incrementally updated indicators
+        if self.bar_feed is not None and self.bar_feed.add_indicator_columns(df):
+            return df
+
         # EMA 9 / EMA 20
         df["ema9"] = df["close"].ewm(span=self.ema9_period, adjust=False).mean()
         df["ema20"] = df["close"].ewm(span=self.ema20_period, adjust=False).mean()
@@ -229,100 +284,205 @@ class SPYBOSKStrategy:
     # ------------------------------------------------------------------
     # Position helpers
     # ------------------------------------------------------------------
-    def place_order(self, contract, action: str, quantity: int):
-        order = MarketOrder(action, quantity)
-        trade = self.ib.placeOrder(contract, order)
-        self.ib.sleep(1)
-        print(f"{datetime.datetime.now(self.tz)} — {action} {quantity} {contract.localSymbol}")
+    def place_order(self, contract, action: str, quantity: int, order_ref: str = ""):
+        """Submit a market order; fills are reported to ``on_order_filled``."""
+        self.latency.mark("signal")
+        order = MarketOrder(action, quantity, orderRef=order_ref)
+        trade = self.latency.track(self.get_order_manager().submit(
+            contract, order,
+            on_fill=self.on_order_filled, on_partial=self.on_partial_fill, on_reject=self.on_order_rejected,
+        ))
+        print(f"{self.clock.now(self.tz)} — {action} {quantity} {contract.localSymbol}")
         return trade
 
+    def _position_for(self, contract) -> Position | None:
+        return self.positions.get(contract)
+
+    def _remove_position(self, position: Position):
+        self.positions.remove(position)
+        self.get_quote_cache().unsubscribe(position.contract)
+        if self.journal is not None:
+            self.journal.close(position.contract)
+
+    def _journal_update(self, position: Position):
+        if self.journal is not None:
+            self.journal.update(position.contract, contracts_remaining=position.contracts_remaining, half_sold=True)
+
+    def recover_positions(self):
+        """Pick up the positions an earlier run left open (once, before the first pass).
+
+        Working orders earlier runs left (e.g. its server-side exits, an entry
+        that never filled) are cancelled; the position is managed client-side
+        from here on.
+        """
+        if self.journal is None or self.journal_recovered:
+            return
+        self.journal_recovered = True
+        manager = self.get_order_manager()
+        for record in self.recover_journal():
+            contract, state = record["contract"], record["state"]
+            entry_price = record["fill_price"] or state["entry_option_price"]
+            manager.restore(contract, record["quantity"], entry_price)
+            position = self.positions.add(Position.from_state(
+                contract, state, entry_option_price=entry_price, contracts_remaining=int(record["quantity"]),
+            ))
+            print(f"Recovered {position.type} — {position.contracts_remaining} {contract.localSymbol} @ {entry_price:.2f}")
+
+    def on_order_filled(self, trade: Trade, price: float, pnl: float):
+        contract, quantity = trade.contract, trade.order.totalQuantity
+        position = self._position_for(contract)
+        if position is not None and self.journal is not None:
+            self.journal.fill(contract, trade.order.action, quantity, price)
+        if trade.order.action == "BUY":
+            if position is not None:
+                position.entry_option_price = price  # Replace the quote seen at submit with the real fill
+                if position.exits is not None:
+                    position.exits.submit(price)
+            print(f"Bought {quantity:g} {contract.localSymbol} at {price:.2f}")
+            return
+        pnl_per_contract = pnl / quantity
+        print(f"Sold {quantity:g} {contract.localSymbol} at {price:.2f} | P/L: ${pnl_per_contract:.2f}/contract")
+        if position is not None:
+            # A server-side exit filled: reconcile the position with what is still held
+            held = self.get_order_manager().position(contract)
+            if held > 0:
+                position.contracts_remaining = int(held)
+                position.half_sold = True
+                self._journal_update(position)
+                return
+            self.last_profit_side = "LONG" if position.type == "CALL" else "SHORT"
+            self._remove_position(position)
+        # Final exit: settle the re-entry guard on the real fill
+        self.wait_for_ema20_cross = pnl_per_contract > 0
+
+    def on_partial_fill(self, trade: Trade, fill: Fill):
+        print(f"Partial fill: {fill.execution.shares:g} of {trade.order.totalQuantity:g} {trade.contract.localSymbol} at {fill.execution.price:.2f}")
+
+    def on_order_rejected(self, trade: Trade, reason: str):
+        contract = trade.contract
+        print(f"{trade.order.action} {trade.order.totalQuantity:g} {contract.localSymbol} rejected: {reason}")
+        position = self._position_for(contract)
+        if trade.order.action == "BUY" and position is not None and not trade.fills:
+            # The entry never happened; stop managing it
+            if position.exits is not None:
+                position.exits.cancel()
+            self._remove_position(position)
+        elif trade.order.action == "SELL":
+            if position is not None and position.exits is not None and position.exits.failed:
+                print("Server-side exits failed — managing the position client-side.")
+            else:
+                print(f"WARNING: {contract.localSymbol} may still be open — check TWS.")
+
     def enter_position(self, position_type: str):
-        """Enter CALL (long) or PUT (short)."""
+        """Enter CALL (long) or PUT (short); the option price is the quote until the fill arrives.
+
+        The position and its exits are booked before the order is sent: the
+        quote and contract lookups can run the event loop, and the entry fill
+        must find them when it arrives.
+        """
         if self.has_position_type(position_type):
             print(f"Already have a {position_type} position - skipping entry")
             return
         right = "C" if position_type == "CALL" else "P"
         option_contract = self.get_option_contract(right)
-        self.place_order(option_contract, "BUY", self.contracts)
 
         entry_underlying = self.get_underlying_price()
-        entry_option_price = self.ib.reqTickers(option_contract)[0].marketPrice()
-        position = {
-            "type": position_type,  # CALL / PUT
-            "contract": option_contract,
-            "entry_underlying_price": entry_underlying,
-            "entry_option_price": entry_option_price,
-            "entry_strike": option_contract.strike,
-            "contracts_remaining": self.contracts,
-            "half_sold": False,
-            "entry_time": datetime.datetime.now(self.tz),
-        }
-        self.positions.append(position)
+        entry_option_price = self.get_quote_cache().price(option_contract)
+        position = Position(
+            position_type, option_contract,
+            entry_underlying_price=entry_underlying,
+            entry_option_price=entry_option_price,
+            contracts_remaining=self.contracts,
+            entry_time=self.clock.now(self.tz),
+        )
+        if self.server_side_exits:
+            # Placed with the entry fill price as the breakeven stop
+            sign = 1 if position_type == "CALL" else -1
+            position.exits = ServerExits(
+                self.get_order_manager(), self.get_qualified_stock_contract(), option_contract, self.contracts,
+                first_target=entry_underlying + sign * self.underlying_move_target,
+                second_target=option_contract.strike + sign * self.itm_offset,
+                on_fill=self.on_order_filled, on_reject=self.on_order_rejected,
+            )
+        self.positions.add(position)
+        order_ref = ""
+        if self.journal is not None:
+            # Write-ahead: the intent is on disk before the order can fill
+            order_ref = self.journal.open(option_contract, self.contracts, **position.state())
+        self.place_order(option_contract, "BUY", self.contracts, order_ref=order_ref)
         print(
-            f"Entered {position_type} — Underlying: {entry_underlying:.2f}, Option: {entry_option_price:.2f}, Strike: {position['entry_strike']}"
+            f"Entered {position_type} — Underlying: {entry_underlying:.2f}, Option: {entry_option_price:.2f}, Strike: {position.entry_strike}"
         )
 
-    def check_stop_loss(self, position: dict, last_candle: pd.Series) -> bool:
+    def check_stop_loss(self, position: Position, last_candle: pd.Series) -> bool:
         close_price = last_candle["close"]
         ema9 = last_candle["ema9"]
         if np.isnan(ema9):
             return False
-        if position["type"] == "CALL":
+        if position.type == "CALL":
             return close_price < ema9
         else:
             return close_price > ema9
 
-    def check_profit_targets(self, position: dict) -> str | None:
+    def check_profit_targets(self, position: Position) -> str | None:
         underlying_price = self.get_underlying_price()
-        option_price = self.ib.reqTickers(position["contract"])[0].marketPrice()
+        option_price = self.get_option_price(position.contract)
         # First target: underlying ± $1
-        if not position["half_sold"]:
-            if position["type"] == "CALL":
-                if underlying_price >= position["entry_underlying_price"] + self.underlying_move_target:
+        if not position.half_sold:
+            if position.type == "CALL":
+                if underlying_price >= position.entry_underlying_price + self.underlying_move_target:
                     return "FIRST_TARGET"
             else:
-                if underlying_price <= position["entry_underlying_price"] - self.underlying_move_target:
+                if underlying_price <= position.entry_underlying_price - self.underlying_move_target:
                     return "FIRST_TARGET"
         # Breakeven stop after half sold
-        if position["half_sold"] and option_price <= position["entry_option_price"]:
+        if position.half_sold and option_price <= position.entry_option_price:
             return "BREAKEVEN_STOP"
         # Second target: option 1.05 ITM on underlying
-        if position["type"] == "CALL":
-            if underlying_price >= position["entry_strike"] + self.itm_offset:
+        if position.type == "CALL":
+            if underlying_price >= position.entry_strike + self.itm_offset:
                 return "SECOND_TARGET"
         else:
-            if underlying_price <= position["entry_strike"] - self.itm_offset:
+            if underlying_price <= position.entry_strike - self.itm_offset:
                 return "SECOND_TARGET"
         return None
 
-    def exit_position(self, position: dict, reason: str, partial: bool = False):
-        if partial and not position["half_sold"]:
+    def exit_position(self, position: Position, reason: str, partial: bool = False):
+        if partial and not position.half_sold:
             qty = self.contracts // 2
-            position["contracts_remaining"] -= qty
-            position["half_sold"] = True
+            position.contracts_remaining -= qty
+            position.half_sold = True
+            self._journal_update(position)
         else:
-            qty = position["contracts_remaining"]
-        self.place_order(position["contract"], "SELL", qty)
-        option_price = self.ib.reqTickers(position["contract"])[0].marketPrice()
-        pnl = (option_price - position["entry_option_price"]) * 100
-        print(f"Closed {qty} {position['type']} | Reason: {reason} | P/L: ${pnl:.2f}/contract")
-        if not partial or position["contracts_remaining"] == 0:
+            qty = position.contracts_remaining
+        if position.exits is not None and position.exits.active:
+            position.exits.cancel()
+            # Sell what the fills say is held; the entry may still be working
+            qty = int(self.get_order_manager().position(position.contract)) or qty
+            position.contracts_remaining = qty
+        self.place_order(position.contract, "SELL", qty)
+        # Estimate from the quote; the fill reports (and settles) the real P/L
+        option_price = self.get_quote_cache().price(position.contract)
+        pnl = (option_price - position.entry_option_price) * 100
+        print(f"Closing {qty} {position.type} | Reason: {reason} | Est. P/L: ${pnl:.2f}/contract")
+        if not partial or position.contracts_remaining == 0:
             # Determine if profitable for re-entry guard
             self.wait_for_ema20_cross = pnl > 0
-            self.last_profit_side = "LONG" if position["type"] == "CALL" else "SHORT"
-            self.positions.remove(position)
+            self.last_profit_side = "LONG" if position.type == "CALL" else "SHORT"
+            self._remove_position(position)
 
     def close_all_positions(self, reason: str):
-        for pos in self.positions[:]:
+        for pos in self.positions:
             self.exit_position(pos, reason)
 
     # ------------------------------------------------------------------
     # Daily reset helpers
     # ------------------------------------------------------------------
     def reset_daily_state(self):
-        self.positions = []
+        self.positions.clear()
         self.wait_for_ema20_cross = False
         self.last_profit_side = None
+        self.stop_bar_feed()
 
     def _check_ema20_cross_reset(self, last_candle: pd.Series):
         if not self.wait_for_ema20_cross:
@@ -339,81 +499,102 @@ class SPYBOSKStrategy:
     # ------------------------------------------------------------------
     # Main loop
     # ------------------------------------------------------------------
+    def step(self) -> float:
+        """Run one pass of the trading logic.
+
+        Returns the number of seconds to wait before the next pass.  ``run``
+        sleeps for that long; ``StrategyRuntime`` wakes earlier on bar closes,
+        quote ticks and order-status changes.
+        """
+        self.recover_positions()
+
+        # Market hours check
+        if not self.is_market_open():
+            if self.positions:
+                print("Market closed — exiting all positions.")
+                self.close_all_positions("Market closed")
+            self.reset_daily_state()
+            return self.get_calendar().seconds_until_next(self.clock.now(self.tz))
+
+        # Option chain for today's expiry (loaded once per session)
+        self.load_option_chain()
+
+        # Force close time
+        if self.is_force_close_time() and self.positions:
+            print("Force-close time reached — closing all positions.")
+            self.close_all_positions("2:55 PM force close")
+
+        # Start monitoring after monitor_start
+        if not self.monitoring_started and self.should_start_monitoring():
+            self.monitoring_started = True
+            print("Started monitoring BOSK signals …")
+        if not self.monitoring_started:
+            return min(30, self.get_calendar().seconds_until_next(self.clock.now(self.tz)))
+
+        # Fetch data
+        df = self.get_intraday_5min()
+        if df is None or len(df) < self.ema20_period + 5:
+            print("Insufficient historical data — waiting…")
+            return 30
+        self.latency.begin(last_arrival(self.bar_feed, self.quote_cache, self.get_stock_contract()))
+        df = self.calculate_indicators(df)
+        self.latency.mark("indicators")
+        last_candle = df.iloc[-2]  # Last completed candle
+
+        # Reset re-entry guard based on EMA20 cross
+        self._check_ema20_cross_reset(last_candle)
+
+        # Entry logic
+        if self.can_open_new_trades():
+            entry_signal = self.check_entry_signal(df)
+            if entry_signal == "ENTER_LONG":
+                self.enter_position("CALL")
+            elif entry_signal == "ENTER_SHORT":
+                self.enter_position("PUT")
+
+        # Manage positions
+        for pos in self.positions:
+            # Stop loss
+            if self.check_stop_loss(pos, last_candle):
+                self.exit_position(pos, "Stop loss")
+                continue
+            # Targets and breakeven stop are worked by IB; the fills reconcile the state
+            if pos.exits is not None and pos.exits.active:
+                continue
+            # Profit targets
+            tgt = self.check_profit_targets(pos)
+            if tgt == "FIRST_TARGET":
+                self.exit_position(pos, "First profit target", partial=True)
+            elif tgt == "BREAKEVEN_STOP":
+                self.exit_position(pos, "Breakeven stop")
+            elif tgt == "SECOND_TARGET":
+                self.exit_position(pos, "Second profit target")
+
+        # Pace loop
+        return 5
+
+    def shutdown(self):
+        """Flatten any open positions before the connection goes away."""
+        if self.positions:
+            self.close_all_positions("Shutdown")
+        self.get_order_manager().wait()  # Let the exit fills arrive before disconnecting
+        if self.recorder is not None:
+            self.recorder.close()
+
     def run(self):
         if not self.connect_to_ib():
             return
         try:
             print("Starting SPY BOSK strategy …")
-            monitoring_started = False
+            self.monitoring_started = False
             while True:
-                now = datetime.datetime.now(self.tz)
-
-                # Market hours check
-                if not self.is_market_open():
-                    if self.positions:
-                        print("Market closed — exiting all positions.")
-                        self.close_all_positions("Market closed")
-                    self.reset_daily_state()
-                    time.sleep(60)
-                    continue
-
-                # Force close time
-                if self.is_force_close_time() and self.positions:
-                    print("Force-close time reached — closing all positions.")
-                    self.close_all_positions("2:55 PM force close")
-
-                # Start monitoring after monitor_start
-                if not monitoring_started and self.should_start_monitoring():
-                    monitoring_started = True
-                    print("Started monitoring BOSK signals …")
-                if not monitoring_started:
-                    time.sleep(30)
-                    continue
-
-                # Fetch data
-                df = self.get_intraday_5min()
-                if df is None or len(df) < self.ema20_period + 5:
-                    print("Insufficient historical data — waiting…")
-                    time.sleep(30)
-                    continue
-                df = self.calculate_indicators(df)
-                last_candle = df.iloc[-2]  # Last completed candle
-
-                # Reset re-entry guard based on EMA20 cross
-                self._check_ema20_cross_reset(last_candle)
-
-                # Entry logic
-                if self.can_open_new_trades():
-                    entry_signal = self.check_entry_signal(df)
-                    if entry_signal == "ENTER_LONG":
-                        self.enter_position("CALL")
-                    elif entry_signal == "ENTER_SHORT":
-                        self.enter_position("PUT")
-
-                # Manage positions
-                for pos in self.positions[:]:
-                    # Stop loss
-                    if self.check_stop_loss(pos, last_candle):
-                        self.exit_position(pos, "Stop loss")
-                        continue
-                    # Profit targets
-                    tgt = self.check_profit_targets(pos)
-                    if tgt == "FIRST_TARGET":
-                        self.exit_position(pos, "First profit target", partial=True)
-                    elif tgt == "BREAKEVEN_STOP":
-                        self.exit_position(pos, "Breakeven stop")
-                    elif tgt == "SECOND_TARGET":
-                        self.exit_position(pos, "Second profit target")
-
-                # Pace loop
-                time.sleep(5)
+                self.ib.sleep(self.step())
         except KeyboardInterrupt:
             print("User interrupted — shutting down.")
         except Exception as exc:
             print(f"Unhandled error: {exc}")
         finally:
-            if self.positions:
-                self.close_all_positions("Shutdown")
+            self.shutdown()
             self.ib.disconnect()
             print("Disconnected from Interactive Brokers.")
 
@@ -428,6 +609,15 @@ if __name__ == "__main__":
     parser.add_argument("--itm_offset", type=float, default=1.05, help="Underlying distance beyond strike for second target")
     parser.add_argument("--paper_trading", action="store_true", help="Use paper trading account (7497)")
     parser.add_argument("--port", type=int, default=7497, help="Port number")
+    parser.add_argument("--bar_store", type=str, default=None, help="Directory of the on-disk bar store")
+    parser.add_argument("--warm_days", type=int, default=0, help="Stored sessions loaded to warm up indicators")
+    parser.add_argument("--gateway", type=str, default=None, help="Address of a shared IB gateway to use instead of a direct connection")
+    parser.add_argument("--bar_bus", type=str, default=None, help="Name prefix of the shared-memory bar bus to read bars from")
+    parser.add_argument("--server_side_exits", action="store_true", help="Submit targets and breakeven stop to IB as conditional OCA orders at entry")
+    parser.add_argument("--target_delta", type=float, default=None, help="Pick the option whose delta is closest to this (0.5 = at the money) instead of the nearest strike")
+    parser.add_argument("--latency_file", type=str, default=None, help="JSON file the stage latency histograms are exported to")
+    parser.add_argument("--journal", type=str, default=None, help="SQLite file open positions are journaled to for crash recovery")
+    parser.add_argument("--record", type=str, default=None, help="Directory every quote, bar and order event is recorded to")
     args = parser.parse_args()
 
     strategy = SPYBOSKStrategy(
@@ -437,5 +627,20 @@ if __name__ == "__main__":
         itm_offset=args.itm_offset,
         paper_trading=args.paper_trading,
         port=args.port,
+        server_side_exits=args.server_side_exits,
+        target_delta=args.target_delta,
     )
+    if args.gateway:
+        strategy.ib = GatewayIB(args.gateway)
+    if args.bar_bus:
+        strategy.bar_feeds = SharedBarFeedCache(args.bar_bus)
+    if args.bar_store:
+        strategy.bar_store = BarStore(args.bar_store, strategy.bar_size)
+        strategy.warm_days = args.warm_days
+    if args.latency_file:
+        start_export(args.latency_file)
+    if args.journal:
+        strategy.journal = PositionJournal(args.journal, f"{type(strategy).__name__} {strategy.ticker}")
+    if args.record:
+        strategy.recorder = TickRecorder(args.record, f"{type(strategy).__name__}_{strategy.ticker}")
     strategy.run() 
\ No newline at end of file
@@ -9,7 +9,23 @@ import time
 import pytz
 from ib_insync import *
 
-class SPYEMAChad:
+from bar_store import BarStore
+from ib_gateway import GatewayIB
+from latency import last_arrival, recorder, start_export
+from log_pipeline import debug
+from indicators import EMAChadIndicators
+from position_book import CurrentField, PositionBook, SinglePositionMixin
+from position_journal import PositionJournal
+from session_calendar import SessionCalendar
+from shm_bus import SharedBarFeedCache
+from strategy_services import StrategyServices
+from tick_recorder import TickRecorder
+
+class SPYEMAChad(SinglePositionMixin, StrategyServices):
+    # The open position is kept in ``self.positions``; these are its fields
+    position = CurrentField("type")  # None, "LONG", or "SHORT"
+    entry_price = CurrentField("entry_underlying_price", 0)
+
     def __init__(self, ticker="SPY", profit_target=1.0, market_open="08:30:00", 
                  market_close="15:00:00", signal_time="09:00:00", force_close_time="14:55:00",
                  timeframe="5 mins", ema_short=9, ema_long=20, paper_trading=True, threshold=0.0003, trading_time=5):
@@ -43,13 +59,18 @@ class SPYEMAChad:
         self.threshold = threshold
         self.trading_time = trading_time
         # Initialize trading state
-        self.position = None  # None, "LONG", or "SHORT"
-        self.entry_price = 0
+        self.positions = PositionBook()
         self.stop_loss = 0
         self.today_trade_taken = False
         self.waiting_for_entry = False
         self.initial_condition = None  # "ABOVE", "BELOW", or None
         self.option = None
+        self.bar_store = None  # Optional on-disk bar history, set by the launcher
+        self.warm_days = 0  # Stored sessions prepended to warm the indicators
+        self.latency = recorder(f"{type(self).__name__} {ticker}")  # Stage timings from data arrival to fill
+        self.journal = None  # Crash-safe record of the open position, optional (set by the launcher)
+        self.journal_recovered = False
+        self.recorder = None  # Every quote, bar and order event seen, on disk for replay, optional (set by the launcher)
         
         # Time zone for US Central Time
         self.tz = pytz.timezone('US/Central')
@@ -80,7 +101,7 @@ class SPYEMAChad:
     
     def get_contract(self):
         """Get the contract for the specified ticker"""
-        print("Getting contract for", self.ticker)
+        debug("Getting contract for", self.ticker)
         contract = Stock(self.ticker, 'SMART', 'USD')
         return contract
 
@@ -89,7 +110,7 @@ class SPYEMAChad:
         Args:
             option_type (str): 'C' for Call, 'P' for Put
         """
-        print("Getting 0DTE option contract for SPY")
+        debug("Getting 0DTE option contract for SPY")
         # Get current date
         today = datetime.datetime.now(self.tz).date()
         
@@ -102,8 +123,16 @@ class SPYEMAChad:
         
         # Determine ATM strike price
         stock_contract = self.get_contract()
-        ticker = self.ib.reqTickers(stock_contract)[0]
-        spot_price = ticker.marketPrice()
+        spot_price = self.get_quote_cache().price(stock_contract)
+
+        # Pre-qualified contract from the session's chain when available
+        chain = self.get_option_chains().get(self.ticker)
+        if chain is not None:
+            option_contract = chain.select(option_type, spot_price, expiry_str)
+            if option_contract is not None:
+                debug(option_contract)
+                return option_contract
+
         strike_price = round(spot_price)
 
         # Create option contract at ATM strike
@@ -118,28 +147,26 @@ class SPYEMAChad:
         if details:
             option_contract = details[0].contract
             self.ib.qualifyContracts(option_contract)
-        print(option_contract)
+        debug(option_contract)
         return option_contract
     
     def get_historical_data(self, duration='1 D', bar_size='5 mins', max_retries=3):
-        """Get historical data for calculations"""
-        contract = self.get_contract()
+        """Get historical data for calculations
+        
+        The first successful call backfills the session and subscribes to live
+        bar updates; subsequent calls read the streamed bars from memory.
+        """
+        if self.bar_feed is None:
+            self.bar_feed = self.get_bar_feeds().get(self.get_contract(), bar_size, duration,
+                                                     EMAChadIndicators(self.ema_short, self.ema_long),
+                                                     store=self.bar_store, history_days=self.warm_days)
+            if self.recorder is not None:
+                self.recorder.watch_bars(self.bar_feed)
         
         for attempt in range(max_retries):
             try:
-                bars = self.ib.reqHistoricalData(
-                    contract,
-                    endDateTime='',
-                    durationStr=duration,
-                    barSizeSetting=bar_size,
-                    whatToShow='TRADES',
-                    useRTH=True,
-                    formatDate=1
-                )
-                
-                if bars and len(bars) > 0:
-                    df = util.df(bars)
-                    return df
+                if self.bar_feed.start():
+                    return self.bar_feed.to_df()
                 else:
                     print(f"Warning: No historical data received (attempt {attempt+1}/{max_retries})")
                     time.sleep(2)  # Wait before retry
@@ -150,9 +177,44 @@ class SPYEMAChad:
         print("Failed to get historical data after maximum retries")
         return None
     
+    def recover_positions(self):
+        """Pick up the position an earlier run left open (once, before the first pass)"""
+        if self.journal is None or self.journal_recovered:
+            return
+        self.journal_recovered = True
+        manager = self.get_order_manager()
+        for record in self.recover_journal():
+            contract = record['contract']
+            if self.position is not None:
+                print(f"WARNING: {contract.localSymbol} also journaled — left to the trader.")
+                continue
+            self.option = contract
+            self.update_current(type=record['state']['position'], contract=contract,
+                                entry_underlying_price=record['state']['entry_price'],
+                                entry_option_price=record['fill_price'] or float('nan'),
+                                contracts_remaining=int(record['quantity']))
+            self.today_trade_taken = True
+            manager.restore(contract, record['quantity'], record['fill_price'] or 0.0)
+            print(f"{datetime.datetime.now(self.tz)}: Recovered {self.position} position entered at ${self.entry_price:.2f}")
+    
+    def load_option_chain(self):
+        """Pre-qualify this week's contracts so entries skip the contract lookups"""
+        today = datetime.datetime.now(self.tz).date()
+        self.get_option_chains().load(Stock(self.ticker, 'SMART', 'USD'), today, max_dte=7)
+    
+    def stop_bar_feed(self):
+        """Release the bar feed (cancelled once no other strategy holds it) so the next session starts with a fresh backfill"""
+        if self.bar_feed is not None:
+            self.get_bar_feeds().release(self.bar_feed)
+            self.bar_feed = None
+    
     def calculate_indicators(self, df):
-        print("Calculating indicators")
+        debug("Calculating indicators")
         """Calculate EMA and VWAP indicators"""
+        # Bars from the live feed already carry incrementally updated indicators
+        if self.bar_feed is not None and self.bar_feed.add_indicator_columns(df):
+            return df
+        
         # Calculate EMAs
         df['ema_short'] = df['close'].ewm(span=self.ema_short, adjust=False).mean()
         df['ema_long'] = df['close'].ewm(span=self.ema_long, adjust=False).mean()
@@ -185,7 +247,7 @@ class SPYEMAChad:
             ema_short = df_5.iloc[-1]['ema_short']
             ema_long = df_5.iloc[-1]['ema_long']
             vwap = df_5.iloc[-1]['vwap']
-            print(df_5.iloc[-1])
+            debug(df_5.iloc[-1])
             
             # Check conditions
             if price > ema_short and price > ema_long and price > vwap:
@@ -249,40 +311,85 @@ class SPYEMAChad:
             return True
         return False
     
-    def place_order(self, action, quantity=1):
+    def place_order(self, action, quantity=1, order_ref=""):
         """
         Place an order with Interactive Brokers
         Args:
             action (str): "BUY" or "SELL"
             quantity (int): Number of contracts
+            order_ref (str): orderRef of the order (the journal's tag for an entry)
         """
         option_type = 'C' if self.position == "LONG" else 'P'
         if self.option is None:
             self.option = self.get_spy_option_contract(option_type)
         contract = self.option
-        order = MarketOrder(action, quantity)
-        trade = self.ib.placeOrder(contract, order)
-        self.ib.sleep(1)  # Give IB time to process the order
+        self.latency.mark("signal")
+        order = MarketOrder(action, quantity, orderRef=order_ref)
+        trade = self.latency.track(self.get_order_manager().submit(
+            contract, order,
+            on_fill=self.on_order_filled, on_partial=self.on_partial_fill, on_reject=self.on_order_rejected,
+        ))
         
         print(f"{datetime.datetime.now(self.tz)}: {action} order placed for {quantity} {self.ticker}")
         return trade
     
+    def on_order_filled(self, trade, price, pnl):
+        """
+        Report a completed order at its real fill price
+        Args:
+            trade (Trade): The filled trade
+            price (float): Average fill price
+            pnl (float): P/L realized by this order against earlier fills
+        """
+        if self.position is not None and trade.contract is self.option:
+            if self.current.entry_option_price != self.current.entry_option_price:
+                self.current.entry_option_price = price  # Opening fill: the mark's cost basis
+            if self.journal is not None:
+                self.journal.fill(trade.contract, trade.order.action, trade.order.totalQuantity, price)
+        message = f"{datetime.datetime.now(self.tz)}: {trade.order.action} {trade.order.totalQuantity:g} {trade.contract.localSymbol} filled at ${price:.2f}"
+        if pnl:
+            message += f", P/L: ${pnl:.2f}"
+        print(message)
+    
+    def on_partial_fill(self, trade, fill):
+        """Report an execution that leaves part of the order open"""
+        print(f"{datetime.datetime.now(self.tz)}: Partial fill {fill.execution.shares:g} of {trade.order.totalQuantity:g} "
+              f"{trade.contract.localSymbol} at ${fill.execution.price:.2f}")
+    
+    def on_order_rejected(self, trade, reason):
+        """Report an order IB cancelled or rejected; an unfilled entry is dropped"""
+        print(f"{datetime.datetime.now(self.tz)}: {trade.order.action} {trade.order.totalQuantity:g} "
+              f"{trade.contract.localSymbol} rejected: {reason}")
+        held = self.get_order_manager().position(trade.contract)
+        if self.position is not None and not held:
+            # Nothing was ever filled on this contract: the entry did not happen
+            if self.journal is not None:
+                self.journal.close(trade.contract)
+            self.position = None
+        elif held:
+            print(f"WARNING: {held:g} {trade.contract.localSymbol} still open — check TWS.")
+    
     def enter_position(self, direction):
         """
         Enter a position (long or short)
         Args:
             direction (str): "LONG" or "SHORT"
         """
-        if direction == "LONG":
-            self.position = "LONG"
-            self.place_order("BUY")
-        else:
-            self.position = "SHORT"
-            self.place_order("SELL")
+        self.position = direction
+        if self.option is None:
+            self.option = self.get_spy_option_contract('C' if direction == "LONG" else 'P')
+        
+        # Get current price for tracking profit/loss (booked before the order is sent, so its fill finds it)
+        self.update_current(contract=self.option, contracts_remaining=1 if direction == "LONG" else -1,
+                            entry_underlying_price=self.get_quote_cache().price(self.get_contract()),
+                            entry_time=datetime.datetime.now(self.tz))
         
-        # Get current price for tracking profit/loss
-        ticker = self.ib.reqTickers(self.get_contract())[0]
-        self.entry_price = ticker.marketPrice()
+        order_ref = ""
+        if self.journal is not None:
+            # Write-ahead, sold to open when short
+            order_ref = self.journal.open(self.option, 1 if direction == "LONG" else -1,
+                                          position=self.position, entry_price=self.entry_price)
+        self.place_order("BUY" if direction == "LONG" else "SELL", order_ref=order_ref)
         
         self.today_trade_taken = True
         self.waiting_for_entry = False
@@ -296,23 +403,22 @@ class SPYEMAChad:
         elif self.position == "SHORT":
             self.place_order("BUY")
         
-        ticker = self.ib.reqTickers(self.get_contract())[0]
-        exit_price = ticker.marketPrice()
+        exit_price = self.get_quote_cache().price(self.get_contract())
         profit = exit_price - self.entry_price if self.position == "LONG" else self.entry_price - exit_price
         
         print(f"{datetime.datetime.now(self.tz)}: Exited {self.position} position at ${exit_price:.2f}, "
               f"P/L: ${profit:.2f} ({reason})")
         
+        if self.journal is not None:
+            self.journal.close(self.option)
         self.position = None
-        self.entry_price = 0
     
     def check_profit_target(self):
         """Check if profit target has been reached"""
         if self.position is None:
             return False
         
-        ticker = self.ib.reqTickers(self.get_contract())[0]
-        current_price = ticker.marketPrice()
+        current_price = self.get_quote_cache().price(self.get_contract())
         
         if (self.position == "LONG" and 
             current_price - self.entry_price >= self.profit_target):
@@ -327,44 +433,130 @@ class SPYEMAChad:
         self.today_trade_taken = False
         self.waiting_for_entry = False
         self.initial_condition = None
+        self.stop_bar_feed()
+    
+    def get_calendar(self):
+        """Get the session calendar (holidays and early closes)"""
+        return self.lazy("calendar", lambda: SessionCalendar(self.tz, self.market_open, self.market_close,
+                                                             force_close=self.force_close_time))
     
     def is_market_open(self):
         """Check if the market is currently open"""
-        now = datetime.datetime.now(self.tz)
-        
-        # Convert times to datetime objects for today
-        today = now.date()
-        market_open_time = datetime.datetime.combine(today, 
-                                                    datetime.datetime.strptime(self.market_open, "%H:%M:%S").time())
-        
-        market_close_time = datetime.datetime.combine(today, 
-                                                     datetime.datetime.strptime(self.market_close, "%H:%M:%S").time())
-        
-        # Localize times if needed
-        if market_open_time.tzinfo is None:
-            market_open_time = self.tz.localize(market_open_time)
-            
-        if market_close_time.tzinfo is None:
-            market_close_time = self.tz.localize(market_close_time)
-        
-        # Check if current time is within market hours
-        return market_open_time <= now <= market_close_time
+        return self.get_calendar().is_open(datetime.datetime.now(self.tz))
     
     def is_force_close_time(self):
         """Check if it's time to force close any open positions"""
+        return self.get_calendar().is_force_close_time(datetime.datetime.now(self.tz))
+    
+    def step(self):
+        """Run one pass of the trading logic.
+
+        Returns the number of seconds to wait before the next pass, or None
+        when the strategy should stop.  ``run`` sleeps for that long;
+        ``StrategyRuntime`` wakes earlier on bar closes, quote ticks and
+        order-status changes.
+        """
+        self.recover_positions()
+        
+        # Check if market is open
+        if not self.is_market_open():
+            if self.position is not None:
+                print("Market closed with position still open. Closing position.")
+                self.exit_position("Market closed")
+            
+            # Reset daily state at the end of the day
+            now = datetime.datetime.now(self.tz)
+            if self.get_calendar().is_after_close(now):
+                self.reset_daily_state()
+                
+            print("Market closed. Waiting for next market open.")
+            return self.get_calendar().seconds_until_next(now)  # Sleep until the next session transition
+        
+        # Option chain for the week (loaded once per session)
+        self.load_option_chain()
+        
+        # Get current data
+        df = self.get_historical_data()
+        debug("Historical data here:", df)
+        if df is None or len(df) == 0:
+            print("Unable to retrieve market data. Waiting before retry...")
+            return 60  # Wait a minute before trying again
+        self.latency.begin(last_arrival(self.bar_feed, self.quote_cache, self.get_contract()))
+        df = self.calculate_indicators(df)
+        self.latency.mark("indicators")
+        debug("Indicators here:", df)
+
+        # Check for force close time
+        if self.is_force_close_time() and self.position is not None:
+            print("Force close time reached. Closing position.")
+            self.exit_position("Force close time")
+            return 60  # Wait until next day
+        
+        # New day check
         now = datetime.datetime.now(self.tz)
+        current_time = now.time()
+        signal_time = datetime.datetime.strptime(self.signal_time, "%H:%M:%S").time()
+        ticker = self.get_quote_cache().ticker(self.get_contract())
+        debug(ticker)
+        if ticker is None:
+            print("No market data available. Delayed data or no subscription.")
+            return None  # or raise a custom error, or use a fallback
+        current_price = ticker.marketPrice()
+
         
-        # Convert force close time to datetime object for today
-        today = now.date()
-        force_close_time = datetime.datetime.combine(today, 
-                                                    datetime.datetime.strptime(self.force_close_time, "%H:%M:%S").time())
-        # Only localize if not already localized
-        if force_close_time.tzinfo is None:
-            force_close_time = self.tz.localize(force_close_time)
         
-        # Check if current time is at or past force close time
-        return now >= force_close_time
-    
+        # Around 9:00 AM, check initial conditions if we haven't done so today
+        if (abs((current_time.hour * 60 + current_time.minute) - 
+                (signal_time.hour * 60 + signal_time.minute)) < self.trading_time and 
+            not self.today_trade_taken and not self.waiting_for_entry):
+            
+            self.initial_condition = self.check_initial_condition(df=current_price, df_5=df)
+            
+            if self.initial_condition == "ABOVE":
+                print(f"{now}: Initial condition: Price ABOVE all indicators. Waiting for price to touch 9 EMA for LONG entry.")
+                self.waiting_for_entry = True
+            elif self.initial_condition == "BELOW":
+                print(f"{now}: Initial condition: Price BELOW all indicators. Waiting for price to touch 9 EMA for SHORT entry.")
+                self.waiting_for_entry = True
+            else:
+                print(f"{now}: Initial condition: Price between indicators. No trade today.")
+                self.today_trade_taken = True  # No trade today
+        
+        # Check for entry if we're waiting
+        if self.waiting_for_entry:
+            # Determine option type based on initial condition
+            # Get current 9 EMA value
+            latest_data = df.iloc[-1]
+            ema_short_price = latest_data['ema_short']
+            
+            if self.check_for_entry(current_price, ema_short_price):
+                # Enter position
+                entry_direction = "LONG" if self.initial_condition == "ABOVE" else "SHORT"
+                self.enter_position(entry_direction)
+        
+        # Check for exit conditions if in a position
+        if self.position is not None:
+            # Check profit target
+            if self.check_profit_target():
+                self.exit_position("Profit target reached")
+                return 0
+            
+            # Check stop loss
+            if self.check_stop_loss(current_price, df):
+                self.exit_position("Stop loss triggered")
+                return 0
+        
+        # Sleep for a short time before checking again
+        return 1  # Check every 1 seconds
+
+    def shutdown(self):
+        """Close any open position before the connection goes away."""
+        if self.position is not None:
+            self.exit_position("Strategy shutdown")
+        self.get_order_manager().wait()  # Let the exit fills arrive before disconnecting
+        if self.recorder is not None:
+            self.recorder.close()
+
     def run(self):
         """Main trading loop"""
         # Connect to Interactive Brokers
@@ -374,101 +566,16 @@ class SPYEMAChad:
         try:
             print(f"Starting SPY EMA CHAD trading strategy for {self.ticker}")
             while True:
-                # Check if market is open
-                if not self.is_market_open():
-                    if self.position is not None:
-                        print("Market closed with position still open. Closing position.")
-                        self.exit_position("Market closed")
-                    
-                    # Reset daily state at the end of the day
-                    if datetime.datetime.now(self.tz).time() > datetime.datetime.strptime(self.market_close, "%H:%M:%S").time():
-                        self.reset_daily_state()
-                        
-                    print("Market closed. Waiting for next market open.")
-                    time.sleep(60)  # Check again in 1 minute
-                    continue
-                
-                # Get current data
-                df = self.get_historical_data()
-                print(f"Historical data here: {df}")
-                if df is None or len(df) == 0:
-                    print("Unable to retrieve market data. Waiting before retry...")
-                    time.sleep(60)  # Wait a minute before trying again
-                    continue
-                df = self.calculate_indicators(df)
-                print(f"Indicators here: {df}")
-
-                # Check for force close time
-                if self.is_force_close_time() and self.position is not None:
-                    print("Force close time reached. Closing position.")
-                    self.exit_position("Force close time")
-                    time.sleep(60)  # Wait until next day
-                    continue
-                
-                # New day check
-                now = datetime.datetime.now(self.tz)
-                current_time = now.time()
-                signal_time = datetime.datetime.strptime(self.signal_time, "%H:%M:%S").time()
-                tickers = self.ib.reqTickers(self.get_contract())
-                print(tickers)
-                if not tickers:
-                    print("No market data available. Delayed data or no subscription.")
-                    return None  # or raise a custom error, or use a fallback
-                current_price = tickers[0].marketPrice()
-
-                
-                
-                # Around 9:00 AM, check initial conditions if we haven't done so today
-                if (abs((current_time.hour * 60 + current_time.minute) - 
-                        (signal_time.hour * 60 + signal_time.minute)) < self.trading_time and 
-                    not self.today_trade_taken and not self.waiting_for_entry):
-                    
-                    self.initial_condition = self.check_initial_condition(df=current_price, df_5=df)
-                    
-                    if self.initial_condition == "ABOVE":
-                        print(f"{now}: Initial condition: Price ABOVE all indicators. Waiting for price to touch 9 EMA for LONG entry.")
-                        self.waiting_for_entry = True
-                    elif self.initial_condition == "BELOW":
-                        print(f"{now}: Initial condition: Price BELOW all indicators. Waiting for price to touch 9 EMA for SHORT entry.")
-                        self.waiting_for_entry = True
-                    else:
-                        print(f"{now}: Initial condition: Price between indicators. No trade today.")
-                        self.today_trade_taken = True  # No trade today
-                
-                # Check for entry if we're waiting
-                if self.waiting_for_entry:
-                    # Determine option type based on initial condition
-                    # Get current 9 EMA value
-                    latest_data = df.iloc[-1]
-                    ema_short_price = latest_data['ema_short']
-                    
-                    if self.check_for_entry(current_price, ema_short_price):
-                        # Enter position
-                        entry_direction = "LONG" if self.initial_condition == "ABOVE" else "SHORT"
-                        self.enter_position(entry_direction)
-                
-                # Check for exit conditions if in a position
-                if self.position is not None:
-                    # Check profit target
-                    if self.check_profit_target():
-                        self.exit_position("Profit target reached")
-                        continue
-                    
-                    # Check stop loss
-                    if self.check_stop_loss(current_price, df):
-                        self.exit_position("Stop loss triggered")
-                        continue
-                
-                # Sleep for a short time before checking again
-                time.sleep(1)  # Check every 1 seconds
-                
+                delay = self.step()
+                if delay is None:
+                    return
+                self.ib.sleep(delay)
         except KeyboardInterrupt:
             print("Strategy stopped by user.")
         except Exception as e:
             print(f"Error in trading strategy: {e}")
         finally:
-            if self.position is not None:
-                self.exit_position("Strategy shutdown")
+            self.shutdown()
             self.ib.disconnect()
             print("Disconnected from Interactive Brokers")
 
@@ -491,6 +598,13 @@ if __name__ == "__main__":
     parser.add_argument('--paper_trading', action='store_true', help='Use paper trading')
     parser.add_argument('--threshold', type=float, default=0.0003, help='Threshold for entry conditions')
     parser.add_argument('--trading_time', type=int, default=500, help='Time in minutes to trade')
+    parser.add_argument('--bar_store', type=str, default=None, help='Directory of the on-disk bar store')
+    parser.add_argument('--warm_days', type=int, default=0, help='Stored sessions loaded to warm up indicators')
+    parser.add_argument('--gateway', type=str, default=None, help='Address of a shared IB gateway to use instead of a direct connection')
+    parser.add_argument('--bar_bus', type=str, default=None, help='Name prefix of the shared-memory bar bus to read bars from')
+    parser.add_argument('--latency_file', type=str, default=None, help='JSON file the stage latency histograms are exported to')
+    parser.add_argument('--journal', type=str, default=None, help='SQLite file open positions are journaled to for crash recovery')
+    parser.add_argument('--record', type=str, default=None, help='Directory every quote, bar and order event is recorded to')
     
     # Parse arguments
     args = parser.parse_args()
@@ -510,4 +624,17 @@ if __name__ == "__main__":
         threshold=args.threshold,
         trading_time=args.trading_time
     )
+    if args.gateway:
+        strategy.ib = GatewayIB(args.gateway)
+    if args.bar_bus:
+        strategy.bar_feeds = SharedBarFeedCache(args.bar_bus)
+    if args.bar_store:
+        strategy.bar_store = BarStore(args.bar_store, args.timeframe)
+        strategy.warm_days = args.warm_days
+    if args.latency_file:
+        start_export(args.latency_file)
+    if args.journal:
+        strategy.journal = PositionJournal(args.journal, f"{type(strategy).__name__} {strategy.ticker}")
+    if args.record:
+        strategy.recorder = TickRecorder(args.record, f"{type(strategy).__name__}_{strategy.ticker}")
     strategy.run()
\ No newline at end of file
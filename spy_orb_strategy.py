@@ -9,8 +9,19 @@ import time
 import pytz
 from ib_insync import *
 
-
-class SPYORBStrategy:
+from bar_store import BarStore
+from ib_gateway import GatewayIB
+from latency import last_arrival, recorder, start_export
+from position_book import CurrentField, PositionBook, SinglePositionMixin
+from position_journal import PositionJournal
+from server_exits import ServerExits
+from session_calendar import SessionCalendar
+from shm_bus import SharedBarFeedCache
+from strategy_services import StrategyServices
+from tick_recorder import TickRecorder
+
+
+class SPYORBStrategy(SinglePositionMixin, StrategyServices):
     """Opening Range Breakout strategy for SPY 0-DTE options.
 
     The logic follows the specification supplied by the user.  It is intentionally
@@ -18,6 +29,15 @@ class SPYORBStrategy:
     jump between the two files.
     """
 
+    # The open position (one at a time) is kept in ``self.positions``; these are its fields
+    position = CurrentField("type")  # "CALL" or "PUT"
+    option_contract = CurrentField("contract")
+    entry_underlying_price = CurrentField("entry_underlying_price")
+    entry_option_price = CurrentField("entry_option_price")
+    entry_strike = CurrentField("entry_strike")
+    half_position_closed = CurrentField("half_sold", False)
+    exits = CurrentField("exits")  # Server-side exits of the open position
+
     def __init__(
         self,
         ticker: str = "SPY",
@@ -30,6 +50,8 @@ class SPYORBStrategy:
         bar_size: str = "5 mins",
         paper_trading: bool = True,
         port: int = 7497,
+        server_side_exits: bool = False,
+        target_delta: float | None = None,
     ):
         self.ticker = ticker
         self.contracts = contracts
@@ -41,17 +63,26 @@ class SPYORBStrategy:
         self.bar_size = bar_size
         self.paper_trading = paper_trading
         self.port = port
+        self.server_side_exits = server_side_exits  # Targets and breakeven stop worked by IB as conditional orders
+        self.target_delta = target_delta  # Strike picked by delta (0.5 = at the money) instead of the nearest strike
         # Trading state
         self.opening_range_high = None
         self.opening_range_low = None
         self.opening_range_set = False
 
-        self.position = None  # "CALL" or "PUT"
-        self.option_contract = None
-        self.entry_underlying_price = None
-        self.entry_option_price = None
-        self.entry_strike = None
-        self.half_position_closed = False
+        self.positions = PositionBook()
+        self.daily_trade_done = False  # One trade per day
+
+        # On-disk bar history shared across restarts (optional, set by the launcher)
+        self.bar_store: BarStore | None = None
+        self.warm_days = 0  # Stored sessions prepended to warm the indicators
+        # Stage timings from data arrival to fill (the launcher may rename it)
+        self.latency = recorder(f"{type(self).__name__} {self.ticker}")
+        # Crash-safe record of the open position (optional, set by the launcher)
+        self.journal: PositionJournal | None = None
+        self.journal_recovered = False
+        # Every quote, bar and order event seen, on disk for replay (optional, set by the launcher)
+        self.recorder: TickRecorder | None = None
 
         # IB & timezone
         self.tz = pytz.timezone("US/Central")
@@ -79,12 +110,13 @@ class SPYORBStrategy:
         print("Unable to connect after maximum retries – exiting.")
         return False
 
-    def get_stock_contract(self):
-        return Stock(self.ticker, "SMART", "USD")
-
-    def get_underlying_price(self) -> float:
-        ticker = self.ib.reqTickers(self.get_stock_contract())[0]
-        return ticker.marketPrice()
+    def load_option_chain(self):
+        """Pre-qualify today's 0-DTE contracts so entries skip the contract lookups."""
+        today = datetime.datetime.now(self.tz).date()
+        chain = self.get_option_chains().load(self.get_stock_contract(), today, max_dte=0)
+        if chain is not None and self.target_delta is not None:
+            # Stream the strikes around the money so their implied vols are known at entry
+            self.get_pricer().subscribe(chain, today.strftime("%Y%m%d"), self.get_underlying_price())
 
     def get_option_contract(self, right: str) -> Option:
         """Return the ATM 0-DTE option contract for SPY (right="C" or "P")."""
@@ -92,6 +124,17 @@ class SPYORBStrategy:
         expiry_str = today.strftime("%Y%m%d")  # 0-DTE (same-day) expiry for SPY
 
         spot = self.get_underlying_price()
+        chain = self.get_option_chains().get(self.ticker)
+        if chain is not None:
+            if self.target_delta is not None:
+                contract = self.get_pricer().select_delta(
+                    chain, right, expiry_str, spot, self.years_to_expiry(expiry_str), self.target_delta
+                )
+            else:
+                contract = chain.select(right, spot, expiry_str)
+            if contract is not None:
+                return contract
+
         strike = round(spot)
 
         contract = Option(
@@ -112,46 +155,47 @@ class SPYORBStrategy:
     # ---------------------------------------------------------------------
     # Market & timing helpers
     # ---------------------------------------------------------------------
+    def get_calendar(self) -> SessionCalendar:
+        """Session times, holidays and early closes."""
+        return self.lazy("calendar", lambda: SessionCalendar(self.tz, self.market_open, self.market_close, force_close=self.force_close_time))
+
     def is_market_open(self) -> bool:
-        now = datetime.datetime.now(self.tz)
-        today = now.date()
-        mo = self.tz.localize(
-            datetime.datetime.combine(today, datetime.datetime.strptime(self.market_open, "%H:%M:%S").time())
-        )
-        mc = self.tz.localize(
-            datetime.datetime.combine(today, datetime.datetime.strptime(self.market_close, "%H:%M:%S").time())
-        )
-        return mo <= now <= mc
+        return self.get_calendar().is_open(datetime.datetime.now(self.tz))
 
     def is_force_close_time(self) -> bool:
-        now = datetime.datetime.now(self.tz)
-        today = now.date()
-        fct = self.tz.localize(
-            datetime.datetime.combine(today, datetime.datetime.strptime(self.force_close_time, "%H:%M:%S").time())
-        )
-        return now >= fct
+        return self.get_calendar().is_force_close_time(datetime.datetime.now(self.tz))
 
     # ---------------------------------------------------------------------
     # Data helpers
     # ---------------------------------------------------------------------
     def get_intraday_5min(self, duration: str = "1 D") -> pd.DataFrame | None:
-        """Fetch 5-minute historical data for the underlying."""
-        contract = self.get_stock_contract()
-        bars = self.ib.reqHistoricalData(
-            contract,
-            endDateTime="",
-            durationStr=duration,
-            barSizeSetting=self.bar_size,
-            whatToShow="TRADES",
-            useRTH=True,
-            formatDate=1,
-        )
-        if not bars:
+        """Return 5-minute bars for the underlying.
+
+        The first call backfills *duration* and subscribes to live updates; later
+        calls are served from the bar feed without another IB request.
+        """
+        if self.bar_feed is None:
+            self.bar_feed = self.get_bar_feeds().get(
+                self.get_stock_contract(),
+                self.bar_size,
+                duration,
+                store=self.bar_store,
+                history_days=self.warm_days,
+            )
+            if self.recorder is not None:
+                self.recorder.watch_bars(self.bar_feed)
+        if not self.bar_feed.start():
             return None
-        df = util.df(bars)
+        df = self.bar_feed.to_df()
         df["date"] = pd.to_datetime(df["date"])
         return df
 
+    def stop_bar_feed(self):
+        """Release the bar feed (cancelled once no other strategy holds it) so the next session starts with a fresh backfill."""
+        if self.bar_feed is not None:
+            self.get_bar_feeds().release(self.bar_feed)
+            self.bar_feed = None
+
     def calculate_opening_range(self, df: pd.DataFrame):
         today = datetime.datetime.now(self.tz).date()
         # Filter today & first 15 minutes (3 * 5-minute candles)
@@ -177,27 +221,136 @@ class SPYORBStrategy:
     # ---------------------------------------------------------------------
     # Order helpers
     # ---------------------------------------------------------------------
-    def place_order(self, action: str, quantity: int):
+    def place_order(self, action: str, quantity: int, order_ref: str = ""):
+        """Submit a market order for the open option; fills are reported to ``on_order_filled``."""
         if self.option_contract is None:
             raise RuntimeError("Option contract not initialised before order placement.")
-        order = MarketOrder(action, quantity)
-        trade = self.ib.placeOrder(self.option_contract, order)
-        self.ib.sleep(1)
+        self.latency.mark("signal")
+        order = MarketOrder(action, quantity, orderRef=order_ref)
+        trade = self.latency.track(self.get_order_manager().submit(
+            self.option_contract, order,
+            on_fill=self.on_order_filled, on_partial=self.on_partial_fill, on_reject=self.on_order_rejected,
+        ))
         print(f"{datetime.datetime.now(self.tz)} — {action} {quantity} {self.option_contract.localSymbol}")
         return trade
 
+    def on_order_filled(self, trade: Trade, price: float, pnl: float):
+        contract = trade.contract
+        if contract is self.option_contract and self.journal is not None:
+            self.journal.fill(contract, trade.order.action, trade.order.totalQuantity, price)
+        if trade.order.action == "BUY":
+            if contract is self.option_contract:
+                self.entry_option_price = price  # Replace the quote seen at submit with the real fill
+                if self.exits is not None:
+                    self.exits.submit(price)
+            print(f"Bought {trade.order.totalQuantity:g} {contract.localSymbol} at {price:.2f}")
+            return
+        print(f"Sold {trade.order.totalQuantity:g} {contract.localSymbol} at {price:.2f} | P/L: ${pnl:.2f}")
+        if contract is self.option_contract:
+            # A server-side exit filled: reconcile the position with what is still held
+            held = self.get_order_manager().position(contract)
+            if held > 0:
+                self._close_half(held)
+            else:
+                self._clear_position()
+
+    def on_partial_fill(self, trade: Trade, fill: Fill):
+        print(f"Partial fill: {fill.execution.shares:g} of {trade.order.totalQuantity:g} {trade.contract.localSymbol} at {fill.execution.price:.2f}")
+
+    def on_order_rejected(self, trade: Trade, reason: str):
+        contract = trade.contract
+        print(f"{trade.order.action} {trade.order.totalQuantity:g} {contract.localSymbol} rejected: {reason}")
+        if trade.order.action == "BUY" and contract is self.option_contract and not trade.fills:
+            # The entry never happened; stop managing it
+            if self.exits is not None:
+                self.exits.cancel()
+            self.get_quote_cache().unsubscribe(contract)
+            self._clear_position()
+        elif trade.order.action == "SELL":
+            if self.exits is not None and self.exits.failed:
+                print("Server-side exits failed — managing the position client-side.")
+            else:
+                print(f"WARNING: {contract.localSymbol} may still be open — check TWS.")
+
+    def _clear_position(self):
+        if self.journal is not None and self.option_contract is not None:
+            self.journal.close(self.option_contract)
+        self.position = None
+
+    def _close_half(self, remaining: int):
+        self.update_current(half_sold=True, contracts_remaining=remaining)
+        if self.journal is not None:
+            self.journal.update(self.option_contract, half_position_closed=True)
+
+    def recover_positions(self):
+        """Pick up the position an earlier run left open (once, before the first pass).
+
+        Working orders earlier runs left (e.g. its server-side exits, an entry
+        that never filled) are cancelled; the position is managed client-side
+        from here on.
+        """
+        if self.journal is None or self.journal_recovered:
+            return
+        self.journal_recovered = True
+        manager = self.get_order_manager()
+        for record in self.recover_journal():
+            contract, state = record["contract"], record["state"]
+            if self.position is not None:
+                print(f"WARNING: {contract.localSymbol} also journaled — left to the trader.")
+                continue
+            self.update_current(
+                type=state["position"], contract=contract,
+                entry_underlying_price=state["entry_underlying_price"],
+                entry_option_price=record["fill_price"] or state["entry_option_price"],
+                entry_strike=state["entry_strike"], half_sold=state["half_position_closed"],
+                contracts_remaining=int(record["quantity"]),
+            )
+            self.daily_trade_done = True
+            manager.restore(contract, record["quantity"], self.entry_option_price)
+            print(f"Recovered {self.position} — {record['quantity']:g} {contract.localSymbol} @ {self.entry_option_price:.2f}")
+
     def enter_position(self, position_type: str):
-        """Enter CALL or PUT position (always buying options)."""
+        """Enter CALL or PUT position (always buying options).
+
+        The position and its exits are recorded before the order is sent:
+        the quote and contract lookups can run the event loop, and the entry
+        fill must find them (and its price must not be overwritten by the
+        quote) when it arrives.
+        """
         right = "C" if position_type == "CALL" else "P"
-        self.option_contract = self.get_option_contract(right)
-        self.place_order("BUY", self.contracts)
-
-        # Record entry stats
-        self.position = position_type
-        self.entry_underlying_price = self.get_underlying_price()
-        opt_ticker = self.ib.reqTickers(self.option_contract)[0]
-        self.entry_option_price = opt_ticker.marketPrice()
-        self.entry_strike = self.option_contract.strike
+        option_contract = self.get_option_contract(right)
+        entry_underlying = self.get_underlying_price()
+        exits = None
+        if self.server_side_exits:
+            # Placed with the entry fill price as the breakeven stop
+            sign = 1 if position_type == "CALL" else -1
+            exits = ServerExits(
+                self.get_order_manager(), self.get_qualified_stock_contract(), option_contract, self.contracts,
+                first_target=entry_underlying + sign * self.underlying_move_target,
+                second_target=option_contract.strike + sign * self.itm_offset,
+                on_fill=self.on_order_filled, on_reject=self.on_order_rejected,
+            )
+
+        # Record entry stats (the option price is the quote until the fill arrives)
+        self.update_current(
+            type=position_type,
+            contract=option_contract,
+            entry_underlying_price=entry_underlying,
+            entry_option_price=self.get_quote_cache().price(option_contract),
+            entry_strike=option_contract.strike,
+            contracts_remaining=self.contracts,
+            entry_time=datetime.datetime.now(self.tz),
+            exits=exits,
+        )
+        order_ref = ""
+        if self.journal is not None:
+            # Write-ahead: the intent is on disk before the order can fill
+            order_ref = self.journal.open(
+                self.option_contract, self.contracts, position=position_type,
+                entry_underlying_price=self.entry_underlying_price, entry_option_price=self.entry_option_price,
+                entry_strike=self.entry_strike, half_position_closed=False,
+            )
+        self.place_order("BUY", self.contracts, order_ref=order_ref)
         print(
             f"Entered {position_type} — Underlying: {self.entry_underlying_price:.2f}, Option: {self.entry_option_price:.2f}, Strike: {self.entry_strike}"
         )
@@ -206,122 +359,135 @@ class SPYORBStrategy:
         if self.position is None or self.option_contract is None:
             return
         remaining = self.contracts // 2 if self.half_position_closed else self.contracts
-        self.place_order("SELL", remaining)
-        # Log P/L (rough, per option contract)
-        opt_price = self.ib.reqTickers(self.option_contract)[0].marketPrice()
-        pnl_per_contract = (opt_price - self.entry_option_price) * 100
-        direction = "CALL" if self.position == "CALL" else "PUT"
-        # Reset
-        self.position = None
-        self.option_contract = None
-        self.entry_underlying_price = None
-        self.entry_option_price = None
-        self.entry_strike = None
-        self.half_position_closed = False
+        if self.exits is not None and self.exits.active:
+            self.exits.cancel()
+            # Sell what the fills say is held; the entry may still be working
+            remaining = self.get_order_manager().position(self.option_contract) or remaining
+        self.place_order("SELL", remaining)  # P/L is logged from the fill
+        print(f"Exiting {self.position} — {reason}")
+        self.get_quote_cache().unsubscribe(self.option_contract)
+        self._clear_position()
 
     # ---------------------------------------------------------------------
     # Core loop
     # ---------------------------------------------------------------------
+    def step(self) -> float:
+        """Run one pass of the trading logic.
+
+        Returns the number of seconds to wait before the next pass.  ``run``
+        sleeps for that long; ``StrategyRuntime`` wakes earlier on bar closes,
+        quote ticks and order-status changes.
+        """
+        self.recover_positions()
+
+        # Handle market hours
+        if not self.is_market_open():
+            if self.position is not None:
+                print("Market closed — force exiting open position.")
+                self.exit_all("Market closed")
+            self.daily_trade_done = False  # Reset for next day
+            self.stop_bar_feed()
+            return self.get_calendar().seconds_until_next(datetime.datetime.now(self.tz))
+
+        # Option chain for today's expiry (loaded once per session)
+        self.load_option_chain()
+
+        # Force-close time
+        if self.is_force_close_time() and self.position is not None:
+            print("Force-close time reached — closing position.")
+            self.exit_all("14:55 force close")
+
+        # Historical bars — used for signals
+        df = self.get_intraday_5min()
+        if df is None or df.empty:
+            print("No historical data — waiting…")
+            return 30
+        self.latency.begin(last_arrival(self.bar_feed, self.quote_cache, self.get_stock_contract()))
+
+        # Ensure opening range captured
+        if not self.opening_range_set:
+            self.calculate_opening_range(df)
+            return 5  # Need the range before anything else
+
+        # Entry check (one trade per day)
+        if not self.daily_trade_done and self.position is None:
+            last_closed = df.iloc[-2]  # Last *completed* 5-minute bar
+            if last_closed["close"] > self.opening_range_high:
+                self.enter_position("CALL")
+                self.daily_trade_done = True
+            elif last_closed["close"] < self.opening_range_low:
+                self.enter_position("PUT")
+                self.daily_trade_done = True
+
+        # Manage open position
+        if self.position is not None:
+            underlying_price = self.get_underlying_price()
+            option_price = self.get_option_price(self.option_contract)
+
+            # Initial stop loss (based on opening range)
+            last_closed = df.iloc[-2]
+            if self.position == "CALL" and last_closed["close"] < self.opening_range_low:
+                self.exit_all("Initial stop loss (CALL)")
+                return 5
+            if self.position == "PUT" and last_closed["close"] > self.opening_range_high:
+                self.exit_all("Initial stop loss (PUT)")
+                return 5
+
+            # Targets and breakeven stop are worked by IB; the fills reconcile the state
+            if self.exits is not None and self.exits.active:
+                return 5
+
+            # Profit target 1 — underlying ± $1
+            if not self.half_position_closed:
+                if self.position == "CALL" and underlying_price >= self.entry_underlying_price + self.underlying_move_target:
+                    self.place_order("SELL", self.contracts // 2)
+                    self._close_half(self.contracts - self.contracts // 2)
+                    print("First profit target hit — sold half, stop moved to breakeven.")
+                elif self.position == "PUT" and underlying_price <= self.entry_underlying_price - self.underlying_move_target:
+                    self.place_order("SELL", self.contracts // 2)
+                    self._close_half(self.contracts - self.contracts // 2)
+                    print("First profit target hit — sold half, stop moved to breakeven.")
+
+            # Breakeven stop on remaining half
+            if self.half_position_closed:
+                if option_price <= self.entry_option_price:
+                    self.exit_all("Breakeven stop (remaining half)")
+                    return 5
+
+            # Profit target 2 — option 1.05 ITM
+            if self.position == "CALL" and underlying_price >= self.entry_strike + self.itm_offset:
+                self.exit_all("Second profit target (CALL)")
+                return 5
+            if self.position == "PUT" and underlying_price <= self.entry_strike - self.itm_offset:
+                self.exit_all("Second profit target (PUT)")
+                return 5
+
+        # Loop nap — 5-sec granularity is more than enough for 5-min bars
+        return 5
+
+    def shutdown(self):
+        """Flatten any open position before the connection goes away."""
+        if self.position is not None:
+            self.exit_all("Shutdown")
+        self.get_order_manager().wait()  # Let the exit fills arrive before disconnecting
+        if self.recorder is not None:
+            self.recorder.close()
+
     def run(self):
         if not self.connect_to_ib():
             return
 
         try:
-            daily_trade_done = False
+            self.daily_trade_done = False
             print("Starting SPY ORB strategy …")
             while True:
-                now = datetime.datetime.now(self.tz)
-
-                # Handle market hours
-                if not self.is_market_open():
-                    if self.position is not None:
-                        print("Market closed — force exiting open position.")
-                        self.exit_all("Market closed")
-                    daily_trade_done = False  # Reset for next day
-                    time.sleep(60)
-                    continue
-
-                # Force-close time
-                if self.is_force_close_time() and self.position is not None:
-                    print("Force-close time reached — closing position.")
-                    self.exit_all("14:55 force close")
-
-                # Historical bars — used for signals
-                df = self.get_intraday_5min()
-                if df is None or df.empty:
-                    print("No historical data — waiting…")
-                    time.sleep(30)
-                    continue
-
-                # Ensure opening range captured
-                if not self.opening_range_set:
-                    self.calculate_opening_range(df)
-                    time.sleep(5)
-                    continue  # Need the range before anything else
-
-                # Entry check (one trade per day)
-                if not daily_trade_done and self.position is None:
-                    last_closed = df.iloc[-2]  # Last *completed* 5-minute bar
-                    if last_closed["close"] > self.opening_range_high:
-                        self.enter_position("CALL")
-                        daily_trade_done = True
-                    elif last_closed["close"] < self.opening_range_low:
-                        self.enter_position("PUT")
-                        daily_trade_done = True
-
-                # Manage open position
-                if self.position is not None:
-                    underlying_price = self.get_underlying_price()
-                    option_price = self.ib.reqTickers(self.option_contract)[0].marketPrice()
-
-                    # Initial stop loss (based on opening range)
-                    last_closed = df.iloc[-2]
-                    if self.position == "CALL" and last_closed["close"] < self.opening_range_low:
-                        self.exit_all("Initial stop loss (CALL)")
-                        time.sleep(5)
-                        continue
-                    if self.position == "PUT" and last_closed["close"] > self.opening_range_high:
-                        self.exit_all("Initial stop loss (PUT)")
-                        time.sleep(5)
-                        continue
-
-                    # Profit target 1 — underlying ± $1
-                    if not self.half_position_closed:
-                        if self.position == "CALL" and underlying_price >= self.entry_underlying_price + self.underlying_move_target:
-                            self.place_order("SELL", self.contracts // 2)
-                            self.half_position_closed = True
-                            print("First profit target hit — sold half, stop moved to breakeven.")
-                        elif self.position == "PUT" and underlying_price <= self.entry_underlying_price - self.underlying_move_target:
-                            self.place_order("SELL", self.contracts // 2)
-                            self.half_position_closed = True
-                            print("First profit target hit — sold half, stop moved to breakeven.")
-
-                    # Breakeven stop on remaining half
-                    if self.half_position_closed:
-                        if option_price <= self.entry_option_price:
-                            self.exit_all("Breakeven stop (remaining half)")
-                            time.sleep(5)
-                            continue
-
-                    # Profit target 2 — option 1.05 ITM
-                    if self.position == "CALL" and underlying_price >= self.entry_strike + self.itm_offset:
-                        self.exit_all("Second profit target (CALL)")
-                        time.sleep(5)
-                        continue
-                    if self.position == "PUT" and underlying_price <= self.entry_strike - self.itm_offset:
-                        self.exit_all("Second profit target (PUT)")
-                        time.sleep(5)
-                        continue
-
-                # Loop nap — 5-sec granularity is more than enough for 5-min bars
-                time.sleep(5)
+                self.ib.sleep(self.step())
         except KeyboardInterrupt:
             print("User interrupted — shutting down.")
         except Exception as exc:
             print(f"Unhandled error: {exc}")
         finally:
-            if self.position is not None:
-                self.exit_all("Shutdown")
+            self.shutdown()
             self.ib.disconnect()
             print("Disconnected from Interactive Brokers.")
 
@@ -336,6 +502,15 @@ if __name__ == "__main__":
     parser.add_argument("--itm_offset", type=float, default=1.05, help="Underlying distance beyond strike for second target")
     parser.add_argument("--paper_trading", action="store_true", help="Use paper trading account (7497)")
     parser.add_argument("--port", type=int, default=7497, help="Port number")
+    parser.add_argument("--bar_store", type=str, default=None, help="Directory of the on-disk bar store")
+    parser.add_argument("--warm_days", type=int, default=0, help="Stored sessions loaded to warm up indicators")
+    parser.add_argument("--gateway", type=str, default=None, help="Address of a shared IB gateway to use instead of a direct connection")
+    parser.add_argument("--bar_bus", type=str, default=None, help="Name prefix of the shared-memory bar bus to read bars from")
+    parser.add_argument("--server_side_exits", action="store_true", help="Submit targets and breakeven stop to IB as conditional OCA orders at entry")
+    parser.add_argument("--target_delta", type=float, default=None, help="Pick the option whose delta is closest to this (0.5 = at the money) instead of the nearest strike")
+    parser.add_argument("--latency_file", type=str, default=None, help="JSON file the stage latency histograms are exported to")
+    parser.add_argument("--journal", type=str, default=None, help="SQLite file open positions are journaled to for crash recovery")
+    parser.add_argument("--record", type=str, default=None, help="Directory every quote, bar and order event is recorded to")
 
     args = parser.parse_args()
 
@@ -346,5 +521,20 @@ if __name__ == "__main__":
         itm_offset=args.itm_offset,
         paper_trading=args.paper_trading,
         port=args.port,
+        server_side_exits=args.server_side_exits,
+        target_delta=args.target_delta,
     )
+    if args.gateway:
+        strategy.ib = GatewayIB(args.gateway)
+    if args.bar_bus:
+        strategy.bar_feeds = SharedBarFeedCache(args.bar_bus)
+    if args.bar_store:
+        strategy.bar_store = BarStore(args.bar_store, strategy.bar_size)
+        strategy.warm_days = args.warm_days
+    if args.latency_file:
+        start_export(args.latency_file)
+    if args.journal:
+        strategy.journal = PositionJournal(args.journal, f"{type(strategy).__name__} {strategy.ticker}")
+    if args.record:
+        strategy.recorder = TickRecorder(args.record, f"{type(strategy).__name__}_{strategy.ticker}")
     strategy.run() 
\ No newline at end of file
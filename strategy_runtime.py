@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# Event-driven runtime for the CHAD strategies
+# Runs any number of strategies on one asyncio event loop and one IB connection, waking each on bar closes, ticks and order-status changes.
+
+import asyncio
+from ib_insync import *
+
+from bar_feed import BarFeedCache
+from option_chain import OptionChainCache
+from position_book import PositionBook
+from quote_cache import QuoteCache
+
+
+class StrategyRuntime:
+    """Drive the strategies' ``step()`` methods from IB events.
+
+    Every strategy gets its own asyncio task on the shared event loop.  After a
+    pass the task sleeps until the first of:
+
+    * the strategy's bar feed completing a bar,
+    * a tick on the strategy's underlying (streamed with ``reqMktData``),
+    * an order-status change on the connection,
+    * the delay returned by ``step()`` (the old polling interval, now a fallback).
+
+    All strategies share ``self.ib``, ``self.quotes``, ``self.chains`` and
+    ``self.bar_feeds``, so N strategies need one connection, one market data
+    line per contract, one option chain load per underlying, one bar
+    subscription (and indicator pass) per contract and no threads.  ``step()`` still uses ib_insync's blocking helpers; the event
+    loop is patched for nesting so those calls keep servicing the other tasks.
+
+    ``self.positions`` holds the open positions of every strategy with a
+    position book, to be marked against ``self.quotes`` in one pass.  With a
+    ``RiskEngine`` in ``self.risk`` (set by the launcher), a kill switch halts
+    every strategy without its shutdown flatten: the engine closes the
+    positions itself.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 7497,
+        client_id: int = 1,
+        ib: IB | None = None,
+        min_interval: float = 0.25,
+    ):
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.ib = ib if ib is not None else IB()
+        self.quotes = QuoteCache(self.ib)
+        self.chains = OptionChainCache(self.ib)
+        self.bar_feeds = BarFeedCache(self.ib)
+        self.positions = PositionBook()  # Every strategy's book is nested in it
+        self.risk = None  # RiskEngine on this connection (optional, set by the launcher)
+        self._halted = False
+        self.min_interval = min_interval  # Floor between passes when woken by ticks
+
+        self.strategies: list = []
+        self._wakeups: dict[int, asyncio.Event] = {}
+        self._watched_feeds: set[tuple[int, int]] = set()  # (feed, strategy) pairs already hooked
+        self._subscribers: dict[tuple, list] = {}
+        self._running = False
+
+    # ------------------------------------------------------------------
+    # Registration
+    # ------------------------------------------------------------------
+    def add(self, strategy):
+        """Register a strategy and hand it the shared connection, quotes, option chains and bar feeds."""
+        strategy.ib = self.ib
+        strategy.quote_cache = self.quotes.share()
+        strategy.option_chains = self.chains
+        strategy.bar_feeds = self.bar_feeds
+        if isinstance(getattr(strategy, "positions", None), PositionBook):
+            strategy.positions = PositionBook(parent=self.positions)
+        if getattr(strategy, "recorder", None) is not None:
+            strategy.recorder.watch_quotes(strategy.quote_cache)
+        self.strategies.append(strategy)
+        return strategy
+
+    @staticmethod
+    def _underlying(strategy) -> Contract | None:
+        if hasattr(strategy, "get_stock_contract"):
+            return strategy.get_stock_contract()
+        if hasattr(strategy, "ticker") and isinstance(strategy.ticker, str):
+            return Stock(strategy.ticker, "SMART", "USD")
+        return None
+
+    # ------------------------------------------------------------------
+    # Event wiring
+    # ------------------------------------------------------------------
+    def _wake(self, strategy):
+        event = self._wakeups.get(id(strategy))
+        if event is not None:
+            event.set()
+
+    def _wake_all(self, *args):
+        for strategy in self.strategies:
+            self._wake(strategy)
+
+    def _subscribe_ticks(self, strategy):
+        """Stream the underlying once per contract and wake every strategy trading it."""
+        contract = self._underlying(strategy)
+        if contract is None:
+            return
+        key = QuoteCache.key(contract)
+        if key not in self._subscribers:
+            ticker = self.quotes.subscribe(contract)
+            ticker.updateEvent.connect(lambda _ticker, key=key: self._on_tick(key))
+        self._subscribers.setdefault(key, []).append(strategy)
+
+    def _on_tick(self, key: tuple):
+        for strategy in self._subscribers.get(key, ()):
+            self._wake(strategy)
+
+    def _watch_bar_feed(self, strategy):
+        """Bar feeds are created lazily by the strategies; hook each one the first time it appears.
+
+        A feed shared by several strategies is hooked once per strategy so a bar close wakes all of them.
+        """
+        feed = getattr(strategy, "bar_feed", None)
+        if feed is None or (id(feed), id(strategy)) in self._watched_feeds:
+            return
+        feed.bar_close_event.connect(lambda _feed: self._wake(strategy))
+        self._watched_feeds.add((id(feed), id(strategy)))
+
+    # ------------------------------------------------------------------
+    # Task per strategy
+    # ------------------------------------------------------------------
+    async def _drive(self, strategy):
+        name = type(strategy).__name__
+        loop = asyncio.get_event_loop()
+        wakeup = self._wakeups[id(strategy)] = asyncio.Event()
+        while self._running:
+            started = loop.time()
+            wakeup.clear()
+            try:
+                delay = strategy.step()
+            except Exception as exc:
+                print(f"{name}: unhandled error: {exc}")
+                break
+            if delay is None:
+                print(f"{name}: stopped.")
+                break
+            self._watch_bar_feed(strategy)
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                continue
+            # Woken by an event: don't spin faster than the tick cadence
+            remaining = self.min_interval - (loop.time() - started)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+
+    async def run_async(self):
+        """Connect (if needed), run every registered strategy until it stops, then flatten."""
+        if not self.ib.isConnected():
+            await self.ib.connectAsync(self.host, self.port, clientId=self.client_id)
+            print(f"Connected to Interactive Brokers on port {self.port} (client {self.client_id})")
+
+        self._running = True
+        self.ib.orderStatusEvent.connect(self._wake_all)
+        if self.risk is not None:
+            self.risk.kill_event.connect(self.halt)
+            self.risk.start()
+        for strategy in self.strategies:
+            self._subscribe_ticks(strategy)
+
+        tasks = [asyncio.ensure_future(self._drive(strategy)) for strategy in self.strategies]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self._running = False
+            for task in tasks:
+                task.cancel()
+            self.ib.orderStatusEvent.disconnect(self._wake_all)
+            if not self._halted:
+                self._shutdown_strategies()
+
+    def _shutdown_strategies(self):
+        for strategy in self.strategies:
+            try:
+                strategy.shutdown()
+            except Exception as exc:
+                print(f"{type(strategy).__name__}: shutdown failed: {exc}")
+
+    def stop(self):
+        """Ask every strategy task to finish after its current pass."""
+        self._running = False
+        self._wake_all()
+
+    def halt(self, reason: str = ""):
+        """Stop every strategy without flattening: the risk engine's kill switch closes the positions."""
+        print(f"Halting all strategies — {reason}")
+        self._halted = True
+        self.stop()
+
+    def run(self):
+        """Blocking entry point: run all strategies on the current thread's event loop."""
+        run_runtimes([self])
+
+
+def run_runtimes(runtimes: list[StrategyRuntime]):
+    """Run several runtimes (e.g. one per IB port) on the current thread's event loop until all finish."""
+    util.patchAsyncio()  # step() calls ib_insync's blocking helpers from inside the loop
+    try:
+        util.run(*(runtime.run_async() for runtime in runtimes))
+    except KeyboardInterrupt:
+        # run_until_complete does not unwind the tasks on Ctrl-C, so flatten here
+        print("User interrupted — shutting down.")
+        for runtime in runtimes:
+            runtime._running = False
+            if not runtime._halted:
+                runtime._shutdown_strategies()
+    finally:
+        for runtime in runtimes:
+            runtime.quotes.clear()
+            runtime.ib.disconnect()
+        print("Disconnected from Interactive Brokers.")
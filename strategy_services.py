@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# Shared services of the CHAD strategies
+# The quote cache, option chains, pricer, bar feeds and order manager a strategy builds on first use, unless a launcher or host hands it shared ones.
+
+from ib_insync import *
+
+from bar_feed import BarFeed, BarFeedCache
+from clock import WALL
+from greeks import ChainPricer, years_to_expiry
+from option_chain import OptionChainCache
+from order_manager import OrderManager
+from quote_cache import QuoteCache
+from session_calendar import SessionCalendar
+
+
+class StrategyServices:
+    """Lazy getters for the services of the BOSK, REV, ORB and EMA CHAD strategies.
+
+    Each service is an attribute that stays None until its ``get_*`` getter
+    first runs and builds it with ``lazy``; each strategy's ``get_calendar``
+    builds its ``SessionCalendar`` the same way, from its own settings.  A
+    launcher or host sets the attribute beforehand to share its own
+    (``StrategyRuntime`` hands out its connection's quotes, option chains and
+    bar feeds), and the getter then returns that one.  ``recorder`` (a
+    ``TickRecorder``) and ``clock`` are set by the launcher and by replay.py;
+    the recorder watches the quotes and orders of the services built here.
+    """
+
+    stock_contract: Contract | None = None  # Qualified underlying
+    bar_feed: BarFeed | None = None
+    bar_feeds: BarFeedCache | None = None
+    quote_cache: QuoteCache | None = None
+    option_chains: OptionChainCache | None = None
+    pricer: ChainPricer | None = None
+    order_manager: OrderManager | None = None
+    calendar: SessionCalendar | None = None  # Session times for today, rebuilt when the day changes
+    recorder = None
+    clock = WALL
+
+    def lazy(self, name: str, factory):
+        """``self.<name>``, built with *factory* and kept the first time it is None."""
+        value = getattr(self, name)
+        if value is None:
+            value = factory()
+            setattr(self, name, value)
+        return value
+
+    # ------------------------------------------------------------------
+    # Underlying
+    # ------------------------------------------------------------------
+    def get_stock_contract(self):
+        return Stock(self.ticker, "SMART", "USD")
+
+    def get_qualified_stock_contract(self) -> Contract:
+        """The underlying with its conId, for price conditions (qualified once)."""
+        return self.lazy("stock_contract", self._qualified_stock_contract)
+
+    def _qualified_stock_contract(self) -> Contract:
+        contract = self.get_stock_contract()
+        self.ib.qualifyContracts(contract)
+        return contract
+
+    def get_underlying_price(self) -> float:
+        return self.get_quote_cache().price(self.get_stock_contract())
+
+    # ------------------------------------------------------------------
+    # Services
+    # ------------------------------------------------------------------
+    def get_quote_cache(self) -> QuoteCache:
+        """Streaming quotes kept across loop passes."""
+        return self.lazy("quote_cache", self._new_quote_cache)
+
+    def _new_quote_cache(self) -> QuoteCache:
+        quotes = QuoteCache(self.ib, clock=self.clock.monotonic)
+        if self.recorder is not None:
+            self.recorder.watch_quotes(quotes)
+        return quotes
+
+    def get_option_chains(self) -> OptionChainCache:
+        """Option chains loaded once per session."""
+        return self.lazy("option_chains", lambda: OptionChainCache(self.ib))
+
+    def get_pricer(self) -> ChainPricer:
+        """Implied vols and greeks of the chain, from the quote cache's streams."""
+        return self.lazy("pricer", lambda: ChainPricer(self.get_quote_cache()))
+
+    def get_bar_feeds(self) -> BarFeedCache:
+        """Bar feeds by contract, shared with the other strategies of a host process."""
+        return self.lazy("bar_feeds", lambda: BarFeedCache(self.ib, clock=self.clock))
+
+    def get_order_manager(self) -> OrderManager:
+        """Order submission and fill tracking, journaled when the launcher set a journal."""
+        return self.lazy("order_manager", self._new_order_manager)
+
+    def _new_order_manager(self) -> OrderManager:
+        manager = OrderManager(self.ib, journal=self.journal)
+        if self.recorder is not None:
+            self.recorder.watch_orders(self.ib)
+        return manager
+
+    # ------------------------------------------------------------------
+    # Recovery
+    # ------------------------------------------------------------------
+    def recover_journal(self) -> list[dict]:
+        """The positions of the journal IB still holds, with the orders earlier runs left working cancelled.
+
+        Orders on a recovered option (e.g. its server-side exits) and on the
+        records the journal dropped (an entry that never filled, a stop on a
+        position sold by hand) are cancelled; recovered positions are managed
+        client-side from here on.
+        """
+        manager = self.get_order_manager()
+        records = self.journal.recover(self.ib.positions(), symbol=self.ticker, fills=self.ib.fills())
+        for record in records + self.journal.dropped:
+            manager.cancel_orders(record["contract"], record["orders"], order_ref=record.get("ref"))
+        return records
+
+    # ------------------------------------------------------------------
+    # Option pricing
+    # ------------------------------------------------------------------
+    def years_to_expiry(self, expiry: str) -> float:
+        return years_to_expiry(self.clock.now(self.tz), expiry, self.get_calendar())
+
+    def get_option_price(self, contract: Contract) -> float:
+        """Option quote, or its theoretical value while the quote is stale."""
+        expiry = contract.lastTradeDateOrContractMonth
+        return self.get_pricer().option_price(contract, self.get_underlying_price(), self.years_to_expiry(expiry))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# Parameter sweep for the CHAD strategies
+# Backtests grids or random samples of constructor parameters across tickers on a process pool and ranks the results.
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from backtest import DayMatrix, SCRIPTS, load_bars, run_backtest, _parse_value
+
+# Constructor arguments that only matter to the live connection
+LIVE_ONLY = {"ticker", "contracts", "paper_trading", "port"}
+
+
+# ---------------------------------------------------------------------------
+# Parameter spaces
+# ---------------------------------------------------------------------------
+def grid(space: dict[str, list]) -> list[dict]:
+    """Every combination of the listed values."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_samples(ranges: dict[str, tuple], n: int, seed: int = 0) -> list[dict]:
+    """*n* uniform draws; a range with integer bounds draws integers."""
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(n):
+        sample = {}
+        for name, (low, high) in ranges.items():
+            if isinstance(low, int) and isinstance(high, int):
+                sample[name] = int(rng.integers(low, high + 1))
+            else:
+                sample[name] = round(float(rng.uniform(low, high)), 4)
+        samples.append(sample)
+    return samples
+
+
+def config_params(config_file: str, strategy: str) -> dict[str, dict]:
+    """Per-ticker constructor arguments of *strategy* from ``config.yaml`` (enabled or not)."""
+    with open(config_file, "r") as f:
+        config = yaml.safe_load(f)
+    params = {}
+    for entry in config.get("strategies", {}).values():
+        if SCRIPTS.get(entry.get("script")) != strategy:
+            continue
+        args = entry.get("args", {})
+        params[args.get("ticker", "SPY")] = {k: v for k, v in args.items() if k not in LIVE_ONLY}
+    return params
+
+
+# ---------------------------------------------------------------------------
+# Shared bar data
+# ---------------------------------------------------------------------------
+class SharedBars:
+    """Day matrices of every ticker placed in shared memory once, attached by each worker."""
+
+    def __init__(self, matrices: dict[str, DayMatrix]):
+        self.blocks: list[shared_memory.SharedMemory] = []
+        self.specs = {}
+        for ticker, m in matrices.items():
+            stacked = m.stacked()
+            block = shared_memory.SharedMemory(create=True, size=stacked.nbytes)
+            np.ndarray(stacked.shape, dtype=stacked.dtype, buffer=block.buf)[:] = stacked
+            self.blocks.append(block)
+            self.specs[ticker] = (block.name, stacked.shape, m.days, m.open_minute, m.bar_minutes)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+
+_worker_blocks: list[shared_memory.SharedMemory] = []
+_worker_matrices: dict[str, DayMatrix] = {}
+
+
+def _attach(specs: dict):
+    """Pool initializer: map the shared day matrices into this worker."""
+    for ticker, (name, shape, days, open_minute, bar_minutes) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        stacked = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        _worker_blocks.append(block)  # Keep the mapping alive for the worker's lifetime
+        _worker_matrices[ticker] = DayMatrix.from_arrays(days, stacked, open_minute, bar_minutes)
+
+
+def _evaluate(task: tuple[str, str, dict]) -> dict:
+    strategy, ticker, params = task
+    summary = run_backtest(strategy, None, m=_worker_matrices[ticker], **params).summary()
+    return {"ticker": ticker, **params, **summary}
+
+
+# ---------------------------------------------------------------------------
+# Sweep
+# ---------------------------------------------------------------------------
+def run_sweep(
+    strategy: str,
+    bars: dict[str, pd.DataFrame],
+    combos: list[dict],
+    base_params: dict[str, dict] | None = None,
+    workers: int | None = None,
+    metric: str = "total_pnl",
+) -> pd.DataFrame:
+    """Backtest every combo on every ticker and return the results ranked by *metric*."""
+    base_params = base_params or {}
+    matrices = {ticker: DayMatrix(df) for ticker, df in bars.items()}
+    tasks = [
+        (strategy, ticker, {**base_params.get(ticker, {}), **combo})
+        for ticker in matrices
+        for combo in combos
+    ]
+    workers = workers or os.cpu_count() or 1
+    shared = SharedBars(matrices)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(shared.specs,)) as pool:
+            chunksize = max(1, len(tasks) // (workers * 8))
+            rows = list(pool.map(_evaluate, tasks, chunksize=chunksize))
+    finally:
+        shared.close()
+    results = pd.DataFrame(rows)
+    return results.sort_values(metric, ascending=False, ignore_index=True)
+
+
+def _parse_space(items: list[str]) -> dict[str, list]:
+    return {name: [_parse_value(v) for v in values.split(",")] for name, values in (i.split("=", 1) for i in items)}
+
+
+def _parse_ranges(items: list[str]) -> dict[str, tuple]:
+    ranges = {}
+    for item in items:
+        name, bounds = item.split("=", 1)
+        low, high = bounds.split(":")
+        ranges[name] = (_parse_value(low), _parse_value(high))
+    return ranges
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters over historical bars")
+    parser.add_argument("--strategy", type=str, default="orb", choices=sorted(set(SCRIPTS.values())), help="Strategy rules")
+    parser.add_argument("--data-dir", type=str, default="data", help="Directory holding <TICKER>.csv, <TICKER>.parquet or bar store <TICKER>/ folders")
+    parser.add_argument("--tickers", type=str, default=None, help="Comma-separated tickers (default: the strategy's config.yaml entries)")
+    parser.add_argument("--config", type=str, default="config.yaml", help="Base parameters per ticker")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...", help="Grid values (repeatable)")
+    parser.add_argument("--random", type=int, default=0, help="Number of random samples instead of a grid")
+    parser.add_argument("--range", action="append", default=[], metavar="NAME=LOW:HIGH", help="Sampling range (repeatable)")
+    parser.add_argument("--seed", type=int, default=0, help="Random sampling seed")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--metric", type=str, default="total_pnl", help="Summary column to rank by")
+    parser.add_argument("--top", type=int, default=20, help="Rows to print")
+    parser.add_argument("--out", type=str, default=None, help="Write the full ranked table to this CSV")
+
+    args = parser.parse_args()
+    base = config_params(args.config, args.strategy) if os.path.exists(args.config) else {}
+    tickers = args.tickers.split(",") if args.tickers else sorted(base) or ["SPY"]
+
+    bars = {}
+    for ticker in tickers:
+        for ext in (".parquet", ".csv", ""):  # "" = a bar store directory
+            path = os.path.join(args.data_dir, ticker + ext)
+            if os.path.exists(path):
+                bars[ticker] = load_bars(path)
+                break
+        else:
+            print(f"No bar data for {ticker} in {args.data_dir} — skipping.")
+    if not bars:
+        raise SystemExit("No bar data found.")
+
+    if args.random:
+        combos = random_samples(_parse_ranges(args.range), args.random, args.seed)
+    else:
+        combos = grid(_parse_space(args.grid))
+    print(f"Sweeping {len(combos)} combinations × {len(bars)} tickers for {args.strategy} …")
+
+    results = run_sweep(args.strategy, bars, combos, base, args.workers, args.metric)
+    print(results.head(args.top).to_string(index=False))
+    if args.out:
+        results.to_csv(args.out, index=False)
+        print(f"Wrote {len(results)} rows to {args.out}")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# Unit tests for the vectorized backtester
+
+import datetime
+import unittest
+import numpy as np
+import pandas as pd
+import pytz
+
+from backtest import DayMatrix, ema_rows, rsi_rows, atr_rows, run_backtest, backtest_orb
+from spy_bosk_strategy import SPYBOSKStrategy
+from spy_rev_strategy import SPYREVStrategy
+
+
+def make_bars(n_days: int = 40, seed: int = 3) -> pd.DataFrame:
+    """Random-walk regular-session 5-minute bars."""
+    rng = np.random.default_rng(seed)
+    tz = pytz.timezone("US/Central")
+    dates = [
+        tz.localize(datetime.datetime.combine(day.date(), datetime.time(8, 30)) + datetime.timedelta(minutes=5 * j))
+        for day in pd.bdate_range("2023-01-02", periods=n_days)
+        for j in range(78)
+    ]
+    n = len(dates)
+    close = 400 + np.cumsum(rng.normal(0, 0.35, n))
+    open_ = np.r_[close[0], close[:-1]] + rng.normal(0, 0.05, n)
+    return pd.DataFrame({
+        "date": dates,
+        "open": open_,
+        "high": np.maximum(open_, close) + np.abs(rng.normal(0, 0.2, n)),
+        "low": np.minimum(open_, close) - np.abs(rng.normal(0, 0.2, n)),
+        "close": close,
+        "volume": rng.integers(1000, 50000, n).astype(float),
+    })
+
+
+def orb_reference(m: DayMatrix, move_target: float, itm_offset: float, force_bar: int) -> list[float]:
+    """Bar-by-bar ORB replay with the same fill conventions as the vectorized engine."""
+    pnls = []
+    for d in range(m.shape[0]):
+        o, h, l, c = m.open[d], m.high[d], m.low[d], m.close[d]
+        or_high, or_low = h[:3].max(), l[:3].min()
+        signal = next((j for j in range(3, m.shape[1]) if c[j] > or_high or c[j] < or_low), None)
+        if signal is None or signal + 1 >= force_bar:
+            continue
+        side = 1 if c[signal] > or_high else -1
+        entry = signal + 1
+        price = o[entry]
+        second = side * (round(price) - price) + itm_offset
+        half_bar, pending_stop, exit_price = None, False, None
+        for b in range(entry, m.shape[1]):
+            if b > entry and pending_stop:
+                exit_price = o[b]
+                break
+            if b == force_bar:
+                exit_price = o[b]
+                break
+            favourable = h[b] - price if side > 0 else price - l[b]
+            if half_bar is None and favourable >= move_target:
+                half_bar = b
+            if favourable >= second:
+                exit_price = price + side * second
+                break
+            if half_bar is not None and b > half_bar and (l[b] <= price if side > 0 else h[b] >= price):
+                exit_price = price
+                break
+            pending_stop = c[b] < or_low if side > 0 else c[b] > or_high
+        if exit_price is None:
+            exit_price = c[-1]
+        move = side * (exit_price - price)
+        pnls.append(0.5 * move_target + 0.5 * move if half_bar is not None else move)
+    return pnls
+
+
+class TestDayMatrix(unittest.TestCase):
+    def test_layout_drops_off_session_and_pads_gaps(self):
+        df = make_bars(n_days=2)
+        df = df.drop(index=5)  # Missing bar on day one
+        extra = df.iloc[[0]].copy()
+        extra["date"] = extra["date"] - datetime.timedelta(hours=2)  # Pre-market
+        m = DayMatrix(pd.concat([extra, df]))
+        self.assertEqual(m.shape, (2, 78))
+        self.assertTrue(np.isnan(m.close[0, 5]))
+        self.assertEqual(m.close[1, 0], df["close"].iloc[77])
+        self.assertEqual(m.slot("14:55:00"), 77)
+
+
+class TestIndicators(unittest.TestCase):
+    def setUp(self):
+        self.day = make_bars(n_days=1)
+        self.m = DayMatrix(self.day)
+
+    def test_bosk_indicators_match_strategy(self):
+        expected = SPYBOSKStrategy().calculate_indicators(self.day.copy())
+        np.testing.assert_allclose(ema_rows(self.m.close, 9)[0], expected["ema9"], rtol=1e-12)
+        np.testing.assert_allclose(atr_rows(self.m.high, self.m.low, self.m.close, 20)[0], expected["atr"], rtol=1e-12)
+
+    def test_rsi_matches_strategy(self):
+        expected = SPYREVStrategy().calculate_indicators(self.day.copy())
+        np.testing.assert_allclose(rsi_rows(self.m.close, 14)[0], expected["rsi"], rtol=1e-9)
+
+
+class TestStrategies(unittest.TestCase):
+    def setUp(self):
+        self.df = make_bars()
+
+    def test_orb_matches_bar_by_bar_replay(self):
+        result = backtest_orb(self.df, underlying_move_target=1.0, itm_offset=1.05)
+        m = DayMatrix(self.df)
+        expected = orb_reference(m, 1.0, 1.05, m.slot("14:55:00"))
+        np.testing.assert_allclose(result.trades["pnl"].to_numpy(), expected)
+
+    def test_every_strategy_runs_by_script_name(self):
+        for script in ("spy_orb_strategy.py", "spy_bosk_strategy.py", "spy_rev_strategy.py", "spy_ema_chad.py"):
+            summary = run_backtest(script, self.df).summary()
+            self.assertEqual(summary["days"], 40)
+            self.assertGreaterEqual(summary["max_drawdown"], 0.0)
+
+    def test_trades_close_before_force_time(self):
+        m = DayMatrix(self.df)
+        for name in ("orb", "bosk", "rev", "ema_chad"):
+            trades = run_backtest(name, self.df, m=m).trades
+            self.assertTrue((trades["exit_bar"] <= m.slot("14:55:00")).all(), name)
+            self.assertTrue((trades["exit_bar"] >= trades["entry_bar"]).all(), name)
+            if name in ("orb", "ema_chad"):
+                self.assertEqual(trades.groupby("day").size().max(), 1, name)  # One trade per day
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# Unit tests for the streaming bar feed
+
+import unittest
+from unittest.mock import Mock, MagicMock
+import datetime
+import pandas as pd
+from ib_insync import BarData, BarDataList, Stock
+
+from bar_feed import BarBuffer, BarFeed, BarFeedCache
+from indicators import BOSKIndicators, REVIndicators
+
+
+def make_bar(minute: int, close: float) -> BarData:
+    return BarData(
+        date=datetime.datetime(2023, 1, 3, 8, 30) + datetime.timedelta(minutes=minute),
+        open=close - 0.5,
+        high=close + 1.0,
+        low=close - 1.0,
+        close=close,
+        volume=1000.0,
+        average=close,
+        barCount=10,
+    )
+
+
+class TestBarBuffer(unittest.TestCase):
+    def test_append_grows_and_preserves_rows(self):
+        """Appending past capacity keeps every row in order."""
+        buffer = BarBuffer.from_df(pd.DataFrame([make_bar(0, 400.0).__dict__]), capacity=2)
+        for i in range(1, 10):
+            buffer.append(make_bar(5 * i, 400.0 + i))
+        self.assertEqual(len(buffer), 10)
+        self.assertEqual(list(buffer.column("close")), [400.0 + i for i in range(10)])
+
+    def test_update_last_overwrites_forming_bar(self):
+        buffer = BarBuffer.from_df(pd.DataFrame([make_bar(0, 400.0).__dict__, make_bar(5, 401.0).__dict__]))
+        buffer.update_last(make_bar(5, 402.5))
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(buffer.column("close")[-1], 402.5)
+
+    def test_column_is_read_only_view(self):
+        buffer = BarBuffer.from_df(pd.DataFrame([make_bar(0, 400.0).__dict__]))
+        with self.assertRaises(ValueError):
+            buffer.column("close")[0] = 1.0
+
+    def test_to_df_matches_source(self):
+        df = pd.DataFrame([make_bar(0, 400.0).__dict__, make_bar(5, 401.0).__dict__])
+        self.assertTrue(BarBuffer.from_df(df).to_df().equals(df))
+
+
+class TestBarFeed(unittest.TestCase):
+    def setUp(self):
+        self.ib = Mock()
+        self.bars = BarDataList([make_bar(0, 400.0), make_bar(5, 401.0)])
+        self.ib.reqHistoricalData = MagicMock(return_value=self.bars)
+        self.feed = BarFeed(self.ib, Stock("SPY", "SMART", "USD"))
+
+    def test_start_backfills_once(self):
+        self.assertTrue(self.feed.start())
+        self.assertTrue(self.feed.start())
+        self.ib.reqHistoricalData.assert_called_once()
+        kwargs = self.ib.reqHistoricalData.call_args[1]
+        self.assertTrue(kwargs["keepUpToDate"])
+        self.assertEqual(kwargs["durationStr"], "1 D")
+        self.assertEqual(len(self.feed.to_df()), 2)
+
+    def test_start_without_bars(self):
+        self.ib.reqHistoricalData = MagicMock(return_value=[])
+        self.assertFalse(self.feed.start())
+        self.assertFalse(self.feed.is_active)
+        self.assertIsNone(self.feed.to_df())
+
+    def test_forming_bar_update(self):
+        self.feed.start()
+        self.bars[-1] = make_bar(5, 403.0)
+        self.bars.updateEvent.emit(self.bars, False)
+        df = self.feed.to_df()
+        self.assertEqual(len(df), 2)
+        self.assertEqual(df["close"].iloc[-1], 403.0)
+
+    def test_new_bar_finalises_previous_and_emits_close(self):
+        closed = []
+        self.feed.start()
+        self.feed.bar_close_event.connect(lambda feed: closed.append(len(feed)))
+
+        # Final tick of the 08:35 bar arrives together with the new 08:40 bar
+        self.bars[-1] = make_bar(5, 401.75)
+        self.bars.append(make_bar(10, 402.0))
+        self.bars.updateEvent.emit(self.bars, True)
+
+        df = self.feed.to_df()
+        self.assertEqual(list(df["close"]), [400.0, 401.75, 402.0])
+        self.assertEqual(closed, [3])
+
+    def test_stop_cancels_subscription(self):
+        self.ib.isConnected = MagicMock(return_value=True)
+        self.feed.start()
+        self.feed.stop()
+        self.ib.cancelHistoricalData.assert_called_once_with(self.bars)
+        self.assertFalse(self.feed.is_active)
+
+        # Updates after stopping are ignored
+        self.bars.append(make_bar(10, 402.0))
+        self.bars.updateEvent.emit(self.bars, True)
+        self.assertIsNone(self.feed.to_df())
+
+
+class TestBarFeedCache(unittest.TestCase):
+    def setUp(self):
+        self.ib = Mock()
+        self.ib.reqHistoricalData = MagicMock(return_value=BarDataList([make_bar(0, 400.0), make_bar(5, 401.0)]))
+        self.feeds = BarFeedCache(self.ib)
+        self.spy = Stock("SPY", "SMART", "USD")
+
+    def test_same_contract_shares_feed_and_indicators(self):
+        a = self.feeds.get(self.spy, indicators=BOSKIndicators())
+        b = self.feeds.get(Stock("SPY", "SMART", "USD"), indicators=BOSKIndicators())
+        c = self.feeds.get(self.spy, indicators=REVIndicators())
+        self.assertIs(a, b)
+        self.assertIs(a, c)
+        self.assertEqual(len(a.indicator_sets), 2)
+        a.start()
+        b.start()
+        self.ib.reqHistoricalData.assert_called_once()
+        self.assertIsNot(self.feeds.get(Stock("QQQ", "SMART", "USD")), a)
+
+    def test_clashing_indicators_get_own_feed(self):
+        a = self.feeds.get(self.spy, indicators=BOSKIndicators(kc_mult=1.5))
+        b = self.feeds.get(self.spy, indicators=BOSKIndicators(kc_mult=2.0))
+        self.assertIsNot(a, b)
+        self.assertEqual(len(self.feeds), 2)
+        with self.assertRaises(ValueError):
+            a.add_indicators(BOSKIndicators(kc_mult=2.0))
+
+    def test_last_release_stops_shared_feed(self):
+        self.ib.isConnected = MagicMock(return_value=True)
+        a = self.feeds.get(self.spy, indicators=BOSKIndicators())
+        b = self.feeds.get(self.spy, indicators=REVIndicators())
+        a.start()
+        self.feeds.release(a)
+        self.assertTrue(b.is_active)  # Still held by the other strategy
+        self.ib.cancelHistoricalData.assert_not_called()
+        self.feeds.release(b)
+        self.assertFalse(b.is_active)
+        self.ib.cancelHistoricalData.assert_called_once()
+
+        # A later session gets the same feed back and backfills again
+        self.assertIs(self.feeds.get(self.spy, indicators=BOSKIndicators()), a)
+        self.assertTrue(a.start())
+        self.assertEqual(self.ib.reqHistoricalData.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# Unit tests for the on-disk bar store
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock, MagicMock
+
+import pytz
+from ib_insync import BarData, BarDataList, Stock
+
+from bar_feed import BarFeed
+from bar_store import BarStore, read_bars, bar_seconds
+from clock import Clock
+
+TZ = pytz.timezone("US/Central")
+
+
+def make_bar(day: datetime.date, minute: int, close: float) -> BarData:
+    return BarData(
+        date=TZ.localize(datetime.datetime.combine(day, datetime.time(8, 30)) + datetime.timedelta(minutes=minute)),
+        open=close - 0.5,
+        high=close + 1.0,
+        low=close - 1.0,
+        close=close,
+        volume=1000.0,
+        average=close,
+        barCount=10,
+    )
+
+
+class TestBarStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = BarStore(self.root)
+        self.day = datetime.date(2024, 3, 4)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_append_skips_bars_already_stored(self):
+        bars = [make_bar(self.day, 5 * i, 500.0 + i) for i in range(4)]
+        self.assertEqual(self.store.append("SPY", bars[:3]), 3)
+        self.assertEqual(self.store.append("SPY", bars), 1)
+        # A fresh store instance reads the last bar back from disk
+        self.assertEqual(BarStore(self.root).append("SPY", bars), 0)
+        records = self.store.read_day("SPY", self.day)
+        self.assertEqual(list(records["close"]), [500.0, 501.0, 502.0, 503.0])
+        self.assertEqual(self.store.last_bar("SPY", self.day), bars[-1].date)
+
+    def test_bars_split_per_day_and_loaded_in_order(self):
+        next_day = self.day + datetime.timedelta(days=1)
+        self.store.append("SPY", [make_bar(self.day, 0, 500.0), make_bar(next_day, 0, 501.0), make_bar(next_day, 5, 502.0)])
+        self.assertEqual(self.store.days("SPY"), [self.day, next_day])
+        self.assertEqual(len(self.store.load("SPY", next_day, days=1)), 2)
+        df = self.store.load("SPY", next_day, days=2)
+        self.assertEqual(list(df["close"]), [500.0, 501.0, 502.0])
+        self.assertEqual(df["date"].iloc[0], make_bar(self.day, 0, 0).date)
+        self.assertEqual(len(read_bars(self.store.directory("SPY"))), 3)
+
+    def test_partial_record_is_dropped(self):
+        self.store.append("SPY", [make_bar(self.day, 0, 500.0)])
+        with open(self.store.path("SPY", self.day), "ab") as f:
+            f.write(b"\x00" * 7)  # Interrupted write
+        self.assertEqual(len(BarStore(self.root).read_day("SPY", self.day)), 1)
+        self.assertEqual(BarStore(self.root).append("SPY", [make_bar(self.day, 5, 501.0)]), 1)
+        self.assertEqual(list(self.store.read_day("SPY", self.day)["close"]), [500.0, 501.0])
+
+    def test_bar_seconds(self):
+        self.assertEqual(bar_seconds("5 mins"), 300)
+        self.assertEqual(bar_seconds("1 hour"), 3600)
+
+
+class FixedClock(Clock):
+    def __init__(self, when: datetime.datetime):
+        self.when = when
+
+    def now(self, tz=None) -> datetime.datetime:
+        return self.when.astimezone(tz)
+
+
+class TestBarFeedWithStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = BarStore(self.root)
+        self.today = datetime.datetime.now(TZ).date()
+        self.yesterday = self.today - datetime.timedelta(days=1)
+        self.ib = Mock()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def make_feed(self, ib_bars, history_days=0, **kwargs) -> BarFeed:
+        self.bars = BarDataList(ib_bars)
+        self.ib.reqHistoricalData = MagicMock(return_value=self.bars)
+        return BarFeed(self.ib, Stock("SPY", "SMART", "USD"), store=self.store, history_days=history_days, **kwargs)
+
+    def test_restart_requests_only_the_gap(self):
+        self.store.append("SPY", [make_bar(self.today, 5 * i, 500.0 + i) for i in range(3)])
+        feed = self.make_feed([make_bar(self.today, 10, 502.0), make_bar(self.today, 15, 503.0)])
+        self.assertTrue(feed.start())
+        duration = self.ib.reqHistoricalData.call_args[1]["durationStr"]
+        self.assertTrue(duration.endswith(" S"))
+        self.assertEqual(list(feed.to_df()["close"]), [500.0, 501.0, 502.0, 503.0])
+
+    def test_history_days_prepended_and_new_bars_stored(self):
+        self.store.append("SPY", [make_bar(self.yesterday, 5 * i, 490.0 + i) for i in range(2)])
+        feed = self.make_feed([make_bar(self.today, 0, 500.0), make_bar(self.today, 5, 501.0)], history_days=1)
+        feed.start()
+        self.assertEqual(self.ib.reqHistoricalData.call_args[1]["durationStr"], "1 D")
+        self.assertEqual(list(feed.to_df()["close"]), [490.0, 491.0, 500.0, 501.0])
+        self.assertEqual(len(self.store.read_day("SPY", self.today)), 1)  # Forming bar is not stored
+
+        self.bars.append(make_bar(self.today, 10, 502.0))
+        self.bars.updateEvent.emit(self.bars, True)
+        self.assertEqual(list(feed.to_df()["close"]), [490.0, 491.0, 500.0, 501.0, 502.0])
+        self.assertEqual(list(self.store.read_day("SPY", self.today)["close"]), [500.0, 501.0])
+
+    def test_replayed_day_follows_the_clock(self):
+        day = datetime.date(2024, 3, 5)
+        self.store = BarStore(self.root, read_only=True)
+        writer = BarStore(self.root)
+        writer.append("SPY", [make_bar(day - datetime.timedelta(days=1), 5 * i, 490.0 + i) for i in range(2)])
+        writer.append("SPY", [make_bar(day, 5 * i, 600.0 + i) for i in range(6)])  # The day as recorded live
+        clock = FixedClock(TZ.localize(datetime.datetime.combine(day, datetime.time(8, 40))))
+        feed = self.make_feed([make_bar(day, 0, 500.0), make_bar(day, 5, 501.0), make_bar(day, 10, 502.0)],
+                              history_days=1, clock=clock)
+        feed.start()
+        # Stored bars ahead of the clock are requested again, not read back
+        self.assertEqual(self.ib.reqHistoricalData.call_args[1]["durationStr"], "1 D")
+        self.assertEqual(list(feed.to_df()["close"]), [490.0, 491.0, 500.0, 501.0, 502.0])
+        self.assertEqual(self.store.append("SPY", [make_bar(day, 30, 503.0)]), 0)
+        self.assertEqual(len(writer.read_day("SPY", day)), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
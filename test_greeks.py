@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# Unit tests for the option pricing module
+
+import datetime
+import math
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pytz
+from ib_insync import Stock
+
+from greeks import ChainPricer, greeks, implied_vol, norm_cdf, price, years_to_expiry
+from quote_cache import QuoteCache
+from session_calendar import SessionCalendar
+from sim_fixtures import SimTestCase
+
+TZ = pytz.timezone("US/Central")
+
+
+class TestBlackScholes(unittest.TestCase):
+    spot = 500.0
+    strikes = np.arange(490.0, 511.0)
+    t = 4 / 24 / 365  # Four hours to the 0-DTE close
+
+    def test_norm_cdf(self):
+        x = np.linspace(-8, 8, 401)
+        expected = [0.5 * math.erfc(-v / math.sqrt(2)) for v in x]
+        np.testing.assert_allclose(norm_cdf(x), expected, atol=1e-7)
+
+    def test_put_call_parity_and_greeks(self):
+        g_call = greeks(self.spot, self.strikes, self.t, 0.2, True, rate=0.05)
+        g_put = greeks(self.spot, self.strikes, self.t, 0.2, False, rate=0.05)
+        np.testing.assert_allclose(g_call["value"] - g_put["value"], self.spot - self.strikes * math.exp(-0.05 * self.t))
+        np.testing.assert_allclose(g_call["delta"] - g_put["delta"], 1.0)
+
+        h = 0.05  # Finite differences also pick up the ~1e-7 error of the normal CDF approximation
+        up = price(self.spot + h, self.strikes, self.t, 0.2, True, rate=0.05)
+        down = price(self.spot - h, self.strikes, self.t, 0.2, True, rate=0.05)
+        np.testing.assert_allclose(g_call["delta"], (up - down) / (2 * h), atol=1e-3)
+        np.testing.assert_allclose(g_call["gamma"], (up - 2 * g_call["value"] + down) / h ** 2, rtol=1e-2, atol=1e-2)
+        vega = (price(self.spot, self.strikes, self.t, 0.21, True, rate=0.05) - price(self.spot, self.strikes, self.t, 0.19, True, rate=0.05)) / 2
+        np.testing.assert_allclose(g_call["vega"], vega, atol=1e-4)
+        self.assertTrue((g_call["theta"] < 0).all())
+
+    def test_implied_vol_round_trip(self):
+        is_call = np.arange(len(self.strikes)) % 2 == 0
+        vols = 0.15 + 0.002 * np.abs(self.strikes - self.spot)
+        for t in (self.t, 2 / 365):
+            premiums = price(self.spot, self.strikes, t, vols, is_call)
+            solved = implied_vol(premiums, self.spot, self.strikes, t, is_call)
+            # Far wings of a 0-DTE chain have no time value left and no implied vol
+            has_time_value = ~np.isnan(solved)
+            np.testing.assert_allclose(solved[5:16], vols[5:16], atol=1e-4)
+            np.testing.assert_allclose(price(self.spot, self.strikes, t, solved, is_call)[has_time_value],
+                                       premiums[has_time_value], atol=1e-6)
+        self.assertTrue(has_time_value.all())
+
+    def test_implied_vol_outside_bounds(self):
+        # Below intrinsic, above the underlying, and no time value left
+        solved = implied_vol([5.0, 600.0, 10.0], self.spot, [490.0, 490.0, 490.0], self.t, True)
+        self.assertTrue(np.isnan(solved).all())
+
+    def test_years_to_expiry_uses_the_session_close(self):
+        calendar = SessionCalendar(TZ, "08:30:00", "15:00:00")
+        now = TZ.localize(datetime.datetime(2024, 3, 4, 13, 0))
+        self.assertAlmostEqual(years_to_expiry(now, "20240304", calendar) * 365 * 24, 2.0)
+        early = TZ.localize(datetime.datetime(2024, 11, 29, 11, 0))  # Closes at 12:00 Central
+        self.assertAlmostEqual(years_to_expiry(early, "20241129", calendar) * 365 * 24, 1.0)
+        after = TZ.localize(datetime.datetime(2024, 3, 4, 15, 30))
+        self.assertAlmostEqual(years_to_expiry(after, "20240304", calendar) * 365 * 24 * 60, 1.0)
+
+
+class TestChainPricer(SimTestCase):
+    warmup = 3600
+
+    def setUp(self):
+        super().setUp()
+        self.clock = [0.0]
+        self.quotes = QuoteCache(self.ib, clock=lambda: self.clock[0])
+        self.chain = self.load_chain()
+        self.pricer = ChainPricer(self.quotes)
+        self.spot = self.quotes.price(Stock("SPY", "SMART", "USD"))
+        now = datetime.datetime.fromtimestamp(self.ib.time, TZ)
+        self.t = years_to_expiry(now, "20240304", SessionCalendar(TZ, "08:30:00", "15:00:00"))
+
+    def test_prices_the_chain_from_streaming_quotes(self):
+        self.assertEqual(self.pricer.subscribe(self.chain, "20240304", self.spot, width=3), 14)
+        self.assertEqual(self.pricer.subscribe(self.chain, "20240304", self.spot, width=3), 0)  # Once per expiry
+        self.ib.sleep(5)
+        with patch.object(self.ib, "reqTickers", side_effect=AssertionError("snapshot requested")):
+            priced = self.pricer.price_chain(self.chain, "20240304", self.spot, self.t)
+        quoted = ~np.isnan(priced["quote"])
+        self.assertEqual(quoted.sum(), 14)
+        self.assertFalse(np.isnan(priced["iv"]).any())  # Unquoted strikes interpolated
+        self.assertTrue((np.abs(priced["delta"]) <= 1).all())
+
+        atm = self.pricer.select_delta(self.chain, "C", "20240304", self.spot, self.t, 0.5)
+        self.assertLessEqual(abs(atm.strike - self.spot), 1.0)
+        itm = self.pricer.select_delta(self.chain, "C", "20240304", self.spot, self.t, 0.8)
+        self.assertLess(itm.strike, atm.strike)
+        put = self.pricer.select_delta(self.chain, "P", "20240304", self.spot, self.t, 0.3)
+        self.assertEqual(put.right, "P")
+        self.assertLess(put.strike, self.spot)
+
+    def test_theoretical_value_while_the_quote_is_stale(self):
+        contract = self.chain.select("C", self.spot, "20240304")
+        self.quotes.subscribe(contract)
+        self.ib.sleep(5)
+        quote = self.pricer.option_price(contract, self.spot, self.t)
+        self.assertEqual(quote, self.quotes.cached_price(contract))
+
+        self.clock[0] += 60  # No tick for a minute
+        self.assertFalse(self.quotes.is_fresh(contract))
+        theoretical = self.pricer.option_price(contract, self.spot + 1.0, self.t)
+        self.assertGreater(theoretical, quote)
+        self.assertAlmostEqual(theoretical, self.pricer.value(contract, self.spot + 1.0, self.t))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# Unit tests for the shared IB connection gateway
+
+import asyncio
+import datetime
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from ib_insync import (
+    BarData, BarDataList, CommissionReport, Contract, ContractDetails, Event, Execution, Fill, MarketOrder, OrderStatus,
+    Stock, Ticker, Trade,
+)
+
+from ib_gateway import IBGateway, GatewayIB
+
+AUTHKEY = b"test-key"
+
+
+def make_bar(minute: int, close: float) -> BarData:
+    return BarData(
+        date=datetime.datetime(2024, 3, 4, 8, 30) + datetime.timedelta(minutes=minute),
+        open=close, high=close + 1, low=close - 1, close=close, volume=100.0, average=close, barCount=1,
+    )
+
+
+class FakeIB:
+    """The slice of ``IB`` the gateway drives, recording upstream requests."""
+
+    def __init__(self):
+        self.orderStatusEvent = Event("orderStatusEvent")
+        self.execDetailsEvent = Event("execDetailsEvent")
+        self.tickers: list[Ticker] = []
+        self.bars: list[BarDataList] = []
+        self.cancelled_mktdata: list[Contract] = []
+        self.detail_requests = 0
+        self.trades: list[Trade] = []
+
+    def isConnected(self):
+        return True
+
+    def reqMktData(self, contract, genericTickList=""):
+        ticker = Ticker(contract=contract)
+        self.tickers.append(ticker)
+        return ticker
+
+    def cancelMktData(self, contract):
+        self.cancelled_mktdata.append(contract)
+
+    async def reqHistoricalDataAsync(self, contract, endDateTime, durationStr, barSizeSetting, whatToShow, useRTH,
+                                     formatDate=1, keepUpToDate=False):
+        await asyncio.sleep(0.05)
+        bars = BarDataList([make_bar(0, 500.0), make_bar(5, 501.0)])
+        self.bars.append(bars)
+        return bars
+
+    def cancelHistoricalData(self, bars):
+        pass
+
+    async def reqContractDetailsAsync(self, contract):
+        self.detail_requests += 1
+        await asyncio.sleep(0.05)
+        return [ContractDetails(contract=Contract(conId=99, symbol=contract.symbol))]
+
+    async def qualifyContractsAsync(self, *contracts):
+        for contract in contracts:
+            contract.conId = 756733
+        return list(contracts)
+
+    async def reqExecutionsAsync(self, execFilter=None):
+        return [fill for trade in self.trades for fill in trade.fills]
+
+    def placeOrder(self, contract, order):
+        order.orderId = len(self.trades) + 1
+        trade = Trade(contract, order, OrderStatus(orderId=order.orderId, status="PendingSubmit"))
+        self.trades.append(trade)
+        return trade
+
+
+class TestGateway(unittest.TestCase):
+    def setUp(self):
+        self.address = os.path.join(tempfile.mkdtemp(), "gateway.sock")
+        self.ib = FakeIB()
+        self.gateway = IBGateway(self.ib, self.address, AUTHKEY)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.gateway.serve(),), daemon=True)
+        self.thread.start()
+        self.clients = [GatewayIB(self.address, authkey=AUTHKEY).connect() for _ in range(2)]
+
+    def tearDown(self):
+        for client in self.clients:
+            client.disconnect()
+        self.loop.call_soon_threadsafe(self.gateway.stop)
+        self.thread.join(timeout=5)
+        self.loop.close()
+
+    def on_gateway(self, fn, *args):
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    def pump(self, condition, timeout: float = 2.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            for client in self.clients:
+                client.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_market_data_opened_once_and_fanned_out(self):
+        a, b = (client.reqMktData(Stock("SPY", "SMART", "USD")) for client in self.clients)
+        self.assertEqual(len(self.ib.tickers), 1)
+
+        upstream = self.ib.tickers[0]
+        upstream.bid, upstream.ask = 500.0, 500.1
+        self.on_gateway(upstream.updateEvent.emit, upstream)
+        self.pump(lambda: a.bid == 500.0 and b.ask == 500.1)
+
+        self.clients[0].cancelMktData(a.contract)
+        self.clients[0].sleep(0.1)
+        self.assertEqual(self.ib.cancelled_mktdata, [])
+        self.clients[1].disconnect()  # Last subscriber gone -> cancelled upstream
+        deadline = time.monotonic() + 2
+        while not self.ib.cancelled_mktdata and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.ib.cancelled_mktdata), 1)
+
+    def test_bar_updates_shared(self):
+        bars = [client.reqHistoricalData(Stock("SPY", "SMART", "USD"), "", "1 D", "5 mins", "TRADES", True,
+                                         keepUpToDate=True) for client in self.clients]
+        self.assertEqual(len(self.ib.bars), 1)
+        self.assertEqual([len(b) for b in bars], [2, 2])
+
+        events = []
+        bars[0].updateEvent += lambda b, has_new_bar: events.append(has_new_bar)
+        upstream = self.ib.bars[0]
+        upstream.append(make_bar(10, 502.0))
+        self.on_gateway(upstream.updateEvent.emit, upstream, True)
+        self.pump(lambda: len(bars[0]) == 3 and len(bars[1]) == 3)
+        self.assertEqual(events, [True])
+        self.assertEqual(bars[1][-1].close, 502.0)
+
+    def test_contract_calls_deduplicated_and_qualified_in_place(self):
+        contract = Stock("SPY", "SMART", "USD")
+        self.assertEqual(self.clients[0].qualifyContracts(contract), [contract])
+        self.assertEqual(contract.conId, 756733)
+
+        option = Contract(symbol="SPY", secType="OPT")
+        for client in self.clients:
+            self.assertEqual(client.reqContractDetails(option)[0].contract.conId, 99)
+        self.assertEqual(self.ib.detail_requests, 1)
+
+    def test_order_updates_go_to_the_owner(self):
+        statuses = [[], []]
+        for client, seen in zip(self.clients, statuses):
+            client.orderStatusEvent += lambda trade, seen=seen: seen.append(trade.orderStatus.status)
+        order = MarketOrder("BUY", 1)
+        trade = self.clients[0].placeOrder(Stock("SPY", "SMART", "USD"), order)
+        self.assertEqual(order.orderId, 1)
+
+        upstream = self.ib.trades[0]
+        upstream.orderStatus = OrderStatus(orderId=1, status="Filled", filled=1)
+        self.on_gateway(self.ib.orderStatusEvent.emit, upstream)
+        self.on_gateway(self.ib.execDetailsEvent.emit, upstream, Fill(upstream.contract, Execution(orderId=1, shares=1), CommissionReport(), datetime.datetime.now()))
+        self.pump(lambda: trade.fills)
+        self.assertEqual(statuses, [["Filled"], []])
+        self.assertEqual(trade.orderStatus.status, "Filled")
+
+    def test_fills_come_from_the_connection(self):
+        order = MarketOrder("BUY", 1, orderRef="entry-1")
+        self.clients[0].placeOrder(Stock("SPY", "SMART", "USD"), order)
+        upstream = self.ib.trades[0]
+        upstream.fills.append(Fill(upstream.contract, Execution(orderId=1, shares=1, orderRef="entry-1"), CommissionReport(), None))
+        # Another process (a restarted strategy) sees the execution by its orderRef
+        [fill] = self.clients[1].fills()
+        self.assertEqual(fill.execution.orderRef, "entry-1")
+
+    def test_wrong_key_is_rejected(self):
+        with self.assertRaises(Exception):
+            GatewayIB(self.address, authkey=b"wrong").connect()
+
+
+if __name__ == "__main__":
+    unittest.main()
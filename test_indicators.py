@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# Unit tests for the incremental indicator engine
+
+import unittest
+from unittest.mock import Mock, MagicMock
+import datetime
+import numpy as np
+import pandas as pd
+import pytz
+from ib_insync import BarData, BarDataList, Stock
+
+from bar_feed import BarFeed
+from indicators import EMA, RollingMean, BOSKIndicators, REVIndicators, EMAChadIndicators
+from spy_bosk_strategy import SPYBOSKStrategy
+from spy_rev_strategy import SPYREVStrategy
+from spy_ema_chad import SPYEMAChad
+
+
+def make_session_df(n_bars: int = 240, seed: int = 7) -> pd.DataFrame:
+    """Random-walk 5-minute bars spanning several sessions, with a flat stretch."""
+    rng = np.random.default_rng(seed)
+    tz = pytz.timezone("US/Central")
+    start = datetime.datetime(2023, 1, 3, 8, 30)
+    dates = [tz.localize(start + datetime.timedelta(days=i // 78, minutes=5 * (i % 78))) for i in range(n_bars)]
+    close = np.round(400 + np.cumsum(rng.normal(0, 0.3, n_bars)), 2)
+    close[n_bars // 6:n_bars // 4] = close[n_bars // 6]
+    return pd.DataFrame({
+        "date": dates,
+        "open": close + rng.normal(0, 0.1, n_bars),
+        "high": close + np.abs(rng.normal(0.3, 0.1, n_bars)),
+        "low": close - np.abs(rng.normal(0.3, 0.1, n_bars)),
+        "close": close,
+        "volume": rng.integers(100, 5000, n_bars).astype(float),
+    })
+
+
+class TestPrimitives(unittest.TestCase):
+    def test_ema_matches_pandas(self):
+        values = pd.Series(np.random.default_rng(1).normal(400, 2, 500))
+        ema = EMA(20)
+        streamed = [ema.update(x) for x in values]
+        expected = values.ewm(span=20, adjust=False).mean().to_numpy()
+        self.assertTrue(np.array_equal(streamed, expected))
+
+    def test_rolling_mean_matches_pandas(self):
+        values = pd.Series(np.r_[np.random.default_rng(2).normal(0, 1, 100), np.full(30, 0.25), -np.zeros(5)])
+        mean = RollingMean(14)
+        streamed = [mean.update(x) for x in values]
+        expected = values.rolling(window=14).mean().to_numpy()
+        self.assertTrue(np.array_equal(streamed, expected, equal_nan=True))
+
+    def test_peek_does_not_change_state(self):
+        ema = EMA(9)
+        for x in (400.0, 401.0, 402.0):
+            ema.update(x)
+        before = ema.value
+        ema.peek(410.0)
+        self.assertEqual(ema.value, before)
+
+
+class TestIndicatorSets(unittest.TestCase):
+    def setUp(self):
+        self.df = make_session_df()
+
+    def assertColumnsIdentical(self, expected: pd.DataFrame, actual: pd.DataFrame, columns):
+        for name in columns:
+            self.assertTrue(
+                np.array_equal(expected[name].to_numpy(dtype=float), actual[name].to_numpy(dtype=float), equal_nan=True),
+                f"{name} differs from the pandas formula",
+            )
+
+    def test_bosk_bit_compatible(self):
+        expected = SPYBOSKStrategy().calculate_indicators(self.df.copy())
+        self.assertColumnsIdentical(expected, BOSKIndicators().frame(self.df), BOSKIndicators.columns)
+
+    def test_rev_bit_compatible(self):
+        expected = SPYREVStrategy().calculate_indicators(self.df.copy())
+        self.assertColumnsIdentical(expected, REVIndicators().frame(self.df), REVIndicators.columns)
+
+    def test_ema_chad_bit_compatible(self):
+        expected = SPYEMAChad().calculate_indicators(self.df.copy())
+        self.assertColumnsIdentical(expected, EMAChadIndicators().frame(self.df), EMAChadIndicators.columns)
+
+    def test_provisional_update_is_repeatable(self):
+        indicators = BOSKIndicators()
+        rows = list(self.df.itertuples(index=False))
+        for bar in rows[:-1]:
+            indicators.update(bar)
+        first = indicators.update(rows[-1], provisional=True)
+        second = indicators.update(rows[-1], provisional=True)
+        self.assertEqual(first, second)
+        self.assertEqual(first, indicators.update(rows[-1]))
+
+
+class TestBarFeedIndicators(unittest.TestCase):
+    def test_streamed_columns_match_full_recompute(self):
+        df = make_session_df(n_bars=60)
+        bars = [BarData(date=r.date, open=r.open, high=r.high, low=r.low, close=r.close,
+                        volume=r.volume, average=r.close, barCount=1) for r in df.itertuples(index=False)]
+        live = BarDataList(bars[:30])
+        ib = Mock()
+        ib.reqHistoricalData = MagicMock(return_value=live)
+
+        strategy = SPYBOSKStrategy()
+        strategy.ib = ib
+        strategy.get_intraday_5min()
+
+        for bar in bars[30:]:
+            # One provisional tick for the forming bar, then the bar completes
+            live[-1] = BarData(**{**live[-1].__dict__, "close": live[-1].close + 0.1})
+            live.updateEvent.emit(live, False)
+            live[-1] = bars[len(live) - 1]
+            live.append(bar)
+            live.updateEvent.emit(live, True)
+
+        streamed = strategy.calculate_indicators(strategy.get_intraday_5min())
+        recomputed = SPYBOSKStrategy().calculate_indicators(df.copy())
+        ib.reqHistoricalData.assert_called_once()
+        for name in BOSKIndicators.columns:
+            self.assertTrue(np.array_equal(streamed[name].to_numpy(), recomputed[name].to_numpy()), name)
+
+    def test_foreign_frame_falls_back_to_pandas(self):
+        strategy = SPYBOSKStrategy()
+        strategy.bar_feed = BarFeed(Mock(), Stock("SPY", "SMART", "USD"))
+        df = strategy.calculate_indicators(make_session_df(n_bars=30))
+        self.assertIn("kc_upper", df.columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# Unit tests for the latency instrumentation
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from ib_insync import MarketOrder, Stock
+
+import latency
+from latency import LatencyHistogram, LatencyRecorder, last_arrival
+from sim_broker import SimIB
+from sim_fixtures import make_session
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles_within_bucket_resolution(self):
+        histogram = LatencyHistogram()
+        for ms in range(1, 101):
+            histogram.record(ms / 1000)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.percentile(50), 0.050, delta=0.050 * 0.05)
+        self.assertAlmostEqual(histogram.percentile(99), 0.099, delta=0.099 * 0.05)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        self.assertAlmostEqual(histogram.summary()["mean_ms"], 50.5)
+
+    def test_extremes_are_clamped(self):
+        histogram = LatencyHistogram()
+        histogram.record(0.0)
+        histogram.record(1e6)
+        self.assertEqual(histogram.counts[0], 1)
+        self.assertEqual(histogram.counts[-1], 1)
+
+
+class TestLatencyRecorder(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.recorder = LatencyRecorder("test", clock=self.clock)
+
+    def test_stages_measured_from_data_arrival(self):
+        self.recorder.begin(self.clock.now - 2.0)  # Bar arrived two seconds before the pass
+        self.clock.now += 0.01
+        self.recorder.mark("indicators")
+        summary = self.recorder.summary()
+        self.assertEqual(list(summary), ["data", "indicators"])
+        self.assertAlmostEqual(summary["data"]["p50_ms"], 2000, delta=2000 * 0.05)
+        self.assertAlmostEqual(summary["indicators"]["max_ms"], 2010)
+
+    def test_order_ack_and_fill(self):
+        ib = SimIB({"SPY": make_session([500.5] * 3)})
+        self.recorder.begin()
+        self.clock.now += 0.5
+        trade = self.recorder.track(ib.placeOrder(Stock("SPY", "SMART", "USD"), MarketOrder("BUY", 1)))
+        self.assertEqual(self.recorder.histograms["ack"].count, 1)  # SimIB acknowledges synchronously
+        self.clock.now += 0.25
+        ib.sleep(1)
+        self.assertEqual(trade.orderStatus.status, "Filled")
+        summary = self.recorder.summary()
+        self.assertEqual(list(summary)[:5], ["data", "submit", "ack", "fill", "submit_to_ack"])
+        self.assertEqual(summary["fill"]["max_ms"], 750)
+        self.assertEqual(summary["submit_to_fill"]["max_ms"], 250)
+        ib.sleep(1)
+        self.assertEqual(self.recorder.histograms["fill"].count, 1)
+
+    def test_last_arrival_takes_newest_source(self):
+        feed = Mock(updated_at=90.0)
+        quotes = Mock(clock=self.clock)
+        quotes.age.return_value = 5.0
+        self.assertEqual(last_arrival(feed, quotes, Stock("SPY", "SMART", "USD")), 95.0)
+        quotes.age.return_value = float("inf")
+        self.assertEqual(last_arrival(feed, quotes, Stock("SPY", "SMART", "USD")), 90.0)
+        self.assertIsNone(last_arrival())
+
+    def test_write_exports_every_recorder(self):
+        latency.recorder("export test").record("data", 0.002)
+        path = os.path.join(tempfile.mkdtemp(), "latency.json")
+        latency.write(path)
+        with open(path) as f:
+            data = json.load(f)
+        self.assertEqual(data["strategies"]["export test"]["data"]["count"], 1)
+
+    def test_summary_while_the_loop_records(self):
+        rec = LatencyRecorder("busy")
+        stop = threading.Event()
+
+        def loop():
+            i = 0
+            while not stop.is_set():
+                rec.record(f"stage {i % 500}", 0.001)  # New stages keep appearing
+                i += 1
+
+        thread = threading.Thread(target=loop)
+        thread.start()
+        try:
+            for _ in range(20):
+                rec.summary()
+        finally:
+            stop.set()
+            thread.join()
+
+    def test_export_thread_survives_a_failed_write(self):
+        path = os.path.join(tempfile.mkdtemp(), "latency.json")
+        calls = []
+        retried = threading.Event()
+
+        def flaky(path):
+            calls.append(path)
+            if len(calls) == 1:
+                raise RuntimeError("dictionary changed size during iteration")
+            retried.set()
+
+        with patch.object(latency, "write", flaky), patch("atexit.register"), \
+                contextlib.redirect_stdout(io.StringIO()) as out:
+            latency.start_export(path, interval=0.01)
+            self.assertTrue(retried.wait(5))
+        latency._exports.pop(path).set()
+        self.assertIn("RuntimeError", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
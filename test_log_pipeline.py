@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# Unit tests for the logging pipeline
+
+import contextlib
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from log_pipeline import LEVEL_ENV, debug, line_level, start_logging
+
+
+class TestLineLevel(unittest.TestCase):
+    def test_levels_from_strategy_output(self):
+        self.assertEqual(line_level("DEBUG: Indicators here:"), logging.DEBUG)
+        self.assertEqual(line_level("Unhandled error: boom"), logging.ERROR)
+        self.assertEqual(line_level("Traceback (most recent call last):"), logging.ERROR)
+        self.assertEqual(line_level("WARNING: SPY 1 may still be open — check TWS."), logging.WARNING)
+        self.assertEqual(line_level("SELL 2 SPY 1 rejected: No margin"), logging.WARNING)
+        self.assertEqual(line_level("KILL SWITCH: delta +612 beyond ±500 — cancelling all orders and flattening"), logging.CRITICAL)
+        self.assertEqual(line_level("Bought 2 SPY 1 at 2.10"), logging.INFO)
+
+
+class TestDebug(unittest.TestCase):
+    def test_dataframes_are_not_formatted_below_debug(self):
+        df = pd.DataFrame({"close": [1.0, 2.0]})
+        with patch.dict(os.environ, {LEVEL_ENV: "INFO"}), \
+                patch.object(pd.DataFrame, "__str__", side_effect=AssertionError("formatted")), \
+                contextlib.redirect_stdout(io.StringIO()) as out:
+            debug("Indicators here:", df)
+        self.assertEqual(out.getvalue(), "")
+
+        with patch.dict(os.environ, {LEVEL_ENV: "DEBUG"}), contextlib.redirect_stdout(io.StringIO()) as out:
+            debug("Indicators here:", df)
+        self.assertTrue(out.getvalue().startswith("DEBUG: Indicators here:"))
+
+
+class TestStartLogging(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.root_handlers = logging.getLogger().handlers[:]
+        self.root_level = logging.getLogger().level
+        self.env = patch.dict(os.environ)
+        self.env.start()
+
+    def tearDown(self):
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in self.root_handlers:
+            root.addHandler(handler)
+        root.setLevel(self.root_level)
+        self.env.stop()
+        shutil.rmtree(self.tmp)
+
+    def read(self, name: str) -> list[dict]:
+        with open(os.path.join(self.tmp, f"{name}.jsonl"), encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_records_routed_per_strategy(self):
+        listener = start_logging("info", self.tmp, console=False)
+        self.assertEqual(os.environ[LEVEL_ENV], "INFO")
+        manager = logging.getLogger("StrategyManager")
+        manager.info("Starting")
+        manager.getChild("spy_orb").warning("SELL 2 rejected: No margin", extra={"strategy": "spy_orb"})
+        manager.getChild("spy_orb").debug("dropped", extra={"strategy": "spy_orb"})
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+        [event] = self.read("spy_orb")
+        self.assertEqual(event["level"], "WARNING")
+        self.assertEqual(event["logger"], "StrategyManager.spy_orb")
+        self.assertEqual(event["strategy"], "spy_orb")
+        self.assertEqual(event["msg"], "SELL 2 rejected: No margin")
+        [event] = self.read("strategy_manager")
+        self.assertEqual(event["msg"], "Starting")
+        self.assertIsNone(event["strategy"])
+
+
+if __name__ == "__main__":
+    unittest.main()
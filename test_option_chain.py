@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# Unit tests for the option chain cache
+
+import datetime
+import unittest
+from unittest.mock import Mock, MagicMock
+from ib_insync import ContractDetails, Index, Option, OptionChain, Stock
+
+from option_chain import OptionChainCache, OptionChainIndex
+from spy_orb_strategy import SPYORBStrategy
+
+DAY = datetime.date(2023, 1, 3)
+EXPIRIES = ["20230103", "20230104", "20230106", "20230120"]
+STRIKES = [395.0, 396.0, 397.0, 398.0, 399.0, 400.0, 401.0, 402.0, 403.0]
+
+
+def listed_contracts(template: Option) -> list[ContractDetails]:
+    expiry = template.lastTradeDateOrContractMonth
+    return [
+        ContractDetails(contract=Option("SPY", expiry, strike, right, "SMART", conId=hash((expiry, strike, right)) & 0xFFFFFF))
+        for strike in STRIKES
+        for right in ("C", "P")
+    ]
+
+
+def make_ib() -> Mock:
+    ib = Mock()
+    ib.reqSecDefOptParams = MagicMock(return_value=[
+        OptionChain("CBOE", 756733, "SPY", "100", EXPIRIES, STRIKES),
+        OptionChain("SMART", 756733, "SPY", "100", EXPIRIES, STRIKES),
+    ])
+    ib.reqContractDetails = MagicMock(side_effect=listed_contracts)
+    return ib
+
+
+class TestOptionChainIndex(unittest.TestCase):
+    def setUp(self):
+        contracts = [d.contract for e in EXPIRIES for d in listed_contracts(Option("SPY", e))]
+        self.chain = OptionChainIndex("SPY", contracts)
+
+    def test_nearest_strike(self):
+        self.assertEqual(self.chain.nearest_strike("20230103", 400.4), 400.0)
+        self.assertEqual(self.chain.nearest_strike("20230103", 400.6), 401.0)
+        self.assertEqual(self.chain.nearest_strike("20230103", 380.0), 395.0)
+        self.assertEqual(self.chain.nearest_strike("20230103", 420.0), 403.0)
+        self.assertEqual(self.chain.nearest_strike("20230103", 400.2, offset=2), 402.0)
+        self.assertIsNone(self.chain.nearest_strike("20230105", 400.0))
+
+    def test_nearest_expiry(self):
+        self.assertEqual(self.chain.nearest_expiry(datetime.date(2023, 1, 5)), "20230104")
+        self.assertEqual(self.chain.nearest_expiry(datetime.date(2023, 1, 5), on_or_after=True), "20230106")
+        self.assertEqual(self.chain.nearest_expiry(datetime.date(2023, 1, 17)), "20230120")
+
+    def test_select_returns_qualified_contract(self):
+        contract = self.chain.select("P", 398.7, "20230103")
+        self.assertEqual((contract.strike, contract.right), (399.0, "P"))
+        self.assertTrue(contract.conId)
+
+
+class TestOptionChainCache(unittest.TestCase):
+    def test_loads_once_per_day(self):
+        ib = make_ib()
+        cache = OptionChainCache(ib)
+        chain = cache.load(Stock("SPY", "SMART", "USD", conId=756733), DAY, max_dte=3)
+        self.assertEqual(chain.expirations, ["20230103", "20230104", "20230106"])
+        self.assertIs(cache.load(Stock("SPY", "SMART", "USD", conId=756733), DAY, max_dte=0), chain)
+        self.assertEqual(ib.reqSecDefOptParams.call_count, 1)
+        self.assertEqual(ib.reqContractDetails.call_count, 3)
+
+    def test_picks_the_class_listing_the_nearest_expiry(self):
+        ib = make_ib()
+        ib.reqSecDefOptParams = MagicMock(return_value=[
+            OptionChain("SMART", 416904, "SPX", "100", ["20230120", "20230217"], STRIKES),
+            OptionChain("SMART", 416904, "SPXW", "100", EXPIRIES, STRIKES),
+        ])
+        chain = OptionChainCache(ib).load(Index("SPX", "CBOE", "USD", conId=416904), DAY, max_dte=0)
+        self.assertEqual(chain.expirations, ["20230103"])
+        self.assertEqual(ib.reqContractDetails.call_args[0][0].tradingClass, "SPXW")
+
+    def test_failed_load_not_retried_same_day(self):
+        ib = make_ib()
+        ib.reqSecDefOptParams = MagicMock(side_effect=RuntimeError("pacing violation"))
+        cache = OptionChainCache(ib)
+        self.assertIsNone(cache.load(Stock("SPY", "SMART", "USD", conId=756733), DAY))
+        self.assertIsNone(cache.load(Stock("SPY", "SMART", "USD", conId=756733), DAY))
+        self.assertEqual(ib.reqSecDefOptParams.call_count, 1)
+
+    def test_strategy_entry_uses_preloaded_chain(self):
+        strategy = SPYORBStrategy()
+        strategy.ib = make_ib()
+        today = datetime.datetime.now(strategy.tz).date()
+        strategy.ib.reqSecDefOptParams.return_value = [
+            OptionChain("SMART", 756733, "SPY", "100", [today.strftime("%Y%m%d")], STRIKES),
+        ]
+        strategy.get_underlying_price = MagicMock(return_value=400.3)
+
+        strategy.load_option_chain()
+        strategy.ib.reqContractDetails.reset_mock()
+        contract = strategy.get_option_contract("C")
+
+        self.assertEqual((contract.strike, contract.right), (400.0, "C"))
+        strategy.ib.reqContractDetails.assert_not_called()
+        strategy.ib.qualifyContracts.assert_called_once()  # Underlying only, at load time
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# Unit tests for the order manager
+
+import unittest
+
+from ib_insync import Execution, Fill, MarketOrder, Option, Order, OrderStatus, Trade
+
+from order_manager import OrderManager
+from sim_fixtures import SimTestCase
+
+
+class Recorder:
+    """Collects the manager's callbacks."""
+
+    def __init__(self):
+        self.fills, self.partials, self.rejects = [], [], []
+
+    def callbacks(self) -> dict:
+        return {
+            "on_fill": lambda trade, price, pnl: self.fills.append((trade, price, pnl)),
+            "on_partial": lambda trade, fill: self.partials.append(fill.execution.shares),
+            "on_reject": lambda trade, reason: self.rejects.append(reason),
+        }
+
+
+class ManualIB:
+    """Hands out trades that the test fills by hand."""
+
+    def __init__(self):
+        self.order_id = 0
+
+    def placeOrder(self, contract, order: Order) -> Trade:
+        self.order_id += 1
+        order.orderId = self.order_id
+        return Trade(contract, order, OrderStatus(orderId=order.orderId, status="Submitted"))
+
+
+def execute(trade: Trade, exec_id: str, shares: float, price: float):
+    fill = Fill(trade.contract, Execution(execId=exec_id, shares=shares, price=price), None, None)
+    trade.fills.append(fill)
+    trade.fillEvent.emit(trade, fill)
+
+
+class TestOrderManager(SimTestCase):
+    closes = [500.0 + i for i in range(12)]
+    spread = 1.0
+
+    def setUp(self):
+        super().setUp()
+        self.manager = OrderManager(self.ib)
+        self.recorder = Recorder()
+
+    def test_submit_does_not_wait_for_the_fill(self):
+        started = self.ib.now()
+        trade = self.manager.submit(self.spy, MarketOrder("BUY", 10), **self.recorder.callbacks())
+        self.assertEqual(self.ib.now(), started)  # No sleep inside submit
+        self.assertEqual(trade.orderStatus.status, "Submitted")
+        self.assertEqual(self.recorder.fills, [])
+        self.assertIn(trade.order.orderId, self.manager.open_trades)
+
+        self.ib.sleep(1)
+        [(filled, price, pnl)] = self.recorder.fills
+        self.assertIs(filled, trade)
+        self.assertAlmostEqual(price, trade.fills[0].execution.price)
+        self.assertEqual(pnl, 0.0)
+        self.assertEqual(self.manager.open_trades, {})
+        self.assertEqual(self.manager.position(self.spy), 10)
+
+    def test_pnl_from_fill_prices(self):
+        buy = self.manager.submit(self.spy, MarketOrder("BUY", 10), **self.recorder.callbacks())
+        self.ib.sleep(900)
+        sell = self.manager.submit(self.spy, MarketOrder("SELL", 10), **self.recorder.callbacks())
+        self.ib.sleep(1)
+        bought, sold = buy.fills[0].execution.price, sell.fills[0].execution.price
+        self.assertGreater(sold, bought)
+        self.assertAlmostEqual(self.recorder.fills[-1][2], (sold - bought) * 10)
+        self.assertAlmostEqual(self.manager.realized, (sold - bought) * 10)
+        self.assertEqual(self.manager.position(self.spy), 0)
+
+    def test_two_exits_cost_no_wall_time(self):
+        for action in ("BUY", "BUY"):
+            self.manager.submit(self.spy, MarketOrder(action, 1), **self.recorder.callbacks())
+        self.assertEqual(len(self.manager.open_trades), 2)
+        self.ib.sleep(self.ib.fill_latency)
+        self.assertEqual(len(self.recorder.fills), 2)
+
+    def test_reject_reports_reason(self):
+        order = Order(action="BUY", totalQuantity=1, orderType="MOC")
+        trade = self.manager.submit(self.spy, order, **self.recorder.callbacks())
+        self.assertEqual(trade.orderStatus.status, "PendingSubmit")
+        self.ib.sleep(1)
+        self.assertEqual(trade.orderStatus.status, "Inactive")
+        [reason] = self.recorder.rejects
+        self.assertIn("Error 321", reason)
+        self.assertEqual(self.recorder.fills, [])
+        self.assertEqual(self.manager.open_trades, {})
+
+    def test_cancel_reports_reject(self):
+        trade = self.manager.submit(self.spy, MarketOrder("BUY", 1), **self.recorder.callbacks())
+        self.ib.cancelOrder(trade.order)
+        self.assertEqual(self.recorder.rejects, ["Cancelled"])
+        self.assertEqual(self.manager.open_trades, {})
+
+
+class TestPartialFills(unittest.TestCase):
+    def setUp(self):
+        self.manager = OrderManager(ManualIB())
+        self.recorder = Recorder()
+        self.call = Option("SPY", "20240304", 500.0, "C", "SMART", multiplier="100", conId=1)
+
+    def test_partials_then_fill_with_average_price(self):
+        trade = self.manager.submit(self.call, MarketOrder("BUY", 3), **self.recorder.callbacks())
+        execute(trade, "a", 1, 2.00)
+        execute(trade, "b", 2, 2.30)
+        self.assertEqual(self.recorder.partials, [1])
+        self.assertEqual(self.recorder.fills, [])  # Status not Filled yet
+
+        trade.orderStatus.status = "Filled"
+        trade.statusEvent.emit(trade)
+        [(_, price, pnl)] = self.recorder.fills
+        self.assertAlmostEqual(price, 2.20)
+        self.assertEqual(pnl, 0.0)
+        self.assertAlmostEqual(self.manager.average_price(self.call), 2.20)
+
+        exit_trade = self.manager.submit(self.call, MarketOrder("SELL", 3), **self.recorder.callbacks())
+        exit_trade.orderStatus.status = "Filled"  # Status before the executions
+        exit_trade.statusEvent.emit(exit_trade)
+        self.assertEqual(len(self.recorder.fills), 1)
+        execute(exit_trade, "c", 3, 2.70)
+        self.assertAlmostEqual(self.recorder.fills[-1][2], 0.50 * 3 * 100)
+
+    def test_cancel_after_partial_fill(self):
+        trade = self.manager.submit(self.call, MarketOrder("BUY", 2), **self.recorder.callbacks())
+        execute(trade, "a", 1, 2.00)
+        trade.orderStatus.status = "Cancelled"
+        trade.statusEvent.emit(trade)
+        self.assertEqual(self.recorder.rejects, ["Cancelled"])
+        self.assertEqual(self.manager.position(self.call), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
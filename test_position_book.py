@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# Unit tests for the position book
+
+import datetime
+import json
+import math
+import unittest
+
+import numpy as np
+
+from position_book import Position, PositionBook
+from position_journal import _encode
+from sim_fixtures import SimTestCase
+from spy_bosk_strategy import SPYBOSKStrategy
+from spy_ema_chad import SPYEMAChad
+from spy_orb_strategy import SPYORBStrategy
+from spy_rev_strategy import SPYREVStrategy
+from strategy_runtime import StrategyRuntime
+
+
+class TestPositionBook(SimTestCase):
+    warmup = 3600
+
+    def setUp(self):
+        super().setUp()
+        chain = self.load_chain()
+        self.call = chain.select("C", 500.0, "20240304")
+        self.put = chain.select("P", 500.0, "20240304")
+
+    def test_lookup_by_contract_and_side(self):
+        book = PositionBook()
+        call = book.add(Position("CALL", self.call, entry_option_price=2.0, contracts_remaining=2))
+        self.assertIs(book.get(self.call), call)
+        self.assertIsNone(book.get(self.put))
+        self.assertIn(self.call, book)
+        self.assertTrue(book.has_type("CALL"))
+        self.assertFalse(book.has_type("PUT"))
+        self.assertEqual(call.entry_strike, self.call.strike)
+        self.assertEqual((call.side, Position("PUT", self.put).side), (1, -1))
+        with self.assertRaises(AttributeError):
+            call.stop = 1.0  # Fixed fields only
+
+        book.add(Position("PUT", self.put, contracts_remaining=2))
+        for position in book:  # Removing while iterating is safe
+            book.remove(position)
+        self.assertFalse(book)
+        self.assertFalse(book.has_type("CALL"))
+        book.remove(call)  # Already gone: a no-op
+
+    def test_nested_books(self):
+        process = PositionBook()
+        bosk, rev = PositionBook(parent=process), PositionBook(parent=process)
+        first = bosk.add(Position("CALL", self.call, contracts_remaining=2))
+        second = rev.add(Position("CALL", self.call, contracts_remaining=1))
+        self.assertEqual((len(process), len(bosk), len(rev)), (2, 1, 1))
+        self.assertIs(bosk.get(self.call), first)
+
+        rev.remove(second)
+        self.assertEqual(list(process), [first])
+        self.assertIs(process.get(self.call), first)
+        bosk.clear()
+        self.assertEqual(len(process), 0)
+        self.assertIsNone(process.get(self.call))
+
+    def test_mark_to_market_from_the_quote_cache(self):
+        strategy = SPYBOSKStrategy()
+        strategy.ib = self.ib
+        quotes = strategy.get_quote_cache()
+        quotes.subscribe(self.call)
+        self.ib.sleep(5)
+        book = PositionBook()
+        book.add(Position("CALL", self.call, entry_option_price=1.0, contracts_remaining=2))
+        book.add(Position("PUT", self.put, entry_option_price=1.0, contracts_remaining=2))  # Not streaming
+
+        positions, prices, pnl = book.mark(quotes)
+        self.assertEqual([p.type for p in positions], ["CALL", "PUT"])
+        self.assertEqual(prices[0], quotes.cached_price(self.call))
+        self.assertTrue(math.isnan(prices[1]))
+        self.assertAlmostEqual(pnl[0], (prices[0] - 1.0) * 2 * 100)
+        self.assertAlmostEqual(book.unrealized(quotes), pnl[0])
+        self.assertEqual(PositionBook().mark(quotes)[1].shape, (0,))
+
+    def test_journal_state_round_trip(self):
+        entered = datetime.datetime(2024, 3, 4, 9, 45)
+        position = Position("PUT", self.put, entry_underlying_price=500.0, entry_option_price=2.5,
+                            contracts_remaining=2, entry_time=entered, stop_loss_price=501.0)
+        state = json.loads(json.dumps(position.state(), default=_encode))  # As the journal stores it
+        self.assertNotIn("exits", state)
+        restored = Position.from_state(self.put, state, contracts_remaining=1)
+        self.assertEqual(restored.entry_time, entered)
+        self.assertEqual(restored.contracts_remaining, 1)
+        self.assertEqual(restored.state(), dict(position.state(), contracts_remaining=1))
+        # Records written before stop_loss_price existed
+        del state["stop_loss_price"]
+        self.assertIsNone(Position.from_state(self.put, state).stop_loss_price)
+
+    def test_runtime_books_every_strategy_position(self):
+        runtime = StrategyRuntime(ib=self.ib)
+        strategies = [runtime.add(cls()) for cls in (SPYBOSKStrategy, SPYREVStrategy)]
+        strategies[0].get_option_contract = lambda right: self.call
+        strategies[0].enter_position("CALL")
+        strategies[1].get_option_contract = lambda right: self.put
+        strategies[1].rsi_signal_price = 501.0
+        strategies[1].enter_position("PUT")
+        self.assertEqual(sorted(p.type for p in runtime.positions), ["CALL", "PUT"])
+        self.assertEqual([p.type for p in strategies[0].positions], ["CALL"])
+
+        strategies[0].close_all_positions("Test")
+        self.assertEqual([p.type for p in runtime.positions], ["PUT"])
+        self.ib.sleep(5)
+        _, prices, _ = runtime.positions.mark(runtime.quotes)
+        self.assertFalse(np.isnan(prices).any())
+
+    def test_single_position_strategies_use_the_book(self):
+        runtime = StrategyRuntime(ib=self.ib)
+        orb, chad = runtime.add(SPYORBStrategy()), runtime.add(SPYEMAChad())
+        orb.get_option_contract = lambda right: self.call
+        orb.enter_position("CALL")
+        chad.get_spy_option_contract = lambda right: self.put
+        chad.enter_position("SHORT")
+        self.ib.sleep(1)
+        self.assertEqual(sorted(p.type for p in runtime.positions), ["CALL", "SHORT"])
+        self.assertIs(orb.positions.get(self.call), orb.current)
+        self.assertEqual((orb.position, orb.option_contract, orb.current.contracts_remaining), ("CALL", self.call, orb.contracts))
+        self.assertEqual(chad.current.contracts_remaining, -1)
+        self.assertEqual(chad.current.entry_option_price, self.ib.fills()[-1].execution.price)  # Cost basis from the fill
+
+        orb.exit_all("Test")
+        self.assertIsNone(orb.current)
+        self.assertIsNone(orb.entry_option_price)
+        self.assertEqual([p.type for p in runtime.positions], ["SHORT"])
+        chad.exit_position("Test")
+        self.assertEqual((len(runtime.positions), chad.entry_price), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
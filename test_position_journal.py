@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# Unit tests for the position journal
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from ib_insync import Execution, Fill, LimitOrder, MarketOrder, Option, Position
+
+from position_journal import PositionJournal
+from sim_fixtures import EXPIRY, SimTestCase
+from spy_bosk_strategy import SPYBOSKStrategy
+
+
+def option(con_id: int, right: str = "C") -> Option:
+    return Option("SPY", "20240304", 500.0, right, "SMART", multiplier="100", conId=con_id, localSymbol=f"SPY {con_id}")
+
+
+class TestPositionJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "positions.db")
+        self.journal = PositionJournal(self.path, "BOSK SPY")
+
+    def tearDown(self):
+        self.journal.close_db()
+        shutil.rmtree(self.tmp)
+
+    def test_replay_folds_fills_and_partials(self):
+        call, put = option(1), option(2, "P")
+        self.journal.open(call, 4, type="CALL", entry_option_price=2.0, half_sold=False)
+        self.journal.fill(call, "BUY", 2, 2.10)
+        self.journal.fill(call, "BUY", 2, 2.30)
+        self.journal.update(call, half_sold=True)
+        self.journal.fill(call, "SELL", 2, 3.00)
+        self.journal.open(put, 2, type="PUT", entry_option_price=1.0)
+        self.journal.close(put)
+        self.journal.fill(put, "SELL", 2, 1.50)  # Late fill of a closed position
+
+        records = PositionJournal(self.path, "BOSK SPY").replay()
+        self.assertEqual(list(records), [1])
+        record = records[1]
+        self.assertEqual(record["contract"], call)
+        self.assertAlmostEqual(record["fill_price"], 2.20)
+        self.assertEqual(record["filled"], 2)
+        self.assertEqual(record["state"], {"type": "CALL", "entry_option_price": 2.0, "half_sold": True})
+
+    def test_strategies_share_a_file(self):
+        self.journal.open(option(1), 2, type="CALL")
+        other = PositionJournal(self.path, "ORB SPY")
+        self.assertEqual(other.replay(), {})
+        other.close_db()
+
+    def test_recover_reconciles_with_ib_and_compacts(self):
+        kept, sold, short = option(1), option(2, "P"), option(3)
+        self.journal.open(kept, 2, type="CALL", entry_time=datetime.datetime(2024, 3, 4, 9, 0))
+        self.journal.fill(kept, "BUY", 2, 2.5)
+        self.journal.open(sold, 2, type="PUT")
+        self.journal.open(short, -1, type="SHORT")
+        orphan = option(4)
+        positions = [
+            Position("DU1", kept, 1.0, 250.0),  # Half sold by IB while down
+            Position("DU1", short, -1.0, 100.0),
+            Position("DU1", orphan, 3.0, 100.0),
+        ]
+
+        survivors = self.journal.recover(positions, symbol="SPY")
+        self.assertEqual([r["contract"].conId for r in survivors], [1, 3])
+        self.assertEqual(survivors[0]["quantity"], 1.0)
+        self.assertEqual(survivors[0]["state"]["entry_time"], "2024-03-04T09:00:00")
+
+        count = self.journal.db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        self.assertEqual(count, 2)  # One row per surviving position
+        replayed = self.journal.replay()
+        self.assertEqual(replayed[1]["quantity"], 1.0)
+        self.assertAlmostEqual(replayed[1]["fill_price"], 2.5)
+
+    def test_recover_keeps_only_the_journaled_share(self):
+        call = option(1)
+        other = PositionJournal(self.path, "ORB SPY")
+        for journal in (self.journal, other):
+            journal.order(call, 7 if journal is other else 5)  # Journaled ahead of its entry
+            journal.open(call, 2, type="CALL")
+            journal.fill(call, "BUY", 2, 2.0)
+            journal.order(call, 8 if journal is other else 6)
+        positions = [Position("DU1", call, 4.0, 200.0)]  # Both strategies' contracts
+
+        [mine] = self.journal.recover(positions, symbol="SPY")
+        [theirs] = other.recover(positions, symbol="SPY")
+        other.close_db()
+        self.assertEqual((mine["quantity"], theirs["quantity"]), (2, 2))
+        self.assertEqual((mine["orders"], theirs["orders"]), ([5, 6], [7, 8]))
+        self.assertEqual(self.journal.replay()[1]["orders"], [5, 6])  # Kept through the compaction
+
+    def test_recover_reconciles_entries_with_their_executions(self):
+        filled, unfilled = option(1), option(2, "P")
+        ref = self.journal.open(filled, 2, type="CALL", entry_option_price=2.0)
+        self.journal.open(unfilled, 1, type="PUT", entry_option_price=1.0)
+        fills = [
+            Fill(filled, Execution(execId=str(n), shares=1.0, price=price, orderRef=ref), None, None)
+            for n, price in enumerate((2.1, 2.3))
+        ] + [Fill(filled, Execution(execId="2", shares=1.0, price=9.0, orderRef="other"), None, None)]
+        positions = [Position("DU1", filled, 2.0, 220.0)]
+
+        [record] = self.journal.recover(positions, symbol="SPY", fills=fills)
+        self.assertEqual(record["ref"], ref)
+        self.assertAlmostEqual(record["fill_price"], 2.2)
+        self.assertEqual(record["filled"], 2.0)
+        self.assertEqual([r["contract"].conId for r in self.journal.dropped], [2])
+        self.assertAlmostEqual(self.journal.replay()[1]["fill_price"], 2.2)
+
+
+class TestBOSKRecovery(SimTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "positions.db")
+        chain = self.load_chain()
+        self.select = lambda right: chain.select(right, 500.0, EXPIRY)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def strategy(self, **kwargs) -> SPYBOSKStrategy:
+        strategy = SPYBOSKStrategy(**kwargs)
+        strategy.ib = self.ib
+        strategy.get_option_contract = self.select
+        strategy.journal = PositionJournal(self.path, "SPYBOSKStrategy SPY")
+        return strategy
+
+    def test_restart_picks_up_open_position(self):
+        crashed = self.strategy(server_side_exits=True)
+        crashed.enter_position("CALL")
+        self.ib.sleep(1)
+        [entered] = crashed.positions
+        contract, fill_price = entered.contract, entered.entry_option_price
+        self.assertEqual(len(self.ib.openTrades()), 4)  # Server-side exits working
+        crashed.journal.close_db()  # The process dies here
+
+        restarted = self.strategy()
+        restarted.recover_positions()
+        [position] = restarted.positions
+        self.assertEqual(position.contract.conId, contract.conId)
+        self.assertEqual(position.type, "CALL")
+        self.assertEqual(position.contracts_remaining, 2)
+        self.assertAlmostEqual(position.entry_option_price, fill_price)
+        self.assertIsNone(position.exits)
+        self.assertEqual(self.ib.openTrades(), [])  # Left-over exits cancelled
+        self.assertEqual(restarted.get_order_manager().position(position.contract), 2)
+
+        restarted.close_all_positions("Test")
+        self.ib.sleep(1)
+        self.assertEqual(self.ib.positions(), [])
+        self.assertEqual(restarted.journal.replay(), {})
+
+    def test_restart_leaves_other_orders_alone(self):
+        crashed = self.strategy(server_side_exits=True)
+        crashed.enter_position("CALL")
+        self.ib.sleep(1)
+        [entered] = crashed.positions
+        crashed.journal.close_db()
+        other = self.ib.placeOrder(entered.contract, LimitOrder("BUY", 1, 0.05))  # Another strategy's order
+
+        restarted = self.strategy()
+        restarted.recover_positions()
+        self.assertEqual(self.ib.openTrades(), [other])
+
+    def test_position_closed_while_down_is_dropped(self):
+        crashed = self.strategy()
+        crashed.enter_position("PUT")
+        self.ib.sleep(1)
+        crashed.journal.close_db()
+        [entered] = crashed.positions
+        self.ib.placeOrder(entered.contract, MarketOrder("SELL", 2))  # Sold by hand in TWS
+        self.ib.sleep(1)
+
+        restarted = self.strategy()
+        restarted.recover_positions()
+        self.assertEqual(len(restarted.positions), 0)
+
+    def test_entry_is_journaled_before_the_order_is_sent(self):
+        crashed = self.strategy()
+        place_order = self.ib.placeOrder
+        journaled = []
+
+        def place(contract, order):
+            journaled.append(crashed.journal.replay())
+            return place_order(contract, order)
+
+        self.ib.placeOrder = place
+        crashed.enter_position("CALL")
+        [record] = journaled[0].values()
+        [trade] = self.ib.openTrades()
+        self.assertEqual(record["orders"], [trade.order.orderId])
+        self.assertEqual(trade.order.orderRef, record["ref"])
+
+    def test_entry_filled_while_down_takes_its_fill_price(self):
+        crashed = self.strategy()
+        crashed.enter_position("CALL")
+        crashed.journal.close_db()  # Dies before the fill
+        self.ib.sleep(1)
+        [fill] = self.ib.fills()
+
+        restarted = self.strategy()
+        restarted.recover_positions()
+        [position] = restarted.positions
+        self.assertEqual(position.contracts_remaining, 2)
+        self.assertAlmostEqual(position.entry_option_price, fill.execution.price)
+
+    def test_entry_never_filled_is_cancelled_and_dropped(self):
+        crashed = self.strategy()
+        crashed.enter_position("CALL")
+        crashed.journal.close_db()  # Dies with the entry still working
+
+        restarted = self.strategy()
+        restarted.recover_positions()
+        self.assertEqual(len(restarted.positions), 0)
+        self.assertEqual(self.ib.openTrades(), [])
+        self.ib.sleep(1)
+        self.assertEqual(self.ib.positions(), [])  # The entry can no longer fill unjournaled
+        self.assertEqual(restarted.journal.replay(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# Unit tests for the shared quote cache
+
+import math
+import unittest
+from unittest.mock import Mock, MagicMock
+from ib_insync import Option, Stock, Ticker
+
+from quote_cache import QuoteCache
+
+
+class TestQuoteCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.ib = Mock()
+        self.ib.reqMktData = MagicMock(side_effect=lambda contract: Ticker(contract=contract))
+        self.ib.reqTickers = MagicMock(return_value=[Mock(marketPrice=MagicMock(return_value=399.0))])
+        self.cache = QuoteCache(self.ib, max_age=5.0, clock=lambda: self.now)
+        self.spy = Stock("SPY", "SMART", "USD")
+
+    def tick(self, ticker: Ticker, last: float):
+        ticker.last = last
+        ticker.updateEvent.emit(ticker)
+
+    def test_one_subscription_per_contract(self):
+        first = self.cache.subscribe(self.spy)
+        second = self.cache.subscribe(Stock("SPY", "SMART", "USD"))
+        self.assertIs(first, second)
+        self.ib.reqMktData.assert_called_once()
+        self.assertIn(self.spy, self.cache)
+
+    def test_fresh_quote_served_from_memory(self):
+        self.tick(self.cache.subscribe(self.spy), 401.25)
+        self.now += 2.0
+        self.assertEqual(self.cache.price(self.spy), 401.25)
+        self.assertEqual(self.cache.age(self.spy), 2.0)
+        self.ib.reqTickers.assert_not_called()
+
+    def test_stale_stream_falls_back_to_snapshot(self):
+        self.assertEqual(self.cache.price(self.spy), 399.0)  # No tick yet
+        self.tick(self.cache.subscribe(self.spy), 401.25)
+        self.now += 10.0
+        self.assertEqual(self.cache.price(self.spy), 399.0)
+        self.assertEqual(self.ib.reqTickers.call_count, 2)
+
+    def test_no_market_data(self):
+        self.ib.reqTickers = MagicMock(return_value=[])
+        self.assertIsNone(self.cache.ticker(self.spy))
+        self.assertTrue(math.isnan(self.cache.price(self.spy)))
+
+    def test_unsubscribe_cancels_stream(self):
+        option = Option("SPY", "20230103", 400, "C", "SMART", currency="USD")
+        self.ib.isConnected = MagicMock(return_value=True)
+        self.cache.subscribe(option)
+        self.cache.unsubscribe(option)
+        self.ib.cancelMktData.assert_called_once_with(option)
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.age(option), math.inf)
+
+    def test_shared_stream_cancelled_by_last_holder(self):
+        option = Option("SPY", "20230103", 400, "C", "SMART", currency="USD")
+        self.ib.isConnected = MagicMock(return_value=True)
+        other = self.cache.share()
+        self.cache.subscribe(option)
+        self.cache.price(option)  # Reads do not count as another subscription
+        other.subscribe(option)
+        self.ib.reqMktData.assert_called_once()
+
+        self.cache.unsubscribe(option)
+        self.cache.unsubscribe(option)
+        self.ib.cancelMktData.assert_not_called()
+        self.assertIn(option, other)
+        other.unsubscribe(option)
+        self.ib.cancelMktData.assert_called_once_with(option)
+
+    def test_clear_releases_own_streams_only(self):
+        self.ib.isConnected = MagicMock(return_value=True)
+        other = self.cache.share()
+        self.cache.subscribe(self.spy)
+        other.subscribe(Stock("QQQ", "SMART", "USD"))
+        other.subscribe(self.spy)
+        self.cache.clear()
+        self.ib.cancelMktData.assert_not_called()
+        self.assertEqual(len(other), 2)
+        other.clear()
+        self.assertEqual(self.ib.cancelMktData.call_count, 2)
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# Unit tests for the clock abstraction and the replay runner
+
+import contextlib
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import pytz
+
+from backtest import backtest_bosk
+from bar_store import BarStore
+from benchmark import make_bars
+from clock import WALL, SimClock
+from replay import replay, sessions, summary
+from sim_broker import ReplayFinished, SimIB
+from spy_bosk_strategy import SPYBOSKStrategy
+
+DAY = datetime.date(2024, 3, 6)
+TZ = pytz.timezone("US/Central")
+
+
+class TestClock(unittest.TestCase):
+    def test_sim_clock_follows_the_broker(self):
+        ib = SimIB({"SPY": make_bars(1, end=DAY)})
+        clock = SimClock(ib)
+        self.assertEqual(clock.now(TZ), TZ.localize(datetime.datetime(2024, 3, 6, 8, 30)))
+        started = time.monotonic()
+        clock.sleep(3600)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(clock.now().hour, 9)
+        self.assertEqual(clock.time(), clock.monotonic())
+        self.assertEqual(WALL.now(TZ).tzinfo.zone, "US/Central")
+
+    def test_broker_stops_once_at_the_end(self):
+        ib = SimIB({"SPY": make_bars(1, end=DAY)}, end=TZ.localize(datetime.datetime(2024, 3, 6, 9, 0)))
+        ib.sleep(600)
+        with self.assertRaises(ReplayFinished):
+            ib.sleep(3600)
+        self.assertEqual(ib.now(), TZ.localize(datetime.datetime(2024, 3, 6, 9, 0)))
+        ib.sleep(5)  # Shutdown sleeps run on
+        self.assertEqual(ib.now().second, 5)
+
+
+class TestReplay(unittest.TestCase):
+    def test_whole_session_through_run(self):
+        bars = make_bars(2, seed=5, end=DAY)
+        self.assertEqual(sessions(bars, TZ), [datetime.date(2024, 3, 5), DAY])
+        strategy = SPYBOSKStrategy()
+        started = time.monotonic()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ib = replay(strategy, bars, day=DAY)
+        self.assertLess(time.monotonic() - started, 60.0)
+
+        # The strategy ran on the replayed day, through the close and its shutdown
+        self.assertEqual(strategy.clock.now(strategy.tz).date(), DAY)
+        self.assertGreaterEqual(strategy.clock.now(strategy.tz).time(), datetime.time(15, 0))
+        self.assertFalse(ib.isConnected())
+        self.assertEqual(ib.positions(), [])
+
+        # Entries on the bars the vectorized backtest finds the BOSK signals on
+        expected = backtest_bosk(bars[bars["date"].dt.date == DAY]).trades
+        entries = [f.execution.time for f in ib.fills() if f.execution.side == "BOT"]
+        self.assertEqual(len(entries), len(expected))
+        for when, bar in zip(entries, expected["entry_bar"]):
+            opened = TZ.localize(datetime.datetime.combine(DAY, datetime.time(8, 30)))
+            self.assertEqual(when.astimezone(TZ).replace(microsecond=0), opened + datetime.timedelta(minutes=5 * int(bar)))
+
+        result = summary(ib)
+        self.assertEqual(result["bought"], result["sold"])
+        self.assertEqual(result["open"], 0)
+        self.assertAlmostEqual(result["net_pnl"], result["gross_pnl"] - result["commissions"], places=2)
+
+    def test_replay_leaves_the_bar_store_alone(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        bars = make_bars(2, seed=5, end=DAY)
+        strategy = SPYBOSKStrategy()
+        strategy.bar_store = BarStore(root, strategy.bar_size)
+        with contextlib.redirect_stdout(io.StringIO()):
+            replay(strategy, bars, day=DAY)
+        self.assertTrue(strategy.bar_store.read_only)
+        self.assertEqual([files for _, _, files in os.walk(root) if files], [])  # No replayed bars written
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# Unit tests for the portfolio risk engine
+
+import unittest
+
+from ib_insync import MarketOrder
+
+from quote_cache import QuoteCache
+from risk_engine import RiskEngine, RiskLimits
+from sim_fixtures import EXPIRY, SimTestCase
+
+
+class TestRiskLimits(unittest.TestCase):
+    def test_breach(self):
+        limits = RiskLimits(max_delta=500, max_premium=10000, max_loss=2000)
+        self.assertIsNone(limits.breach(-499, 9999, -1999))
+        self.assertIn("delta", limits.breach(-501, 0, 0))
+        self.assertIn("premium", limits.breach(0, 10001, 0))
+        self.assertIn("P/L", limits.breach(0, 0, -2001))
+        self.assertIsNone(RiskLimits().breach(1e9, 1e9, -1e9))
+
+
+class TestRiskEngine(SimTestCase):
+    closes = [500.0 + 0.25 * i for i in range(60)]
+    warmup = 3600
+
+    def setUp(self):
+        super().setUp()
+        chain = self.load_chain()
+        spot = self.ib.underlying_price("SPY")
+        self.call = chain.select("C", spot, EXPIRY)
+        self.put = chain.select("P", spot, EXPIRY)
+        self.engine = RiskEngine(self.ib, QuoteCache(self.ib), clock=self.ib.now, refresh=None)
+        self.engine.start()
+
+    def buy(self, contract, quantity: int):
+        trade = self.ib.placeOrder(contract, MarketOrder("BUY", quantity))
+        self.ib.sleep(5)
+        return trade
+
+    def test_aggregates_every_position_on_the_account(self):
+        self.buy(self.call, 2)
+        self.buy(self.put, 1)
+        self.ib.sleep(10)
+        quotes = self.engine.quotes
+        prices = {c.conId: quotes.cached_price(c) for c in (self.call, self.put)}
+        held = {p.contract.conId: p for p in self.ib.positions()}
+        premium = sum(held[c].position * 100 * prices[c] for c in held)
+        unrealized = sum(held[c].position * (100 * prices[c] - held[c].avgCost) for c in held)
+        self.assertAlmostEqual(self.engine.premium, premium, places=6)
+        self.assertAlmostEqual(self.engine.unrealized, unrealized, places=6)
+        self.assertEqual(self.engine.snapshot()["positions"], 2)
+        # Two calls against one put: long about one at-the-money option's worth of delta
+        self.assertGreater(self.engine.delta, 20)
+        self.assertLess(self.engine.delta, 150)
+
+    def test_incremental_delta_follows_the_underlying(self):
+        self.buy(self.call, 2)
+        self.ib.sleep(5)
+        before = self.engine.delta
+        self.ib.sleep(300)  # The underlying keeps rising
+        incremental = self.engine.delta
+        self.assertGreater(incremental, before)
+        self.engine.reprice()
+        self.assertAlmostEqual(incremental, self.engine.delta, delta=0.1 * abs(self.engine.delta))
+
+    def test_realized_pnl_from_the_fill(self):
+        bought = self.buy(self.call, 2)
+        self.ib.sleep(600)
+        sold = self.ib.placeOrder(self.call, MarketOrder("SELL", 1))
+        self.ib.sleep(5)
+        expected = (sold.orderStatus.avgFillPrice - bought.orderStatus.avgFillPrice) * 100
+        self.assertAlmostEqual(self.engine.realized, expected, places=6)
+        self.assertEqual(self.engine.snapshot()["positions"], 1)
+
+    def test_kill_switch_flattens_everything(self):
+        kills = []
+        self.engine.kill_event.connect(kills.append)
+        self.engine.limits = RiskLimits(max_delta=100)
+        self.buy(self.put, 1)
+        self.assertFalse(self.engine.killed)
+        self.buy(self.call, 4)
+        self.ib.sleep(5)
+        self.assertEqual(len(kills), 1)
+        self.assertIn("delta", kills[0])
+        self.assertEqual(self.ib.positions(), [])
+
+        # Anything bought after the kill is closed again
+        self.buy(self.call, 1)
+        self.ib.sleep(5)
+        self.assertEqual(self.ib.positions(), [])
+        self.assertEqual(len(kills), 1)
+
+    def test_option_tick_moves_only_its_slot(self):
+        self.buy(self.call, 2)
+        self.buy(self.put, 1)
+        slot = self.engine._slots[self.call.conId]
+        ticker = self.engine.quotes.subscribe(self.call)
+        premium, unrealized, delta = self.engine.premium, self.engine.unrealized, self.engine.delta
+        old = ticker.marketPrice()
+        ticker.bid, ticker.ask, ticker.last = ticker.bid + 0.10, ticker.ask + 0.10, ticker.last + 0.10
+        ticker.updateEvent.emit(ticker)
+        change = 2 * 100 * (ticker.marketPrice() - old)
+        self.assertAlmostEqual(self.engine.premium - premium, change, places=6)
+        self.assertAlmostEqual(self.engine.unrealized - unrealized, change, places=6)
+        self.assertEqual(self.engine.delta, delta)
+        self.assertEqual(self.engine._price[slot], ticker.marketPrice())
+
+
+if __name__ == "__main__":
+    unittest.main()
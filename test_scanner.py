@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# Unit tests for the multi-ticker bar scanner
+
+import contextlib
+import datetime
+import io
+import unittest
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+from ib_insync import Event, Stock
+
+from bar_feed import BarFeedCache
+from benchmark import make_bars
+from indicators import BOSKIndicators, EMAChadIndicators
+from scanner import FIELDS, BarScanner, BOSKScan, ChadScan
+from sim_broker import SimIB
+from spy_bosk_strategy import SPYBOSKStrategy
+
+TICKERS = ["SPY", "QQQ", "IWM"]
+END = datetime.date(2024, 3, 5)
+
+
+def frames() -> dict[str, pd.DataFrame]:
+    bars = {ticker: make_bars(2, price=100.0 * (i + 1), seed=i, end=END) for i, ticker in enumerate(TICKERS)}
+    # A flush below the lower Keltner band that closes above the last three highs, and the mirror image
+    for ticker, j, side in (("SPY", 50, 1), ("IWM", 120, -1)):
+        df = bars[ticker]
+        prev = df["high"].iloc[j - 3:j].max() if side > 0 else df["low"].iloc[j - 3:j].min()
+        open_, close = df.at[j, "open"] * (1 - 0.02 * side), prev + 0.01 * side
+        df.loc[j, ["open", "high", "low", "close"]] = [open_, max(open_, close), min(open_, close), close]
+    return bars
+
+
+class TestBarScanner(unittest.TestCase):
+    def setUp(self):
+        self.frames = frames()
+        self.scanner = BarScanner(TICKERS, [ChadScan(), BOSKScan()])
+        self.history = []
+        for j in range(len(self.frames["SPY"])):
+            rows = [self.frames[ticker].iloc[j] for ticker in TICKERS]
+            signals = self.scanner.add_bar(rows[0]["date"], *(np.array([row[name] for row in rows]) for name in FIELDS))
+            self.history.append(signals)
+
+    def test_indicators_match_the_strategy_indicator_sets(self):
+        for ticker, df in self.frames.items():
+            scanned = self.scanner.to_df(ticker)
+            for indicators in (BOSKIndicators(), EMAChadIndicators()):
+                expected = indicators.frame(df)
+                for name in indicators.columns:
+                    np.testing.assert_array_equal(scanned[name].to_numpy(), expected[name].to_numpy(), err_msg=f"{ticker} {name}")
+
+    def test_bosk_signals_match_check_entry_signal(self):
+        strategy = SPYBOSKStrategy()
+        found = 0
+        for i, ticker in enumerate(TICKERS):
+            df = strategy.calculate_indicators(self.frames[ticker].copy())
+            for j, signals in enumerate(self.history[:-1]):
+                # The strategy evaluates iloc[-2]: bar j with the next bar forming
+                expected = strategy.check_entry_signal(df.iloc[:j + 2])
+                self.assertEqual(signals["bosk"][i], {"ENTER_LONG": 1, "ENTER_SHORT": -1, None: 0}[expected])
+                found += expected is not None
+        self.assertGreater(found, 0)
+
+    def test_chad_side_and_touch(self):
+        df = self.scanner.to_df("QQQ")
+        for j, signals in enumerate(self.history):
+            row = df.iloc[j]
+            indicators = [row["ema_short"], row["ema_long"], row["vwap"]]
+            side = 1 if all(row["close"] > x for x in indicators) else -1 if all(row["close"] < x for x in indicators) else 0
+            self.assertEqual(signals["chad_side"][1], side)
+            self.assertEqual(signals["chad_touch"][1], abs(row["close"] - row["ema_short"]) < row["close"] * 0.0003)
+
+    def test_hits_and_column(self):
+        self.assertEqual(self.scanner.column("close").shape, (3, len(self.frames["SPY"])))
+        self.scanner.signals = {"bosk": np.array([0, -1, 1], dtype=np.int8)}
+        self.assertEqual(self.scanner.hits("bosk"), {"QQQ": -1, "IWM": 1})
+
+    def test_compaction_keeps_the_latest_bars(self):
+        scanner = BarScanner(TICKERS, [BOSKScan()], capacity=16)
+        scanner.add_frames(self.frames)
+        self.assertEqual(len(scanner), 16)  # The last 16 bars
+        np.testing.assert_array_equal(scanner.column("close")[0], self.frames["SPY"]["close"].to_numpy()[-16:])
+        for j in range(8):
+            scanner.add_bar(pd.Timestamp("2024-03-06 08:30", tz="US/Central") + pd.Timedelta(minutes=5 * j),
+                            *(np.full(3, 100.0) for _ in FIELDS))
+        self.assertEqual(len(scanner), 16)
+        np.testing.assert_array_equal(scanner.column("close")[0, -8:], 100.0)
+        self.assertEqual(scanner.column("close")[0, 7], self.frames["SPY"]["close"].iloc[-1])
+
+    def test_shared_columns_rejected(self):
+        with self.assertRaises(ValueError):
+            BarScanner(TICKERS, [BOSKScan(), BOSKScan(kc_mult=2.0)])
+
+
+class TestWatch(unittest.TestCase):
+    def test_scans_once_every_ticker_closed_the_bar(self):
+        sessions = {ticker: df[df["date"].dt.date == END].reset_index(drop=True) for ticker, df in frames().items()}
+        ib = SimIB(sessions)
+        ib.connect()
+        ib.sleep(3600)
+        cache = BarFeedCache(ib)
+        feeds = {ticker: cache.get(Stock(ticker, "SMART", "USD")) for ticker in TICKERS}
+        for feed in feeds.values():
+            feed.start()
+        scanner = BarScanner(TICKERS, [ChadScan()])
+        scanner.watch(feeds)
+        loaded = len(scanner)
+        self.assertEqual(loaded, len(feeds["SPY"].to_df()) - 1)
+        scans = []
+        scanner.scan_event.connect(lambda s, signals: scans.append(s.dates[s.count - 1]))
+
+        ib.sleep(900)
+        self.assertEqual(len(scans), 3)
+        self.assertEqual(len(scanner), loaded + 3)
+        for ticker in TICKERS:
+            expected = feeds[ticker].to_df().iloc[:-1]
+            np.testing.assert_array_equal(scanner.to_df(ticker)["close"].to_numpy(), expected["close"].to_numpy())
+        scanner.unwatch(feeds)
+
+    def test_late_bars_keep_the_scans_in_order(self):
+        now = [0.0]
+        scanner = BarScanner(["SPY", "QQQ"], [ChadScan()], clock=lambda: now[0])
+        feeds = {ticker: FakeFeed() for ticker in scanner.tickers}
+        scanner.watch(feeds)
+        scans = []
+        scanner.scan_event.connect(lambda s, signals: scans.append(s.dates[s.count - 1]))
+        bar = [datetime.datetime(2024, 3, 5, 9, 0) + datetime.timedelta(minutes=5 * j) for j in range(4)]
+
+        feeds["SPY"].close(bar[0], 500.0)
+        feeds["SPY"].close(bar[1], 501.0)
+        feeds["QQQ"].close(bar[0], 400.0)  # Behind SPY by a bar: scanned first, SPY's next bar waits
+        self.assertEqual(scans, bar[:1])
+        feeds["QQQ"].close(bar[1], 401.0)
+        self.assertEqual(scans, bar[:2])
+
+        feeds["SPY"].close(bar[2], 502.0)
+        now[0] += scanner.max_wait
+        feeds["SPY"].close(bar[3], 503.0)  # QQQ silent too long: its bar is scanned as missing
+        self.assertEqual(scans, bar[:3])
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            feeds["QQQ"].close(bar[2], 402.0)
+        self.assertIn("dropped", out.getvalue())
+        feeds["QQQ"].close(bar[3], 403.0)
+        self.assertEqual(scans, bar)
+        np.testing.assert_array_equal(scanner.to_df("QQQ")["close"], [400.0, 401.0, np.nan, 403.0])
+
+
+class FakeFeed:
+    """Just enough of a ``BarFeed`` for ``watch``: a buffer holding the last completed bar and the forming one."""
+
+    def __init__(self):
+        self.buffer = None
+        self.bar_close_event = Event("bar_close_event")
+
+    def to_df(self):
+        return None
+
+    def close(self, date: datetime.datetime, close: float):
+        columns = {"date": [date, date + datetime.timedelta(minutes=5)], "volume": [1000.0] * 2}
+        columns.update({name: [close] * 2 for name in ("open", "high", "low", "close")})
+        self.buffer = Mock(__len__=Mock(return_value=2), column=lambda name: columns[name])
+        self.bar_close_event.emit(self)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# Unit tests for the server-side exit orders
+
+import unittest
+
+from ib_insync import MarketOrder
+
+from order_manager import OrderManager
+from server_exits import BREAKEVEN, FIRST_TARGET, SECOND_TARGET, ServerExits
+from sim_fixtures import EXPIRY, SimTestCase
+from spy_bosk_strategy import SPYBOSKStrategy
+from spy_orb_strategy import SPYORBStrategy
+from spy_rev_strategy import SPYREVStrategy
+
+
+class TestServerExits(SimTestCase):
+    spread = 0.0
+    gapless = True  # Prices walk from one close to the next, so targets trigger in order
+
+    def setUp(self):
+        pass  # Each test opens its own session
+
+    def start(self, closes: list[float], first_target: float, second_target: float):
+        self.open_session(closes)
+        self.manager = OrderManager(self.ib)
+        self.ib.qualifyContracts(self.spy)
+        self.call = self.load_chain().select("C", 500.0, EXPIRY)
+        self.fills, self.rejects = [], []
+        self.exits = ServerExits(
+            self.manager, self.spy, self.call, 2, first_target, second_target,
+            on_fill=lambda trade, price, pnl: self.fills.append(trade.order.orderRef),
+            on_reject=lambda trade, reason: self.rejects.append(reason),
+        )
+        entry = self.manager.submit(self.call, MarketOrder("BUY", 2),
+                                    on_fill=lambda trade, price, pnl: self.exits.submit(price))
+        self.ib.sleep(1)
+        return entry
+
+    def test_first_then_second_target(self):
+        self.start([500.0 + i for i in range(12)], first_target=502.0, second_target=505.0)
+        self.assertEqual(len(self.exits.trades), 4)
+        self.assertTrue(all(t.orderStatus.status == "PreSubmitted" for t in self.exits.trades))
+        self.ib.sleep(3600)
+        self.assertEqual(self.fills, [FIRST_TARGET, SECOND_TARGET])
+        self.assertEqual(self.rejects, [])  # OCA cancels are expected
+        self.assertEqual(self.manager.position(self.call), 0)
+        self.assertEqual(self.manager.open_trades, {})
+
+    def test_breakeven_after_first_target(self):
+        self.start([500.0, 501.0, 502.5, 503.0, 501.0, 499.0, 497.0, 495.0], first_target=502.0, second_target=510.0)
+        self.ib.sleep(2400)
+        self.assertEqual(self.fills, [FIRST_TARGET, BREAKEVEN])
+        self.assertEqual(self.rejects, [])
+        self.assertEqual(self.manager.position(self.call), 0)
+
+    def test_cancel_before_entry_fill(self):
+        self.open_session([500.0] * 4)
+        exits = ServerExits(OrderManager(self.ib), self.spy, self.spy, 1, 1.0, 2.0)
+        exits.cancel()
+        self.assertEqual(exits.submit(1.0), [])
+        self.assertFalse(exits.active)
+
+
+class TestORBServerSideExits(SimTestCase):
+    closes = [500.0 + i for i in range(12)]
+    spread = 0.0
+    gapless = True
+
+    def setUp(self):
+        super().setUp()
+        self.strategy = SPYORBStrategy(server_side_exits=True)
+        self.strategy.ib = self.ib
+        chain = self.load_chain()
+        self.strategy.get_option_contract = lambda right: chain.select(right, 500.0, EXPIRY)
+
+    def test_exits_placed_on_entry_fill_and_reconciled(self):
+        self.strategy.enter_position("CALL")
+        self.assertEqual(self.strategy.exits.trades, [])  # Waiting for the entry fill
+        self.ib.sleep(1)
+        self.assertEqual(len(self.strategy.exits.trades), 4)
+        self.assertEqual(self.strategy.exits.trades[-1].order.auxPrice, round(self.strategy.entry_option_price, 2))
+
+        self.ib.sleep(600)  # Underlying up $1: first half sold by IB
+        self.assertTrue(self.strategy.half_position_closed)
+        self.assertEqual(self.strategy.position, "CALL")
+        self.ib.sleep(3600)  # Strike + 1.05 reached: the rest sold
+        self.assertIsNone(self.strategy.position)
+        self.assertEqual(self.ib.positions(), [])
+
+    def test_exit_all_cancels_exits_and_sells_held(self):
+        self.strategy.enter_position("CALL")
+        self.ib.sleep(1)
+        exits = self.strategy.exits
+        self.strategy.exit_all("Force close")
+        self.assertTrue(all(t.orderStatus.status == "Cancelled" for t in exits.trades))
+        self.ib.sleep(1)
+        self.assertEqual(self.ib.positions(), [])
+
+    def test_entry_fill_during_entry_finds_the_position(self):
+        place_order = self.strategy.place_order
+
+        def place_and_fill(*args, **kwargs):
+            trade = place_order(*args, **kwargs)
+            self.ib.sleep(1)  # The fill arrives before enter_position returns
+            return trade
+
+        self.strategy.place_order = place_and_fill
+        self.strategy.enter_position("CALL")
+        self.assertEqual(len(self.strategy.exits.trades), 4)
+        self.assertEqual(self.strategy.entry_option_price, self.ib.fills()[0].execution.price)
+        self.assertEqual(self.strategy.exits.trades[-1].order.auxPrice, round(self.strategy.entry_option_price, 2))
+
+
+class TestEntryFillDuringEntry(SimTestCase):
+    closes = [500.0 + i for i in range(12)]
+    spread = 0.0
+    gapless = True
+
+    def test_position_and_exits_exist_before_the_order(self):
+        chain = self.load_chain()
+        for cls in (SPYBOSKStrategy, SPYREVStrategy):
+            strategy = cls(server_side_exits=True)
+            strategy.ib = self.ib
+            strategy.rsi_signal_price = 499.0
+            strategy.get_option_contract = lambda right: chain.select(right, 500.0, EXPIRY)
+            place_order = strategy.place_order
+
+            def place_and_fill(*args, place_order=place_order, **kwargs):
+                trade = place_order(*args, **kwargs)
+                self.ib.sleep(1)  # The fill arrives before enter_position returns
+                return trade
+
+            strategy.place_order = place_and_fill
+            strategy.enter_position("CALL")
+            (position,) = strategy.positions
+            self.assertEqual(position.entry_option_price, self.ib.fills()[-1].execution.price)
+            self.assertEqual(len(position.exits.trades), 4)
+            position.exits.cancel()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# Unit tests for the session calendar
+
+import contextlib
+import datetime
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pytz
+
+from session_calendar import CALENDAR_ENV, SessionCalendar
+
+TZ = pytz.timezone("US/Central")
+
+
+def at(day: datetime.date, hour: int, minute: int = 0) -> datetime.datetime:
+    return TZ.localize(datetime.datetime.combine(day, datetime.time(hour, minute)))
+
+
+class TestSessionCalendar(unittest.TestCase):
+    def setUp(self):
+        self.calendar = SessionCalendar(
+            TZ, "08:30:00", "15:00:00", force_close="14:55:00",
+            no_new_trades="14:30:00", monitor_start="08:40:00",
+        )
+
+    def test_regular_day(self):
+        day = datetime.date(2024, 3, 5)
+        self.assertFalse(self.calendar.is_open(at(day, 8, 29)))
+        self.assertTrue(self.calendar.is_open(at(day, 8, 30)))
+        self.assertTrue(self.calendar.is_open(at(day, 15, 0)))
+        self.assertTrue(self.calendar.is_after_close(at(day, 15, 1)))
+        self.assertFalse(self.calendar.should_start_monitoring(at(day, 8, 35)))
+        self.assertTrue(self.calendar.should_start_monitoring(at(day, 8, 40)))
+        self.assertTrue(self.calendar.can_open_new_trades(at(day, 14, 29)))
+        self.assertFalse(self.calendar.can_open_new_trades(at(day, 14, 30)))
+        self.assertFalse(self.calendar.is_force_close_time(at(day, 14, 54)))
+        self.assertTrue(self.calendar.is_force_close_time(at(day, 14, 55)))
+
+    def test_weekend_and_holiday_are_closed(self):
+        for day in (datetime.date(2024, 3, 9), datetime.date(2024, 7, 4)):
+            self.assertFalse(self.calendar.is_trading_day(day))
+            self.assertFalse(self.calendar.is_open(at(day, 10)))
+            self.assertFalse(self.calendar.can_open_new_trades(at(day, 10)))
+            self.assertFalse(self.calendar.should_start_monitoring(at(day, 10)))
+
+    def test_early_close_shifts_late_times(self):
+        day = datetime.date(2024, 11, 29)  # 13:00 Eastern close
+        session = self.calendar.session(at(day, 9))
+        self.assertTrue(session.early_close)
+        self.assertEqual(session.close, int(at(day, 12).timestamp()))
+        self.assertEqual(session.force_close, int(at(day, 11, 55).timestamp()))
+        self.assertEqual(session.no_new_trades, int(at(day, 11, 30).timestamp()))
+        self.assertEqual(session.open, int(at(day, 8, 30).timestamp()))
+        self.assertFalse(self.calendar.is_open(at(day, 12, 1)))
+
+    def test_session_is_cached_for_the_day(self):
+        day = datetime.date(2024, 3, 5)
+        first = self.calendar.session(at(day, 9))
+        self.assertIs(self.calendar.session(at(day, 14)), first)
+        self.assertIsInstance(first.open, int)
+        self.assertIsNot(self.calendar.session(at(day + datetime.timedelta(days=1), 9)), first)
+
+    def test_seconds_until_next_transition(self):
+        day = datetime.date(2024, 3, 5)
+        self.assertEqual(self.calendar.seconds_until_next(at(day, 8)), 30 * 60)
+        self.assertEqual(self.calendar.seconds_until_next(at(day, 8, 30)), 10 * 60)
+        # After the close: the next morning's open
+        self.assertEqual(self.calendar.seconds_until_next(at(day, 16)), 16.5 * 3600)
+
+    def test_seconds_until_next_skips_weekend(self):
+        friday = datetime.date(2024, 3, 8)
+        monday_open = at(datetime.date(2024, 3, 11), 8, 30)
+        now = at(friday, 15, 30)
+        self.assertEqual(self.calendar.seconds_until_next(now), monday_open.timestamp() - now.timestamp())
+
+    def test_year_without_tables_warns_once(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertTrue(self.calendar.is_trading_day(datetime.date(2024, 7, 5)))
+            self.assertTrue(self.calendar.is_trading_day(datetime.date(2040, 7, 4)))
+            self.calendar.session(at(datetime.date(2040, 7, 5), 9))
+        self.assertFalse(self.calendar.covers(datetime.date(2040, 1, 2)))
+        self.assertEqual(out.getvalue().count("WARNING"), 1)
+        self.assertIn("2040", out.getvalue())
+
+    def test_calendar_file_extends_the_tables(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as f:
+            f.write("holidays:\n  - 2040-07-04\nearly_closes:\n  - 2040-07-03\n")
+        self.addCleanup(os.remove, f.name)
+        with mock.patch.dict(os.environ, {CALENDAR_ENV: f.name}):
+            calendar = SessionCalendar(TZ, "08:30:00", "15:00:00")
+        self.assertTrue(calendar.covers(datetime.date(2040, 1, 2)))
+        self.assertFalse(calendar.is_trading_day(datetime.date(2040, 7, 4)))
+        self.assertFalse(calendar.is_trading_day(datetime.date(2024, 7, 4)))  # Built-in days still apply
+        self.assertTrue(calendar.session(at(datetime.date(2040, 7, 3), 9)).early_close)
+
+
+if __name__ == "__main__":
+    unittest.main()
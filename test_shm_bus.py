@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# Unit tests for the shared-memory bar bus
+
+import itertools
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from bar_feed import BarFeedCache
+from indicators import BOSKIndicators, REVIndicators
+from shm_bus import SEQ, BarBus, BarBusPublisher, BarRing, SharedBarFeedCache, block_name
+from sim_fixtures import SimTestCase
+
+_prefixes = itertools.count()
+
+
+class TestBarBus(SimTestCase):
+    closes = [500.0 + 0.3 * np.sin(i / 3) + 0.05 * i for i in range(40)]
+    warmup = 3600  # A dozen bars into the session
+
+    def setUp(self):
+        super().setUp()
+        self.prefix = f"test{os.getpid()}x{next(_prefixes)}"
+        self.feed = BarFeedCache(self.ib).get(self.spy, "5 mins", "1 D", BOSKIndicators())
+        self.publisher = BarBusPublisher(self.feed, block_name(self.prefix, "SPY", "5 mins"))
+        self.feed.start()
+        self.reader = SharedBarFeedCache(self.prefix).get(self.spy, "5 mins", "1 D", BOSKIndicators())
+
+    def tearDown(self):
+        self.reader.stop()
+        self.publisher.close()
+
+    def test_reader_sees_the_publisher_bars_and_indicators(self):
+        self.assertTrue(self.reader.start())
+        df = self.reader.to_df()
+        expected = self.feed.to_df()
+        self.assertEqual(list(df.columns), list(expected.columns))
+        self.assertEqual(len(df), len(expected))
+        np.testing.assert_array_equal(df["close"], expected["close"])
+        self.assertTrue((pd.to_datetime(expected["date"]) == df["date"]).all())
+
+        self.assertTrue(self.reader.add_indicator_columns(df))
+        self.assertTrue(self.feed.add_indicator_columns(expected))
+        for name in BOSKIndicators.columns:
+            np.testing.assert_allclose(df[name], expected[name])
+
+    def test_new_bars_reach_the_reader(self):
+        self.reader.start()
+        before = len(self.reader.to_df())
+        closes = []
+        self.reader.bar_close_event.connect(lambda feed: closes.append(len(feed)))
+        self.ib.sleep(900)
+        df = self.reader.to_df()
+        self.assertEqual(len(df), before + 3)
+        self.assertEqual(closes, [before + 3])
+        self.assertEqual(df["close"].iloc[-1], self.feed.to_df()["close"].iloc[-1])
+
+    def test_unpublished_indicators_fall_back(self):
+        reader = SharedBarFeedCache(self.prefix).get(self.spy, "5 mins", "1 D", REVIndicators())
+        self.assertTrue(reader.start())
+        self.assertFalse(reader.add_indicator_columns(reader.to_df()))
+        reader.stop()
+
+    def test_no_publisher(self):
+        reader = SharedBarFeedCache(self.prefix + "none").get(self.spy)
+        self.assertFalse(reader.start())
+        self.assertIsNone(reader.to_df())
+
+    def test_bus_publishes_each_bar_size_of_a_ticker(self):
+        feeds = [{"ticker": "SPY", "bar_size": size, "indicators": []} for size in ("5 mins", "15 mins")]
+        bus = BarBus(self.open_session(pacing=False), self.prefix + "bus", feeds)
+        self.addCleanup(bus.close)
+        bus.poll()
+        shared = SharedBarFeedCache(self.prefix + "bus")
+        five, fifteen = shared.get(self.spy, "5 mins"), shared.get(self.spy, "15 mins")
+        self.assertTrue(five.start() and fifteen.start())
+        self.addCleanup(five.stop)
+        self.addCleanup(fifteen.stop)
+        for feed, minutes in ((five, 5), (fifteen, 15)):
+            dates = feed.to_df()["date"]
+            self.assertTrue((dates.diff().dropna() == pd.Timedelta(minutes=minutes)).all())
+
+
+class TestBarRing(unittest.TestCase):
+    def setUp(self):
+        self.name = f"test{os.getpid()}ring{next(_prefixes)}"
+        self.ring = BarRing.create(self.name, ["date", "close"], ["date", "close"], ["datetime", "<f8"], None, [], capacity=4)
+
+    def tearDown(self):
+        self.ring.close()
+
+    def test_zero_copy_column_until_wrapped(self):
+        self.ring.write(0, np.array([[1.0, 2.0, 3.0], [10.0, 20.0, 30.0]]), 3)
+        reader = BarRing.attach(self.name)
+        view = reader.column("close")
+        np.testing.assert_array_equal(view, [10.0, 20.0, 30.0])
+        self.assertFalse(view.flags.writeable)
+        self.assertTrue(np.shares_memory(view, reader.data))
+
+        self.ring.write(2, np.array([[3.0, 4.0, 5.0], [31.0, 40.0, 50.0]]), 5)
+        self.assertEqual(view[2], 31.0)  # The view follows the writer
+        del view
+        wrapped = reader.column("close")
+        np.testing.assert_array_equal(wrapped, [20.0, 31.0, 40.0, 50.0])
+        self.assertFalse(np.shares_memory(wrapped, reader.data))
+
+        version, rows = reader.snapshot()
+        self.assertEqual(version[1], 5)
+        np.testing.assert_array_equal(rows[0], [2.0, 3.0, 4.0, 5.0])
+        del wrapped
+        reader.close()
+
+    def test_snapshot_waits_for_the_writer(self):
+        self.ring.header[SEQ] += 1  # Writer stuck mid-update
+        with self.assertRaises(RuntimeError):
+            self.ring.snapshot(retries=10)
+        self.ring.header[SEQ] += 1
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# Unit tests for the simulated broker
+
+import datetime
+import unittest
+
+from ib_insync import LimitOrder, MarketOrder
+
+from bar_feed import BarFeed
+from option_chain import OptionChainCache
+from sim_fixtures import SimTestCase
+
+
+class TestSimIB(SimTestCase):
+    closes = [500.0 + i for i in range(12)]
+    spread = 1.0
+    gap = -0.5  # Up bars: open -> low -> high -> close
+
+    def setUp(self):
+        self.wall = 0.0
+        self.open_session(clock=lambda: self.wall)
+
+    def test_price_walks_the_bar(self):
+        ticker = self.ib.reqMktData(self.spy)
+        seen = []
+        ticker.updateEvent += lambda t: seen.append(t.last)
+        self.ib.sleep(300)
+        # Up bar: open -> low -> high -> close
+        self.assertEqual(min(seen), 499.0)
+        self.assertEqual(max(seen), 501.0)
+        self.assertAlmostEqual(ticker.marketPrice(), 500.5)  # First tick of the next bar (open 500.5)
+
+    def test_bar_feed_streams_completed_bars(self):
+        self.ib.sleep(1800 + 60)
+        feed = BarFeed(self.ib, self.spy)
+        self.assertTrue(feed.start())
+        self.assertEqual(len(feed), 7)  # Six completed bars and the forming one
+        closed = []
+        feed.bar_close_event += lambda f: closed.append(f.to_df()["close"].iloc[-2])
+        self.ib.sleep(600)
+        self.assertEqual(closed, [506.0, 507.0])
+
+    def test_market_order_fills_after_latency_with_slippage(self):
+        statuses = []
+        self.ib.orderStatusEvent += lambda trade: statuses.append(trade.orderStatus.status)
+        self.ib.sleep(60)
+        trade = self.ib.placeOrder(self.spy, MarketOrder("BUY", 10))
+        ask = self.ib.reqTickers(self.spy)[0].ask
+        self.assertEqual(statuses, ["Submitted"])
+        self.ib.sleep(self.ib.fill_latency)
+        self.assertEqual(statuses, ["Submitted", "Filled"])
+        self.assertAlmostEqual(trade.orderStatus.avgFillPrice, ask + self.ib.slippage, delta=0.2)
+        self.assertEqual(trade.fills[0].commissionReport.commission, 6.5)
+        self.assertEqual(self.ib.positions()[0].position, 10)
+
+        self.ib.placeOrder(self.spy, MarketOrder("SELL", 10))
+        self.ib.sleep(1)
+        self.assertEqual(self.ib.positions(), [])
+
+    def test_limit_order_waits_until_marketable(self):
+        trade = self.ib.placeOrder(self.spy, LimitOrder("SELL", 1, 503.0))
+        self.ib.sleep(300)
+        self.assertEqual(trade.orderStatus.status, "Submitted")
+        self.ib.sleep(600)
+        self.assertEqual(trade.orderStatus.status, "Filled")
+        self.assertGreaterEqual(trade.orderStatus.avgFillPrice, 503.0)
+
+        pending = self.ib.placeOrder(self.spy, LimitOrder("BUY", 1, 400.0))
+        self.ib.cancelOrder(pending.order)
+        self.assertEqual(pending.orderStatus.status, "Cancelled")
+        self.assertEqual(self.ib.openTrades(), [])
+
+    def test_option_chain_and_quotes(self):
+        chain = OptionChainCache(self.ib).load(self.spy, datetime.date(2024, 3, 4), max_dte=1)
+        self.assertEqual(chain.expirations, ["20240304", "20240305"])
+        call = chain.select("C", 500.0, "20240304")
+        self.assertEqual(call.localSymbol, "SPY   240304C00500000")
+        itm = self.ib.reqTickers(chain.select("C", 490.0, "20240304"))[0]
+        self.assertGreater(itm.marketPrice(), 9.0)
+        self.assertLess(self.ib.reqTickers(call)[0].marketPrice(), itm.marketPrice())
+
+    def test_historical_pacing(self):
+        request = (self.spy, "", "1 D", "5 mins", "TRADES", True)
+        self.assertEqual(len(self.ib.reqHistoricalData(*request)), 0)  # Session not started yet: no bars
+        self.assertEqual(len(self.ib.reqHistoricalData(*request)), 0)
+        self.assertEqual(self.ib.violations[-1][0], 162)  # Identical request within 15 seconds
+        self.wall += 15.0
+        self.ib.sleep(600)
+        self.assertEqual(len(self.ib.reqHistoricalData(*request)), 2)
+        self.assertEqual(len(self.ib.violations), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
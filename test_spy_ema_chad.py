@@ -7,7 +7,7 @@ import datetime
 import pandas as pd
 import numpy as np
 import pytz
-from ib_insync import Stock, MarketOrder, util
+from ib_insync import Stock, Option, MarketOrder, util
 
 from spy_ema_chad import SPYEMAChad
 
@@ -290,8 +290,9 @@ class TestSPYEMAChad(unittest.TestCase):
         
     def test_enter_position(self):
         """Test entering a position."""
-        # Mock place_order method
+        # Mock place_order method and the option lookup
         self.strategy.place_order = MagicMock()
+        self.strategy.get_spy_option_contract = MagicMock(return_value=Option("SPY", "20240304", 400.0, "C", "SMART"))
         
         # Mock IB ticker response
         mock_ticker = Mock()
@@ -302,7 +303,7 @@ class TestSPYEMAChad(unittest.TestCase):
         self.strategy.enter_position("LONG")
         
         # Check that place_order was called correctly
-        self.strategy.place_order.assert_called_once_with("BUY")
+        self.strategy.place_order.assert_called_once_with("BUY", order_ref="")
         
         # Check that state was updated correctly
         self.assertEqual(self.strategy.position, "LONG")
@@ -318,7 +319,7 @@ class TestSPYEMAChad(unittest.TestCase):
         
         self.strategy.enter_position("SHORT")
         
-        self.strategy.place_order.assert_called_once_with("SELL")
+        self.strategy.place_order.assert_called_once_with("SELL", order_ref="")
         self.assertEqual(self.strategy.position, "SHORT")
         
     def test_exit_position(self):
@@ -307,7 +307,7 @@ class TestSPYORBStrategy(unittest.TestCase):
         self.strategy.get_option_contract.assert_called_once_with("C")
         
         # Verify order was placed
-        self.strategy.place_order.assert_called_once_with("BUY", 2)
+        self.strategy.place_order.assert_called_once_with("BUY", 2, order_ref="")
         
         # Verify state was updated
         self.assertEqual(self.strategy.position, "CALL")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# Unit tests for the event-driven strategy runtime
+
+import asyncio
+import unittest
+from unittest.mock import Mock
+from ib_insync import Event
+
+from spy_bosk_strategy import SPYBOSKStrategy
+from spy_ema_chad import SPYEMAChad
+from spy_orb_strategy import SPYORBStrategy
+from spy_rev_strategy import SPYREVStrategy
+from strategy_runtime import StrategyRuntime
+
+
+class FakeStrategy:
+    """Minimal strategy: returns the queued delays from step(), then stops."""
+
+    def __init__(self, delays, ticker=None):
+        self.delays = list(delays)
+        self.steps = 0
+        self.shut_down = False
+        if ticker is not None:
+            self.ticker = ticker
+        self.bar_feed = Mock()
+        self.bar_feed.bar_close_event = Event("bar_close_event")
+
+    def step(self):
+        self.steps += 1
+        return self.delays.pop(0) if self.delays else None
+
+    def shutdown(self):
+        self.shut_down = True
+
+
+class TestStrategyRuntime(unittest.TestCase):
+    def setUp(self):
+        self.ib = Mock()
+        self.ib.isConnected.return_value = True
+        self.ib.orderStatusEvent = Event("orderStatusEvent")
+        self.runtime = StrategyRuntime(ib=self.ib, min_interval=0)
+
+    def run_until(self, scenario):
+        async def main():
+            task = asyncio.ensure_future(self.runtime.run_async())
+            await asyncio.sleep(0.01)
+            await scenario()
+            self.runtime.stop()
+            await asyncio.wait_for(task, 1)
+
+        asyncio.run(main())
+
+    def test_bar_close_wakes_strategy_before_timeout(self):
+        strategy = self.runtime.add(FakeStrategy([60, 60, 60]))
+
+        async def scenario():
+            self.assertEqual(strategy.steps, 1)
+            strategy.bar_feed.bar_close_event.emit(strategy.bar_feed)
+            await asyncio.sleep(0.01)
+            self.assertEqual(strategy.steps, 2)
+
+        self.run_until(scenario)
+        self.assertIs(strategy.ib, self.ib)
+        self.assertTrue(strategy.shut_down)
+
+    def test_order_status_wakes_every_strategy(self):
+        first = self.runtime.add(FakeStrategy([60, 60]))
+        second = self.runtime.add(FakeStrategy([60, 60]))
+
+        async def scenario():
+            self.ib.orderStatusEvent.emit(Mock())
+            await asyncio.sleep(0.01)
+            self.assertEqual((first.steps, second.steps), (2, 2))
+
+        self.run_until(scenario)
+
+    def test_ticks_shared_per_underlying(self):
+        ticker = Mock()
+        ticker.updateEvent = Event("updateEvent")
+        self.ib.reqMktData.return_value = ticker
+        spy_a = self.runtime.add(FakeStrategy([60, 60], ticker="SPY"))
+        spy_b = self.runtime.add(FakeStrategy([60, 60], ticker="SPY"))
+
+        async def scenario():
+            ticker.updateEvent.emit(ticker)
+            await asyncio.sleep(0.01)
+            self.assertEqual((spy_a.steps, spy_b.steps), (2, 2))
+
+        self.run_until(scenario)
+        self.ib.reqMktData.assert_called_once()
+
+    def test_strategy_returning_none_stops_only_itself(self):
+        done = self.runtime.add(FakeStrategy([]))
+        running = self.runtime.add(FakeStrategy([0, 0, 0, 60]))
+
+        async def scenario():
+            self.assertEqual(done.steps, 1)
+            self.assertEqual(running.steps, 4)
+
+        self.run_until(scenario)
+        self.assertTrue(done.shut_down and running.shut_down)
+
+    def test_shared_bar_feed_wakes_every_strategy(self):
+        first = self.runtime.add(FakeStrategy([60, 60]))
+        second = self.runtime.add(FakeStrategy([60, 60]))
+        second.bar_feed = first.bar_feed
+        self.assertIs(first.bar_feeds, second.bar_feeds)
+
+        async def scenario():
+            first.bar_feed.bar_close_event.emit(first.bar_feed)
+            await asyncio.sleep(0.01)
+            self.assertEqual((first.steps, second.steps), (2, 2))
+
+        self.run_until(scenario)
+
+    def test_strategies_use_the_shared_services(self):
+        for cls in (SPYBOSKStrategy, SPYREVStrategy, SPYORBStrategy, SPYEMAChad):
+            hosted = self.runtime.add(cls())
+            self.assertIs(hosted.get_quote_cache(), hosted.quote_cache)
+            self.assertIs(hosted.get_quote_cache().ib, self.ib)
+            self.assertIs(hosted.get_option_chains(), self.runtime.chains)
+            self.assertIs(hosted.get_bar_feeds(), self.runtime.bar_feeds)
+
+            alone = cls()
+            self.assertIsNone(alone.quote_cache)
+            self.assertIs(alone.get_pricer(), alone.get_pricer())
+            self.assertIs(alone.get_pricer().quotes, alone.quote_cache)  # Built on first use
+            self.assertIs(alone.get_calendar(), alone.calendar)
+
+
+if __name__ == '__main__':
+    unittest.main()
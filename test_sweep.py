@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# Unit tests for the parameter sweep runner
+
+import os
+import tempfile
+import unittest
+
+from backtest import DayMatrix, run_backtest
+from sweep import grid, random_samples, config_params, run_sweep
+from test_backtest import make_bars
+
+
+class TestParameterSpaces(unittest.TestCase):
+    def test_grid_is_cartesian_product(self):
+        combos = grid({"underlying_move_target": [1.0, 1.5], "itm_offset": [2.0, 3.0, 4.0]})
+        self.assertEqual(len(combos), 6)
+        self.assertIn({"underlying_move_target": 1.5, "itm_offset": 3.0}, combos)
+
+    def test_random_samples_respect_ranges_and_types(self):
+        samples = random_samples({"rsi_period": (5, 20), "kc_mult": (1.0, 3.0)}, 50, seed=1)
+        self.assertEqual(len(samples), 50)
+        for sample in samples:
+            self.assertIsInstance(sample["rsi_period"], int)
+            self.assertTrue(5 <= sample["rsi_period"] <= 20)
+            self.assertTrue(1.0 <= sample["kc_mult"] <= 3.0)
+        self.assertEqual(samples, random_samples({"rsi_period": (5, 20), "kc_mult": (1.0, 3.0)}, 50, seed=1))
+
+    def test_config_params_per_ticker(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as f:
+            f.write(
+                "strategies:\n"
+                "  spy_orb:\n"
+                "    script: spy_orb_strategy.py\n"
+                "    args: {ticker: SPY, contracts: 2, underlying_move_target: 1.55, port: 7498}\n"
+                "  qqq_rev:\n"
+                "    script: spy_rev_strategy.py\n"
+                "    args: {ticker: QQQ, rsi_period: 14}\n"
+            )
+        try:
+            params = config_params(f.name, "orb")
+        finally:
+            os.unlink(f.name)
+        self.assertEqual(params, {"SPY": {"underlying_move_target": 1.55}})
+
+
+class TestRunSweep(unittest.TestCase):
+    def test_results_ranked_and_match_direct_backtest(self):
+        bars = {"SPY": make_bars(20, seed=3), "QQQ": make_bars(20, seed=5)}
+        combos = grid({"underlying_move_target": [0.5, 1.0, 1.5]})
+        results = run_sweep("orb", bars, combos, {"SPY": {"itm_offset": 1.0}}, workers=2)
+
+        self.assertEqual(len(results), 6)
+        self.assertTrue(results["total_pnl"].is_monotonic_decreasing)
+
+        row = results[(results["ticker"] == "SPY") & (results["underlying_move_target"] == 1.0)].iloc[0]
+        self.assertEqual(row["itm_offset"], 1.0)
+        direct = run_backtest("orb", bars["SPY"], underlying_move_target=1.0, itm_offset=1.0).summary()
+        self.assertAlmostEqual(row["total_pnl"], direct["total_pnl"])
+        self.assertEqual(row["trades"], direct["trades"])
+
+    def test_from_arrays_shares_memory(self):
+        m = DayMatrix(make_bars(5))
+        stacked = m.stacked()
+        view = DayMatrix.from_arrays(m.days, stacked, m.open_minute, m.bar_minutes)
+        self.assertEqual(view.shape, m.shape)
+        stacked[3, 0, 0] = 123.0
+        self.assertEqual(view.close[0, 0], 123.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
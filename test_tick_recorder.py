@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# Unit tests for the tick recorder
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from ib_insync import MarketOrder, Stock
+
+from bar_feed import BarFeed
+from quote_cache import QuoteCache
+from sim_fixtures import DAY, EXPIRY, SimTestCase
+from spy_bosk_strategy import SPYBOSKStrategy
+from spy_ema_chad import SPYEMAChad
+from spy_orb_strategy import SPYORBStrategy
+from spy_rev_strategy import SPYREVStrategy
+from tick_recorder import BAR, FILL, ORDER, QUOTE, TICK_DTYPE, TickRecorder, bars_from_ticks, read_index, read_ticks, ticks_to_df
+
+
+class TestTickRecorder(SimTestCase):
+    closes = [500.0 + 0.25 * i for i in range(24)]
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.recorder = TickRecorder(self.root, "test", clock=lambda: self.ib.time)
+
+    def test_quotes_and_orders_round_trip(self):
+        quotes = QuoteCache(self.ib)
+        self.recorder.watch_quotes(quotes)
+        self.recorder.watch_orders(self.ib)
+        self.recorder.watch_quotes(quotes)  # Watching twice records once
+        ticker = quotes.subscribe(self.spy)
+        self.ib.sleep(60)
+        call = self.load_chain().select("C", 500.0, EXPIRY)
+        quotes.subscribe(call)
+        trade = self.ib.placeOrder(call, MarketOrder("BUY", 2))
+        self.ib.sleep(5)
+
+        records, contracts = self.recorder.load_day(DAY)
+        self.assertEqual(len(records), self.recorder.recorded)
+        self.assertEqual([c.symbol for c in contracts], ["SPY", "SPY"])
+        self.assertEqual(contracts[1].conId, call.conId)
+        spy = ticks_to_df(records, contracts, QUOTE, "US/Central")
+        spy = spy[spy["contract"] == "SPY"]
+        self.assertEqual(len(spy), 13)  # A tick every 5 seconds
+        self.assertEqual(spy["time"].iloc[-1], self.ib.now())
+        self.assertEqual(tuple(spy.iloc[-1][["bid", "ask", "last"]]), (ticker.bid, ticker.ask, ticker.last))
+
+        orders = ticks_to_df(records, contracts, ORDER)
+        self.assertEqual(list(orders["status"]), ["Submitted", "Filled"])
+        self.assertEqual(orders["order_id"].iloc[-1], trade.order.orderId)
+        fills = ticks_to_df(records, contracts, FILL)
+        self.assertEqual((fills["side"].iloc[0], fills["shares"].iloc[0]), ("BUY", 2.0))
+        self.assertEqual(fills["price"].iloc[0], trade.orderStatus.avgFillPrice)
+
+    def test_completed_bars_replay_as_recorded(self):
+        feed = BarFeed(self.ib, self.spy)
+        self.recorder.watch_bars(feed)
+        self.assertTrue(feed.start())
+        self.ib.sleep(len(self.bars) * 300)
+        records, contracts = self.recorder.load_day(DAY)
+        self.assertGreater((records["kind"] == BAR).sum(), len(self.bars))  # Forming updates as well
+        bars = bars_from_ticks(records, contracts, "SPY", "US/Central")
+        expected = self.bars.iloc[: len(bars)]
+        self.assertEqual(len(bars), len(self.bars) - 1)  # The last bar never closed
+        self.assertTrue((bars["date"].to_numpy() == expected["date"].to_numpy()).all())
+        np.testing.assert_allclose(bars[["open", "high", "low", "close"]], expected[["open", "high", "low", "close"]])
+
+    def test_every_strategy_records_its_bars_and_flushes_on_shutdown(self):
+        for cls in (SPYBOSKStrategy, SPYREVStrategy, SPYORBStrategy, SPYEMAChad):
+            with self.subTest(cls.__name__):
+                self.open_session()
+                strategy = cls()
+                strategy.ib = self.ib
+                strategy.recorder = TickRecorder(self.root, cls.__name__, clock=lambda: self.ib.time)
+                if isinstance(strategy, SPYEMAChad):
+                    strategy.get_historical_data()
+                else:
+                    strategy.get_intraday_5min()
+                self.ib.sleep(600)
+                strategy.shutdown()
+                strategy.stop_bar_feed()
+                records = read_ticks(strategy.recorder.path(DAY))  # On disk without another flush
+                self.assertGreater((records["kind"] == BAR).sum(), 0)
+
+    def test_day_files_and_restart(self):
+        now = [datetime.datetime(2024, 3, 4, 23, 59, 59, tzinfo=datetime.timezone.utc).timestamp()]
+        recorder = TickRecorder(self.root, "days", tz="UTC", clock=lambda: now[0])
+        ticker = self.ib.reqMktData(self.spy)
+        recorder.record_quote(ticker)
+        now[0] += 2  # Past midnight
+        recorder.record_quote(ticker)
+        recorder.close()
+        self.assertEqual(recorder.days(), [DAY, DAY + datetime.timedelta(days=1)])
+        self.assertEqual([len(recorder.load_day(day)[0]) for day in recorder.days()], [1, 1])
+
+        # A restart the same day keeps the index and drops a half-written record
+        path = recorder.path(DAY + datetime.timedelta(days=1))
+        with open(path, "ab") as f:
+            f.write(b"\0" * (TICK_DTYPE.itemsize // 2))
+        restarted = TickRecorder(self.root, "days", tz="UTC", clock=lambda: now[0])
+        restarted.record_quote(ticker)
+        restarted.record_quote(self.ib.reqMktData(Stock("QQQ", "SMART", "USD")))
+        restarted.close()
+        self.assertEqual(os.path.getsize(path), 3 * TICK_DTYPE.itemsize)
+        records, contracts = restarted.load_day(DAY + datetime.timedelta(days=1))
+        self.assertEqual(list(records["key"]), [0, 0, 1])
+        self.assertEqual([c.symbol for c in read_index(restarted.index_path(DAY + datetime.timedelta(days=1)))], ["SPY", "QQQ"])
+
+
+if __name__ == "__main__":
+    unittest.main()
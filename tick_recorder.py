@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# Tick recorder for the CHAD strategies
+# Captures every quote, bar update and order event a strategy sees into append-only binary day files with a contract index, for offline replay and debugging.
+
+import argparse
+import datetime
+import json
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytz
+from ib_insync import *
+from ib_insync.util import UNSET_DOUBLE
+
+# Record kinds
+QUOTE, BAR, ORDER, FILL = range(4)
+KINDS = ("quote", "bar", "order", "fill")
+
+# One fixed-width record per event; the meaning of v0..v5 depends on the kind (FIELDS)
+TICK_DTYPE = np.dtype([
+    ("time", "<i8"),      # UTC epoch nanoseconds the event was recorded
+    ("kind", "u1"),       # QUOTE, BAR, ORDER or FILL
+    ("flag", "u1"),       # BAR: 1 once the bar is complete; ORDER: index into ORDER_STATES
+    ("side", "i1"),       # ORDER / FILL: +1 buy, -1 sell
+    ("key", "<u2"),       # Line of the day's index file (the contract)
+    ("order_id", "<i4"),  # ORDER / FILL
+    ("v0", "<f8"),
+    ("v1", "<f8"),
+    ("v2", "<f8"),
+    ("v3", "<f8"),
+    ("v4", "<f8"),
+    ("v5", "<f8"),
+])
+VALUES = ("v0", "v1", "v2", "v3", "v4", "v5")
+FIELDS = {
+    QUOTE: ("bid", "ask", "last", "bidSize", "askSize", "lastSize"),
+    BAR: ("open", "high", "low", "close", "volume", "start"),  # start: epoch seconds of the bar
+    ORDER: ("quantity", "filled", "remaining", "avgFillPrice", "lmtPrice", "auxPrice"),
+    FILL: ("shares", "price", "cumQty", "avgPrice"),
+}
+ORDER_STATES = (
+    "PendingSubmit", "ApiPending", "PreSubmitted", "Submitted", "PendingCancel",
+    "ApiCancelled", "Cancelled", "Filled", "Inactive",
+)
+_STATE_CODES = {state: code for code, state in enumerate(ORDER_STATES)}
+_UNKNOWN_STATE = 255
+
+# Contract fields written to the index
+INDEX_FIELDS = ("conId", "secType", "symbol", "localSymbol", "lastTradeDateOrContractMonth", "strike", "right", "multiplier")
+
+
+def _float(value) -> float:
+    return math.nan if value is None or value == UNSET_DOUBLE else float(value)
+
+
+def read_ticks(path: str) -> np.ndarray:
+    """Records of one day file; a trailing partial record (interrupted write) is ignored."""
+    count = os.path.getsize(path) // TICK_DTYPE.itemsize
+    return np.fromfile(path, dtype=TICK_DTYPE, count=count)
+
+
+def read_index(path: str) -> list[Contract]:
+    """Contracts of a day's index file; a record's ``key`` is the position in this list."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [Contract.create(**json.loads(line)) for line in f if line.endswith("\n")]
+
+
+def ticks_to_df(records: np.ndarray, contracts: list[Contract], kind: int, tz: str | datetime.tzinfo = "UTC") -> pd.DataFrame:
+    """The records of one *kind* with named columns and the contract's ``localSymbol`` (or symbol)."""
+    records = records[records["kind"] == kind]
+    names = [contract.localSymbol or contract.symbol for contract in contracts]
+    df = pd.DataFrame({"time": pd.to_datetime(records["time"], utc=True).tz_convert(tz)})
+    df["contract"] = [names[key] for key in records["key"]]
+    if kind == BAR:
+        df["final"] = records["flag"] == 1
+    elif kind == ORDER:
+        df["status"] = [ORDER_STATES[code] if code < len(ORDER_STATES) else "" for code in records["flag"]]
+    if kind in (ORDER, FILL):
+        df["order_id"] = records["order_id"]
+        df["side"] = np.where(records["side"] > 0, "BUY", "SELL")
+    for name, value in zip(FIELDS[kind], VALUES):
+        df[name] = records[value]
+    return df
+
+
+def bars_from_ticks(records: np.ndarray, contracts: list[Contract], symbol: str, tz: str | datetime.tzinfo = "UTC") -> pd.DataFrame:
+    """Completed bars of *symbol* as ``date, open, high, low, close, volume`` (what ``backtest.load_bars`` returns)."""
+    keys = [key for key, contract in enumerate(contracts) if contract.symbol == symbol and contract.secType == "STK"]
+    done = records[(records["kind"] == BAR) & (records["flag"] == 1) & np.isin(records["key"], keys)]
+    df = pd.DataFrame({name: done[value] for name, value in zip(FIELDS[BAR][:5], VALUES)})
+    df.insert(0, "date", pd.to_datetime(done["v5"], unit="s", utc=True).tz_convert(tz))
+    return df.drop_duplicates("date", keep="last").sort_values("date", ignore_index=True)
+
+
+class TickRecorder:
+    """Append-only recording of the market data and order events a strategy sees.
+
+    Files live at ``<root>/<name>/<YYYYMMDD>.ticks`` and hold raw ``TICK_DTYPE``
+    records in arrival order, as ``BarStore`` keeps its bars: a day is read
+    with one ``np.fromfile`` and nothing is ever rewritten.  Records refer to
+    their contract by ``key``, the line of the day's ``<YYYYMMDD>.index`` file
+    (one JSON contract per line, written before the first record using it).
+
+    Recording an event only copies a few numbers into a preallocated record
+    buffer; the buffer is written out when it is full, at least every
+    *flush_interval* seconds and on ``flush()``/``close()``, so the cost per
+    tick stays in the microseconds (``record_quote`` in ``bench_signals.py``).
+    A crash loses at most the unflushed buffer.  The day of a record is its
+    ``clock()`` time in *tz*.
+    """
+
+    def __init__(
+        self,
+        root: str = "ticks",
+        name: str = "ticks",
+        tz: str = "US/Central",
+        capacity: int = 4096,
+        flush_interval: float = 1.0,
+        clock=time.time,
+    ):
+        self.root = root
+        self.name = name
+        self.tz = pytz.timezone(tz)
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.recorded = 0
+        self._buffer = np.zeros(capacity, dtype=TICK_DTYPE)
+        self._size = 0
+        self._flushed_at = -math.inf
+        self._day: datetime.date | None = None
+        self._day_bounds = (math.inf, -math.inf)  # Epoch seconds [start, end) of the open day
+        self._keys: dict[tuple, int] = {}  # Contract identity -> index line of the open day
+        self._by_ticker: dict[int, tuple[Ticker, int]] = {}  # id(ticker) -> (ticker, key)
+        self._watched: set[int] = set()
+
+    def directory(self) -> str:
+        return os.path.join(self.root, self.name)
+
+    def path(self, day: datetime.date) -> str:
+        return os.path.join(self.directory(), day.strftime("%Y%m%d") + ".ticks")
+
+    def index_path(self, day: datetime.date) -> str:
+        return os.path.join(self.directory(), day.strftime("%Y%m%d") + ".index")
+
+    def days(self) -> list[datetime.date]:
+        """Days with recorded ticks, oldest first."""
+        directory = self.directory()
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            datetime.datetime.strptime(name[:-6], "%Y%m%d").date()
+            for name in os.listdir(directory)
+            if name.endswith(".ticks")
+        )
+
+    def load_day(self, day: datetime.date) -> tuple[np.ndarray, list[Contract]]:
+        """Records and contracts of *day* (including what is still buffered)."""
+        if day == self._day:
+            self.flush()
+        path = self.path(day)
+        records = read_ticks(path) if os.path.exists(path) else np.empty(0, TICK_DTYPE)
+        return records, read_index(self.index_path(day))
+
+    # ------------------------------------------------------------------
+    # Sources
+    # ------------------------------------------------------------------
+    def _watch(self, source) -> bool:
+        if id(source) in self._watched:
+            return False
+        self._watched.add(id(source))
+        return True
+
+    def watch_quotes(self, quotes):
+        """Record every tick streamed through a ``QuoteCache``."""
+        if self._watch(quotes):
+            quotes.tick_event.connect(self.record_quote)
+
+    def watch_bars(self, feed):
+        """Record the bar updates of a ``BarFeed``: the forming bar on each update, the completed one at its close."""
+        if self._watch(feed) and hasattr(feed, "update_event"):
+            feed.update_event.connect(self._on_bar_update)
+            feed.bar_close_event.connect(self._on_bar_close)
+
+    def watch_orders(self, ib: IB):
+        """Record the status changes and executions of every order on the connection."""
+        if self._watch(ib):
+            ib.orderStatusEvent.connect(self.record_order)
+            ib.execDetailsEvent.connect(self.record_fill)
+
+    def _on_bar_update(self, feed):
+        if feed.bars:
+            self.record_bar(feed.contract, feed.bars[-1])
+
+    def _on_bar_close(self, feed):
+        if feed.bars is not None and len(feed.bars) > 1:
+            self.record_bar(feed.contract, feed.bars[-2], final=True)
+
+    # ------------------------------------------------------------------
+    # Records
+    # ------------------------------------------------------------------
+    def record_quote(self, ticker: Ticker):
+        entry = self._by_ticker.get(id(ticker))
+        now = self.clock()
+        if entry is None or not self._day_bounds[0] <= now < self._day_bounds[1]:
+            self._roll(now)
+            entry = self._by_ticker[id(ticker)] = (ticker, self._key(ticker.contract))
+        self._append(now, QUOTE, 0, 0, entry[1], 0, (
+            ticker.bid, ticker.ask, ticker.last, ticker.bidSize, ticker.askSize, ticker.lastSize,
+        ))
+
+    def record_bar(self, contract: Contract, bar, final: bool = False):
+        now = self.clock()
+        self._roll(now)
+        start = pd.Timestamp(bar.date)
+        start = (start.tz_localize(self.tz) if start.tzinfo is None else start).timestamp()
+        self._append(now, BAR, int(final), 0, self._key(contract), 0, (
+            bar.open, bar.high, bar.low, bar.close, bar.volume, start,
+        ))
+
+    def record_order(self, trade: Trade):
+        now = self.clock()
+        self._roll(now)
+        order, status = trade.order, trade.orderStatus
+        self._append(now, ORDER, _STATE_CODES.get(status.status, _UNKNOWN_STATE), 1 if order.action == "BUY" else -1,
+                     self._key(trade.contract), order.orderId, (
+            order.totalQuantity, status.filled, status.remaining, status.avgFillPrice,
+            _float(order.lmtPrice), _float(order.auxPrice),
+        ))
+
+    def record_fill(self, trade: Trade, fill: Fill):
+        now = self.clock()
+        self._roll(now)
+        execution = fill.execution
+        self._append(now, FILL, 0, 1 if execution.side == "BOT" else -1, self._key(fill.contract), execution.orderId, (
+            execution.shares, execution.price, execution.cumQty, execution.avgPrice, math.nan, math.nan,
+        ))
+
+    def _append(self, now: float, kind: int, flag: int, side: int, key: int, order_id: int, values: tuple):
+        self._buffer[self._size] = (int(now * 1e9), kind, flag, side, key, order_id, *values)
+        self._size += 1
+        self.recorded += 1
+        if self._size == len(self._buffer) or now - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    # ------------------------------------------------------------------
+    # Day files
+    # ------------------------------------------------------------------
+    def _roll(self, now: float):
+        """Switch to the day file of *now* when it leaves the open day."""
+        if self._day_bounds[0] <= now < self._day_bounds[1]:
+            return
+        self.flush()
+        day = datetime.datetime.fromtimestamp(now, self.tz).date()
+        start = self.tz.localize(datetime.datetime.combine(day, datetime.time(0, 0))).timestamp()
+        end = self.tz.localize(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time(0, 0))).timestamp()
+        self._day, self._day_bounds = day, (start, end)
+        self._by_ticker.clear()
+        # A restart on the same day continues its index and drops a half-written record
+        contracts = read_index(self.index_path(day))
+        self._keys = {self._identity(contract): key for key, contract in enumerate(contracts)}
+        path = self.path(day)
+        partial = os.path.getsize(path) % TICK_DTYPE.itemsize if os.path.exists(path) else 0
+        if partial:
+            os.truncate(path, os.path.getsize(path) - partial)
+
+    @staticmethod
+    def _identity(contract: Contract) -> tuple:
+        return (contract.conId,) if contract.conId else (contract.secType, contract.symbol, contract.localSymbol,
+                                                         contract.lastTradeDateOrContractMonth, contract.strike, contract.right)
+
+    def _key(self, contract: Contract) -> int:
+        identity = self._identity(contract)
+        key = self._keys.get(identity)
+        if key is None:
+            key = self._keys[identity] = len(self._keys)
+            os.makedirs(self.directory(), exist_ok=True)
+            fields = {name: getattr(contract, name) for name in INDEX_FIELDS}
+            with open(self.index_path(self._day), "a") as f:
+                f.write(json.dumps(fields) + "\n")
+        return key
+
+    def flush(self):
+        """Append the buffered records to the open day file."""
+        self._flushed_at = self.clock()
+        if not self._size:
+            return
+        os.makedirs(self.directory(), exist_ok=True)
+        with open(self.path(self._day), "ab") as f:
+            self._buffer[: self._size].tofile(f)
+        self._size = 0
+
+    def close(self):
+        self.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect a recorded tick file")
+    parser.add_argument("path", type=str, help="A <YYYYMMDD>.ticks file")
+    parser.add_argument("--kind", type=str, default=None, choices=KINDS, help="Print every record of this kind")
+    parser.add_argument("--bars", type=str, default=None, metavar="CSV",
+                        help="Write the completed bars of --symbol to a CSV backtest.py and replay.py read")
+    parser.add_argument("--symbol", type=str, default="SPY", help="Underlying of the exported bars")
+    parser.add_argument("--tz", type=str, default="US/Central", help="Timezone of the printed times")
+    args = parser.parse_args()
+
+    records = read_ticks(args.path)
+    contracts = read_index(args.path[: -len(".ticks")] + ".index")
+    if args.kind:
+        print(ticks_to_df(records, contracts, KINDS.index(args.kind), args.tz).to_string())
+    elif args.bars:
+        bars = bars_from_ticks(records, contracts, args.symbol, args.tz)
+        bars.to_csv(args.bars, index=False)
+        print(f"Wrote {len(bars)} bars to {args.bars}")
+    else:
+        kinds, counts = np.unique(records["kind"], return_counts=True)
+        print(f"{len(records)} records, {len(contracts)} contracts")
+        for kind, count in zip(kinds, counts):
+            print(f"{KINDS[kind]:>6}: {count}")